@@ -1,9 +1,17 @@
-from flask import Flask, send_from_directory
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 from config import config
 from utils.database import db_instance
 from routes.sounds import sounds_bp
 from routes.analytics import analytics_bp
+from routes.search import search_bp
+from routes.uploads import uploads_bp
+from utils.suggest_index import suggest_index
+from utils.recommender import recommender
+from utils.audio_similarity import audio_index
+from utils.storage import get_storage
+from utils.streaming import send_audio_file
+from utils.renditions import rendition_cache, select_rendition
 import os
 
 def create_app(config_name='development'):
@@ -16,29 +24,82 @@ def create_app(config_name='development'):
     # Inicializar conexión a la base de datos
     with app.app_context():
         db_instance.connect()
+        
+        # Cargar el índice de autocompletado y la matriz de recomendaciones
+        try:
+            terms = suggest_index.load(db_instance.get_collection('sonidos'))
+            print(f"Índice de sugerencias cargado: {terms} términos")
+        except Exception:
+            print("Las sugerencias se cargarán en la primera petición")
+        
+        try:
+            sounds = recommender.load(db_instance.get_collection('sonidos'))
+            print(f"Motor de recomendaciones cargado: {sounds} sonidos")
+        except Exception:
+            print("Las recomendaciones se cargarán en la primera petición")
+        
+        if os.path.exists(audio_index.path):
+            try:
+                sounds = audio_index.load()
+                print(f"Índice de audio cargado: {sounds} sonidos")
+            except Exception:
+                print("El índice de audio se cargará en la primera petición")
     
     # Registrar blueprints
     app.register_blueprint(sounds_bp, url_prefix='/api')
     app.register_blueprint(analytics_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(uploads_bp, url_prefix='/api')
     
-    # Ruta para servir archivos de audio
-    @app.route('/uploads/<filename>')
+    # Ruta para servir archivos de audio: en local soporta Range, ETag y 304;
+    # con S3 redirige al almacenamiento. Con ?quality=, ?format= o Accept:
+    # audio/ogg sirve la versión comprimida si ya existe y si no, el original
+    # mientras se genera en segundo plano. Solo con RENDITIONS_INLINE las
+    # versiones pedidas con quality/format se generan dentro de la petición
+    @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        storage = get_storage(app.config['UPLOAD_FOLDER'])
+        try:
+            rendition = select_rendition(
+                request.args.get('quality'), request.args.get('format'), request.accept_mimetypes
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if any(part.startswith('.') for part in filename.split('/')):
+            rendition = None
+        
+        response = None
+        if rendition:
+            output_format, quality, explicit = rendition
+            if explicit and app.config['RENDITIONS_INLINE']:
+                relative_path = rendition_cache.get(filename, output_format, quality, storage)
+            else:
+                relative_path = rendition_cache.cached(filename, output_format, quality)
+            if relative_path:
+                response = send_audio_file(rendition_cache.folder, relative_path)
+        
+        if response is None:
+            response = storage.serve(filename)
+            if rendition and response.status_code < 400:
+                rendition_cache.schedule(filename, storage, rendition[0], rendition[1])
+        if 'quality' not in request.args and 'format' not in request.args:
+            response.vary.add('Accept')
+        return response
     
     # Ruta de health check
     @app.route('/api/health')
     def health_check():
-        return {'status': 'OK', 'message': 'SoundScape Explorer API está funcionando'}
+        return jsonify({'status': 'OK', 'message': 'SoundScape Explorer API está funcionando'})
     
     # Manejo de errores
     @app.errorhandler(404)
     def not_found(error):
-        return {'success': False, 'error': 'Endpoint no encontrado'}, 404
+        return jsonify({'success': False, 'error': 'Endpoint no encontrado'}), 404
     
     @app.errorhandler(500)
     def internal_error(error):
-        return {'success': False, 'error': 'Error interno del servidor'}, 500
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
     
     return app
 
@@ -0,0 +1,222 @@
+"""
+API ASGI de SoundScape Explorer (lectura de sonidos y analytics)
+
+Sirve el mismo contrato que app.py para GET /api/sounds, /api/sounds/<id>
+y /api/analytics/{emotions,locations,tags,timeline,dashboard,database}.
+Las consultas usan Motor: mientras una espera a MongoDB el mismo proceso
+atiende otras peticiones, sin un hilo bloqueado por cada una.
+
+Las escrituras, subidas, búsqueda, audio y la caché de respuestas siguen
+en la app Flask; los índices también los crea app.py al arrancar.
+
+Uso:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import contextlib
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from config import config
+from models.async_sound_model import AsyncSoundModel
+from models.sound_model import SoundModel
+from utils.dashboard import dashboard_sections, gather_sections
+from utils.database import PoolMonitor, client_options, pool_summary
+
+def get_page_size(request, default):
+    """Parámetro limit acotado por MAX_PAGE_SIZE (como utils.helpers.get_page_size)"""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, request.app.state.config.MAX_PAGE_SIZE))
+
+def get_float(request, name):
+    """Parámetro numérico opcional; los valores no numéricos se ignoran"""
+    try:
+        return float(request.query_params[name])
+    except (KeyError, ValueError):
+        return None
+
+def is_live_request(request):
+    """source=live recalcula con agregaciones en lugar de leer los contadores"""
+    return request.query_params.get('source') == 'live'
+
+def error_response(error, status_code):
+    return JSONResponse({'success': False, 'error': str(error)}, status_code=status_code)
+
+async def get_sounds(request):
+    """Obtener sonidos con filtros opcionales, paginados por cursor"""
+    try:
+        sound_model = request.app.state.sound_model
+        lat = get_float(request, 'lat')
+        lng = get_float(request, 'lng')
+        try:
+            radius = int(request.query_params.get('radius', 10))
+        except ValueError:
+            radius = 10
+        emotion = request.query_params.get('emotion')
+        cursor = request.query_params.get('cursor')
+        projection = SoundModel.build_projection(
+            request.query_params.get('view'), request.query_params.get('fields')
+        )
+
+        if lat and lng:
+            limit = get_page_size(request, 50)
+            sounds, next_cursor = await sound_model.get_sounds_by_location(
+                lat, lng, radius, limit=limit, cursor=cursor, projection=projection
+            )
+        elif emotion:
+            limit = get_page_size(request, 20)
+            sounds, next_cursor = await sound_model.get_sounds_by_emotion(
+                emotion, limit=limit, cursor=cursor, projection=projection
+            )
+        else:
+            limit = get_page_size(request, 100)
+            sounds, next_cursor = await sound_model.get_all_sounds(
+                limit, cursor=cursor, projection=projection
+            )
+
+        return JSONResponse({
+            'success': True,
+            'data': sounds,
+            'count': len(sounds),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+
+    except ValueError as e:
+        return error_response(e, 400)
+
+    except Exception as e:
+        return error_response(e, 500)
+
+async def get_sound(request):
+    """Obtener un sonido específico por ID"""
+    try:
+        sound = await request.app.state.sound_model.get_sound_by_id(request.path_params['sound_id'])
+
+        if not sound:
+            return error_response('Sonido no encontrado', 404)
+
+        return JSONResponse({'success': True, 'data': sound})
+
+    except Exception as e:
+        return error_response(e, 500)
+
+def analytics_endpoint(method_name):
+    """Endpoint de analytics que devuelve {'success', 'data'} con un método del modelo"""
+    async def endpoint(request):
+        try:
+            method = getattr(request.app.state.sound_model, method_name)
+            data = await method(live=is_live_request(request))
+            return JSONResponse({'success': True, 'data': data})
+
+        except Exception as e:
+            return error_response(e, 500)
+    return endpoint
+
+async def get_dashboard(request):
+    """Emociones, ubicaciones, etiquetas y línea de tiempo en una respuesta"""
+    try:
+        payload = await gather_sections(
+            dashboard_sections(request.app.state.sound_model, live=is_live_request(request)),
+            request.app.state.config.DASHBOARD_TIMEOUT
+        )
+
+        if not payload['success']:
+            return JSONResponse({
+                'success': False,
+                'error': 'No se pudo calcular ninguna sección del dashboard',
+                'sections': payload['sections']
+            }, status_code=500)
+
+        headers = {'Cache-Control': 'no-store'} if payload['partial'] else None
+        return JSONResponse(payload, headers=headers)
+
+    except Exception as e:
+        return error_response(e, 500)
+
+async def get_database_stats(request):
+    """Métricas del pool de conexiones de Motor en este worker"""
+    return JSONResponse({
+        'success': True,
+        'data': pool_summary(request.app.state.pool_monitor, request.app.state.config)
+    })
+
+async def health_check(request):
+    return JSONResponse({'status': 'OK', 'message': 'SoundScape Explorer API está funcionando'})
+
+async def not_found(request, exc):
+    if exc.status_code == 404:
+        return error_response('Endpoint no encontrado', 404)
+    return error_response(exc.detail, exc.status_code)
+
+async def internal_error(request, exc):
+    return error_response('Error interno del servidor', 500)
+
+def create_app(config_name='development', client=None):
+    """
+    Crear la app ASGI
+
+    Args:
+        config_name: Clave de config (development, production, testing)
+        client: Cliente de Motor ya creado (por defecto uno nuevo con MONGODB_URI)
+    """
+    app_config = config[config_name]
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        motor_client = client or AsyncIOMotorClient(
+            app_config.MONGODB_URI,
+            **client_options(app_config, event_listeners=[app.state.pool_monitor])
+        )
+        try:
+            await motor_client.admin.command('ping')
+            print("Conexión asíncrona exitosa a MongoDB Atlas")
+        except Exception as e:
+            print(f"Error conectando a MongoDB: {e}")
+            raise e
+
+        app.state.sound_model = AsyncSoundModel(motor_client[app_config.DATABASE_NAME])
+        yield
+        if client is None:
+            motor_client.close()
+
+    routes = [
+        Route('/api/health', health_check),
+        Route('/api/sounds', get_sounds),
+        Route('/api/sounds/{sound_id}', get_sound),
+        Route('/api/analytics/emotions', analytics_endpoint('get_emotion_patterns')),
+        Route('/api/analytics/locations', analytics_endpoint('get_location_stats')),
+        Route('/api/analytics/tags', analytics_endpoint('get_tag_stats')),
+        Route('/api/analytics/timeline', analytics_endpoint('get_timeline_stats')),
+        Route('/api/analytics/dashboard', get_dashboard),
+        Route('/api/analytics/database', get_database_stats)
+    ]
+
+    app = Starlette(
+        debug=app_config.DEBUG,
+        routes=routes,
+        middleware=[Middleware(CORSMiddleware, allow_origins=[app_config.FRONTEND_URL])],
+        exception_handlers={HTTPException: not_found, 500: internal_error},
+        lifespan=lifespan
+    )
+    app.state.config = app_config
+    app.state.pool_monitor = PoolMonitor()
+    return app
+
+# Instancia global de la app ASGI (uvicorn asgi_app:app)
+app = create_app('production')
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🎵 SoundScape Explorer Backend (ASGI) iniciando...")
+    print(f"🌍 Servidor corriendo en: http://localhost:8000")
+
+    uvicorn.run('asgi_app:app', host='0.0.0.0', port=8000)
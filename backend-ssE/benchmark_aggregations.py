@@ -0,0 +1,358 @@
+"""
+Benchmark de regresión de las agregaciones de analytics
+
+Genera un corpus sintético en una base de datos aparte y mide, para cada
+tamaño y estadística, tres caminos de lectura:
+
+- legacy: los pipelines anteriores, con $push sin límite
+- acotado: los pipelines con $topN e histogramas (?source=live)
+- contadores: las lecturas de sonidos_stats y sonidos_celdas que usa la API
+  por defecto, tras reconstruirlos desde el corpus
+
+De cada uno se reporta la latencia, el tamaño de la respuesta y, según
+explain (executionStats), la memoria de acumuladores y ordenaciones y lo
+que se volcó a disco con allowDiskUse.
+
+Uso:
+    python benchmark_aggregations.py --sizes 10000,100000,1000000 [--skip-legacy]
+"""
+
+import os
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+import bson
+from dotenv import load_dotenv
+from config import Config
+from utils.database import db_instance
+from models import analytics_pipelines
+from models.sound_model import SoundModel
+
+# Cargar variables de entorno
+load_dotenv()
+
+BENCHMARK_DATABASE_NAME = os.getenv('BENCHMARK_DATABASE_NAME', 'soundscape_benchmark')
+
+EMOCIONES = ['alegria', 'tristeza', 'calma', 'energia', 'nostalgia', 'miedo', 'sorpresa', 'paz']
+ETIQUETAS = [f'etiqueta_{i}' for i in range(200)]
+SONIDOS = ['naturaleza', 'urbano', 'musica', 'voces', 'animales', 'agua', 'viento']
+
+# Pipelines actuales, con los mismos límites que la API con ?source=live
+BOUNDED_PIPELINES = {
+    'emociones': lambda: analytics_pipelines.emotion_patterns_pipeline(analytics_pipelines.EMOTION_STATS_LIMIT),
+    'etiquetas': lambda: analytics_pipelines.tag_stats_pipeline(analytics_pipelines.TAG_STATS_LIMIT),
+    'ubicaciones': lambda: analytics_pipelines.location_stats_pipeline(analytics_pipelines.LOCATION_STATS_LIMIT),
+    'linea_tiempo': lambda: analytics_pipelines.timeline_pipeline(analytics_pipelines.TIMELINE_DAYS)
+}
+
+# Lecturas de los contadores materializados: (método de SoundModel, consulta equivalente para explain)
+ROLLUP_READS = {
+    'emociones': ('get_emotion_patterns', {
+        "find": "sonidos_stats", "filter": {"tipo": "emocion"},
+        "sort": {"count": -1}, "limit": analytics_pipelines.EMOTION_STATS_LIMIT
+    }),
+    'etiquetas': ('get_tag_stats', {
+        "find": "sonidos_stats", "filter": {"tipo": "etiqueta"},
+        "sort": {"count": -1}, "limit": analytics_pipelines.TAG_STATS_LIMIT
+    }),
+    'ubicaciones': ('get_location_stats', {
+        "find": "sonidos_celdas", "filter": {"precision": analytics_pipelines.LOCATION_STATS_PRECISION},
+        "sort": {"count": -1}, "limit": analytics_pipelines.LOCATION_STATS_LIMIT
+    }),
+    'linea_tiempo': ('get_timeline_stats', {
+        "find": "sonidos_stats", "filter": {"tipo": "dia"},
+        "sort": {"fecha": -1}, "limit": analytics_pipelines.TIMELINE_DAYS
+    })
+}
+
+VARIANTS = ('legacy', 'acotado', 'contadores')
+
+# Pipelines anteriores, con $push sin límite, para comparar
+LEGACY_PIPELINES = {
+    'emociones': lambda: [
+        {"$unwind": "$emociones"},
+        {"$group": {"_id": "$emociones", "count": {"$sum": 1}, "sonidos_ejemplo": {"$push": "$nombre"}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 10}
+    ],
+    'etiquetas': lambda: [
+        {"$unwind": "$etiquetas"},
+        {"$group": {"_id": "$etiquetas", "count": {"$sum": 1}, "sonidos": {"$push": "$nombre"}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 15}
+    ],
+    'ubicaciones': lambda: [
+        {"$group": {
+            "_id": {
+                "lat": {"$round": [{"$arrayElemAt": ["$ubicacion.coordinates", 1]}, 1]},
+                "lng": {"$round": [{"$arrayElemAt": ["$ubicacion.coordinates", 0]}, 1]}
+            },
+            "count": {"$sum": 1},
+            "emociones_comunes": {"$push": "$emociones"},
+            "nombres": {"$push": "$nombre"}
+        }},
+        {"$project": {
+            "count": 1,
+            "emociones_comunes": {"$reduce": {
+                "input": "$emociones_comunes", "initialValue": [],
+                "in": {"$concatArrays": ["$$value", "$$this"]}
+            }},
+            "nombres": {"$slice": ["$nombres", 3]}
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": 20}
+    ],
+    'linea_tiempo': lambda: [
+        {"$group": {
+            "_id": {"year": {"$year": "$fecha"}, "month": {"$month": "$fecha"}, "day": {"$dayOfMonth": "$fecha"}},
+            "count": {"$sum": 1},
+            "emociones": {"$push": "$emociones"}
+        }},
+        {"$project": {
+            "count": 1,
+            "emociones_planas": {"$reduce": {
+                "input": "$emociones", "initialValue": [],
+                "in": {"$concatArrays": ["$$value", "$$this"]}
+            }}
+        }},
+        {"$sort": {"_id": -1}},
+        {"$limit": 30}
+    ]
+}
+
+def generate_sounds(start, count):
+    """Generar documentos sintéticos con la forma de la colección sonidos"""
+    now = datetime.now()
+    for i in range(start, start + count):
+        yield {
+            "nombre": f"Sonido sintético {i}",
+            "ubicacion": {
+                "type": "Point",
+                "coordinates": [random.uniform(-79, -67), random.uniform(-4, 12)]
+            },
+            "sonidos": random.sample(SONIDOS, random.randint(1, 3)),
+            "emociones": random.sample(EMOCIONES, random.randint(1, 3)),
+            "etiquetas": random.sample(ETIQUETAS, random.randint(0, 5)),
+            "autor": f"autor_{i % 500}",
+            "fecha": now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+            "descripcion": "",
+            "duracion": random.randint(5, 300),
+            "calidad_audio": "media"
+        }
+
+def seed_collection(collection, target_size, batch_size=10000):
+    """Completar la colección hasta target_size documentos"""
+    current = collection.estimated_document_count()
+    while current < target_size:
+        batch = list(generate_sounds(current, min(batch_size, target_size - current)))
+        collection.insert_many(batch, ordered=False)
+        current += len(batch)
+
+def explain_command(db, command):
+    """
+    Ejecutar un comando con explain y verbosidad executionStats
+
+    Returns:
+        dict | None: Salida de explain, o None si el servidor no lo admite
+    """
+    try:
+        return db.command({"explain": command, "verbosity": "executionStats"})
+    except Exception:
+        return None
+
+def explain_memory(explain):
+    """
+    Memoria y volcado a disco de las etapas según explain
+
+    Recorre toda la salida, así que sirve tanto para las etapas clásicas
+    ($group con maxAccumulatorMemoryUsageBytes) como para los planes de SBE
+    y las ordenaciones de un find.
+
+    Returns:
+        tuple: (bytes en memoria o None, bytes volcados a disco o None, si se usó disco)
+    """
+    memory = None
+    spilled = None
+    used_disk = False
+
+    def visit(node):
+        nonlocal memory, spilled, used_disk
+        if isinstance(node, list):
+            for item in node:
+                visit(item)
+            return
+        if not isinstance(node, dict):
+            return
+
+        usages = []
+        accumulators = node.get("maxAccumulatorMemoryUsageBytes")
+        if isinstance(accumulators, dict):
+            usages.append(sum(accumulators.values()))
+        elif isinstance(accumulators, (int, float)):
+            usages.append(accumulators)
+        for key in ("peakTrackedMemBytes", "totalDataSizeSorted"):
+            if isinstance(node.get(key), (int, float)):
+                usages.append(node[key])
+        if usages:
+            memory = (memory or 0) + max(usages)
+
+        if node.get("usedDisk"):
+            used_disk = True
+        for key in ("spilledDataStorageSize", "spilledBytes"):
+            if isinstance(node.get(key), (int, float)):
+                spilled = (spilled or 0) + node[key]
+                break
+
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                visit(value)
+
+    if explain is not None:
+        visit(explain)
+    return memory, spilled, used_disk
+
+def timed(read, runs=3):
+    """Ejecutar una lectura varias veces: (mediana en ms, bytes de la última respuesta)"""
+    timings = []
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        results = read()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    response_bytes = sum(len(bson.encode(doc)) for doc in results)
+    return statistics.median(timings), response_bytes
+
+def run_pipeline(db, collection, pipeline):
+    """Medir un pipeline de agregación sobre la colección de sonidos"""
+    latency, response_bytes = timed(lambda: list(collection.aggregate(pipeline, allowDiskUse=True)))
+    explain = explain_command(db, {
+        "aggregate": collection.name,
+        "pipeline": pipeline,
+        "cursor": {},
+        "allowDiskUse": True
+    })
+    return (latency, response_bytes) + explain_memory(explain)
+
+def run_rollup_read(db, sound_model, method, command):
+    """Medir una lectura de contadores tal como la hace la API"""
+    latency, response_bytes = timed(lambda: getattr(sound_model, method)())
+    return (latency, response_bytes) + explain_memory(explain_command(db, command))
+
+def rebuild_rollups(sound_model):
+    """Calcular los campos derivados y reconstruir los contadores del corpus"""
+    start = time.perf_counter()
+    sound_model.backfill_derived_fields()
+    sound_model.geo_cells.rebuild(sound_model.collection)
+    sound_model.stats.rebuild(sound_model.collection)
+    return time.perf_counter() - start
+
+def format_disk(spilled, used_disk):
+    """Formatear el volcado a disco para la tabla"""
+    if spilled:
+        return format_bytes(spilled)
+    return "sí" if used_disk else "no"
+
+def format_ratio(numerator, denominator):
+    """Cociente entre dos medidas, o n/d"""
+    if not numerator or not denominator:
+        return "n/d"
+    return f"x{numerator / denominator:.1f}"
+
+def format_bytes(value):
+    """Formatear bytes para la tabla"""
+    if value is None:
+        return "n/d"
+    for unit in ["B", "KB", "MB", "GB"]:
+        if value < 1024:
+            return f"{value:.0f}{unit}"
+        value /= 1024
+    return f"{value:.0f}TB"
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de agregaciones de analytics")
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help='Tamaños del corpus separados por comas')
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help='No medir los pipelines anteriores con $push (lentos con corpus grandes)')
+    parser.add_argument('--drop', action='store_true',
+                        help='Eliminar la base de datos de benchmark al terminar')
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    variants = [variant for variant in VARIANTS if not (args.skip_legacy and variant == 'legacy')]
+
+    print("📈 Benchmark de agregaciones de SoundScape Explorer")
+    print("=" * 55)
+    print(f"   Base de datos: {BENCHMARK_DATABASE_NAME}")
+
+    # Los modelos leen de la base de datos de benchmark, con sus mismos índices
+    Config.DATABASE_NAME = BENCHMARK_DATABASE_NAME
+
+    db = db_instance.get_db()
+    sound_model = SoundModel()
+    collection = db['sonidos']
+    collection.delete_many({})
+
+    report = {}
+    for size in sizes:
+        print(f"\n🌱 Generando corpus de {size:,} documentos...")
+        seed_collection(collection, size)
+        print(f"   Contadores reconstruidos en {rebuild_rollups(sound_model):.1f}s")
+
+        print(f"{'pipeline':<14}{'variante':<12}{'latencia':>12}{'respuesta':>12}{'memoria':>12}{'disco':>10}")
+        for name in BOUNDED_PIPELINES:
+            for variant in variants:
+                try:
+                    if variant == 'contadores':
+                        method, command = ROLLUP_READS[name]
+                        row = run_rollup_read(db, sound_model, method, command)
+                    else:
+                        pipelines = LEGACY_PIPELINES if variant == 'legacy' else BOUNDED_PIPELINES
+                        row = run_pipeline(db, collection, pipelines[name]())
+                except Exception as e:
+                    print(f"{name:<14}{variant:<12}   ❌ {str(e)[:60]}")
+                    continue
+
+                latency, response_bytes, memory, spilled, used_disk = row
+                report.setdefault((name, variant), {})[size] = row
+                print(f"{name:<14}{variant:<12}{latency:>10.1f}ms{format_bytes(response_bytes):>12}"
+                      f"{format_bytes(memory):>12}{format_disk(spilled, used_disk):>10}")
+
+    # Comparación de cada camino con el pipeline acotado en el corpus más grande
+    largest = sizes[-1]
+    print(f"\n⚖️ COMPARACIÓN CON EL PIPELINE ACOTADO ({largest:,} documentos):")
+    for name in BOUNDED_PIPELINES:
+        bounded = report.get((name, 'acotado'), {}).get(largest)
+        if bounded is None:
+            continue
+        for variant in variants:
+            row = report.get((name, variant), {}).get(largest)
+            if variant == 'acotado' or row is None:
+                continue
+            print(f"   {name:<14}{variant:<12} latencia {format_ratio(row[0], bounded[0])}"
+                  f"  memoria {format_ratio(row[2], bounded[2])}")
+
+    # Crecimiento entre el corpus más pequeño y el más grande
+    print(f"\n📊 CRECIMIENTO ({sizes[0]:,} → {largest:,} documentos):")
+    for (name, variant), rows in report.items():
+        first, last = rows.get(sizes[0]), rows.get(largest)
+        if first is None or last is None:
+            continue
+        print(f"   {name:<14}{variant:<12} latencia {format_ratio(last[0], first[0])}"
+              f"  respuesta {format_ratio(last[1], first[1])}  memoria {format_ratio(last[2], first[2])}")
+
+    if args.drop:
+        db_instance.client.drop_database(BENCHMARK_DATABASE_NAME)
+        print(f"\n🗑️ Base de datos {BENCHMARK_DATABASE_NAME} eliminada")
+
+    db_instance.close_connection()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Benchmark cancelado por el usuario")
@@ -0,0 +1,163 @@
+"""
+Prueba de carga de la API WSGI (app.py) frente a la ASGI (asgi_app.py)
+
+Lanza, contra los dos servidores ya arrancados y sobre la misma base de
+datos, peticiones concurrentes a cada endpoint durante un tiempo fijo
+(cada cliente reutiliza su conexión y envía la siguiente petición al
+recibir la respuesta) y muestra peticiones por segundo y latencias p50/p99.
+
+La app Flask cachea las respuestas; con --bust-cache cada petición lleva un
+parámetro distinto para medir las consultas a MongoDB y no la caché.
+
+Uso:
+    gunicorn -w 4 --threads 8 -b :5000 "app:create_app('production')"
+    uvicorn asgi_app:app --port 8000 --workers 4
+    python benchmark_servers.py [--concurrency 64] [--duration 20] [--bust-cache]
+"""
+
+import time
+import argparse
+import threading
+import statistics
+import http.client
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/api/sounds?limit=50&view=card',
+    '/api/analytics/emotions',
+    '/api/analytics/locations',
+    '/api/analytics/tags',
+    '/api/analytics/timeline',
+    '/api/analytics/dashboard'
+]
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not values:
+        return float('nan')
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+def client_loop(base_url, path, deadline, bust_cache, latencies, errors, lock):
+    """Un cliente: peticiones secuenciales por una conexión keep-alive"""
+    url = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(url.netloc, timeout=30)
+    separator = '&' if '?' in path else '?'
+    local_latencies = []
+    local_errors = 0
+    sequence = 0
+
+    while time.perf_counter() < deadline:
+        target = url.path.rstrip('/') + path
+        if bust_cache:
+            sequence += 1
+            target += f"{separator}_bench={threading.get_ident()}-{sequence}"
+
+        start = time.perf_counter()
+        try:
+            connection.request('GET', target)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            connection.close()
+            connection = connection_class(url.netloc, timeout=30)
+
+    connection.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+def run_load(base_url, path, concurrency, duration, bust_cache):
+    """
+    Carga cerrada de `concurrency` clientes durante `duration` segundos
+
+    Returns:
+        dict: Peticiones por segundo, latencias (ms) y errores
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    threads = [
+        threading.Thread(
+            target=client_loop,
+            args=(base_url, path, deadline, bust_cache, latencies, errors, lock),
+            daemon=True
+        )
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "mean": statistics.fmean(latencies) * 1000 if latencies else float('nan'),
+        "errors": sum(errors)
+    }
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Prueba de carga WSGI frente a ASGI")
+    parser.add_argument('--wsgi', default='http://localhost:5000',
+                        help='URL base de la API Flask')
+    parser.add_argument('--asgi', default='http://localhost:8000',
+                        help='URL base de la API ASGI')
+    parser.add_argument('--paths', default=','.join(DEFAULT_PATHS),
+                        help='Endpoints separados por comas')
+    parser.add_argument('--concurrency', type=int, default=64,
+                        help='Clientes simultáneos')
+    parser.add_argument('--duration', type=float, default=20,
+                        help='Segundos de carga por endpoint y servidor')
+    parser.add_argument('--warmup', type=float, default=2,
+                        help='Segundos de calentamiento (no se miden)')
+    parser.add_argument('--bust-cache', action='store_true',
+                        help='Evitar la caché de respuestas de la app Flask')
+    args = parser.parse_args()
+
+    servers = [('wsgi', args.wsgi), ('asgi', args.asgi)]
+    paths = [path.strip() for path in args.paths.split(',') if path.strip()]
+
+    print("🏁 Prueba de carga de SoundScape Explorer (WSGI vs ASGI)")
+    print("=" * 55)
+    print(f"   Clientes: {args.concurrency}  Duración: {args.duration:.0f}s por endpoint")
+
+    report = {}
+    for path in paths:
+        print(f"\n🔗 {path}")
+        print(f"{'servidor':<10}{'req/s':>10}{'p50':>10}{'p99':>10}{'errores':>10}")
+        for name, base_url in servers:
+            if args.warmup > 0:
+                run_load(base_url, path, args.concurrency, args.warmup, args.bust_cache)
+            result = run_load(base_url, path, args.concurrency, args.duration, args.bust_cache)
+            report[(path, name)] = result
+            print(f"{name:<10}{result['rps']:>10.1f}{result['p50']:>8.1f}ms"
+                  f"{result['p99']:>8.1f}ms{result['errors']:>10}")
+
+    # Comparación por endpoint
+    print(f"\n📊 ASGI FRENTE A WSGI:")
+    for path in paths:
+        wsgi, asgi = report[(path, 'wsgi')], report[(path, 'asgi')]
+        throughput = asgi['rps'] / wsgi['rps'] if wsgi['rps'] else float('nan')
+        tail = asgi['p99'] / wsgi['p99'] if wsgi['p99'] else float('nan')
+        print(f"   {path:<40} req/s x{throughput:.2f}  p99 x{tail:.2f}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Prueba de carga cancelada por el usuario")
@@ -0,0 +1,85 @@
+"""
+Script para importar muchos sonidos de una vez en SoundScape Explorer
+
+Lee un manifiesto CSV o JSON con una fila por sonido (archivo, nombre,
+latitud, longitud, emociones, etiquetas, sonidos, descripcion, autor,
+duracion, calidad_audio) y busca cada audio en el directorio indicado.
+Las columnas de lista de un CSV se separan con ';' o '|'.
+
+Uso:
+    python bulk_import.py grabaciones/ grabaciones/manifiesto.csv [--batch-size 500]
+"""
+
+import os
+import argparse
+from werkzeug.security import safe_join
+from config import Config
+from utils.database import db_instance
+from models.sound_model import SoundModel
+from utils.importer import BulkImporter, parse_manifest
+from utils.audio_processing import schedule_audio_analysis
+from utils.tasks import task_queue
+
+def bulk_import(directory, manifest_path, batch_size):
+    """Importar los sonidos del manifiesto"""
+    try:
+        print("📦 Importación masiva de SoundScape Explorer")
+        print("=" * 55)
+
+        with open(manifest_path, 'rb') as manifest:
+            rows = parse_manifest(manifest.read(), manifest_path)
+        print(f"📋 Filas en el manifiesto: {len(rows)}")
+
+        def open_audio(audio_file):
+            path = safe_join(os.path.abspath(directory), audio_file)
+            if path is None or not os.path.isfile(path):
+                raise ValueError("El audio no existe en el directorio")
+            return open(path, 'rb')
+
+        importer = BulkImporter(
+            SoundModel(),
+            Config.UPLOAD_FOLDER,
+            Config.ALLOWED_AUDIO_EXTENSIONS,
+            batch_size,
+            on_created=lambda sound_id, audio_url: schedule_audio_analysis(
+                sound_id, audio_url, Config.UPLOAD_FOLDER, Config.ANALYSIS_FOLDER
+            )
+        )
+        report = importer.run(rows, open_audio)
+
+        print("🔬 Analizando audios...")
+        task_queue.wait()
+
+        for error in report["errors"]:
+            print(f"   ❌ Fila {error['fila']} ({error['archivo']}): {error['error']}")
+
+        print(f"\n📊 RESUMEN:")
+        print(f"   Creados: {report['created']} de {report['total']}")
+        print(f"   Con errores: {report['failed']}")
+        print(f"   Tiempo: {report['elapsed_seconds']}s")
+        print(f"   Rendimiento: {report['items_per_second']} sonidos/s, {report['mb_per_second']} MB/s")
+        return report["failed"] == 0
+
+    except Exception as e:
+        print(f"❌ Error en la importación: {e}")
+        return False
+
+    finally:
+        db_instance.close_connection()
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Importación masiva de sonidos")
+    parser.add_argument('directory', help='Directorio con los archivos de audio')
+    parser.add_argument('manifest', help='Manifiesto .csv o .json con los metadatos')
+    parser.add_argument('--batch-size', type=int, default=Config.BULK_BATCH_SIZE,
+                        help='Sonidos por insert_many')
+    args = parser.parse_args()
+
+    bulk_import(args.directory, args.manifest, args.batch_size)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Importación cancelada por el usuario")
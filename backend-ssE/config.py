@@ -8,6 +8,23 @@ class Config:
     MONGODB_URI = os.getenv('MONGODB_URI')
     DATABASE_NAME = os.getenv('DATABASE_NAME', 'soundscape')
     
+    # MongoDB Connection Pool Configuration (por proceso; tiempos en ms)
+    MONGO_APP_NAME = os.getenv('MONGO_APP_NAME', 'soundscape-explorer')
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000))
+    MONGO_MAX_CONNECTING = int(os.getenv('MONGO_MAX_CONNECTING', 2))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 0))  # 0: sin límite (scripts largos)
+    MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', 'zstd,snappy,zlib')
+    
+    # Límite por operación (maxTimeMS, 0 sin límite) y lecturas de analytics
+    MONGO_MAX_TIME_MS = int(os.getenv('MONGO_MAX_TIME_MS', 5000))
+    MONGO_ANALYTICS_MAX_TIME_MS = int(os.getenv('MONGO_ANALYTICS_MAX_TIME_MS', 10000))
+    MONGO_ANALYTICS_READ_PREFERENCE = os.getenv('MONGO_ANALYTICS_READ_PREFERENCE', 'secondaryPreferred')
+    MONGO_ANALYTICS_MAX_STALENESS = int(os.getenv('MONGO_ANALYTICS_MAX_STALENESS', -1))
+    
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-local')
     DEBUG = os.getenv('FLASK_ENV') == 'development'
@@ -16,6 +33,88 @@ class Config:
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 50000000))
     
+    # Storage Configuration
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')  # local | s3
+    S3_BUCKET = os.getenv('S3_BUCKET', 'soundscape-audio')
+    S3_PREFIX = os.getenv('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')  # MinIO, LocalStack, moto_server...
+    S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+    S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY')
+    S3_URL_EXPIRES = int(os.getenv('S3_URL_EXPIRES', 3600))
+    S3_PUBLIC_URL = os.getenv('S3_PUBLIC_URL')  # CDN delante del bucket (opcional)
+    
+    # Chunked Upload Configuration
+    UPLOAD_SESSIONS_FOLDER = os.getenv('UPLOAD_SESSIONS_FOLDER', os.path.join(UPLOAD_FOLDER, '.sessions'))
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 500 * 1024 * 1024))
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))
+    
+    # Audio Processing Configuration
+    AUDIO_WORKERS = int(os.getenv('AUDIO_WORKERS', 2))
+    ANALYSIS_FOLDER = os.getenv('ANALYSIS_FOLDER', os.path.join(UPLOAD_FOLDER, '.analysis'))
+    AUDIO_EMBEDDINGS_PATH = os.getenv('AUDIO_EMBEDDINGS_PATH', os.path.join(ANALYSIS_FOLDER, 'audio_embeddings.npy'))
+    
+    # Audio Suggestions Configuration (modelo de train_classifier.py)
+    CLASSIFIER_ENABLED = os.getenv('CLASSIFIER_ENABLED', 'True').lower() == 'true'
+    CLASSIFIER_MODEL_PATH = os.getenv('CLASSIFIER_MODEL_PATH', os.path.join(ANALYSIS_FOLDER, 'classifier.npz'))
+    CLASSIFIER_MIN_PROBABILITY = float(os.getenv('CLASSIFIER_MIN_PROBABILITY', 0.6))
+    CLASSIFIER_MAX_SUGGESTIONS = int(os.getenv('CLASSIFIER_MAX_SUGGESTIONS', 3))
+    
+    # Streaming Renditions Configuration (versiones Opus/MP3 con ffmpeg)
+    RENDITIONS_FOLDER = os.getenv('RENDITIONS_FOLDER', os.path.join(UPLOAD_FOLDER, '.renditions'))
+    RENDITIONS_MAX_BYTES = int(os.getenv('RENDITIONS_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+    RENDITIONS_EAGER = os.getenv('RENDITIONS_EAGER', 'False').lower() == 'true'
+    RENDITIONS_INLINE = os.getenv('RENDITIONS_INLINE', 'False').lower() == 'true'
+    RENDITION_TIMEOUT = int(os.getenv('RENDITION_TIMEOUT', 300))
+    FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+    
+    # Bulk Import Configuration
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 5000))
+    BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 500))
+    BULK_MAX_ARCHIVE_SIZE = int(os.getenv('BULK_MAX_ARCHIVE_SIZE', 20 * 1024 * 1024 * 1024))
+    
+    # Pagination Configuration
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 500))
+    
+    # Search Configuration
+    SEARCH_MAX_QUERY_LENGTH = int(os.getenv('SEARCH_MAX_QUERY_LENGTH', 100))
+    SUGGEST_MAX_RESULTS = int(os.getenv('SUGGEST_MAX_RESULTS', 20))
+    SUGGEST_REFRESH_SECONDS = int(os.getenv('SUGGEST_REFRESH_SECONDS', 300))
+    
+    # Recommendations Configuration
+    RECOMMENDATIONS_MAX_RESULTS = int(os.getenv('RECOMMENDATIONS_MAX_RESULTS', 50))
+    RECOMMENDATIONS_MAX_SEEDS = int(os.getenv('RECOMMENDATIONS_MAX_SEEDS', 50))
+    RECOMMENDER_REFRESH_SECONDS = int(os.getenv('RECOMMENDER_REFRESH_SECONDS', 300))
+    RECOMMENDATIONS_DEFAULT_MAX_KM = float(os.getenv('RECOMMENDATIONS_DEFAULT_MAX_KM', 25))
+    RECOMMENDATIONS_GEO_WEIGHT = float(os.getenv('RECOMMENDATIONS_GEO_WEIGHT', 0.5))
+    
+    # Map Clustering Configuration
+    MAX_MAP_CLUSTERS = int(os.getenv('MAX_MAP_CLUSTERS', 500))
+    MAX_MAP_POINTS = int(os.getenv('MAX_MAP_POINTS', 500))
+    CLUSTER_POINTS_ZOOM = int(os.getenv('CLUSTER_POINTS_ZOOM', 16))
+    
+    # Cache Configuration (TTLs en segundos)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # memory | redis
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'soundscape')
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 256))
+    CACHE_LOCK_TIMEOUT = float(os.getenv('CACHE_LOCK_TIMEOUT', 10))
+    CACHE_LOCK_WAIT = float(os.getenv('CACHE_LOCK_WAIT', 5))
+    CACHE_TTL_SOUNDS = int(os.getenv('CACHE_TTL_SOUNDS', 30))
+    CACHE_TTL_CLUSTERS = int(os.getenv('CACHE_TTL_CLUSTERS', 60))
+    CACHE_TTL_EMOTIONS = int(os.getenv('CACHE_TTL_EMOTIONS', 300))
+    CACHE_TTL_LOCATIONS = int(os.getenv('CACHE_TTL_LOCATIONS', 300))
+    CACHE_TTL_TAGS = int(os.getenv('CACHE_TTL_TAGS', 300))
+    CACHE_TTL_TIMELINE = int(os.getenv('CACHE_TTL_TIMELINE', 300))
+    CACHE_TTL_SEARCH = int(os.getenv('CACHE_TTL_SEARCH', 30))
+    CACHE_TTL_RECOMMENDATIONS = int(os.getenv('CACHE_TTL_RECOMMENDATIONS', 120))
+    CACHE_TTL_DASHBOARD = int(os.getenv('CACHE_TTL_DASHBOARD', 300))
+    
+    # Analytics Dashboard Configuration (plazo en segundos)
+    DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', 8))
+    DASHBOARD_TIMEOUT = float(os.getenv('DASHBOARD_TIMEOUT', 10))
+    
     # CORS Configuration
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
     
@@ -0,0 +1,110 @@
+"""
+Script para generar el índice de similitud de audio de SoundScape Explorer
+
+1. Calcula los descriptores acústicos de los audios que aún no los tienen
+   (o de todos con --force); un audio compartido por varios sonidos se
+   procesa una vez.
+2. Reúne los descriptores de todos los sonidos en la matriz float32 que la
+   API mapea en memoria (AUDIO_EMBEDDINGS_PATH). Los workers detectan la
+   matriz nueva sin reiniciar.
+
+Uso:
+    python extract_features.py [--force] [--workers 4]
+"""
+
+import os
+import time
+import argparse
+from collections import Counter, defaultdict
+from config import Config
+from utils.database import db_instance
+from models.sound_model import SoundModel
+from utils.audio_analysis import AudioAnalysisError
+from utils.audio_features import extract_features as compute_features
+from utils.audio_processing import ANALYZABLE_EXTENSIONS, load_features, save_features
+from utils.audio_similarity import AudioSimilarityIndex
+from utils.audio_storage import audio_key
+from utils.storage import get_storage
+from utils.tasks import TaskQueue
+
+def extract_audio_features(key, storage):
+    """Calcular y guardar los descriptores de un audio"""
+    if os.path.splitext(key)[1].lower() not in ANALYZABLE_EXTENSIONS:
+        return 'no_soportado'
+    try:
+        with storage.local_copy(key) as path:
+            vector = compute_features(path)
+    except AudioAnalysisError:
+        return 'error'
+    save_features(Config.ANALYSIS_FOLDER, key, vector, Config.UPLOAD_FOLDER)
+    return 'extraido'
+
+def extract_features(force=False, workers=os.cpu_count() or 2):
+    """Calcular los descriptores pendientes y regenerar la matriz"""
+    try:
+        print("🎼 Índice de similitud de audio de SoundScape Explorer")
+        print("=" * 55)
+
+        sound_model = SoundModel()
+        storage = get_storage(Config.UPLOAD_FOLDER)
+        start = time.perf_counter()
+
+        sounds_by_key = defaultdict(list)
+        for sound in sound_model.collection.find({"audio_url": {"$nin": [None, ""]}}, {"audio_url": 1}):
+            key = audio_key(sound['audio_url'])
+            if key:
+                sounds_by_key[key].append(str(sound['_id']))
+        print(f"📋 Audios distintos: {len(sounds_by_key)}")
+
+        # 1. Descriptores de los audios pendientes
+        pending = [
+            key for key in sounds_by_key
+            if force or load_features(Config.ANALYSIS_FOLDER, key, Config.UPLOAD_FOLDER) is None
+        ]
+        print(f"🔬 Audios a procesar: {len(pending)}")
+
+        queue = TaskQueue(workers, name='features')
+        futures = [queue.submit(extract_audio_features, key, storage) for key in pending]
+        queue.wait()
+        states = Counter(future.result() or 'error' for future in futures)
+        for state, count in states.most_common():
+            print(f"   {state}: {count}")
+
+        # 2. Matriz con todos los sonidos que tienen descriptores
+        entries = []
+        for key, sound_ids in sounds_by_key.items():
+            vector = load_features(Config.ANALYSIS_FOLDER, key, Config.UPLOAD_FOLDER)
+            if vector is not None:
+                entries.extend((sound_id, vector) for sound_id in sound_ids)
+
+        rows = AudioSimilarityIndex.build(entries, Config.AUDIO_EMBEDDINGS_PATH)
+        print(f"✅ Sonidos en el índice: {rows}")
+        print(f"📂 Matriz: {Config.AUDIO_EMBEDDINGS_PATH}")
+
+        elapsed = time.perf_counter() - start
+        print(f"\n🎉 Índice generado en {elapsed:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error generando el índice de audio: {e}")
+        return False
+
+    finally:
+        db_instance.close_connection()
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Índice de similitud de audio")
+    parser.add_argument('--force', action='store_true',
+                        help='Volver a calcular los descriptores ya guardados')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='Hilos de extracción')
+    args = parser.parse_args()
+
+    extract_features(args.force, args.workers)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Operación cancelada por el usuario")
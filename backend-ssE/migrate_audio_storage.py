@@ -0,0 +1,98 @@
+"""
+Script para pasar los audios de SoundScape Explorer al almacenamiento por contenido
+
+Cada sonido con un audio antiguo ({uuid}_{nombre} en la raíz de uploads)
+pasa a ab/cd/<sha256>.<ext>; los audios repetidos quedan en un solo
+archivo. Con --recount se recalculan además las referencias de
+audio_blobs a partir de los sonidos y de las subidas en curso, y se
+borran los archivos que ya no usa ninguno (salvo los usados dentro de
+UPLOAD_SESSION_TTL).
+
+Uso:
+    python migrate_audio_storage.py [--recount]
+"""
+
+import os
+import argparse
+from collections import Counter
+from config import Config
+from utils.database import db_instance
+from models.sound_model import SoundModel
+from models.audio_blob_model import AudioBlobModel
+from utils.audio_storage import store_audio_file, blob_sha256, delete_claimed_blob
+from utils.storage import get_storage
+from utils.upload_sessions import UploadSessionStore
+
+def migrate_audio_storage(recount=False):
+    """Mover los audios antiguos y, opcionalmente, recontar referencias"""
+    try:
+        print("🗄️  Migración al almacenamiento por contenido")
+        print("=" * 55)
+
+        sounds = SoundModel().collection
+        upload_folder = Config.UPLOAD_FOLDER
+        migrated = duplicates = missing = 0
+
+        legacy = sounds.find(
+            {"audio_url": {"$nin": [None, ""], "$not": {"$regex": r"^/uploads/[0-9a-f]{2}/"}}},
+            {"audio_url": 1}
+        )
+        for sound in legacy:
+            file_path = os.path.join(upload_folder, os.path.basename(sound['audio_url']))
+            if not os.path.isfile(file_path):
+                missing += 1
+                print(f"   ⚠️  Sin archivo: {sound['audio_url']}")
+                continue
+
+            stored = store_audio_file(file_path, file_path, upload_folder)
+            sounds.update_one({"_id": sound['_id']}, {"$set": {"audio_url": stored['audio_url']}})
+            migrated += 1
+            duplicates += stored['duplicate']
+
+        print(f"✅ Audios migrados: {migrated} ({duplicates} repetidos)")
+        if missing:
+            print(f"⚠️  Sonidos sin archivo: {missing}")
+
+        if recount:
+            counts = Counter()
+            for sound in sounds.find({"audio_url": {"$regex": r"^/uploads/[0-9a-f]{2}/"}}, {"audio_url": 1}):
+                sha256 = blob_sha256(sound['audio_url'])
+                if sha256:
+                    counts[sha256] += 1
+
+            # Audios que retienen las subidas por fragmentos aún sin sonido
+            sessions = UploadSessionStore(Config.UPLOAD_SESSIONS_FOLDER, Config.UPLOAD_SESSION_TTL)
+            counts.update(sessions.held_blobs())
+
+            # Los audios usados dentro del TTL de las sesiones no se tocan: pueden
+            # tener referencias de sesiones de otros nodos
+            blob_model = AudioBlobModel()
+            orphans = blob_model.set_refs(counts, protect_seconds=Config.UPLOAD_SESSION_TTL)
+            storage = get_storage(upload_folder)
+            for blob in orphans:
+                delete_claimed_blob(blob_model, blob, storage)
+            print(f"✅ Referencias recontadas: {len(counts)} audios, {len(orphans)} sin usar eliminados")
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Error en la migración: {e}")
+        return False
+
+    finally:
+        db_instance.close_connection()
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Migración al almacenamiento por contenido")
+    parser.add_argument('--recount', action='store_true',
+                        help='Recalcular las referencias de audio_blobs desde los sonidos')
+    args = parser.parse_args()
+
+    migrate_audio_storage(args.recount)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Migración cancelada por el usuario")
@@ -0,0 +1,276 @@
+"""
+Pipelines de agregación acotados para las estadísticas de sonidos
+
+Cada grupo devuelve como máximo `samples` nombres de ejemplo ($topN por
+fecha) y un histograma de emociones ya contado, en lugar de acumular con
+$push todos los nombres o arrays de emociones del grupo. Así la memoria de
+cada grupo depende del vocabulario de emociones y no del tamaño del corpus.
+
+También reúne el formato de las respuestas de analytics, compartido por la
+API WSGI (routes/analytics.py) y la ASGI (asgi_app.py).
+"""
+
+# Nombres de ejemplo por grupo
+DEFAULT_SAMPLES = 5
+
+# Resultados de cada estadística de analytics
+EMOTION_STATS_LIMIT = 10
+TAG_STATS_LIMIT = 15
+LOCATION_STATS_LIMIT = 20
+TIMELINE_DAYS = 30
+
+# Precisión geohash de las estadísticas por ubicación (celdas de ~5km)
+LOCATION_STATS_PRECISION = 5
+
+
+def _recent_names(samples):
+    """Acumulador con los nombres de los sonidos más recientes del grupo"""
+    return {"$topN": {"n": samples, "sortBy": {"fecha": -1}, "output": "$nombre"}}
+
+
+def _day_key():
+    """Expresión con el día (sin hora) de la fecha del sonido"""
+    return {
+        "$dateFromParts": {
+            "year": {"$year": "$fecha"},
+            "month": {"$month": "$fecha"},
+            "day": {"$dayOfMonth": "$fecha"}
+        }
+    }
+
+
+def _histogram_stages(group_key, samples=None):
+    """
+    Etapas que cuentan sonidos y emociones por grupo
+
+    Se desenrolla emociones conservando el índice: cada sonido se cuenta una
+    sola vez (índice 0 o sin emociones) y cada emoción suma en su clave.
+
+    Args:
+        group_key: Expresión de agrupación calculada sobre el sonido
+        samples: Nombres de ejemplo por grupo (None para omitirlos)
+    """
+    first_group = {
+        "_id": {"grupo": "$grupo", "emocion": "$emociones"},
+        "n": {"$sum": 1},
+        "sonidos": {"$sum": {"$cond": [{"$gt": [{"$ifNull": ["$posicion", 0]}, 0]}, 0, 1]}}
+    }
+    second_group = {
+        "_id": "$_id.grupo",
+        "count": {"$sum": "$sonidos"},
+        "emociones": {"$push": {"k": "$_id.emocion", "v": "$n"}}
+    }
+    final_project = {
+        "count": 1,
+        "emociones": {"$arrayToObject": {
+            "$map": {
+                "input": {"$filter": {
+                    "input": "$emociones",
+                    "cond": {"$eq": [{"$type": "$$this.k"}, "string"]}
+                }},
+                "in": {
+                    "k": {"$replaceAll": {"input": "$$this.k", "find": ".", "replacement": "_"}},
+                    "v": "$$this.v"
+                }
+            }
+        }}
+    }
+
+    if samples:
+        first_group["ejemplos"] = _recent_names(samples)
+        second_group["ejemplos"] = {"$push": "$ejemplos"}
+        final_project["ejemplos"] = {"$slice": [
+            {"$reduce": {
+                "input": "$ejemplos",
+                "initialValue": [],
+                "in": {"$setUnion": ["$$value", "$$this"]}
+            }},
+            samples
+        ]}
+
+    return [
+        {"$project": {
+            "grupo": group_key,
+            "nombre": 1,
+            "fecha": 1,
+            "emociones": {"$setUnion": [{"$ifNull": ["$emociones", []]}, []]}
+        }},
+        {"$unwind": {
+            "path": "$emociones",
+            "includeArrayIndex": "posicion",
+            "preserveNullAndEmptyArrays": True
+        }},
+        {"$group": first_group},
+        {"$group": second_group},
+        {"$project": final_project}
+    ]
+
+
+def emotion_patterns_pipeline(limit=10, samples=DEFAULT_SAMPLES):
+    """Emociones más frecuentes con nombres de ejemplo acotados"""
+    return [
+        {"$unwind": "$emociones"},
+        {"$group": {
+            "_id": "$emociones",
+            "count": {"$sum": 1},
+            "sonidos_ejemplo": _recent_names(samples)
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+
+
+def tag_stats_pipeline(limit=15, samples=DEFAULT_SAMPLES):
+    """Etiquetas más frecuentes con nombres de ejemplo acotados"""
+    return [
+        {"$unwind": "$etiquetas"},
+        {"$group": {
+            "_id": "$etiquetas",
+            "count": {"$sum": 1},
+            "sonidos": _recent_names(samples)
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+
+
+def location_stats_pipeline(limit=20, samples=3):
+    """Zonas de 0.1° con más sonidos, con histograma de emociones"""
+    group_key = {
+        "lat": {"$round": [{"$arrayElemAt": ["$ubicacion.coordinates", 1]}, 1]},
+        "lng": {"$round": [{"$arrayElemAt": ["$ubicacion.coordinates", 0]}, 1]}
+    }
+    return _histogram_stages(group_key, samples) + [
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+
+
+def timeline_pipeline(limit=30):
+    """Sonidos por día con histograma de emociones"""
+    return _histogram_stages(_day_key()) + [
+        {"$sort": {"_id": -1}},
+        {"$limit": limit}
+    ]
+
+
+def _unique_values_stages(field):
+    """Desenrollar los valores distintos y no vacíos de un array"""
+    return [
+        {"$project": {
+            "nombre": 1,
+            "fecha": 1,
+            field: {"$setUnion": [{"$ifNull": [f"${field}", []]}, []]}
+        }},
+        {"$unwind": f"${field}"},
+        {"$match": {field: {"$type": "string", "$ne": ""}}}
+    ]
+
+
+def emotion_rollup_pipeline(samples=DEFAULT_SAMPLES):
+    """Contadores por emoción con el formato de sonidos_stats"""
+    return _unique_values_stages("emociones") + [
+        {"$group": {
+            "_id": "$emociones",
+            "count": {"$sum": 1},
+            "ejemplos": _recent_names(samples)
+        }},
+        {"$project": {
+            "_id": {"$concat": ["emocion:", "$_id"]},
+            "tipo": "emocion",
+            "clave": "$_id",
+            "count": 1,
+            "ejemplos": 1
+        }}
+    ]
+
+
+def tag_rollup_pipeline(samples=DEFAULT_SAMPLES):
+    """Contadores por etiqueta con el formato de sonidos_stats"""
+    return _unique_values_stages("etiquetas") + [
+        {"$group": {
+            "_id": "$etiquetas",
+            "count": {"$sum": 1},
+            "ejemplos": _recent_names(samples)
+        }},
+        {"$project": {
+            "_id": {"$concat": ["etiqueta:", "$_id"]},
+            "tipo": "etiqueta",
+            "clave": "$_id",
+            "count": 1,
+            "ejemplos": 1
+        }}
+    ]
+
+
+def timeline_rollup_pipeline():
+    """Contadores por día con el formato de sonidos_stats"""
+    day_key = {"$dateToString": {"format": "%Y-%m-%d", "date": "$_id"}}
+    return [{"$match": {"fecha": {"$type": "date"}}}] + _histogram_stages(_day_key()) + [
+        {"$project": {
+            "_id": {"$concat": ["dia:", day_key]},
+            "tipo": "dia",
+            "clave": day_key,
+            "fecha": "$_id",
+            "count": 1,
+            "emociones": 1
+        }}
+    ]
+
+
+# Formato común de las respuestas de analytics (API WSGI y ASGI)
+
+def format_emotion(stat):
+    """Contador materializado de una emoción"""
+    return {
+        "_id": stat["clave"],
+        "count": stat["count"],
+        "sonidos_ejemplo": stat.get("ejemplos", [])
+    }
+
+
+def format_tag(stat):
+    """Contador materializado de una etiqueta"""
+    return {
+        "_id": stat["clave"],
+        "count": stat["count"],
+        "sonidos": stat.get("ejemplos", [])
+    }
+
+
+def format_location(lat, lng, count, emotions, names, cell_hash=None):
+    """Formato común de las estadísticas por ubicación"""
+    return {
+        "_id": {"lat": round(lat, 1), "lng": round(lng, 1)},
+        "geohash": cell_hash,
+        "count": count,
+        "emociones": emotions,
+        "emociones_comunes": sorted(emotions, key=emotions.get, reverse=True),
+        "nombres": names
+    }
+
+
+def format_location_group(group):
+    """Zona agregada por location_stats_pipeline"""
+    return format_location(
+        group["_id"]["lat"], group["_id"]["lng"], group["count"],
+        group["emociones"], group.get("ejemplos", [])
+    )
+
+
+def format_location_cell(cell):
+    """Celda geohash precalculada (ya formateada por GeoCellModel)"""
+    return format_location(
+        cell["lat"], cell["lng"], cell["count"],
+        cell["emociones"], cell["nombres"], cell["geohash"]
+    )
+
+
+def format_day(fecha, count, emotions):
+    """Formato común de las estadísticas temporales"""
+    return {
+        "_id": {"year": fecha.year, "month": fecha.month, "day": fecha.day},
+        "count": count,
+        "fecha": fecha.isoformat(),
+        "emociones": {k: v for k, v in (emotions or {}).items() if v > 0}
+    }
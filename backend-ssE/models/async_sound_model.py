@@ -0,0 +1,182 @@
+"""
+Lecturas de sonidos y analytics con el driver asíncrono de MongoDB (Motor)
+
+Lo usa la API ASGI (asgi_app.py). Las consultas, los cursores y el formato
+de las respuestas son los de SoundModel y models.analytics_pipelines, así
+que ambas APIs devuelven lo mismo; aquí solo cambia la forma de esperar a
+MongoDB, sin ocupar un hilo por consulta.
+"""
+
+from bson import ObjectId
+from models.sound_model import SoundModel
+from models.geo_cell_model import GeoCellModel
+from models import analytics_pipelines
+from utils.database import db_instance
+
+class AsyncSoundModel:
+    """Consultas de solo lectura sobre una base de datos de Motor"""
+
+    def __init__(self, database):
+        self.collection = database['sonidos']
+
+        # Lecturas de analytics (pueden ir a un secundario)
+        read_preference = db_instance.analytics_read_preference
+        self.analytics = database.get_collection('sonidos', read_preference=read_preference)
+        self.cells = database.get_collection('sonidos_celdas', read_preference=read_preference)
+        self.stats = database.get_collection('sonidos_stats', read_preference=read_preference)
+
+    async def find_page(self, query=None, limit=100, cursor=None, projection=None):
+        """
+        Página de sonidos ordenada por (fecha, _id) descendente
+
+        Returns:
+            tuple: (sonidos, cursor de la siguiente página o None)
+        """
+        search_filter, projection = SoundModel.page_query(query, cursor, projection)
+        results = await (
+            self.collection.find(search_filter, projection)
+            .sort(SoundModel.PAGE_SORT)
+            .limit(limit + 1)
+            .max_time_ms(db_instance.max_time_ms())
+            .to_list(None)
+        )
+        return SoundModel._build_page(results, limit, SoundModel.page_position)
+
+    async def get_all_sounds(self, limit=100, cursor=None, projection=None):
+        """Obtener todos los sonidos paginados por cursor"""
+        try:
+            return await self.find_page({}, limit, cursor, projection)
+
+        except Exception as e:
+            print(f"Error obteniendo todos los sonidos: {e}")
+            raise e
+
+    async def get_sounds_by_emotion(self, emotion, limit=20, cursor=None, projection=None):
+        """Obtener sonidos por emoción específica, paginados por cursor"""
+        try:
+            return await self.find_page(
+                {"emociones": {"$in": [emotion]}}, limit, cursor, projection
+            )
+
+        except Exception as e:
+            print(f"Error obteniendo sonidos por emoción: {e}")
+            raise e
+
+    async def get_sounds_by_location(self, lat, lng, radius_km=10, limit=50, cursor=None,
+                                     projection=None):
+        """Obtener sonidos cerca de una ubicación, paginados por (distancia, _id)"""
+        try:
+            pipeline = SoundModel.location_pipeline(lat, lng, radius_km, limit, cursor, projection)
+            results = await self.collection.aggregate(
+                pipeline, **db_instance.aggregate_options()
+            ).to_list(None)
+            return SoundModel._build_page(results, limit, SoundModel.location_position)
+
+        except Exception as e:
+            print(f"Error obteniendo sonidos por ubicación: {e}")
+            raise e
+
+    async def get_sound_by_id(self, sound_id):
+        """Obtener un sonido por su ID"""
+        try:
+            result = await self.collection.find_one({"_id": ObjectId(sound_id)})
+            return SoundModel._format_result(result) if result else None
+
+        except Exception as e:
+            print(f"Error obteniendo sonido por ID: {e}")
+            raise e
+
+    async def _aggregate(self, pipeline):
+        return await self.analytics.aggregate(
+            pipeline, allowDiskUse=True, **db_instance.aggregate_options(analytics=True)
+        ).to_list(None)
+
+    async def _top_stats(self, kind, limit):
+        return await (
+            self.stats.find({"tipo": kind})
+            .sort("count", -1)
+            .limit(limit)
+            .max_time_ms(db_instance.max_time_ms(analytics=True))
+            .to_list(None)
+        )
+
+    async def get_emotion_patterns(self, live=False):
+        """Emociones más frecuentes (contadores materializados o agregación)"""
+        try:
+            if live:
+                return await self._aggregate(
+                    analytics_pipelines.emotion_patterns_pipeline(analytics_pipelines.EMOTION_STATS_LIMIT)
+                )
+            stats = await self._top_stats("emocion", analytics_pipelines.EMOTION_STATS_LIMIT)
+            return [analytics_pipelines.format_emotion(stat) for stat in stats]
+
+        except Exception as e:
+            print(f"Error obteniendo patrones emocionales: {e}")
+            raise e
+
+    async def get_location_stats(self, live=False):
+        """Zonas con más sonidos (celdas precalculadas o agregación)"""
+        try:
+            if live:
+                groups = await self._aggregate(
+                    analytics_pipelines.location_stats_pipeline(analytics_pipelines.LOCATION_STATS_LIMIT)
+                )
+                return [analytics_pipelines.format_location_group(group) for group in groups]
+
+            cells = await (
+                self.cells.find({"precision": analytics_pipelines.LOCATION_STATS_PRECISION})
+                .sort("count", -1)
+                .limit(analytics_pipelines.LOCATION_STATS_LIMIT)
+                .max_time_ms(db_instance.max_time_ms(analytics=True))
+                .to_list(None)
+            )
+            return [
+                analytics_pipelines.format_location_cell(GeoCellModel._format_cell(cell))
+                for cell in cells
+            ]
+
+        except Exception as e:
+            print(f"Error obteniendo estadísticas por ubicación: {e}")
+            raise e
+
+    async def get_tag_stats(self, live=False):
+        """Etiquetas más frecuentes (contadores materializados o agregación)"""
+        try:
+            if live:
+                return await self._aggregate(
+                    analytics_pipelines.tag_stats_pipeline(analytics_pipelines.TAG_STATS_LIMIT)
+                )
+            stats = await self._top_stats("etiqueta", analytics_pipelines.TAG_STATS_LIMIT)
+            return [analytics_pipelines.format_tag(stat) for stat in stats]
+
+        except Exception as e:
+            print(f"Error obteniendo estadísticas de etiquetas: {e}")
+            raise e
+
+    async def get_timeline_stats(self, live=False):
+        """Sonidos por día (contadores materializados o agregación)"""
+        try:
+            if live:
+                days = await self._aggregate(
+                    analytics_pipelines.timeline_pipeline(analytics_pipelines.TIMELINE_DAYS)
+                )
+                return [
+                    analytics_pipelines.format_day(day['_id'], day['count'], day['emociones'])
+                    for day in days
+                ]
+
+            stats = await (
+                self.stats.find({"tipo": "dia"})
+                .sort("fecha", -1)
+                .limit(analytics_pipelines.TIMELINE_DAYS)
+                .max_time_ms(db_instance.max_time_ms(analytics=True))
+                .to_list(None)
+            )
+            return [
+                analytics_pipelines.format_day(stat['fecha'], stat['count'], stat.get('emociones'))
+                for stat in stats
+            ]
+
+        except Exception as e:
+            print(f"Error obteniendo estadísticas temporales: {e}")
+            raise e
@@ -0,0 +1,214 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from utils.database import db_instance
+
+class AudioBlobModel:
+    """
+    Audios guardados por contenido (SHA-256) con el número de sonidos que los usan
+
+    Dar de baja un audio son dos pasos: release() marca el documento como
+    "borrando" (solo si sigue sin referencias) y, una vez borrado el
+    archivo, finish_release() elimina el documento. Un acquire() que llega
+    entretanto espera a que termine el borrado y vuelve a guardar el
+    archivo, así que nunca se queda con una referencia a un archivo borrado.
+    """
+
+    # Segundos tras los que una baja a medias (proceso caído) se da por abandonada
+    DELETE_TIMEOUT = 60
+
+    # Intervalo de sondeo mientras otro proceso borra el archivo
+    POLL_INTERVAL = 0.05
+
+    def __init__(self):
+        self.collection = db_instance.get_collection('audio_blobs')
+
+    def get(self, sha256):
+        """Documento de un audio o None si no está guardado"""
+        return self.collection.find_one({"_id": sha256})
+
+    def acquire(self, sha256, path, size):
+        """
+        Sumar una referencia a un audio, registrándolo si es nuevo
+
+        Si el archivo se está borrando, espera a que termine: el archivo ya
+        no existe y quien llama debe volver a guardarlo.
+
+        Args:
+            sha256: Hash del contenido
+            path: Ruta relativa al directorio de uploads (solo al registrarlo)
+            size: Tamaño en bytes
+
+        Returns:
+            dict: Documento del audio tras la operación (refs == 1 si es nuevo)
+        """
+        try:
+            blob = self.collection.find_one_and_update(
+                {"_id": sha256},
+                {
+                    "$inc": {"refs": 1},
+                    "$set": {"ultimo_uso": datetime.now()},
+                    "$setOnInsert": {"ruta": path, "size": size, "fecha": datetime.now()}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            if blob.get("borrando"):
+                blob = self._wait_release(sha256, blob["borrando"])
+            return blob
+
+        except Exception as e:
+            print(f"Error registrando audio: {e}")
+            raise e
+
+    def add_reference(self, sha256):
+        """
+        Sumar una referencia a un audio que ya está registrado
+
+        Returns:
+            dict | None: Documento del audio o None si no está registrado (o
+                se está borrando: hay que volver a enviar sus bytes)
+        """
+        try:
+            return self.collection.find_one_and_update(
+                {"_id": sha256, "borrando": {"$exists": False}},
+                {"$inc": {"refs": 1}, "$set": {"ultimo_uso": datetime.now()}},
+                return_document=ReturnDocument.AFTER
+            )
+
+        except Exception as e:
+            print(f"Error registrando audio: {e}")
+            raise e
+
+    def release(self, sha256):
+        """
+        Restar una referencia a un audio y, si nadie lo usa, marcarlo para borrar
+
+        Returns:
+            dict | None: Documento marcado (hay que borrar su archivo y llamar
+                a finish_release con su campo borrando) o None
+        """
+        try:
+            blob = self.collection.find_one_and_update(
+                {"_id": sha256},
+                {"$inc": {"refs": -1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if blob is None or blob["refs"] > 0:
+                return None
+
+            return self._claim({"_id": sha256})
+
+        except Exception as e:
+            print(f"Error liberando audio: {e}")
+            raise e
+
+    def claim_unreferenced(self, sha256, path):
+        """
+        Reservar el borrado de un archivo que aún no está registrado (una
+        subida directa abandonada antes de crear su sonido)
+
+        Returns:
+            dict | None: Documento marcado (como en release) o None si el
+                audio está registrado y no se debe borrar
+        """
+        try:
+            token = uuid.uuid4().hex
+            result = self.collection.update_one(
+                {"_id": sha256},
+                {"$setOnInsert": {
+                    "ruta": path, "size": 0, "refs": 0,
+                    "fecha": datetime.now(), "borrando": token
+                }},
+                upsert=True
+            )
+            if result.upserted_id is None:
+                return None
+            return {"_id": sha256, "ruta": path, "refs": 0, "borrando": token}
+
+        except Exception as e:
+            print(f"Error liberando audio: {e}")
+            raise e
+
+    def finish_release(self, sha256, token):
+        """
+        Terminar la baja tras borrar el archivo
+
+        Si entretanto alguien volvió a usar el audio, el documento se
+        conserva sin la marca y quien espera en acquire() guarda el archivo.
+        """
+        try:
+            result = self.collection.delete_one({"_id": sha256, "borrando": token, "refs": {"$lte": 0}})
+            if result.deleted_count == 0:
+                self.collection.update_one({"_id": sha256, "borrando": token}, {"$unset": {"borrando": ""}})
+
+        except Exception as e:
+            print(f"Error liberando audio: {e}")
+            raise e
+
+    def set_refs(self, counts, protect_seconds=0):
+        """
+        Fijar el número de referencias de cada audio (tras recontar)
+
+        Args:
+            counts: {sha256: referencias}
+            protect_seconds: Los audios usados en estos últimos segundos no
+                se tocan (pueden tener referencias de subidas en curso que
+                no se ven en los sonidos)
+
+        Returns:
+            list: Audios sin referencias, marcados para borrar (hay que
+                borrar sus archivos y llamar a finish_release)
+        """
+        try:
+            recent = None
+            if protect_seconds:
+                recent = {"ultimo_uso": {"$gte": datetime.now() - timedelta(seconds=protect_seconds)}}
+
+            for sha256, refs in counts.items():
+                query = {"_id": sha256}
+                if recent:
+                    query["$nor"] = [recent]
+                self.collection.update_one(query, {"$set": {"refs": refs}})
+
+            query = {"_id": {"$nin": list(counts)}, "borrando": {"$exists": False}}
+            if recent:
+                query["$nor"] = [recent]
+            self.collection.update_many(query, {"$set": {"refs": 0}})
+
+            orphans = []
+            for blob in self.collection.find({"refs": {"$lte": 0}, "borrando": {"$exists": False}}, {"_id": 1}):
+                claimed = self._claim({"_id": blob["_id"]})
+                if claimed:
+                    orphans.append(claimed)
+            return orphans
+
+        except Exception as e:
+            print(f"Error recontando audios: {e}")
+            raise e
+
+    def _claim(self, query):
+        """Marcar para borrar un audio sin referencias que nadie está borrando"""
+        return self.collection.find_one_and_update(
+            {**query, "refs": {"$lte": 0}, "borrando": {"$exists": False}},
+            {"$set": {"borrando": uuid.uuid4().hex}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _wait_release(self, sha256, token):
+        """Esperar a que termine el borrado en curso del archivo de un audio"""
+        deadline = time.monotonic() + self.DELETE_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            blob = self.get(sha256)
+            if blob is None or blob.get("borrando") != token:
+                return blob
+
+        # Baja abandonada: se retira la marca y el archivo se vuelve a guardar
+        print(f"Baja abandonada del audio {sha256}, se retoma")
+        return self.collection.find_one_and_update(
+            {"_id": sha256, "borrando": token},
+            {"$unset": {"borrando": ""}},
+            return_document=ReturnDocument.AFTER
+        ) or self.get(sha256)
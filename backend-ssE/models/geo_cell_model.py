@@ -0,0 +1,265 @@
+from collections import Counter
+from pymongo import UpdateOne
+from utils.database import db_instance
+from utils.helpers import build_bbox_filter, mongo_safe_keys
+from utils import geohash
+
+class GeoCellModel:
+    """Contadores precalculados por celda geohash, mantenidos en cada escritura"""
+
+    # Precisiones de geohash con contadores (1 ≈ 5000km ... 7 ≈ 150m)
+    PRECISIONS = range(1, 8)
+
+    # Precisión del geohash guardado en cada sonido
+    SOUND_PRECISION = 9
+
+    # Nombres de ejemplo guardados por celda
+    SAMPLE_NAMES = 3
+
+    def __init__(self):
+        self.collection = db_instance.get_collection('sonidos_celdas')
+        self.reader = db_instance.get_collection('sonidos_celdas', analytics=True)
+
+    def apply_sound(self, sound, sign=1):
+        """
+        Sumar (sign=1) o restar (sign=-1) un sonido en los contadores de sus celdas
+
+        Args:
+            sound: Documento del sonido con geohash, ubicacion, emociones y nombre
+            sign: 1 al crear, -1 al eliminar
+        """
+        try:
+            cell_hash = sound.get('geohash')
+            if not cell_hash:
+                return
+
+            increments = self._increments(sound, sign)
+
+            operations = []
+            cell_ids = geohash.prefixes(cell_hash, self.PRECISIONS)
+            for cell_id in cell_ids:
+                update = {"$inc": increments}
+
+                if sign > 0:
+                    update["$setOnInsert"] = self._cell_fields(cell_id)
+                    if sound.get('nombre'):
+                        update["$push"] = {
+                            "nombres": {"$each": [sound['nombre']], "$slice": -self.SAMPLE_NAMES}
+                        }
+                elif sound.get('nombre'):
+                    update["$pull"] = {"nombres": sound['nombre']}
+
+                operations.append(UpdateOne({"_id": cell_id}, update, upsert=sign > 0))
+
+            self.collection.bulk_write(operations, ordered=False)
+
+            if sign < 0:
+                self.collection.delete_many({"_id": {"$in": cell_ids}, "count": {"$lte": 0}})
+
+        except Exception as e:
+            print(f"Error actualizando celdas geográficas: {e}")
+            raise e
+
+    def add_sounds(self, sounds, batch_size=1000):
+        """
+        Sumar un lote de sonidos nuevos con una operación por celda afectada
+
+        Args:
+            sounds: Documentos de los sonidos con geohash, ubicacion, emociones y nombre
+        """
+        try:
+            cells = {}
+            for sound in sounds:
+                cell_hash = sound.get('geohash')
+                if not cell_hash:
+                    continue
+
+                increments = self._increments(sound, 1)
+                for cell_id in geohash.prefixes(cell_hash, self.PRECISIONS):
+                    cell = cells.setdefault(cell_id, {"inc": Counter(), "nombres": []})
+                    cell["inc"].update(increments)
+                    if sound.get('nombre'):
+                        cell["nombres"].append(sound['nombre'])
+
+            operations = []
+            for cell_id, cell in cells.items():
+                update = {
+                    "$inc": dict(cell["inc"]),
+                    "$setOnInsert": self._cell_fields(cell_id)
+                }
+                if cell["nombres"]:
+                    update["$push"] = {"nombres": {
+                        "$each": cell["nombres"][-self.SAMPLE_NAMES:],
+                        "$slice": -self.SAMPLE_NAMES
+                    }}
+                operations.append(UpdateOne({"_id": cell_id}, update, upsert=True))
+
+            for start in range(0, len(operations), batch_size):
+                self.collection.bulk_write(operations[start:start + batch_size], ordered=False)
+
+        except Exception as e:
+            print(f"Error actualizando celdas geográficas: {e}")
+            raise e
+
+    def get_top_cells(self, precision, limit=20):
+        """Obtener las celdas con más sonidos de una precisión"""
+        try:
+            results = list(
+                self.reader.find({"precision": precision})
+                .sort("count", -1)
+                .limit(limit)
+                .max_time_ms(db_instance.max_time_ms(analytics=True))
+            )
+            return [self._format_cell(cell) for cell in results]
+
+        except Exception as e:
+            print(f"Error obteniendo celdas: {e}")
+            raise e
+
+    def get_cells_in_bbox(self, precision, bbox, limit=500):
+        """
+        Obtener las celdas de una precisión que cubren un bounding box
+
+        El bbox se amplía media celda por lado para incluir las celdas cuyo
+        centro cae fuera pero que contienen sonidos visibles.
+
+        Returns:
+            list: Celdas ordenadas por número de sonidos (máximo limit + 1)
+        """
+        try:
+            cell_lng, cell_lat = geohash.cell_size(precision)
+            min_lng, min_lat, max_lng, max_lat = bbox
+
+            if (max_lng - min_lng + cell_lng >= 360) or (min_lng > max_lng and min_lng - max_lng <= cell_lng):
+                min_lng, max_lng = -180.0, 180.0
+            else:
+                min_lng = self._wrap_lng(min_lng - cell_lng / 2)
+                max_lng = self._wrap_lng(max_lng + cell_lng / 2)
+
+            expanded = (
+                min_lng,
+                max(-90.0, min_lat - cell_lat / 2),
+                max_lng,
+                min(90.0, max_lat + cell_lat / 2)
+            )
+
+            query = {"precision": precision, **build_bbox_filter(expanded, field="centro")}
+            results = list(
+                self.collection.find(query)
+                .sort("count", -1)
+                .limit(limit + 1)
+                .max_time_ms(db_instance.max_time_ms())
+            )
+            return [self._format_cell(cell) for cell in results]
+
+        except Exception as e:
+            print(f"Error obteniendo celdas del viewport: {e}")
+            raise e
+
+    def rebuild(self, sounds_collection):
+        """
+        Recalcular todas las celdas desde la colección de sonidos
+
+        Returns:
+            int: Número de celdas generadas
+        """
+        try:
+            cells = {}
+            cursor = sounds_collection.find(
+                {"geohash": {"$exists": True}},
+                {"geohash": 1, "ubicacion": 1, "emociones": 1, "nombre": 1}
+            )
+
+            for sound in cursor:
+                lng, lat = sound['ubicacion']['coordinates']
+                emotions = mongo_safe_keys(sound.get('emociones'))
+
+                for cell_id in geohash.prefixes(sound['geohash'], self.PRECISIONS):
+                    cell = cells.get(cell_id)
+                    if cell is None:
+                        center_lng, center_lat = geohash.decode_center(cell_id)
+                        cell = cells[cell_id] = {
+                            "_id": cell_id,
+                            "precision": len(cell_id),
+                            "centro": {"type": "Point", "coordinates": [center_lng, center_lat]},
+                            "count": 0,
+                            "sum_lat": 0.0,
+                            "sum_lng": 0.0,
+                            "emociones": {},
+                            "emociones_principales": {},
+                            "nombres": []
+                        }
+
+                    cell["count"] += 1
+                    cell["sum_lat"] += lat
+                    cell["sum_lng"] += lng
+                    for key in emotions:
+                        cell["emociones"][key] = cell["emociones"].get(key, 0) + 1
+                    if emotions:
+                        key = emotions[0]
+                        cell["emociones_principales"][key] = cell["emociones_principales"].get(key, 0) + 1
+                    if sound.get('nombre'):
+                        cell["nombres"] = (cell["nombres"] + [sound['nombre']])[-self.SAMPLE_NAMES:]
+
+            self.collection.delete_many({})
+            documents = list(cells.values())
+            for start in range(0, len(documents), 1000):
+                self.collection.insert_many(documents[start:start + 1000], ordered=False)
+
+            return len(documents)
+
+        except Exception as e:
+            print(f"Error reconstruyendo celdas geográficas: {e}")
+            raise e
+
+    @staticmethod
+    def _increments(sound, sign):
+        """Incrementos de los contadores de celda que aporta un sonido"""
+        lng, lat = sound['ubicacion']['coordinates']
+        emotions = mongo_safe_keys(sound.get('emociones'))
+
+        increments = {
+            "count": sign,
+            "sum_lat": sign * lat,
+            "sum_lng": sign * lng
+        }
+        for key in emotions:
+            increments[f"emociones.{key}"] = sign
+        if emotions:
+            increments[f"emociones_principales.{emotions[0]}"] = sign
+        return increments
+
+    @staticmethod
+    def _cell_fields(cell_id):
+        """Campos fijos de una celda nueva"""
+        center_lng, center_lat = geohash.decode_center(cell_id)
+        return {
+            "precision": len(cell_id),
+            "centro": {"type": "Point", "coordinates": [center_lng, center_lat]}
+        }
+
+    @staticmethod
+    def _format_cell(cell):
+        """Calcular centroide y emoción dominante de una celda"""
+        count = max(cell.get("count", 0), 1)
+        emotions = {k: v for k, v in (cell.get("emociones") or {}).items() if v > 0}
+        main_emotions = {k: v for k, v in (cell.get("emociones_principales") or {}).items() if v > 0}
+
+        return {
+            "geohash": cell["_id"],
+            "count": cell.get("count", 0),
+            "lat": cell["sum_lat"] / count,
+            "lng": cell["sum_lng"] / count,
+            "emociones": emotions,
+            "emocion_dominante": max(main_emotions, key=main_emotions.get) if main_emotions else None,
+            "nombres": cell.get("nombres", [])
+        }
+
+    @staticmethod
+    def _wrap_lng(lng):
+        """Normalizar una longitud al rango [-180, 180]"""
+        if lng < -180:
+            return lng + 360
+        if lng > 180:
+            return lng - 360
+        return lng
@@ -1,79 +1,442 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from utils.database import db_instance
+from utils import geohash
+from models.geo_cell_model import GeoCellModel
+from models.stats_model import StatsModel
+from models import analytics_pipelines
+from utils.cache import api_cache
+from utils.suggest_index import suggest_index
+from utils.recommender import recommender
+from utils.helpers import encode_cursor, decode_cursor, build_bbox_filter, normalize_text
 
 class SoundModel:
+    # Campos que se pueden pedir con el parámetro fields=
+    SOUND_FIELDS = (
+        "nombre", "ubicacion", "sonidos", "emociones", "audio_url", "autor",
+        "fecha", "etiquetas", "descripcion", "duracion", "calidad_audio", "audio_info",
+        "sugerencias"
+    )
+    
+    # Proyecciones de las vistas de listado (view=marker|card|full)
+    VIEW_PROJECTIONS = {
+        "marker": {"nombre": 1, "ubicacion": 1, "emociones": {"$slice": 1}},
+        "card": {
+            "nombre": 1, "ubicacion": 1, "emociones": 1, "etiquetas": 1,
+            "autor": 1, "fecha": 1, "audio_url": 1, "duracion": 1
+        },
+        "full": None
+    }
+    
+    # Orden de las páginas por cursor
+    PAGE_SORT = [("fecha", -1), ("_id", -1)]
+    
+    # Celdas de clustering por tesela de 256px (celdas de ~64px)
+    CLUSTER_CELLS_PER_TILE = 4
+    
+    # Campos cuyos cambios afectan a los índices derivados
+    DERIVED_SOURCE_FIELDS = ("ubicacion", "emociones", "etiquetas", "nombre", "autor", "sonidos")
+    
+    # Campos que alimentan las celdas geográficas
+    GEO_CELL_FIELDS = ("ubicacion", "emociones", "nombre")
+    
+    # Copias normalizadas (minúsculas, sin acentos) para búsqueda por prefijo
+    NORMALIZED_FIELDS = {
+        "nombre": "nombre_norm",
+        "etiquetas": "etiquetas_norm",
+        "autor": "autor_norm"
+    }
+    
     def __init__(self):
         self.collection = db_instance.get_collection('sonidos')
+        # Lecturas de analytics (pueden ir a un secundario)
+        self.analytics = db_instance.get_collection('sonidos', analytics=True)
+        self.geo_cells = GeoCellModel()
+        self.stats = StatsModel()
+    
+    def build_sound_document(self, sound_data):
+        """Construir el documento de un sonido con sus campos derivados"""
+        sound_document = {
+            "nombre": sound_data.get('nombre'),
+            "ubicacion": {
+                "type": "Point",
+                "coordinates": [
+                    float(sound_data.get('longitud')),
+                    float(sound_data.get('latitud'))
+                ]
+            },
+            "sonidos": sound_data.get('sonidos', []),
+            "emociones": sound_data.get('emociones', []),
+            "audio_url": sound_data.get('audio_url'),
+            "autor": sound_data.get('autor'),
+            "fecha": datetime.now(),
+            "etiquetas": sound_data.get('etiquetas', []),
+            "descripcion": sound_data.get('descripcion', ''),
+            "duracion": sound_data.get('duracion', 0),
+            "calidad_audio": sound_data.get('calidad_audio', 'media')
+        }
+        self._set_derived_fields(sound_document)
+        return sound_document
     
     def create_sound(self, sound_data):
         """Crear un nuevo sonido en la base de datos"""
         try:
             # Validar estructura de datos
-            sound_document = {
-                "nombre": sound_data.get('nombre'),
-                "ubicacion": {
-                    "type": "Point",
-                    "coordinates": [
-                        float(sound_data.get('longitud')),
-                        float(sound_data.get('latitud'))
-                    ]
-                },
-                "sonidos": sound_data.get('sonidos', []),
-                "emociones": sound_data.get('emociones', []),
-                "audio_url": sound_data.get('audio_url'),
-                "autor": sound_data.get('autor'),
-                "fecha": datetime.now(),
-                "etiquetas": sound_data.get('etiquetas', []),
-                "descripcion": sound_data.get('descripcion', ''),
-                "duracion": sound_data.get('duracion', 0),
-                "calidad_audio": sound_data.get('calidad_audio', 'media')
-            }
+            sound_document = self.build_sound_document(sound_data)
             
             result = self.collection.insert_one(sound_document)
+            self._sync_derived(None, sound_document)
+            api_cache.invalidate()
             return str(result.inserted_id)
             
         except Exception as e:
             print(f"Error creando sonido: {e}")
             raise e
     
-    def get_sounds_by_location(self, lat, lng, radius_km=10):
-        """Obtener sonidos cerca de una ubicación"""
+    def create_sounds_bulk(self, sounds_data):
+        """
+        Crear muchos sonidos con un solo insert_many no ordenado
+        
+        Un documento que falla no detiene a los demás. Los índices derivados
+        se actualizan una vez para todo el lote.
+        
+        Args:
+            sounds_data: Lista de datos de sonidos (como en create_sound)
+        
+        Returns:
+            tuple: ({posición: id creado}, {posición: mensaje de error})
+        
+        Raises:
+            PyMongoError: Si no se puede saber qué documentos se insertaron
+        """
         try:
-            pipeline = [
-                {
-                    "$geoNear": {
-                        "near": {
-                            "type": "Point",
-                            "coordinates": [float(lng), float(lat)]
-                        },
-                        "distanceField": "distancia",
-                        "maxDistance": radius_km * 1000,  # Convertir a metros
-                        "spherical": True
-                    }
-                },
-                {
-                    "$limit": 50
+            documents = [self.build_sound_document(data) for data in sounds_data]
+            if not documents:
+                return {}, {}
+            
+            # _id asignados antes de insertar, para saber qué llegó si falla
+            for document in documents:
+                document.setdefault('_id', ObjectId())
+            
+            errors = {}
+            try:
+                self.collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get('writeErrors', []):
+                    errors[write_error['index']] = write_error.get('errmsg', 'Error de escritura')
+            except PyMongoError as e:
+                # Resultado incierto (p. ej. se cortó la conexión): comprobar
+                # qué documentos llegaron por sus _id
+                inserted = {
+                    document['_id'] for document in self.collection.find(
+                        {"_id": {"$in": [document['_id'] for document in documents]}}, {"_id": 1}
+                    )
                 }
-            ]
+                errors = {
+                    position: str(e)
+                    for position, document in enumerate(documents)
+                    if document['_id'] not in inserted
+                }
+            
+            created = {
+                position: document
+                for position, document in enumerate(documents)
+                if position not in errors
+            }
             
-            results = list(self.collection.aggregate(pipeline))
-            return self._format_results(results)
+            # Los sonidos ya están insertados: un fallo aquí no debe
+            # informarse como fallo de las filas
+            try:
+                self._sync_derived_bulk(list(created.values()))
+            except Exception as e:
+                print(f"Error actualizando índices derivados del lote (ejecute rebuild_stats.py): {e}")
+            finally:
+                api_cache.invalidate()
+            
+            return {position: str(document['_id']) for position, document in created.items()}, errors
+            
+        except Exception as e:
+            print(f"Error creando sonidos en lote: {e}")
+            raise e
+    
+    def get_sounds_by_location(self, lat, lng, radius_km=10, limit=50, cursor=None,
+                               projection=None):
+        """
+        Obtener sonidos cerca de una ubicación, paginados por (distancia, _id)
+        
+        Returns:
+            tuple: (sonidos, cursor de la siguiente página o None)
+        """
+        try:
+            pipeline = self.location_pipeline(lat, lng, radius_km, limit, cursor, projection)
+            results = list(self.collection.aggregate(pipeline, **db_instance.aggregate_options()))
+            return self._build_page(results, limit, self.location_position)
             
         except Exception as e:
             print(f"Error obteniendo sonidos por ubicación: {e}")
             raise e
     
-    def get_all_sounds(self, limit=100):
-        """Obtener todos los sonidos con límite"""
+    def get_clusters(self, bbox, zoom, max_clusters=500, points_zoom=16, max_points=500):
+        """
+        Agrupar los sonidos de un viewport en celdas de una rejilla según el zoom
+        
+        Se leen las celdas geohash precalculadas cuando el zoom corresponde a
+        una precisión mantenida; si no, se agrupa al vuelo. La emoción dominante
+        de cada celda se calcula con la emoción principal (la primera) de cada
+        sonido, la misma que colorea su marcador.
+        
+        Args:
+            bbox: Tupla (min_lng, min_lat, max_lng, max_lat)
+            zoom: Nivel de zoom del mapa
+            max_clusters: Máximo de celdas devueltas
+            points_zoom: Zoom a partir del cual se devuelven puntos individuales
+            max_points: Máximo de puntos devueltos en ese modo
+        
+        Returns:
+            dict: {mode, data, truncated}
+        """
         try:
-            results = list(self.collection.find().limit(limit).sort("fecha", -1))
-            return self._format_results(results)
+            bbox_filter = build_bbox_filter(bbox)
+            
+            if zoom >= points_zoom:
+                results = list(
+                    self.collection.find(bbox_filter, self.VIEW_PROJECTIONS["marker"])
+                    .limit(max_points + 1)
+                    .max_time_ms(db_instance.max_time_ms())
+                )
+                truncated = len(results) > max_points
+                points = self._format_results(results[:max_points])
+                for point in points:
+                    point["type"] = "point"
+                return {"mode": "points", "data": points, "truncated": truncated}
+            
+            # Celda geohash más cercana a ~64px en este zoom
+            precision = round((zoom + 2) * 2 / 5)
+            if precision in GeoCellModel.PRECISIONS:
+                cells = self.geo_cells.get_cells_in_bbox(precision, bbox, max_clusters)
+                truncated = len(cells) > max_clusters
+                clusters = [self._format_cell_cluster(cell) for cell in cells[:max_clusters]]
+                return {"mode": "clusters", "data": clusters, "truncated": truncated}
+            
+            cell_size = 360.0 / (2 ** zoom) / self.CLUSTER_CELLS_PER_TILE
+            lng = {"$arrayElemAt": ["$ubicacion.coordinates", 0]}
+            lat = {"$arrayElemAt": ["$ubicacion.coordinates", 1]}
+            
+            pipeline = [
+                {"$match": bbox_filter},
+                {"$project": {
+                    "nombre": 1,
+                    "lng": lng,
+                    "lat": lat,
+                    "celda": {
+                        "x": {"$floor": {"$divide": [lng, cell_size]}},
+                        "y": {"$floor": {"$divide": [lat, cell_size]}}
+                    },
+                    "emocion": {"$arrayElemAt": ["$emociones", 0]}
+                }},
+                {"$group": {
+                    "_id": {"celda": "$celda", "emocion": "$emocion"},
+                    "count": {"$sum": 1},
+                    "sum_lng": {"$sum": "$lng"},
+                    "sum_lat": {"$sum": "$lat"},
+                    "sound_id": {"$first": "$_id"},
+                    "nombre": {"$first": "$nombre"}
+                }},
+                {"$group": {
+                    "_id": "$_id.celda",
+                    "count": {"$sum": "$count"},
+                    "sum_lng": {"$sum": "$sum_lng"},
+                    "sum_lat": {"$sum": "$sum_lat"},
+                    "emociones": {"$push": {"emocion": "$_id.emocion", "count": "$count"}},
+                    "sound_id": {"$first": "$sound_id"},
+                    "nombre": {"$first": "$nombre"}
+                }},
+                {"$sort": {"count": -1}},
+                {"$limit": max_clusters + 1}
+            ]
+            
+            results = list(self.collection.aggregate(pipeline, **db_instance.aggregate_options()))
+            truncated = len(results) > max_clusters
+            
+            clusters = [self._format_cluster(cell) for cell in results[:max_clusters]]
+            return {"mode": "clusters", "data": clusters, "truncated": truncated}
+            
+        except Exception as e:
+            print(f"Error obteniendo clusters: {e}")
+            raise e
+    
+    def get_all_sounds(self, limit=100, cursor=None, projection=None):
+        """Obtener todos los sonidos paginados por cursor"""
+        try:
+            return self.find_page({}, limit, cursor, projection)
             
         except Exception as e:
             print(f"Error obteniendo todos los sonidos: {e}")
             raise e
     
+    def find_page(self, query=None, limit=100, cursor=None, projection=None):
+        """
+        Obtener una página de sonidos ordenada por (fecha, _id) descendente
+        
+        La página siguiente se pide con el cursor devuelto, de modo que las
+        páginas profundas cuestan lo mismo que la primera.
+        
+        Returns:
+            tuple: (sonidos, cursor de la siguiente página o None)
+        """
+        search_filter, projection = self.page_query(query, cursor, projection)
+        results = list(
+            self.collection.find(search_filter, projection)
+            .sort(self.PAGE_SORT)
+            .limit(limit + 1)
+            .max_time_ms(db_instance.max_time_ms())
+        )
+        return self._build_page(results, limit, self.page_position)
+    
+    @classmethod
+    def page_query(cls, query=None, cursor=None, projection=None):
+        """
+        Filtro y proyección de una página ordenada por (fecha, _id)
+        
+        Returns:
+            tuple: (filtro con la posición del cursor, proyección)
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        search_filter = dict(query or {})
+        
+        if cursor:
+            position = decode_cursor(cursor)
+            last_date, last_id = cls._parse_position(position, "f")
+            if last_date is None:
+                # Los sonidos sin fecha van al final del orden descendente
+                keyset = {"fecha": None, "_id": {"$lt": last_id}}
+            else:
+                keyset = {
+                    "$or": [
+                        {"fecha": {"$lt": last_date}},
+                        {"fecha": last_date, "_id": {"$lt": last_id}},
+                        {"fecha": None}
+                    ]
+                }
+            search_filter = {"$and": [search_filter, keyset]} if search_filter else keyset
+        
+        if projection:
+            # La fecha siempre se proyecta porque forma parte del cursor
+            projection = {**projection, "fecha": 1}
+        
+        return search_filter, projection
+    
+    @staticmethod
+    def page_position(doc):
+        """Posición del cursor de find_page"""
+        date = doc.get("fecha")
+        return {"f": date.isoformat() if date else None, "i": str(doc["_id"])}
+    
+    @classmethod
+    def location_pipeline(cls, lat, lng, radius_km=10, limit=50, cursor=None, projection=None):
+        """
+        Pipeline $geoNear de una página ordenada por (distancia, _id)
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        geo_near = {
+            "near": {
+                "type": "Point",
+                "coordinates": [float(lng), float(lat)]
+            },
+            "distanceField": "distancia",
+            "maxDistance": radius_km * 1000,  # Convertir a metros
+            "spherical": True
+        }
+        pipeline = [{"$geoNear": geo_near}]
+        
+        if cursor:
+            position = decode_cursor(cursor)
+            last_distance, last_id = cls._parse_position(position, "d")
+            geo_near["minDistance"] = last_distance
+            pipeline.append({
+                "$match": {
+                    "$or": [
+                        {"distancia": {"$gt": last_distance}},
+                        {"distancia": last_distance, "_id": {"$gt": last_id}}
+                    ]
+                }
+            })
+        
+        pipeline.extend([
+            {"$sort": {"distancia": 1, "_id": 1}},
+            {"$limit": limit + 1}
+        ])
+        
+        if projection:
+            pipeline.append({
+                "$project": cls.to_aggregation_projection(projection, "distancia")
+            })
+        
+        return pipeline
+    
+    @staticmethod
+    def location_position(doc):
+        """Posición del cursor de get_sounds_by_location"""
+        return {"d": doc["distancia"], "i": str(doc["_id"])}
+    
+    def search_text(self, text, query=None, limit=50, cursor=None, projection=None):
+        """
+        Búsqueda de texto completo ordenada por relevancia
+        
+        Usa el índice de texto en español (sin distinguir mayúsculas ni
+        acentos, con raíces de palabras) y pagina por (relevancia, _id).
+        
+        Args:
+            text: Términos de búsqueda
+            query: Filtros adicionales (emoción, etiqueta, autor)
+        
+        Returns:
+            tuple: (sonidos con su relevancia, cursor de la siguiente página o None)
+        """
+        try:
+            pipeline = [
+                {"$match": {"$text": {"$search": text}, **(query or {})}},
+                {"$addFields": {"relevancia": {"$meta": "textScore"}}}
+            ]
+            
+            if cursor:
+                position = decode_cursor(cursor)
+                last_score, last_id = self._parse_position(position, "s")
+                pipeline.append({
+                    "$match": {
+                        "$or": [
+                            {"relevancia": {"$lt": last_score}},
+                            {"relevancia": last_score, "_id": {"$lt": last_id}}
+                        ]
+                    }
+                })
+            
+            pipeline.extend([
+                {"$sort": {"relevancia": -1, "_id": -1}},
+                {"$limit": limit + 1}
+            ])
+            
+            if projection:
+                pipeline.append({
+                    "$project": self.to_aggregation_projection(projection, "relevancia")
+                })
+            
+            results = list(self.collection.aggregate(pipeline, **db_instance.aggregate_options()))
+            return self._build_page(
+                results, limit,
+                lambda doc: {"s": doc["relevancia"], "i": str(doc["_id"])}
+            )
+            
+        except Exception as e:
+            print(f"Error en búsqueda de texto: {e}")
+            raise e
+    
     def get_sound_by_id(self, sound_id):
         """Obtener un sonido por su ID"""
         try:
@@ -86,19 +449,71 @@ class SoundModel:
             print(f"Error obteniendo sonido por ID: {e}")
             raise e
     
+    def get_sounds_by_ids(self, sound_ids, projection=None):
+        """
+        Obtener varios sonidos en una sola consulta
+        
+        Returns:
+            dict: {id: sonido formateado}; los IDs inexistentes no aparecen
+        """
+        try:
+            object_ids = [ObjectId(sound_id) for sound_id in sound_ids]
+            if not object_ids:
+                return {}
+            
+            results = self.collection.find(
+                {"_id": {"$in": object_ids}}, projection
+            ).max_time_ms(db_instance.max_time_ms())
+            return {
+                str(result['_id']): result
+                for result in self._format_results(results)
+            }
+            
+        except Exception as e:
+            print(f"Error obteniendo sonidos: {e}")
+            raise e
+    
     def update_sound(self, sound_id, update_data):
         """Actualizar un sonido"""
         try:
             # Remover campos que no deben actualizarse
             update_data.pop('_id', None)
             update_data.pop('fecha', None)
+            update_data.pop('geohash', None)
+            # El audio se comparte por contenido y cuenta sus referencias
+            update_data.pop('audio_url', None)
+            update_data.pop('audio_info', None)
+            update_data.pop('sugerencias', None)
+            for normalized_field in self.NORMALIZED_FIELDS.values():
+                update_data.pop(normalized_field, None)
             
-            result = self.collection.update_one(
+            # El formulario envía latitud/longitud sueltas
+            lat = update_data.pop('latitud', None)
+            lng = update_data.pop('longitud', None)
+            if lat is not None or lng is not None:
+                if lat is None or lng is None:
+                    raise ValueError("Se requieren latitud y longitud juntas")
+                update_data['ubicacion'] = {
+                    "type": "Point",
+                    "coordinates": [float(lng), float(lat)]
+                }
+            
+            self._set_derived_fields(update_data)
+            
+            previous = self.collection.find_one_and_update(
                 {"_id": ObjectId(sound_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE
             )
             
-            return result.modified_count > 0
+            if previous is None:
+                return False
+            
+            if any(field in update_data for field in self.DERIVED_SOURCE_FIELDS):
+                self._sync_derived(previous, {**previous, **update_data})
+            
+            api_cache.invalidate()
+            return True
             
         except Exception as e:
             print(f"Error actualizando sonido: {e}")
@@ -107,12 +522,22 @@ class SoundModel:
     def add_tag_to_sound(self, sound_id, new_tag):
         """Añadir etiqueta a un sonido"""
         try:
-            result = self.collection.update_one(
-                {"_id": ObjectId(sound_id)},
-                {"$addToSet": {"etiquetas": new_tag}}
+            previous = self.collection.find_one_and_update(
+                {"_id": ObjectId(sound_id), "etiquetas": {"$ne": new_tag}},
+                {"$addToSet": {
+                    "etiquetas": new_tag,
+                    "etiquetas_norm": normalize_text(new_tag)
+                }},
+                return_document=ReturnDocument.BEFORE
             )
             
-            return result.modified_count > 0
+            if previous is None:
+                return False
+            
+            current = {**previous, "etiquetas": (previous.get('etiquetas') or []) + [new_tag]}
+            self._sync_derived(previous, current)
+            api_cache.invalidate()
+            return True
             
         except Exception as e:
             print(f"Error añadiendo etiqueta: {e}")
@@ -121,58 +546,407 @@ class SoundModel:
     def delete_sound(self, sound_id):
         """Eliminar un sonido"""
         try:
-            result = self.collection.delete_one({"_id": ObjectId(sound_id)})
-            return result.deleted_count > 0
+            deleted = self.collection.find_one_and_delete({"_id": ObjectId(sound_id)})
+            
+            if deleted is None:
+                return False
+            
+            self._sync_derived(deleted, None)
+            api_cache.invalidate()
+            return True
             
         except Exception as e:
             print(f"Error eliminando sonido: {e}")
             raise e
     
-    def get_emotion_patterns(self):
-        """Obtener patrones emocionales usando agregaciones"""
+    def set_audio_info(self, sound_id, audio_info):
+        """
+        Guardar el análisis del audio de un sonido
+        
+        Si el análisis tiene duración, sustituye a la que envió el cliente.
+        
+        Returns:
+            bool: True si el sonido existe
+        """
         try:
-            pipeline = [
-                {"$unwind": "$emociones"},
-                {"$group": {
-                    "_id": "$emociones",
-                    "count": {"$sum": 1},
-                    "sonidos_ejemplo": {"$push": "$nombre"}
-                }},
-                {"$sort": {"count": -1}},
-                {"$limit": 10}
-            ]
+            update = {"audio_info": audio_info}
+            if audio_info.get('duracion') is not None:
+                update["duracion"] = int(round(audio_info['duracion']))
+            
+            result = self.collection.update_one({"_id": ObjectId(sound_id)}, {"$set": update})
+            api_cache.invalidate()
+            return result.matched_count > 0
+            
+        except Exception as e:
+            print(f"Error guardando análisis de audio: {e}")
+            raise e
+    
+    def set_suggestions(self, suggestions_by_id, batch_size=1000):
+        """
+        Guardar las sugerencias del modelo de audio (no tocan emociones ni sonidos)
+        
+        Args:
+            suggestions_by_id: Lista de (sound_id, sugerencias)
+        
+        Returns:
+            int: Número de sonidos actualizados
+        """
+        try:
+            updated = 0
+            operations = []
+            for sound_id, suggestions in suggestions_by_id:
+                operations.append(UpdateOne(
+                    {"_id": ObjectId(sound_id)}, {"$set": {"sugerencias": suggestions}}
+                ))
+                if len(operations) >= batch_size:
+                    updated += self.collection.bulk_write(operations, ordered=False).modified_count
+                    operations = []
+            
+            if operations:
+                updated += self.collection.bulk_write(operations, ordered=False).modified_count
+            
+            api_cache.invalidate()
+            return updated
+            
+        except Exception as e:
+            print(f"Error guardando sugerencias: {e}")
+            raise e
+    
+    def find_audio_info(self, audio_url):
+        """Análisis ya terminado de otro sonido con el mismo audio, o None"""
+        sound = self.collection.find_one(
+            {"audio_url": audio_url, "audio_info.estado": "listo"},
+            {"audio_info": 1}
+        )
+        return sound['audio_info'] if sound else None
+    
+    def backfill_derived_fields(self, batch_size=1000):
+        """
+        Calcular los campos derivados de los sonidos que aún no los tienen
+        
+        Returns:
+            int: Número de sonidos actualizados
+        """
+        try:
+            updated = 0
+            operations = []
+            source_fields = ("ubicacion",) + tuple(self.NORMALIZED_FIELDS)
+            cursor = self.collection.find(
+                {"$or": [
+                    {"geohash": {"$exists": False}},
+                    {"nombre_norm": {"$exists": False}}
+                ]},
+                {field: 1 for field in source_fields}
+            )
+            
+            for sound in cursor:
+                fields = {
+                    "nombre": sound.get('nombre'),
+                    "etiquetas": sound.get('etiquetas') or [],
+                    "autor": sound.get('autor')
+                }
+                if 'ubicacion' in sound:
+                    fields['ubicacion'] = sound['ubicacion']
+                self._set_derived_fields(fields)
+                for field in source_fields:
+                    fields.pop(field, None)
+                operations.append(UpdateOne({"_id": sound['_id']}, {"$set": fields}))
+                
+                if len(operations) >= batch_size:
+                    updated += self.collection.bulk_write(operations, ordered=False).modified_count
+                    operations = []
+            
+            if operations:
+                updated += self.collection.bulk_write(operations, ordered=False).modified_count
+            
+            return updated
+            
+        except Exception as e:
+            print(f"Error calculando campos derivados: {e}")
+            raise e
+    
+    def _set_derived_fields(self, document):
+        """Calcular en el documento los campos derivados de sus datos"""
+        if 'ubicacion' in document:
+            lng, lat = document['ubicacion']['coordinates']
+            document['geohash'] = geohash.encode(lat, lng, GeoCellModel.SOUND_PRECISION)
+        
+        for field, normalized_field in self.NORMALIZED_FIELDS.items():
+            if field not in document:
+                continue
+            value = document[field]
+            if isinstance(value, list):
+                document[normalized_field] = list(dict.fromkeys(
+                    normalize_text(item) for item in value if item
+                ))
+            else:
+                document[normalized_field] = normalize_text(value)
+    
+    def _sync_derived(self, previous, current):
+        """
+        Mantener los índices derivados (celdas geográficas, estadísticas,
+        sugerencias y recomendaciones) tras una escritura
+        
+        Args:
+            previous: Documento antes de la escritura (None al crear)
+            current: Documento después de la escritura (None al eliminar)
+        """
+        geo_changed = previous is None or current is None or any(
+            previous.get(field) != current.get(field) for field in self.GEO_CELL_FIELDS
+        )
+        if geo_changed:
+            if previous:
+                self.geo_cells.apply_sound(previous, -1)
+            if current:
+                self.geo_cells.apply_sound(current, 1)
+        
+        self.stats.apply_change(previous, current)
+        suggest_index.apply_change(previous, current)
+        recommender.apply_change(previous, current)
+    
+    def _sync_derived_bulk(self, created):
+        """Mantener los índices derivados tras insertar un lote de sonidos nuevos"""
+        if not created:
+            return
+        
+        self.geo_cells.add_sounds(created)
+        self.stats.add_sounds(created)
+        for sound in created:
+            suggest_index.apply_change(None, sound)
+            recommender.apply_change(None, sound)
+    
+    def get_emotion_patterns(self, live=False):
+        """
+        Obtener patrones emocionales desde las estadísticas materializadas
+        
+        Args:
+            live: Recalcular con una agregación acotada en lugar de leer los contadores
+        """
+        try:
+            if live:
+                return list(self.analytics.aggregate(
+                    analytics_pipelines.emotion_patterns_pipeline(analytics_pipelines.EMOTION_STATS_LIMIT),
+                    allowDiskUse=True, **db_instance.aggregate_options(analytics=True)
+                ))
             
-            results = list(self.collection.aggregate(pipeline))
-            return results
+            results = self.stats.get_top("emocion", analytics_pipelines.EMOTION_STATS_LIMIT)
+            return [analytics_pipelines.format_emotion(stat) for stat in results]
             
         except Exception as e:
             print(f"Error obteniendo patrones emocionales: {e}")
             raise e
     
-    def get_sounds_by_emotion(self, emotion):
-        """Obtener sonidos por emoción específica"""
+    def get_location_stats(self, live=False):
+        """
+        Obtener las zonas con más sonidos desde las celdas precalculadas
+        
+        Args:
+            live: Recalcular con una agregación acotada en lugar de leer los contadores
+        """
         try:
-            results = list(self.collection.find(
-                {"emociones": {"$in": [emotion]}}
-            ).limit(20))
+            if live:
+                return [
+                    analytics_pipelines.format_location_group(group)
+                    for group in self.analytics.aggregate(
+                        analytics_pipelines.location_stats_pipeline(analytics_pipelines.LOCATION_STATS_LIMIT),
+                        allowDiskUse=True, **db_instance.aggregate_options(analytics=True)
+                    )
+                ]
             
-            return self._format_results(results)
+            return [
+                analytics_pipelines.format_location_cell(cell)
+                for cell in self.geo_cells.get_top_cells(
+                    analytics_pipelines.LOCATION_STATS_PRECISION,
+                    limit=analytics_pipelines.LOCATION_STATS_LIMIT
+                )
+            ]
+            
+        except Exception as e:
+            print(f"Error obteniendo estadísticas por ubicación: {e}")
+            raise e
+    
+    def get_tag_stats(self, live=False):
+        """
+        Obtener las etiquetas más usadas desde las estadísticas materializadas
+        
+        Args:
+            live: Recalcular con una agregación acotada en lugar de leer los contadores
+        """
+        try:
+            if live:
+                return list(self.analytics.aggregate(
+                    analytics_pipelines.tag_stats_pipeline(analytics_pipelines.TAG_STATS_LIMIT),
+                    allowDiskUse=True, **db_instance.aggregate_options(analytics=True)
+                ))
+            
+            return [
+                analytics_pipelines.format_tag(stat)
+                for stat in self.stats.get_top("etiqueta", analytics_pipelines.TAG_STATS_LIMIT)
+            ]
+            
+        except Exception as e:
+            print(f"Error obteniendo estadísticas de etiquetas: {e}")
+            raise e
+    
+    def get_timeline_stats(self, live=False):
+        """
+        Obtener los sonidos por día desde las estadísticas materializadas
+        
+        Args:
+            live: Recalcular con una agregación acotada en lugar de leer los contadores
+        """
+        try:
+            if live:
+                return [
+                    analytics_pipelines.format_day(day["_id"], day["count"], day["emociones"])
+                    for day in self.analytics.aggregate(
+                        analytics_pipelines.timeline_pipeline(analytics_pipelines.TIMELINE_DAYS),
+                        allowDiskUse=True, **db_instance.aggregate_options(analytics=True)
+                    )
+                ]
+            
+            return [
+                analytics_pipelines.format_day(stat["fecha"], stat["count"], stat.get("emociones"))
+                for stat in self.stats.get_timeline(analytics_pipelines.TIMELINE_DAYS)
+            ]
+            
+        except Exception as e:
+            print(f"Error obteniendo estadísticas temporales: {e}")
+            raise e
+    
+    def get_sounds_by_emotion(self, emotion, limit=20, cursor=None, projection=None):
+        """Obtener sonidos por emoción específica, paginados por cursor"""
+        try:
+            return self.find_page(
+                {"emociones": {"$in": [emotion]}}, limit, cursor, projection
+            )
             
         except Exception as e:
             print(f"Error obteniendo sonidos por emoción: {e}")
             raise e
     
-    def _format_result(self, result):
+    def _format_cluster(self, cell):
+        """Formatear una celda agregada como cluster o como punto individual"""
+        count = cell["count"]
+        emotions = [e for e in cell["emociones"] if e.get("emocion")]
+        dominant = max(emotions, key=lambda e: e["count"])["emocion"] if emotions else None
+        
+        cluster = {
+            "type": "cluster" if count > 1 else "point",
+            "count": count,
+            "lat": cell["sum_lat"] / count,
+            "lng": cell["sum_lng"] / count,
+            "emocion_dominante": dominant
+        }
+        
+        if count == 1:
+            cluster["_id"] = str(cell["sound_id"])
+            cluster["nombre"] = cell["nombre"]
+        
+        return cluster
+    
+    def _format_cell_cluster(self, cell):
+        """Formatear una celda precalculada como cluster"""
+        return {
+            "type": "cluster" if cell["count"] > 1 else "point",
+            "count": cell["count"],
+            "lat": cell["lat"],
+            "lng": cell["lng"],
+            "emocion_dominante": cell["emocion_dominante"],
+            "geohash": cell["geohash"]
+        }
+    
+    @classmethod
+    def build_projection(cls, view=None, fields=None):
+        """
+        Construir la proyección de MongoDB para una vista o lista de campos
+        
+        Args:
+            view: Nombre de la vista (marker, card o full)
+            fields: Campos separados por comas; tienen prioridad sobre view
+        
+        Returns:
+            dict | None: Proyección para find() o None para el documento completo
+        
+        Raises:
+            ValueError: Si la vista o algún campo no existen
+        """
+        if fields:
+            requested = [f.strip() for f in fields.split(',') if f.strip()]
+            invalid = [f for f in requested if f not in cls.SOUND_FIELDS]
+            if invalid:
+                raise ValueError(f"Campos no válidos: {', '.join(invalid)}")
+            return {field: 1 for field in requested}
+        
+        if not view:
+            return None
+        
+        if view not in cls.VIEW_PROJECTIONS:
+            raise ValueError(
+                f"Vista no válida. Use: {', '.join(cls.VIEW_PROJECTIONS)}"
+            )
+        return cls.VIEW_PROJECTIONS[view]
+    
+    @staticmethod
+    def to_aggregation_projection(projection, *extra_fields):
+        """
+        Adaptar una proyección de find() a una etapa $project de agregación
+        
+        Args:
+            projection: Proyección generada por build_projection
+            extra_fields: Campos calculados que deben conservarse
+        
+        Returns:
+            dict: Especificación para $project
+        """
+        stage = {}
+        for field, spec in projection.items():
+            if isinstance(spec, dict) and "$slice" in spec:
+                stage[field] = {"$slice": [f"${field}", spec["$slice"]]}
+            else:
+                stage[field] = spec
+        for field in extra_fields:
+            stage[field] = 1
+        return stage
+    
+    @classmethod
+    def _build_page(cls, results, limit, position_of):
+        """Recortar la página y generar el cursor a partir del último documento"""
+        has_more = len(results) > limit
+        results = results[:limit]
+        
+        next_cursor = None
+        if has_more and results:
+            next_cursor = encode_cursor(position_of(results[-1]))
+        
+        return cls._format_results(results), next_cursor
+    
+    @staticmethod
+    def _parse_position(position, key):
+        """Extraer (valor, ObjectId) de la posición de un cursor"""
+        try:
+            value = position[key]
+            if key == "f":
+                value = datetime.fromisoformat(value) if value is not None else None
+            else:
+                value = float(value)
+            return value, ObjectId(position["i"])
+        except Exception as e:
+            raise ValueError("Cursor inválido") from e
+    
+    @staticmethod
+    def _format_result(result):
         """Formatear un resultado individual"""
         if result:
             result['_id'] = str(result['_id'])
-            if 'fecha' in result:
+            if result.get('fecha'):
                 result['fecha'] = result['fecha'].isoformat()
         return result
     
-    def _format_results(self, results):
+    @classmethod
+    def _format_results(cls, results):
         """Formatear lista de resultados"""
         formatted_results = []
         for result in results:
-            formatted_results.append(self._format_result(result))
+            formatted_results.append(cls._format_result(result))
         return formatted_results
\ No newline at end of file
@@ -0,0 +1,366 @@
+import time
+from datetime import datetime, timedelta
+from collections import Counter
+from pymongo import UpdateOne, ReplaceOne, DeleteOne
+from utils.database import db_instance
+from utils.helpers import mongo_safe_key
+from models import analytics_pipelines
+
+class StatsModel:
+    """Contadores materializados por emoción, etiqueta y día, actualizados con $inc"""
+
+    # Nombres de ejemplo guardados por contador, del más reciente al más
+    # antiguo (el mismo orden que $topN por fecha en rebuild)
+    SAMPLE_NAMES = 5
+
+    # Documento de sonidos_stats_journal que marca una reconstrucción en curso
+    REBUILD_MARKER = "rebuild"
+
+    # Segundos que un proceso da por buena su última consulta del marcador
+    REBUILD_CHECK_SECONDS = 1.0
+
+    # Pasadas máximas para recontar lo escrito durante una reconstrucción
+    REPLAY_ROUNDS = 5
+
+    def __init__(self):
+        self.collection = db_instance.get_collection('sonidos_stats')
+        self.reader = db_instance.get_collection('sonidos_stats', analytics=True)
+        self.journal = db_instance.get_collection('sonidos_stats_journal')
+        self._rebuild_checked_at = None
+        self._rebuilding = False
+
+    def apply_change(self, previous, current):
+        """
+        Aplicar a los contadores la diferencia entre dos versiones de un sonido
+
+        Args:
+            previous: Documento antes de la escritura (None al crear)
+            current: Documento después de la escritura (None al eliminar)
+        """
+        try:
+            old = self._contributions(previous)
+            new = self._contributions(current)
+            old_name = (previous or {}).get('nombre')
+            new_name = (current or {}).get('nombre')
+
+            operations = []
+            decremented = []
+
+            for stat_id in old.keys() | new.keys():
+                old_stat = old.get(stat_id)
+                new_stat = new.get(stat_id)
+                old_inc = old_stat["inc"] if old_stat else {}
+                new_inc = new_stat["inc"] if new_stat else {}
+
+                increments = {}
+                for field in old_inc.keys() | new_inc.keys():
+                    delta = new_inc.get(field, 0) - old_inc.get(field, 0)
+                    if delta:
+                        increments[field] = delta
+
+                update = {}
+                if increments:
+                    update["$inc"] = increments
+                if old_stat and old_name and (not new_stat or old_name != new_name):
+                    update["$pull"] = {"ejemplos": old_name}
+                if new_stat and new_name and (not old_stat or old_name != new_name):
+                    update["$push"] = {
+                        "ejemplos": {"$each": [new_name], "$position": 0, "$slice": self.SAMPLE_NAMES}
+                    }
+
+                if not update:
+                    continue
+
+                if new_stat:
+                    update["$setOnInsert"] = new_stat["fields"]
+                if increments.get("count", 0) < 0:
+                    decremented.append(stat_id)
+
+                # $pull y $push no pueden tocar el mismo array en una operación
+                if "$pull" in update and "$push" in update:
+                    operations.append(UpdateOne({"_id": stat_id}, {"$pull": update.pop("$pull")}))
+
+                operations.append(UpdateOne({"_id": stat_id}, update, upsert=bool(new_stat)))
+
+            if operations:
+                self.collection.bulk_write(operations, ordered=True)
+
+            if decremented:
+                self.collection.delete_many({"_id": {"$in": decremented}, "count": {"$lte": 0}})
+
+            self._record_touched(old.keys() | new.keys())
+
+        except Exception as e:
+            print(f"Error actualizando estadísticas: {e}")
+            raise e
+
+    def add_sounds(self, sounds, batch_size=1000):
+        """
+        Sumar un lote de sonidos nuevos con una operación por contador afectado
+
+        Args:
+            sounds: Documentos de los sonidos creados
+        """
+        try:
+            totals = {}
+            for sound in sounds:
+                for stat_id, contribution in self._contributions(sound).items():
+                    total = totals.setdefault(stat_id, {
+                        "fields": contribution["fields"],
+                        "inc": Counter(),
+                        "ejemplos": []
+                    })
+                    total["inc"].update(contribution["inc"])
+                    if sound.get('nombre'):
+                        total["ejemplos"].append(sound['nombre'])
+
+            operations = []
+            for stat_id, total in totals.items():
+                update = {
+                    "$inc": dict(total["inc"]),
+                    "$setOnInsert": total["fields"]
+                }
+                if total["ejemplos"]:
+                    update["$push"] = {"ejemplos": {
+                        "$each": total["ejemplos"][::-1][:self.SAMPLE_NAMES],
+                        "$position": 0,
+                        "$slice": self.SAMPLE_NAMES
+                    }}
+                operations.append(UpdateOne({"_id": stat_id}, update, upsert=True))
+
+            for start in range(0, len(operations), batch_size):
+                self.collection.bulk_write(operations[start:start + batch_size], ordered=False)
+
+            self._record_touched(totals.keys())
+
+        except Exception as e:
+            print(f"Error actualizando estadísticas: {e}")
+            raise e
+
+    def get_top(self, kind, limit):
+        """Obtener los contadores con más sonidos de un tipo (emocion o etiqueta)"""
+        try:
+            return list(
+                self.reader.find({"tipo": kind})
+                .sort("count", -1)
+                .limit(limit)
+                .max_time_ms(db_instance.max_time_ms(analytics=True))
+            )
+
+        except Exception as e:
+            print(f"Error obteniendo estadísticas: {e}")
+            raise e
+
+    def get_timeline(self, limit=30):
+        """Obtener los contadores de los últimos días con actividad"""
+        try:
+            return list(
+                self.reader.find({"tipo": "dia"})
+                .sort("fecha", -1)
+                .limit(limit)
+                .max_time_ms(db_instance.max_time_ms(analytics=True))
+            )
+
+        except Exception as e:
+            print(f"Error obteniendo línea de tiempo: {e}")
+            raise e
+
+    def rebuild(self, sounds_collection):
+        """
+        Recalcular todos los contadores desde la colección de sonidos
+
+        Las agregaciones acotadas escriben con $merge en una colección
+        temporal que después sustituye a sonidos_stats de forma atómica, así
+        que los datos nunca pasan por Python y los dashboards no ven
+        contadores a medio reconstruir.
+
+        Las escrituras no se detienen: mientras dura la reconstrucción cada
+        proceso anota en sonidos_stats_journal los contadores que toca (su
+        $inc va a la colección que se va a sustituir) y, tras el cambio,
+        esos contadores se recuentan desde los sonidos.
+
+        Returns:
+            int: Número de contadores generados
+        """
+        try:
+            self.journal.drop()
+            self.journal.insert_one({"_id": self.REBUILD_MARKER, "desde": datetime.now()})
+
+            # Los demás procesos ven el marcador antes de que empiece la agregación
+            time.sleep(self.REBUILD_CHECK_SECONDS)
+
+            total = self._build_staging(sounds_collection)
+            self._replay_touched(sounds_collection)
+            return total
+
+        except Exception as e:
+            print(f"Error reconstruyendo estadísticas: {e}")
+            raise e
+
+        finally:
+            self.journal.drop()
+
+    def _build_staging(self, sounds_collection):
+        """Generar los contadores en una colección temporal y sustituir sonidos_stats"""
+        database = self.collection.database
+        target_name = self.collection.name
+        staging = database[f"{target_name}_rebuild"]
+        staging.drop()
+
+        for index in self.collection.list_indexes():
+            if index["name"] != "_id_":
+                staging.create_index(list(index["key"].items()), name=index["name"])
+
+        merge = {"$merge": {
+            "into": staging.name,
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+        for pipeline in (
+            analytics_pipelines.emotion_rollup_pipeline(self.SAMPLE_NAMES),
+            analytics_pipelines.tag_rollup_pipeline(self.SAMPLE_NAMES),
+            analytics_pipelines.timeline_rollup_pipeline()
+        ):
+            list(sounds_collection.aggregate(pipeline + [merge], allowDiskUse=True))
+
+        total = staging.count_documents({})
+        if total:
+            staging.rename(target_name, dropTarget=True)
+        else:
+            staging.drop()
+            self.collection.delete_many({})
+
+        return total
+
+    def _is_rebuilding(self):
+        """Si hay una reconstrucción en curso (consultado como mucho cada REBUILD_CHECK_SECONDS)"""
+        now = time.monotonic()
+        if self._rebuild_checked_at is None or now - self._rebuild_checked_at >= self.REBUILD_CHECK_SECONDS:
+            self._rebuilding = self.journal.find_one({"_id": self.REBUILD_MARKER}, {"_id": 1}) is not None
+            self._rebuild_checked_at = now
+        return self._rebuilding
+
+    def _record_touched(self, stat_ids):
+        """Anotar los contadores escritos mientras se reconstruye"""
+        if not stat_ids or not self._is_rebuilding():
+            return
+
+        self.journal.bulk_write([
+            UpdateOne({"_id": stat_id}, {"$setOnInsert": {"fecha": datetime.now()}}, upsert=True)
+            for stat_id in stat_ids
+        ], ordered=False)
+
+    def _replay_touched(self, sounds_collection):
+        """Recontar los contadores anotados hasta que no quede ninguno"""
+        for _ in range(self.REPLAY_ROUNDS):
+            stat_ids = [
+                entry["_id"] for entry in
+                self.journal.find({"_id": {"$ne": self.REBUILD_MARKER}}, {"_id": 1})
+            ]
+            if not stat_ids:
+                return
+
+            self.journal.delete_many({"_id": {"$in": stat_ids}})
+            self.recount(sounds_collection, stat_ids)
+
+        print("Estadísticas con escrituras pendientes tras la reconstrucción; se corregirán en la siguiente")
+
+    def recount(self, sounds_collection, stat_ids):
+        """
+        Recalcular desde los sonidos unos contadores concretos
+
+        Solo se leen los sonidos de esas emociones, etiquetas y días, y se
+        suman con las mismas contribuciones que las escrituras incrementales.
+
+        Args:
+            stat_ids: IDs de los contadores (p. ej. "emocion:calma", "dia:2024-05-01")
+        """
+        wanted = set(stat_ids)
+        emotions, tags, conditions = [], [], []
+        for stat_id in wanted:
+            kind, _, key = stat_id.partition(':')
+            if kind == "emocion":
+                emotions.append(key)
+            elif kind == "etiqueta":
+                tags.append(key)
+            elif kind == "dia":
+                day = datetime.strptime(key, '%Y-%m-%d')
+                conditions.append({"fecha": {"$gte": day, "$lt": day + timedelta(days=1)}})
+        if emotions:
+            conditions.append({"emociones": {"$in": emotions}})
+        if tags:
+            conditions.append({"etiquetas": {"$in": tags}})
+        if not conditions:
+            return
+
+        documents = {}
+        cursor = sounds_collection.find(
+            {"$or": conditions}, {"nombre": 1, "emociones": 1, "etiquetas": 1, "fecha": 1}
+        ).sort("fecha", -1)
+        for sound in cursor:
+            for stat_id, contribution in self._contributions(sound).items():
+                if stat_id not in wanted:
+                    continue
+
+                document = documents.setdefault(stat_id, {**contribution["fields"], "count": 0, "ejemplos": []})
+                for field, value in contribution["inc"].items():
+                    if '.' in field:
+                        parent, child = field.split('.', 1)
+                        counters = document.setdefault(parent, {})
+                        counters[child] = counters.get(child, 0) + value
+                    else:
+                        document[field] += value
+
+                # Los sonidos llegan del más reciente al más antiguo
+                if sound.get('nombre') and len(document["ejemplos"]) < self.SAMPLE_NAMES:
+                    document["ejemplos"].append(sound['nombre'])
+
+        operations = [
+            ReplaceOne({"_id": stat_id}, document, upsert=True)
+            for stat_id, document in documents.items()
+        ]
+        operations += [DeleteOne({"_id": stat_id}) for stat_id in wanted - documents.keys()]
+        self.collection.bulk_write(operations, ordered=False)
+
+    def _contributions(self, sound):
+        """
+        Contadores a los que contribuye un sonido
+
+        Returns:
+            dict: {stat_id: {"fields": campos fijos, "inc": incrementos}}
+        """
+        if not sound:
+            return {}
+
+        contributions = {}
+        # Las emociones que no dan una clave válida (p. ej. "" o "$") se ignoran
+        emotions = {
+            e for e in sound.get('emociones') or []
+            if isinstance(e, str) and mongo_safe_key(e)
+        }
+
+        for emotion in emotions:
+            contributions[f"emocion:{emotion}"] = {
+                "fields": {"tipo": "emocion", "clave": emotion},
+                "inc": {"count": 1}
+            }
+
+        for tag in set(sound.get('etiquetas') or []):
+            if tag:
+                contributions[f"etiqueta:{tag}"] = {
+                    "fields": {"tipo": "etiqueta", "clave": tag},
+                    "inc": {"count": 1}
+                }
+
+        fecha = sound.get('fecha')
+        if isinstance(fecha, datetime):
+            day = datetime(fecha.year, fecha.month, fecha.day)
+            increments = {"count": 1}
+            for emotion in emotions:
+                increments[f"emociones.{mongo_safe_key(emotion)}"] = 1
+            contributions[f"dia:{day.strftime('%Y-%m-%d')}"] = {
+                "fields": {"tipo": "dia", "clave": day.strftime('%Y-%m-%d'), "fecha": day},
+                "inc": increments
+            }
+
+        return contributions
@@ -0,0 +1,74 @@
+"""
+Script para analizar el audio de los sonidos existentes en SoundScape Explorer
+
+Calcula duración real, frecuencia de muestreo, canales, sonoridad y picos
+de la forma de onda de los sonidos que aún no tienen audio_info (o de
+todos con --force), usando la misma cola que la API.
+
+Uso:
+    python process_audio.py [--force] [--workers 4]
+"""
+
+import time
+import argparse
+from collections import Counter
+from config import Config
+from utils.database import db_instance
+from models.sound_model import SoundModel
+from utils.audio_processing import analyze_sound_audio
+from utils.tasks import TaskQueue
+
+def process_audio(force=False, workers=Config.AUDIO_WORKERS):
+    """Analizar los audios pendientes"""
+    try:
+        print("🔬 Análisis de audio de SoundScape Explorer")
+        print("=" * 55)
+
+        sound_model = SoundModel()
+        query = {"audio_url": {"$nin": [None, ""]}}
+        if not force:
+            query["audio_info"] = {"$exists": False}
+
+        queue = TaskQueue(workers, name='process-audio')
+        futures = [
+            queue.submit(
+                analyze_sound_audio, str(sound['_id']), sound['audio_url'],
+                Config.UPLOAD_FOLDER, Config.ANALYSIS_FOLDER, sound_model
+            )
+            for sound in sound_model.collection.find(query, {"audio_url": 1})
+        ]
+        print(f"📋 Sonidos a analizar: {len(futures)}")
+
+        start = time.perf_counter()
+        queue.wait()
+        states = Counter((future.result() or {}).get('estado', 'sin_audio') for future in futures)
+
+        print(f"\n📊 RESUMEN:")
+        for state, count in states.most_common():
+            print(f"   {state}: {count}")
+        print(f"   Tiempo: {time.perf_counter() - start:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error analizando audios: {e}")
+        return False
+
+    finally:
+        db_instance.close_connection()
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Análisis de audio de los sonidos existentes")
+    parser.add_argument('--force', action='store_true',
+                        help='Volver a analizar también los sonidos ya analizados')
+    parser.add_argument('--workers', type=int, default=Config.AUDIO_WORKERS,
+                        help='Hilos de análisis')
+    args = parser.parse_args()
+
+    process_audio(args.force, args.workers)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Análisis cancelado por el usuario")
@@ -0,0 +1,47 @@
+"""
+Script para recalcular los índices derivados de SoundScape Explorer
+(geohash de cada sonido, contadores por celda geográfica y
+estadísticas materializadas por emoción, etiqueta y día)
+"""
+
+import time
+from utils.database import db_instance
+from models.sound_model import SoundModel
+
+def rebuild_stats():
+    """Recalcular campos derivados y contadores desde cero"""
+    try:
+        print("🔄 Recalculando índices derivados de SoundScape Explorer")
+        print("=" * 55)
+
+        sound_model = SoundModel()
+        start = time.perf_counter()
+
+        # Campos derivados de sonidos antiguos
+        updated = sound_model.backfill_derived_fields()
+        print(f"✅ Sonidos actualizados con campos derivados: {updated}")
+
+        # Contadores por celda geohash
+        cells = sound_model.geo_cells.rebuild(sound_model.collection)
+        print(f"✅ Celdas geográficas generadas: {cells}")
+        
+        # Estadísticas por emoción, etiqueta y día
+        stats = sound_model.stats.rebuild(sound_model.collection)
+        print(f"✅ Estadísticas generadas: {stats}")
+
+        elapsed = time.perf_counter() - start
+        print(f"\n🎉 Índices recalculados en {elapsed:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error recalculando índices: {e}")
+        return False
+
+    finally:
+        db_instance.close_connection()
+
+if __name__ == "__main__":
+    try:
+        rebuild_stats()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Operación cancelada por el usuario")
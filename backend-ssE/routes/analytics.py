@@ -1,15 +1,25 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from models.sound_model import SoundModel
 from utils.database import db_instance
+from utils.helpers import get_page_size, build_prefix_filter, build_contains_filter
+from utils.cache import api_cache
+from utils.recommender import recommender
+from utils.dashboard import collect_sections, dashboard_sections
+from bson import ObjectId
 
 analytics_bp = Blueprint('analytics', __name__)
 sound_model = SoundModel()
 
+def is_live_request():
+    """source=live recalcula con agregaciones en lugar de leer los contadores"""
+    return request.args.get('source') == 'live'
+
 @analytics_bp.route('/analytics/emotions', methods=['GET'])
+@api_cache.cached('CACHE_TTL_EMOTIONS')
 def get_emotion_patterns():
     """Obtener patrones emocionales de los sonidos"""
     try:
-        patterns = sound_model.get_emotion_patterns()
+        patterns = sound_model.get_emotion_patterns(live=is_live_request())
         
         return jsonify({
             'success': True,
@@ -23,42 +33,11 @@ def get_emotion_patterns():
         }), 500
 
 @analytics_bp.route('/analytics/locations', methods=['GET'])
+@api_cache.cached('CACHE_TTL_LOCATIONS')
 def get_location_stats():
-    """Obtener estadísticas por ubicación"""
+    """Obtener estadísticas por ubicación desde las celdas precalculadas"""
     try:
-        collection = db_instance.get_collection('sonidos')
-        
-        pipeline = [
-            {
-                "$group": {
-                    "_id": {
-                        "lat": {"$round": [{"$arrayElemAt": ["$ubicacion.coordinates", 1]}, 1]},
-                        "lng": {"$round": [{"$arrayElemAt": ["$ubicacion.coordinates", 0]}, 1]}
-                    },
-                    "count": {"$sum": 1},
-                    "emociones_comunes": {"$push": "$emociones"},
-                    "nombres": {"$push": "$nombre"}
-                }
-            },
-            {
-                "$project": {
-                    "_id": 1,
-                    "count": 1,
-                    "emociones_comunes": {
-                        "$reduce": {
-                            "input": "$emociones_comunes",
-                            "initialValue": [],
-                            "in": {"$concatArrays": ["$$value", "$$this"]}
-                        }
-                    },
-                    "nombres": {"$slice": ["$nombres", 3]}
-                }
-            },
-            {"$sort": {"count": -1}},
-            {"$limit": 20}
-        ]
-        
-        results = list(collection.aggregate(pipeline))
+        results = sound_model.get_location_stats(live=is_live_request())
         
         return jsonify({
             'success': True,
@@ -72,25 +51,11 @@ def get_location_stats():
         }), 500
 
 @analytics_bp.route('/analytics/tags', methods=['GET'])
+@api_cache.cached('CACHE_TTL_TAGS')
 def get_tag_stats():
-    """Obtener estadísticas de etiquetas"""
+    """Obtener estadísticas de etiquetas desde las estadísticas materializadas"""
     try:
-        collection = db_instance.get_collection('sonidos')
-        
-        pipeline = [
-            {"$unwind": "$etiquetas"},
-            {
-                "$group": {
-                    "_id": "$etiquetas",
-                    "count": {"$sum": 1},
-                    "sonidos": {"$push": "$nombre"}
-                }
-            },
-            {"$sort": {"count": -1}},
-            {"$limit": 15}
-        ]
-        
-        results = list(collection.aggregate(pipeline))
+        results = sound_model.get_tag_stats(live=is_live_request())
         
         return jsonify({
             'success': True,
@@ -104,48 +69,11 @@ def get_tag_stats():
         }), 500
 
 @analytics_bp.route('/analytics/timeline', methods=['GET'])
+@api_cache.cached('CACHE_TTL_TIMELINE')
 def get_timeline_stats():
-    """Obtener estadísticas temporales"""
+    """Obtener estadísticas temporales desde las estadísticas materializadas"""
     try:
-        collection = db_instance.get_collection('sonidos')
-        
-        pipeline = [
-            {
-                "$group": {
-                    "_id": {
-                        "year": {"$year": "$fecha"},
-                        "month": {"$month": "$fecha"},
-                        "day": {"$dayOfMonth": "$fecha"}
-                    },
-                    "count": {"$sum": 1},
-                    "emociones": {"$push": "$emociones"}
-                }
-            },
-            {
-                "$project": {
-                    "_id": 1,
-                    "count": 1,
-                    "fecha": {
-                        "$dateFromParts": {
-                            "year": "$_id.year",
-                            "month": "$_id.month",
-                            "day": "$_id.day"
-                        }
-                    },
-                    "emociones_planas": {
-                        "$reduce": {
-                            "input": "$emociones",
-                            "initialValue": [],
-                            "in": {"$concatArrays": ["$$value", "$$this"]}
-                        }
-                    }
-                }
-            },
-            {"$sort": {"fecha": -1}},
-            {"$limit": 30}
-        ]
-        
-        results = list(collection.aggregate(pipeline))
+        results = sound_model.get_timeline_stats(live=is_live_request())
         
         return jsonify({
             'success': True,
@@ -158,26 +86,66 @@ def get_timeline_stats():
             'error': str(e)
         }), 500
 
+@analytics_bp.route('/analytics/dashboard', methods=['GET'])
+@api_cache.cached('CACHE_TTL_DASHBOARD')
+def get_dashboard():
+    """
+    Emociones, ubicaciones, etiquetas y línea de tiempo en una respuesta
+    
+    Las cuatro consultas se ejecutan en paralelo con el plazo
+    DASHBOARD_TIMEOUT; las secciones que no llegan vuelven con data null y
+    la respuesta parcial no se cachea.
+    """
+    try:
+        payload = collect_sections(
+            dashboard_sections(sound_model, live=is_live_request()),
+            current_app.config['DASHBOARD_TIMEOUT']
+        )
+        
+        if not payload['success']:
+            return jsonify({
+                'success': False,
+                'error': 'No se pudo calcular ninguna sección del dashboard',
+                'sections': payload['sections']
+            }), 500
+        
+        response = jsonify(payload)
+        if payload['partial']:
+            response.cache_control.no_store = True
+        return response
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @analytics_bp.route('/analytics/search', methods=['GET'])
+@api_cache.cached('CACHE_TTL_SEARCH')
 def search_sounds():
     """Búsqueda avanzada de sonidos"""
     try:
-        collection = db_instance.get_collection('sonidos')
-        
         # Parámetros de búsqueda
-        query = request.args.get('q', '')
+        query = request.args.get('q', '').strip()
+        mode = request.args.get('mode', 'text')
         emotion = request.args.get('emotion')
         tag = request.args.get('tag')
-        author = request.args.get('author')
+        author = request.args.get('author', '').strip()
         
-        # Construir filtro de búsqueda
+        if mode not in ('text', 'prefix'):
+            raise ValueError("Modo de búsqueda no válido. Use: text, prefix")
+        
+        max_length = current_app.config['SEARCH_MAX_QUERY_LENGTH']
+        if len(query) > max_length or len(author) > max_length:
+            raise ValueError(f"La búsqueda no puede superar {max_length} caracteres")
+        
+        # Construir filtro de búsqueda (sin expresiones regulares del usuario)
         search_filter = {}
         
-        if query:
+        if query and mode == 'prefix':
             search_filter["$or"] = [
-                {"nombre": {"$regex": query, "$options": "i"}},
-                {"descripcion": {"$regex": query, "$options": "i"}},
-                {"etiquetas": {"$regex": query, "$options": "i"}}
+                build_prefix_filter("nombre_norm", query),
+                build_prefix_filter("etiquetas_norm", query)
             ]
         
         if emotion:
@@ -187,89 +155,218 @@ def search_sounds():
             search_filter["etiquetas"] = {"$in": [tag]}
         
         if author:
-            search_filter["autor"] = {"$regex": author, "$options": "i"}
+            # El autor se busca como subcadena, sin distinguir mayúsculas ni acentos
+            search_filter.update(build_contains_filter("autor_norm", author))
         
-        # Ejecutar búsqueda
-        results = list(collection.find(search_filter).limit(50).sort("fecha", -1))
+        # Ejecutar búsqueda paginada por cursor
+        limit = get_page_size(50)
+        cursor = request.args.get('cursor')
+        projection = sound_model.build_projection(
+            request.args.get('view'), request.args.get('fields')
+        )
         
-        # Formatear resultados
-        formatted_results = []
-        for result in results:
-            result['_id'] = str(result['_id'])
-            if 'fecha' in result:
-                result['fecha'] = result['fecha'].isoformat()
-            formatted_results.append(result)
+        if query and mode == 'text':
+            # Índice de texto: resultados ordenados por relevancia
+            results, next_cursor = sound_model.search_text(
+                query, search_filter, limit, cursor, projection
+            )
+        else:
+            results, next_cursor = sound_model.find_page(
+                search_filter, limit, cursor, projection
+            )
         
         return jsonify({
             'success': True,
-            'data': formatted_results,
-            'count': len(formatted_results)
+            'data': results,
+            'count': len(results),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def load_recommender():
+    """Cargar el motor de recomendaciones o recargarlo si está desactualizado"""
+    collection = db_instance.get_collection('sonidos')
+    if not recommender.loaded:
+        recommender.load(collection)
+    else:
+        recommender.refresh_if_stale(
+            collection, current_app.config['RECOMMENDER_REFRESH_SECONDS']
+        )
+
+def get_recommendation_limit(value):
+    """Acotar el número de recomendaciones por semilla"""
+    return max(1, min(int(value), current_app.config['RECOMMENDATIONS_MAX_RESULTS']))
+
+def get_geo_options(params):
+    """
+    Leer el modo cercano (near, max_km, geo_weight) de la query o del cuerpo JSON
+    
+    Returns:
+        dict: Argumentos max_km y geo_weight para el motor de recomendaciones
+    """
+    near = params.get('near', False)
+    if isinstance(near, str):
+        near = near.lower() in ('true', '1', 'yes')
+    if not near:
+        return {}
+    
+    try:
+        max_km = float(params.get('max_km', current_app.config['RECOMMENDATIONS_DEFAULT_MAX_KM']))
+        geo_weight = float(params.get('geo_weight', current_app.config['RECOMMENDATIONS_GEO_WEIGHT']))
+    except (TypeError, ValueError):
+        raise ValueError("max_km y geo_weight deben ser numéricos")
+    
+    if max_km <= 0:
+        raise ValueError("max_km debe ser mayor que 0")
+    if not 0 <= geo_weight <= 1:
+        raise ValueError("geo_weight debe estar entre 0 y 1")
+    
+    return {'max_km': max_km, 'geo_weight': geo_weight}
+
+def build_recommendations(seed_ids, limit, projection, geo_options=None):
+    """
+    Recomendaciones de varias semillas con una sola consulta de documentos
+    
+    Con geo_options (modo cercano) cada recomendación incluye distance_km.
+    
+    Returns:
+        tuple: ({seed_id: [sonidos con similarity_score]}, semillas, IDs no encontrados)
+    """
+    load_recommender()
+    
+    seeds = sound_model.get_sounds_by_ids(seed_ids)
+    for seed in seeds.values():
+        recommender.ensure_indexed(seed)
+    
+    scored = recommender.recommend(list(seeds), limit, **(geo_options or {}))
+    recommended_ids = {sound_id for pairs in scored.values() for sound_id, _, _ in pairs}
+    documents = sound_model.get_sounds_by_ids(recommended_ids, projection)
+    
+    recommendations = {}
+    for seed_id in seeds:
+        recommendations[seed_id] = []
+        for sound_id, score, distance in scored.get(seed_id, []):
+            if sound_id not in documents:
+                continue
+            recommendation = {**documents[sound_id], 'similarity_score': score}
+            if geo_options:
+                recommendation['distance_km'] = distance
+            recommendations[seed_id].append(recommendation)
+    
+    missing = [seed_id for seed_id in seed_ids if seed_id not in seeds]
+    return recommendations, seeds, missing
+
 @analytics_bp.route('/analytics/recommendations/<sound_id>', methods=['GET'])
+@api_cache.cached('CACHE_TTL_RECOMMENDATIONS')
 def get_recommendations(sound_id):
     """Obtener recomendaciones basadas en un sonido"""
     try:
-        # Obtener el sonido de referencia
-        reference_sound = sound_model.get_sound_by_id(sound_id)
+        if not ObjectId.is_valid(sound_id):
+            raise ValueError("ID de sonido no válido")
+        
+        projection = sound_model.build_projection(
+            request.args.get('view'), request.args.get('fields')
+        )
+        limit = get_recommendation_limit(request.args.get('limit', 10, type=int))
+        geo_options = get_geo_options(request.args)
+        
+        recommendations, seeds, _ = build_recommendations(
+            [sound_id], limit, projection, geo_options
+        )
         
-        if not reference_sound:
+        if sound_id not in seeds:
             return jsonify({
                 'success': False,
                 'error': 'Sonido de referencia no encontrado'
             }), 404
         
-        collection = db_instance.get_collection('sonidos')
-        
-        # Buscar sonidos similares basados en emociones y etiquetas
-        pipeline = [
-            {
-                "$match": {
-                    "_id": {"$ne": sound_id},
-                    "$or": [
-                        {"emociones": {"$in": reference_sound.get('emociones', [])}},
-                        {"etiquetas": {"$in": reference_sound.get('etiquetas', [])}}
-                    ]
-                }
-            },
-            {
-                "$addFields": {
-                    "similarity_score": {
-                        "$add": [
-                            {"$size": {"$setIntersection": ["$emociones", reference_sound.get('emociones', [])]}},
-                            {"$size": {"$setIntersection": ["$etiquetas", reference_sound.get('etiquetas', [])]}}
-                        ]
-                    }
-                }
-            },
-            {"$sort": {"similarity_score": -1}},
-            {"$limit": 10}
-        ]
-        
-        results = list(collection.aggregate(pipeline))
-        
-        # Formatear resultados
-        formatted_results = []
-        for result in results:
-            result['_id'] = str(result['_id'])
-            if 'fecha' in result:
-                result['fecha'] = result['fecha'].isoformat()
-            formatted_results.append(result)
+        return jsonify({
+            'success': True,
+            'data': recommendations[sound_id],
+            'reference': seeds[sound_id]
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@analytics_bp.route('/recommendations', methods=['POST'])
+def get_batch_recommendations():
+    """Obtener recomendaciones para varios sonidos en una sola petición"""
+    try:
+        data = request.get_json(silent=True) or {}
+        seed_ids = data.get('sound_ids')
+        
+        if not isinstance(seed_ids, list) or not seed_ids:
+            raise ValueError("Se requiere sound_ids con al menos un ID")
+        
+        max_seeds = current_app.config['RECOMMENDATIONS_MAX_SEEDS']
+        if len(seed_ids) > max_seeds:
+            raise ValueError(f"Máximo {max_seeds} sonidos por petición")
+        
+        invalid = [seed_id for seed_id in seed_ids if not ObjectId.is_valid(str(seed_id))]
+        if invalid:
+            raise ValueError(f"IDs no válidos: {', '.join(map(str, invalid))}")
+        
+        projection = sound_model.build_projection(data.get('view'), data.get('fields'))
+        limit = get_recommendation_limit(data.get('limit', 10))
+        geo_options = get_geo_options(data)
+        
+        seed_ids = list(dict.fromkeys(str(seed_id) for seed_id in seed_ids))
+        recommendations, _, missing = build_recommendations(
+            seed_ids, limit, projection, geo_options
+        )
         
         return jsonify({
             'success': True,
-            'data': formatted_results,
-            'reference': reference_sound
+            'data': recommendations,
+            'missing': missing
         })
         
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@analytics_bp.route('/analytics/cache', methods=['GET'])
+def get_cache_stats():
+    """Obtener los contadores de la caché de respuestas"""
+    return jsonify({
+        'success': True,
+        'data': api_cache.stats()
+    })
+
+@analytics_bp.route('/analytics/database', methods=['GET'])
+def get_database_stats():
+    """Obtener la configuración y las métricas del pool de conexiones de MongoDB"""
+    return jsonify({
+        'success': True,
+        'data': db_instance.pool_stats()
+    })
@@ -0,0 +1,61 @@
+from flask import Blueprint, request, jsonify, current_app
+from utils.database import db_instance
+from utils.suggest_index import suggest_index
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/search/suggest', methods=['GET'])
+def suggest():
+    """Sugerencias de autocompletado servidas desde el índice en memoria"""
+    try:
+        prefix = request.args.get('prefix', '').strip()
+        limit = request.args.get('limit', 10, type=int)
+        limit = max(1, min(limit, current_app.config['SUGGEST_MAX_RESULTS']))
+        
+        kinds = None
+        types = request.args.get('types')
+        if types:
+            kinds = {kind.strip() for kind in types.split(',') if kind.strip()}
+            invalid = kinds - set(suggest_index.KINDS)
+            if invalid:
+                raise ValueError(
+                    f"Tipos no válidos: {', '.join(sorted(invalid))}. "
+                    f"Use: {', '.join(suggest_index.KINDS)}"
+                )
+        
+        if len(prefix) > current_app.config['SEARCH_MAX_QUERY_LENGTH']:
+            raise ValueError("Prefijo demasiado largo")
+        
+        # Recoger en segundo plano las escrituras de otros workers
+        suggest_index.refresh_if_stale(
+            db_instance.get_collection('sonidos'),
+            current_app.config['SUGGEST_REFRESH_SECONDS']
+        )
+        
+        suggestions = suggest_index.suggest(prefix, limit, kinds)
+        
+        return jsonify({
+            'success': True,
+            'data': suggestions,
+            'count': len(suggestions)
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@search_bp.route('/search/suggest/stats', methods=['GET'])
+def get_suggest_stats():
+    """Obtener el tamaño y la antigüedad del índice de sugerencias"""
+    return jsonify({
+        'success': True,
+        'data': suggest_index.stats()
+    })
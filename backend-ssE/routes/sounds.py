@@ -1,8 +1,19 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, make_response
 import os
-from werkzeug.utils import secure_filename
+import zipfile
+from bson import ObjectId
 from models.sound_model import SoundModel
-import uuid
+from utils.helpers import get_page_size, parse_bbox
+from utils.cache import api_cache
+from utils.audio_storage import save_audio, delete_audio, audio_key
+from utils.importer import BulkImporter, parse_manifest
+from utils.upload_sessions import UploadSessionStore
+from utils.renditions import rendition_cache
+from utils.audio_similarity import audio_index
+from utils.audio_processing import (
+    schedule_audio_analysis, reschedule_audio_analysis, remove_audio_analysis, read_peaks,
+    load_features, DEFAULT_PEAKS_PIXELS, MAX_PEAKS_PIXELS
+)
 
 sounds_bp = Blueprint('sounds', __name__)
 sound_model = SoundModel()
@@ -13,32 +24,96 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_AUDIO_EXTENSIONS']
 
 @sounds_bp.route('/sounds', methods=['GET'])
+@api_cache.cached('CACHE_TTL_SOUNDS')
 def get_sounds():
-    """Obtener sonidos con filtros opcionales"""
+    """Obtener sonidos con filtros opcionales, paginados por cursor"""
     try:
         # Parámetros de consulta
         lat = request.args.get('lat', type=float)
         lng = request.args.get('lng', type=float)
         radius = request.args.get('radius', 10, type=int)
         emotion = request.args.get('emotion')
-        limit = request.args.get('limit', 100, type=int)
+        cursor = request.args.get('cursor')
+        projection = sound_model.build_projection(
+            request.args.get('view'), request.args.get('fields')
+        )
         
         if lat and lng:
             # Buscar por ubicación
-            sounds = sound_model.get_sounds_by_location(lat, lng, radius)
+            limit = get_page_size(50)
+            sounds, next_cursor = sound_model.get_sounds_by_location(
+                lat, lng, radius, limit=limit, cursor=cursor, projection=projection
+            )
         elif emotion:
             # Buscar por emoción
-            sounds = sound_model.get_sounds_by_emotion(emotion)
+            limit = get_page_size(20)
+            sounds, next_cursor = sound_model.get_sounds_by_emotion(
+                emotion, limit=limit, cursor=cursor, projection=projection
+            )
         else:
             # Obtener todos los sonidos
-            sounds = sound_model.get_all_sounds(limit)
+            limit = get_page_size(100)
+            sounds, next_cursor = sound_model.get_all_sounds(
+                limit, cursor=cursor, projection=projection
+            )
         
         return jsonify({
             'success': True,
             'data': sounds,
-            'count': len(sounds)
+            'count': len(sounds),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@sounds_bp.route('/sounds/clusters', methods=['GET'])
+@api_cache.cached('CACHE_TTL_CLUSTERS')
+def get_sound_clusters():
+    """Obtener clusters de sonidos para el viewport del mapa"""
+    try:
+        bbox = request.args.get('bbox')
+        zoom = request.args.get('zoom', type=int)
+        
+        if not bbox or zoom is None:
+            return jsonify({
+                'success': False,
+                'error': 'Se requieren los parámetros bbox y zoom'
+            }), 400
+        
+        zoom = max(0, min(zoom, 22))
+        result = sound_model.get_clusters(
+            parse_bbox(bbox),
+            zoom,
+            max_clusters=current_app.config['MAX_MAP_CLUSTERS'],
+            points_zoom=current_app.config['CLUSTER_POINTS_ZOOM'],
+            max_points=current_app.config['MAX_MAP_POINTS']
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': result['data'],
+            'mode': result['mode'],
+            'count': len(result['data']),
+            'truncated': result['truncated']
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -46,6 +121,7 @@ def get_sounds():
         }), 500
 
 @sounds_bp.route('/sounds/<sound_id>', methods=['GET'])
+@api_cache.cached('CACHE_TTL_SOUNDS')
 def get_sound(sound_id):
     """Obtener un sonido específico por ID"""
     try:
@@ -68,6 +144,176 @@ def get_sound(sound_id):
             'error': str(e)
         }), 500
 
+@sounds_bp.route('/sounds/<sound_id>/peaks', methods=['GET'])
+def get_sound_peaks(sound_id):
+    """
+    Picos mínimo/máximo de la forma de onda para dibujarla en `px` columnas
+
+    Con Accept: application/octet-stream (o ?format=binary) devuelve los
+    pares como int16 little-endian intercalados (min, max, min, max...) y
+    los metadatos en cabeceras X-Peaks-*; si no, JSON.
+    """
+    try:
+        pixels = request.args.get('px', DEFAULT_PEAKS_PIXELS, type=int)
+        if pixels is None or not 1 <= pixels <= MAX_PEAKS_PIXELS:
+            return jsonify({
+                'success': False,
+                'error': f'px debe estar entre 1 y {MAX_PEAKS_PIXELS}'
+            }), 400
+
+        sound = sound_model.get_sound_by_id(sound_id)
+        if not sound:
+            return jsonify({
+                'success': False,
+                'error': 'Sonido no encontrado'
+            }), 404
+
+        audio_info = sound.get('audio_info')
+        if not audio_info or audio_info.get('estado') == 'pendiente':
+            return jsonify({
+                'success': False,
+                'error': 'El audio aún se está analizando'
+            }), 202
+        if audio_info.get('estado') != 'listo':
+            return jsonify({
+                'success': False,
+                'error': 'No hay forma de onda para este audio'
+            }), 404
+
+        key = audio_key(sound['audio_url'])
+        peaks = read_peaks(
+            current_app.config['ANALYSIS_FOLDER'], key, audio_info['peaks'], pixels,
+            current_app.config['UPLOAD_FOLDER']
+        )
+        if peaks is None:
+            # El archivo de picos no está en este nodo ni en el almacenamiento
+            reschedule_audio_analysis(
+                sound_id, sound['audio_url'], current_app.config['UPLOAD_FOLDER'],
+                current_app.config['ANALYSIS_FOLDER'], sound_model
+            )
+            return jsonify({
+                'success': False,
+                'error': 'El audio aún se está analizando'
+            }), 202
+
+        metadata = {
+            'length': len(peaks),
+            'samples_per_peak': round(audio_info['duracion'] * audio_info['sample_rate'] / len(peaks), 3),
+            'sample_rate': audio_info['sample_rate'],
+            'duracion': audio_info['duracion'],
+            'bits': 16
+        }
+
+        output = request.args.get('format')
+        if output is None:
+            best = request.accept_mimetypes.best_match(['application/json', 'application/octet-stream'])
+            output = 'binary' if best == 'application/octet-stream' else 'json'
+
+        if output == 'binary':
+            response = make_response(peaks.astype('<i2').tobytes())
+            response.mimetype = 'application/octet-stream'
+            response.headers.update({
+                'X-Peaks-Length': str(metadata['length']),
+                'X-Peaks-Samples-Per-Peak': str(metadata['samples_per_peak']),
+                'X-Peaks-Sample-Rate': str(metadata['sample_rate']),
+                'Access-Control-Expose-Headers':
+                    'X-Peaks-Length, X-Peaks-Samples-Per-Peak, X-Peaks-Sample-Rate'
+            })
+        elif output == 'json':
+            response = jsonify({
+                'success': True,
+                'data': {**metadata, 'peaks': peaks.reshape(-1).tolist()}
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'format debe ser json o binary'
+            }), 400
+
+        # Los picos dependen solo del contenido del audio (URL por hash)
+        response.set_etag(f"{key}:{pixels}:{output}")
+        response.headers['Cache-Control'] = 'public, max-age=86400'
+        response.vary.add('Accept')
+        return response.make_conditional(request)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@sounds_bp.route('/sounds/<sound_id>/similar-audio', methods=['GET'])
+@api_cache.cached('CACHE_TTL_RECOMMENDATIONS', version=audio_index.version)
+def get_similar_audio(sound_id):
+    """
+    Sonidos que suenan parecido, por sus descriptores acústicos
+
+    No depende de emociones ni etiquetas, así que sirve también para
+    sonidos sin etiquetar. Los sonidos subidos después de la última
+    ejecución de extract_features.py se buscan con sus descriptores, pero
+    aún no aparecen como resultado.
+    """
+    try:
+        if not ObjectId.is_valid(sound_id):
+            raise ValueError("ID de sonido no válido")
+        
+        projection = sound_model.build_projection(
+            request.args.get('view'), request.args.get('fields')
+        )
+        limit = max(1, min(
+            request.args.get('limit', 10, type=int),
+            current_app.config['RECOMMENDATIONS_MAX_RESULTS']
+        ))
+        
+        sound = sound_model.get_sound_by_id(sound_id)
+        if not sound:
+            return jsonify({
+                'success': False,
+                'error': 'Sonido no encontrado'
+            }), 404
+        
+        audio_index.reload_if_changed()
+        
+        raw = None
+        key = audio_key(sound.get('audio_url'))
+        if not audio_index.contains(sound_id) and key:
+            raw = load_features(
+                current_app.config['ANALYSIS_FOLDER'], key, current_app.config['UPLOAD_FOLDER']
+            )
+        
+        # Margen para los sonidos eliminados desde la última indexación
+        scored = audio_index.similar(sound_id, limit + 10, raw)
+        if scored is None:
+            return jsonify({
+                'success': False,
+                'error': 'Este sonido aún no tiene descriptores de audio'
+            }), 404
+        
+        documents = sound_model.get_sounds_by_ids([similar_id for similar_id, _ in scored], projection)
+        similar = [
+            {**documents[similar_id], 'similarity_score': score}
+            for similar_id, score in scored
+            if similar_id in documents
+        ][:limit]
+        
+        return jsonify({
+            'success': True,
+            'data': similar,
+            'reference': sound
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @sounds_bp.route('/sounds', methods=['POST'])
 def create_sound():
     """Crear un nuevo sonido"""
@@ -87,20 +333,6 @@ def create_sound():
             }), 400
         
         if file and allowed_file(file.filename):
-            # Generar nombre único para el archivo
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            
-            # Crear directorio de uploads si no existe
-            os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            # Guardar archivo
-            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(file_path)
-            
-            # Crear URL del archivo
-            audio_url = f"/uploads/{unique_filename}"
-            
             # Obtener datos del formulario
             sound_data = {
                 'nombre': request.form.get('nombre'),
@@ -111,7 +343,6 @@ def create_sound():
                 'etiquetas': request.form.getlist('etiquetas'),
                 'descripcion': request.form.get('descripcion', ''),
                 'autor': request.form.get('autor'),
-                'audio_url': audio_url,
                 'duracion': request.form.get('duracion', 0, type=int),
                 'calidad_audio': request.form.get('calidad_audio', 'media')
             }
@@ -123,13 +354,28 @@ def create_sound():
                     'error': 'Faltan datos requeridos: nombre, latitud, longitud'
                 }), 400
             
+            # Guardar el audio por contenido (un audio repetido no se duplica)
+            stored = save_audio(file.stream, file.filename, current_app.config['UPLOAD_FOLDER'])
+            sound_data['audio_url'] = stored['audio_url']
+            
             # Crear sonido en la base de datos
-            sound_id = sound_model.create_sound(sound_data)
+            try:
+                sound_id = sound_model.create_sound(sound_data)
+            except Exception:
+                delete_audio(stored['audio_url'], current_app.config['UPLOAD_FOLDER'])
+                raise
+            
+            # Duración real, sonoridad y picos se calculan en segundo plano
+            schedule_audio_analysis(
+                sound_id, stored['audio_url'],
+                current_app.config['UPLOAD_FOLDER'], current_app.config['ANALYSIS_FOLDER']
+            )
             
             return jsonify({
                 'success': True,
                 'data': {
                     'id': sound_id,
+                    'duplicate': stored['duplicate'],
                     'message': 'Sonido creado exitosamente'
                 }
             }), 201
@@ -146,6 +392,98 @@ def create_sound():
             'error': str(e)
         }), 500
 
+@sounds_bp.route('/sounds/bulk', methods=['POST'])
+def create_sounds_bulk():
+    """
+    Crear muchos sonidos a partir de un manifiesto (CSV/JSON) y un archivo ZIP
+    
+    El ZIP llega en el formulario (archive, limitado por MAX_CONTENT_LENGTH)
+    o, para importaciones grandes, subido antes por fragmentos en una sesión
+    con "archive": true cuyo upload_id se envía en el formulario.
+    """
+    try:
+        manifest = request.files.get('manifest')
+        archive_file = request.files.get('archive')
+        upload_id = request.form.get('upload_id')
+        
+        if not manifest or not (archive_file or upload_id):
+            return jsonify({
+                'success': False,
+                'error': 'Se requieren los archivos manifest (CSV o JSON) y archive (ZIP) o un upload_id'
+            }), 400
+        
+        rows = parse_manifest(manifest.read(), manifest.filename or '')
+        
+        max_items = current_app.config['BULK_MAX_ITEMS']
+        if len(rows) > max_items:
+            raise ValueError(f"Máximo {max_items} sonidos por importación")
+        
+        # Las sesiones de un ZIP no retienen audios: no hace falta liberar nada al borrarlas
+        store = None
+        archive_source = archive_file.stream if archive_file else None
+        if upload_id:
+            store = UploadSessionStore(
+                current_app.config['UPLOAD_SESSIONS_FOLDER'], current_app.config['UPLOAD_SESSION_TTL']
+            )
+            session = store.get(upload_id)
+            if session is None or not session.get('archive'):
+                return jsonify({
+                    'success': False,
+                    'error': 'Sesión de subida no encontrada'
+                }), 404
+            archive_source, _ = store.assemble(session)
+        
+        try:
+            archive = zipfile.ZipFile(archive_source)
+        except zipfile.BadZipFile:
+            raise ValueError("El archivo archive no es un ZIP válido")
+        
+        members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+        by_basename = {os.path.basename(name): info for name, info in members.items()}
+        max_file_size = current_app.config['UPLOAD_MAX_FILE_SIZE']
+        
+        def open_audio(audio_file):
+            info = members.get(audio_file) or by_basename.get(os.path.basename(audio_file))
+            if info is None:
+                raise ValueError("El audio no está en el ZIP")
+            if info.file_size > max_file_size:
+                raise ValueError("Audio demasiado grande")
+            return archive.open(info)
+        
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        analysis_folder = current_app.config['ANALYSIS_FOLDER']
+        importer = BulkImporter(
+            sound_model,
+            upload_folder,
+            current_app.config['ALLOWED_AUDIO_EXTENSIONS'],
+            current_app.config['BULK_BATCH_SIZE'],
+            on_created=lambda sound_id, audio_url: schedule_audio_analysis(
+                sound_id, audio_url, upload_folder, analysis_folder
+            )
+        )
+        with archive:
+            report = importer.run(rows, open_audio)
+        
+        if store is not None:
+            store.delete(upload_id, discard=False)
+        
+        return jsonify({
+            'success': report['failed'] == 0,
+            'data': report
+        }), 201 if report['created'] else 400
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @sounds_bp.route('/sounds/<sound_id>', methods=['PUT'])
 def update_sound(sound_id):
     """Actualizar un sonido"""
@@ -171,6 +509,12 @@ def update_sound(sound_id):
                 'error': 'No se pudo actualizar el sonido'
             }), 404
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -222,19 +566,18 @@ def delete_sound(sound_id):
                 'error': 'Sonido no encontrado'
             }), 404
         
-        # Eliminar archivo de audio si existe
-        if sound.get('audio_url'):
-            file_path = os.path.join(
-                current_app.config['UPLOAD_FOLDER'],
-                os.path.basename(sound['audio_url'])
-            )
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        
         # Eliminar de la base de datos
         success = sound_model.delete_sound(sound_id)
         
         if success:
+            # El archivo solo se borra si ningún otro sonido usa el mismo audio
+            if delete_audio(sound.get('audio_url'), current_app.config['UPLOAD_FOLDER']):
+                remove_audio_analysis(
+                    sound.get('audio_url'), current_app.config['ANALYSIS_FOLDER'],
+                    current_app.config['UPLOAD_FOLDER']
+                )
+                rendition_cache.remove(audio_key(sound.get('audio_url')))
+            
             return jsonify({
                 'success': True,
                 'message': 'Sonido eliminado exitosamente'
@@ -0,0 +1,262 @@
+from flask import Blueprint, request, jsonify, current_app
+import re
+from routes.sounds import sound_model, allowed_file
+from utils.upload_sessions import UploadSessionStore
+from utils.audio_storage import (
+    store_audio_file, link_audio, delete_audio, presign_audio_upload, register_uploaded_audio,
+    discard_direct_upload
+)
+from utils.importer import validate_row
+from utils.audio_processing import schedule_audio_analysis
+
+uploads_bp = Blueprint('uploads', __name__)
+
+def discard_session_audio(session, upload_folder):
+    """Liberar el audio de una sesión descartada (o borrar su subida directa)"""
+    if session.get('stored'):
+        delete_audio(session['stored']['audio_url'], upload_folder)
+    elif session.get('direct'):
+        discard_direct_upload(session['direct']['sha256'], session['direct']['key'], upload_folder)
+
+def get_session_store():
+    """Almacén de sesiones de subida según la configuración"""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    return UploadSessionStore(
+        current_app.config['UPLOAD_SESSIONS_FOLDER'],
+        current_app.config['UPLOAD_SESSION_TTL'],
+        on_discard=lambda session: discard_session_audio(session, upload_folder)
+    )
+
+def get_session_or_404(store, upload_id):
+    session = store.get(upload_id)
+    if session is None:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Sesión de subida no encontrada'
+        }), 404)
+    return session, None
+
+@uploads_bp.route('/uploads', methods=['POST'])
+def create_upload():
+    """Abrir una sesión de subida por fragmentos"""
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = str(data.get('filename') or '').strip()
+        archive = bool(data.get('archive'))
+
+        # El ZIP de una importación masiva (POST /api/sounds/bulk con upload_id)
+        if archive:
+            if not filename.lower().endswith('.zip'):
+                raise ValueError("El archivo de una importación masiva debe ser un ZIP")
+            if data.get('sha256') or data.get('direct'):
+                raise ValueError("El ZIP de una importación masiva se sube por fragmentos")
+            max_size = current_app.config['BULK_MAX_ARCHIVE_SIZE']
+        elif not filename or not allowed_file(filename):
+            raise ValueError(
+                f"Tipo de archivo no permitido. Use: "
+                f"{', '.join(current_app.config['ALLOWED_AUDIO_EXTENSIONS'])}"
+            )
+        else:
+            max_size = current_app.config['UPLOAD_MAX_FILE_SIZE']
+
+        try:
+            size = int(data.get('size'))
+            chunk_size = int(data.get('chunk_size') or current_app.config['UPLOAD_CHUNK_SIZE'])
+        except (TypeError, ValueError):
+            raise ValueError("size y chunk_size deben ser enteros")
+
+        if size <= 0 or size > max_size:
+            raise ValueError(f"El tamaño debe estar entre 1 y {max_size} bytes")
+
+        # Cada fragmento es una petición: no puede superar MAX_CONTENT_LENGTH
+        chunk_size = max(1, min(chunk_size, current_app.config['MAX_CONTENT_LENGTH']))
+
+        # Si el cliente envía el SHA-256 y ese contenido ya está guardado,
+        # la subida termina aquí sin transferir ningún fragmento
+        stored = None
+        direct = None
+        sha256 = str(data.get('sha256') or '').lower()
+        if sha256:
+            if not re.fullmatch(r'[0-9a-f]{64}', sha256):
+                raise ValueError("sha256 debe ser un hash hexadecimal de 64 caracteres")
+            stored = link_audio(sha256, current_app.config['UPLOAD_FOLDER'])
+
+        # Subida directa al almacenamiento con una URL prefirmada (S3)
+        if data.get('direct') and stored is None:
+            if not sha256:
+                raise ValueError("La subida directa requiere el sha256 del archivo")
+            direct = presign_audio_upload(
+                sha256, filename, size, current_app.config['UPLOAD_FOLDER']
+            )
+            direct['sha256'] = sha256
+
+        session = get_session_store().create(filename, size, chunk_size, stored, direct, archive)
+
+        return jsonify({
+            'success': True,
+            'data': session
+        }), 201
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@uploads_bp.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    """Recibir un fragmento; el cuerpo se escribe en disco por bloques"""
+    try:
+        store = get_session_store()
+        session, error = get_session_or_404(store, upload_id)
+        if error:
+            return error
+
+        checksum = store.write_chunk(
+            session, index, request.stream, request.headers.get('X-Chunk-SHA256')
+        )
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'index': index,
+                'sha256': checksum
+            }
+        })
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Estado de una sesión: fragmentos recibidos y pendientes (para reanudar)"""
+    try:
+        store = get_session_store()
+        session, error = get_session_or_404(store, upload_id)
+        if error:
+            return error
+
+        if session.get('direct'):
+            store.touch(session)
+
+        return jsonify({
+            'success': True,
+            'data': store.status(session)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@uploads_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Ensamblar el audio y crear el sonido con los metadatos enviados"""
+    try:
+        store = get_session_store()
+        session, error = get_session_or_404(store, upload_id)
+        if error:
+            return error
+
+        if session.get('archive'):
+            raise ValueError(
+                "Esta sesión es el ZIP de una importación masiva: envíalo a "
+                "POST /api/sounds/bulk con su upload_id"
+            )
+
+        metadata = request.get_json(silent=True) or {}
+        _, sound_data = validate_row(
+            {**metadata, 'archivo': session['filename']},
+            current_app.config['ALLOWED_AUDIO_EXTENSIONS']
+        )
+
+        if not session.get('stored') and session.get('direct'):
+            # El cliente subió el archivo al almacenamiento, que comprobó su hash
+            session['stored'] = register_uploaded_audio(
+                session['direct']['sha256'],
+                session['direct']['key'],
+                current_app.config['UPLOAD_FOLDER']
+            )
+            store.save(session)
+
+        if not session.get('stored'):
+            # Los fragmentos ya están en su sitio: solo se lee una vez para el hash
+            data_path, checksum = store.assemble(session)
+            session['stored'] = store_audio_file(
+                data_path, session['filename'], current_app.config['UPLOAD_FOLDER']
+            )
+            session['stored']['chunks_sha256'] = checksum
+            store.save(session)
+
+        # Si falla, la sesión conserva el audio y se puede reintentar
+        stored = session['stored']
+        sound_data['audio_url'] = stored['audio_url']
+        sound_id = sound_model.create_sound(sound_data)
+        store.delete(upload_id, discard=False)
+        schedule_audio_analysis(
+            sound_id, stored['audio_url'],
+            current_app.config['UPLOAD_FOLDER'], current_app.config['ANALYSIS_FOLDER']
+        )
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'id': sound_id,
+                'audio_url': stored['audio_url'],
+                'size': stored['size'],
+                'sha256': stored['sha256'],
+                'chunks_sha256': stored.get('chunks_sha256'),
+                'duplicate': stored['duplicate'],
+                'message': 'Sonido creado exitosamente'
+            }
+        }), 201
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Cancelar una sesión y liberar sus datos"""
+    try:
+        store = get_session_store()
+        session, error = get_session_or_404(store, upload_id)
+        if error:
+            return error
+
+        store.delete(upload_id)
+
+        return jsonify({
+            'success': True,
+            'message': 'Subida cancelada'
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
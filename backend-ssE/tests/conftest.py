@@ -0,0 +1,29 @@
+"""
+Configuración común de las pruebas
+
+MongoDB se sustituye por mongomock y Redis por fakeredis, así que las
+pruebas no necesitan servicios externos.
+"""
+
+import os
+
+os.environ.setdefault('MONGODB_URI', 'mongodb://localhost:27017')
+os.environ['CACHE_BACKEND'] = 'memory'
+os.environ['MONGO_COMPRESSORS'] = ''
+os.environ['STORAGE_BACKEND'] = 'local'
+
+import mongomock
+import pytest
+from utils import database
+
+# Un solo servidor simulado: create_app() vuelve a conectar y debe ver los mismos datos
+_server = mongomock.MongoClient()
+database.MongoClient = lambda *args, **kwargs: _server
+
+@pytest.fixture
+def db():
+    """Base de datos vacía para cada prueba"""
+    mongo = database.db_instance.get_db()
+    for name in mongo.list_collection_names():
+        mongo.drop_collection(name)
+    yield mongo
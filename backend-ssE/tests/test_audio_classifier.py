@@ -0,0 +1,104 @@
+"""Pruebas del modelo de sugerencias (utils/audio_classifier.py)"""
+
+import os
+import numpy as np
+import pytest
+from utils.audio_classifier import AudioClassifier, train_one_vs_rest
+from utils.audio_features import FEATURE_DIM, FEATURE_VERSION
+
+def dataset(size=60):
+    """Descriptores al azar con etiquetas que dependen del signo de dos de ellos"""
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(size, FEATURE_DIM)).astype(np.float32) * 3 + 10
+    labels = {
+        "emociones": [["calma"] if row[0] > 10 else ["miedo"] for row in features],
+        "sonidos": [["lluvia"] if row[1] > 10 else [] for row in features]
+    }
+    # Una etiqueta con menos de MIN_EXAMPLES ejemplos no se aprende
+    labels["sonidos"][0] = labels["sonidos"][0] + ["rara"]
+    return features, labels
+
+def accuracy(probabilities, targets):
+    return float(((probabilities >= 0.5) == targets).mean())
+
+def test_one_vs_rest_separates_classes():
+    rng = np.random.default_rng(1)
+    features = rng.normal(size=(80, 3)).astype(np.float32)
+    targets = np.stack([features[:, 0] > 0, features[:, 1] + features[:, 2] > 0], axis=1)
+
+    weights, bias = train_one_vs_rest(features, targets)
+
+    assert weights.shape == (3, 2) and bias.shape == (2,)
+    probabilities = 1 / (1 + np.exp(-(features @ weights + bias)))
+    assert accuracy(probabilities, targets) >= 0.95
+
+def test_train_learns_each_field():
+    features, labels = dataset()
+
+    model = AudioClassifier.train(features, labels)
+    predictions = AudioClassifier.predict_model(model, features)
+
+    emotion_labels, emotion_probabilities = predictions["emociones"]
+    assert list(emotion_labels) == ["calma", "miedo"]
+    calm = np.array([sound == ["calma"] for sound in labels["emociones"]])
+    assert accuracy(emotion_probabilities, np.stack([calm, ~calm], axis=1)) >= 0.95
+
+    sound_labels, _ = predictions["sonidos"]
+    assert list(sound_labels) == ["lluvia"]
+
+@pytest.fixture
+def model_path(tmp_path):
+    features, labels = dataset()
+    path = str(tmp_path / 'modelo.npz')
+    AudioClassifier.save(AudioClassifier.train(features, labels), path)
+    return path
+
+def test_save_and_load_round_trip(model_path):
+    features, labels = dataset()
+    model = AudioClassifier.train(features, labels)
+    classifier = AudioClassifier(model_path)
+
+    loaded = AudioClassifier.predict_model(classifier._ensure_loaded(), features)
+    for field, (field_labels, probabilities) in AudioClassifier.predict_model(model, features).items():
+        assert list(loaded[field][0]) == list(field_labels)
+        assert np.allclose(loaded[field][1], probabilities, atol=1e-5)
+    assert classifier.suggest(features[0])["modelo"]
+
+def test_suggest_many_applies_threshold_and_limit(model_path):
+    features, labels = dataset()
+
+    suggestions = AudioClassifier(model_path, min_probability=0.6, max_suggestions=1).suggest_many(features)
+    assert len(suggestions) == len(features)
+    suggested = 0
+    for sound, sound_labels in zip(suggestions, labels["emociones"]):
+        assert len(sound["emociones"]) <= 1
+        for item in sound["emociones"]:
+            assert item["probabilidad"] >= 0.6
+            assert item["valor"] == sound_labels[0]
+            suggested += 1
+    assert suggested >= len(features) * 0.9
+
+    # Con un umbral imposible no se sugiere nada
+    strict = AudioClassifier(model_path, min_probability=1.01).suggest_many(features[:3])
+    assert all(sound["emociones"] == [] and sound["sonidos"] == [] for sound in strict)
+
+def touch_later(path):
+    """Cambiar la fecha de modificación aunque el sistema de archivos tenga poca resolución"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_reloads_lazily_and_ignores_other_versions(tmp_path):
+    features, labels = dataset()
+    path = str(tmp_path / 'modelo.npz')
+    classifier = AudioClassifier(path)
+    assert not classifier.available
+    assert classifier.suggest_many(features) is None
+
+    model = AudioClassifier.train(features, labels)
+    AudioClassifier.save({**model, "version": np.array(FEATURE_VERSION + 1)}, path)
+    assert not classifier.available
+
+    AudioClassifier.save(model, path)
+    touch_later(path)
+    assert classifier.available
+    assert classifier.suggest(features[0]) is not None
@@ -0,0 +1,150 @@
+"""Pruebas de los archivos auxiliares del análisis de audio (utils/audio_processing.py)"""
+
+import os
+import wave
+import numpy as np
+import pytest
+from utils import audio_processing
+from utils.audio_processing import (
+    read_peaks, write_peaks, peaks_path, save_features, load_features,
+    PEAKS_EXTENSION
+)
+from utils.audio_features import FEATURE_DIM
+from utils.storage import S3StorageBackend
+
+KEY = 'ab/cd/abcd.wav'
+
+def peak_levels(pairs):
+    """Mipmap de picos como el de analyze_wav: cada nivel agrupa el anterior de dos en dos"""
+    level = np.stack([-np.arange(pairs), np.arange(pairs)], axis=1).astype('<i2')
+    levels = [level]
+    while len(level) > 1:
+        level = np.stack([
+            np.minimum.reduceat(level[:, 0], np.arange(0, len(level), 2)),
+            np.maximum.reduceat(level[:, 1], np.arange(0, len(level), 2))
+        ], axis=1)
+        levels.append(level)
+    return levels
+
+def test_read_peaks_picks_coarsest_level(tmp_path):
+    levels = peak_levels(64)
+    write_peaks(peaks_path(str(tmp_path), KEY), levels)
+    info = {'niveles': [len(level) for level in levels]}
+
+    peaks = read_peaks(str(tmp_path), KEY, info, 10)
+    assert peaks.shape == (10, 2)
+    assert peaks[:, 1].max() == 63
+
+    assert np.array_equal(read_peaks(str(tmp_path), KEY, info, 1000), levels[0])
+
+def test_read_peaks_missing_file_returns_none(tmp_path):
+    assert read_peaks(str(tmp_path), KEY, {'niveles': [4]}, 10) is None
+
+def test_read_peaks_rejects_mismatched_file(tmp_path):
+    write_peaks(peaks_path(str(tmp_path), KEY), peak_levels(8))
+    with pytest.raises(ValueError):
+        read_peaks(str(tmp_path), KEY, {'niveles': [3]}, 10)
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='sonidos')
+        storage = S3StorageBackend('sonidos', client=client)
+        monkeypatch.setattr(audio_processing, 'get_storage', lambda upload_folder: storage)
+        yield storage
+
+def test_sidecars_are_shared_through_s3(tmp_path, s3_storage):
+    first_node = str(tmp_path / 'nodo1')
+    second_node = str(tmp_path / 'nodo2')
+    vector = np.arange(FEATURE_DIM, dtype=np.float32)
+    levels = peak_levels(16)
+
+    save_features(first_node, KEY, vector, 'uploads')
+    path = peaks_path(first_node, KEY)
+    write_peaks(path, levels)
+    audio_processing.publish_sidecar(path, KEY, PEAKS_EXTENSION, 'uploads')
+
+    assert np.array_equal(load_features(second_node, KEY, 'uploads'), vector)
+    peaks = read_peaks(second_node, KEY, {'niveles': [len(level) for level in levels]}, 100, 'uploads')
+    assert np.array_equal(peaks, levels[0])
+    assert (tmp_path / 'nodo2').joinpath(*KEY.split('/')).with_name('abcd.wav.peaks').exists()
+
+    assert audio_processing.remove_audio_analysis(f'/uploads/{KEY}', second_node, 'uploads')
+    assert load_features(str(tmp_path / 'nodo3'), KEY, 'uploads') is None
+
+def test_peaks_endpoint_reschedules_missing_analysis(db, tmp_path, monkeypatch):
+    from app import create_app
+    from models.sound_model import SoundModel
+
+    app = create_app('testing')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    app.config['ANALYSIS_FOLDER'] = str(tmp_path / 'analysis')
+
+    scheduled = []
+    monkeypatch.setattr(audio_processing, 'schedule_audio_analysis', lambda *args: scheduled.append(args))
+
+    sound_model = SoundModel()
+    sound_id = str(sound_model.collection.insert_one({
+        'nombre': 'Lluvia',
+        'audio_url': f'/uploads/{KEY}',
+        'audio_info': {
+            'estado': 'listo', 'duracion': 1.0, 'sample_rate': 8000,
+            'peaks': {'samples_per_peak': 256, 'niveles': [32]}
+        }
+    }).inserted_id)
+
+    client = app.test_client()
+    response = client.get(f'/api/sounds/{sound_id}/peaks')
+    assert response.status_code == 202
+    assert len(scheduled) == 1
+    assert sound_model.collection.find_one()['audio_info'] == {'estado': 'pendiente'}
+
+    # Mientras está pendiente no se vuelve a encolar
+    assert client.get(f'/api/sounds/{sound_id}/peaks').status_code == 202
+    assert len(scheduled) == 1
+
+def write_truncated_wav(path, cut=3):
+    """WAV estéreo de 16 bits cortado a mitad de un frame, como una grabación interrumpida"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    samples = (np.sin(np.linspace(0, 400 * np.pi, 16000)) * 20000).astype('<i2')
+    with wave.open(path, 'wb') as writer:
+        writer.setnchannels(2)
+        writer.setsampwidth(2)
+        writer.setframerate(8000)
+        writer.writeframes(np.repeat(samples, 2).tobytes())
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - cut)
+
+def analyze_stored_sound(tmp_path, key):
+    from models.sound_model import SoundModel
+
+    sound_model = SoundModel()
+    sound_id = sound_model.collection.insert_one({'nombre': 'Campo', 'audio_url': f'/uploads/{key}'}).inserted_id
+    audio_processing.analyze_sound_audio(
+        str(sound_id), f'/uploads/{key}', str(tmp_path / 'uploads'), str(tmp_path / 'analysis'), sound_model
+    )
+    return sound_model.collection.find_one({'_id': sound_id})['audio_info']
+
+def test_truncated_wav_is_analyzed_up_to_last_frame(db, tmp_path):
+    write_truncated_wav(str(tmp_path / 'uploads' / 'ab' / 'campo.wav'))
+
+    audio_info = analyze_stored_sound(tmp_path, 'ab/campo.wav')
+
+    assert audio_info['estado'] == 'listo'
+    assert audio_info['canales'] == 2
+    assert audio_info['duracion'] == pytest.approx(15999 / 8000, abs=1e-3)
+
+def test_unexpected_analysis_failure_is_recorded(db, tmp_path, monkeypatch):
+    write_truncated_wav(str(tmp_path / 'uploads' / 'ab' / 'campo.wav'))
+
+    def broken(path):
+        raise RuntimeError("fallo inesperado")
+
+    monkeypatch.setattr(audio_processing, 'analyze_wav', broken)
+    audio_info = analyze_stored_sound(tmp_path, 'ab/campo.wav')
+
+    assert audio_info == {'estado': 'error', 'error': 'fallo inesperado'}
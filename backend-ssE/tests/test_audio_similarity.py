@@ -0,0 +1,126 @@
+"""Pruebas de los descriptores de audio y la búsqueda de sonidos parecidos"""
+
+import wave
+import numpy as np
+import pytest
+from bson import ObjectId
+from utils.audio_analysis import AudioAnalysisError
+from utils.audio_features import extract_features, FEATURE_DIM, FEATURE_NAMES
+from utils.audio_similarity import AudioSimilarityIndex, audio_index
+
+def write_wav(path, samples, channels=1, sample_rate=22050):
+    with wave.open(str(path), 'wb') as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes((np.asarray(samples) * 20000).astype('<i2').tobytes())
+    return str(path)
+
+def sine(seconds=1.0, frequency=440.0, sample_rate=22050):
+    return np.sin(2 * np.pi * frequency * np.arange(int(seconds * sample_rate)) / sample_rate)
+
+def test_features_have_fixed_shape(tmp_path):
+    noise = np.random.default_rng(0).uniform(-1, 1, 2 * 22050)
+    paths = [
+        write_wav(tmp_path / 'tono.wav', sine()),
+        write_wav(tmp_path / 'ruido.wav', noise, channels=2),
+        write_wav(tmp_path / 'corto.wav', sine(seconds=0.01), sample_rate=8000)
+    ]
+
+    vectors = [extract_features(path) for path in paths]
+
+    for vector in vectors:
+        assert vector.shape == (FEATURE_DIM,) == (len(FEATURE_NAMES),)
+        assert vector.dtype == np.float32
+        assert np.all(np.isfinite(vector))
+
+    # El ruido blanco tiene un espectro mucho más plano que un tono puro
+    flatness = FEATURE_NAMES.index("planitud")
+    assert vectors[1][flatness] > vectors[0][flatness]
+
+def test_features_reject_empty_wav(tmp_path):
+    with pytest.raises(AudioAnalysisError):
+        extract_features(write_wav(tmp_path / 'vacio.wav', []))
+
+def catalog(extra=0):
+    """Un sonido de referencia, dos parecidos a distinta distancia y el resto al azar"""
+    rng = np.random.default_rng(1)
+    seed = rng.normal(size=FEATURE_DIM)
+    entries = [
+        ("seed", seed),
+        ("cercano", seed + 0.05 * rng.normal(size=FEATURE_DIM)),
+        ("medio", seed + 0.6 * rng.normal(size=FEATURE_DIM))
+    ]
+    entries += [(f"otro{i}", rng.normal(size=FEATURE_DIM)) for i in range(20 + extra)]
+    return entries
+
+@pytest.fixture
+def index(tmp_path):
+    index = AudioSimilarityIndex(str(tmp_path / 'audio.npy'))
+    AudioSimilarityIndex.build(catalog(), index.path)
+    index.load()
+    return index
+
+def test_similar_ranks_by_similarity_and_excludes_seed(index):
+    results = index.similar("seed", limit=5)
+
+    assert len(results) == 5
+    assert [sound_id for sound_id, _ in results[:2]] == ["cercano", "medio"]
+    assert "seed" not in [sound_id for sound_id, _ in results]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert index.similar("desconocido") is None
+
+def test_similar_embeds_unindexed_sounds(index):
+    raw = dict(catalog())["cercano"]
+    assert index.similar("nuevo", limit=1, raw=raw)[0][0] == "cercano"
+
+def test_version_follows_rebuilds(index):
+    version = index.version()
+    AudioSimilarityIndex.build(catalog(extra=1), index.path)
+
+    assert index.version() != version
+    assert index.stats()["sounds"] == len(catalog(extra=1))
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    from app import create_app
+    from models.sound_model import SoundModel
+
+    # El índice global se reinicia y se restaura al terminar
+    for name, value in list(vars(audio_index).items()):
+        monkeypatch.setattr(audio_index, name, value)
+    monkeypatch.setattr(audio_index, "path", str(tmp_path / 'audio.npy'))
+    monkeypatch.setattr(audio_index, "_signature", None)
+
+    sound_model = SoundModel()
+    ids = {
+        name: sound_model.create_sound({
+            "nombre": name, "latitud": 4.6, "longitud": -74.1, "emociones": ["calma"]
+        })
+        for name in ("Lluvia", "Río", "Tráfico")
+    }
+    app = create_app('testing')
+    return app.test_client(), ids
+
+def similar_names(client, sound_id):
+    response = client.get(f'/api/sounds/{sound_id}/similar-audio', query_string={"limit": 1})
+    assert response.status_code == 200
+    return [sound["nombre"] for sound in response.get_json()["data"]]
+
+def test_similar_audio_is_not_served_stale_after_reindex(client):
+    client, ids = client
+    base = np.ones(FEATURE_DIM)
+    near, far = base + 0.1, -base
+
+    AudioSimilarityIndex.build(
+        [(ids["Lluvia"], base), (ids["Río"], near), (ids["Tráfico"], far)], audio_index.path
+    )
+    assert similar_names(client, ids["Lluvia"]) == ["Río"]
+
+    # Nueva indexación con otra fila: la misma URL ya no puede salir de la caché
+    AudioSimilarityIndex.build(
+        [(ids["Lluvia"], base), (ids["Río"], far), (ids["Tráfico"], near), (str(ObjectId()), far * 2)],
+        audio_index.path
+    )
+    assert similar_names(client, ids["Lluvia"]) == ["Tráfico"]
@@ -0,0 +1,98 @@
+"""Pruebas del almacenamiento por contenido con referencias (utils/audio_storage.py)"""
+
+import io
+import threading
+import time
+from datetime import datetime, timedelta
+from models.audio_blob_model import AudioBlobModel
+from utils.audio_storage import save_audio, delete_audio, link_audio, delete_claimed_blob
+from utils.storage import LocalStorageBackend
+from utils.upload_sessions import UploadSessionStore
+
+AUDIO = b'RIFF' + b'lluvia' * 100
+
+def save(upload_folder, content=AUDIO):
+    return save_audio(io.BytesIO(content), 'lluvia.wav', str(upload_folder))
+
+def test_duplicate_content_shares_one_file(db, tmp_path):
+    first = save(tmp_path)
+    second = save(tmp_path)
+
+    assert first['audio_url'] == second['audio_url']
+    assert not first['duplicate'] and second['duplicate']
+    assert db.audio_blobs.find_one()['refs'] == 2
+    assert (tmp_path / first['filename']).exists()
+
+def test_file_deleted_with_last_reference(db, tmp_path):
+    stored = save(tmp_path)
+    save(tmp_path)
+
+    assert not delete_audio(stored['audio_url'], str(tmp_path))
+    assert (tmp_path / stored['filename']).exists()
+
+    assert delete_audio(stored['audio_url'], str(tmp_path))
+    assert not (tmp_path / stored['filename']).exists()
+    assert db.audio_blobs.count_documents({}) == 0
+
+def test_link_audio_refuses_blob_being_deleted(db, tmp_path):
+    stored = save(tmp_path)
+    assert AudioBlobModel().release(stored['sha256']) is not None
+
+    assert link_audio(stored['sha256'], str(tmp_path)) is None
+
+def test_acquire_during_delete_restores_file(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(AudioBlobModel, 'POLL_INTERVAL', 0.01)
+    stored = save(tmp_path)
+    blob_model = AudioBlobModel()
+    claimed = blob_model.release(stored['sha256'])
+
+    # Otra subida del mismo contenido llega mientras se borra el archivo
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(save(tmp_path)))
+    thread.start()
+    time.sleep(0.1)
+    assert thread.is_alive()
+
+    delete_claimed_blob(blob_model, claimed, LocalStorageBackend(str(tmp_path)))
+    thread.join(timeout=5)
+
+    assert result['audio_url'] == stored['audio_url']
+    assert (tmp_path / stored['filename']).exists()
+    blob = db.audio_blobs.find_one()
+    assert blob['refs'] == 1
+    assert 'borrando' not in blob
+
+def test_abandoned_delete_is_taken_over(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(AudioBlobModel, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(AudioBlobModel, 'DELETE_TIMEOUT', 0.05)
+    stored = save(tmp_path)
+    AudioBlobModel().release(stored['sha256'])
+
+    again = save(tmp_path)
+    assert (tmp_path / again['filename']).exists()
+    assert db.audio_blobs.find_one()['refs'] == 1
+
+def test_recount_keeps_session_and_recent_blobs(db, tmp_path, monkeypatch):
+    from migrate_audio_storage import migrate_audio_storage
+    from config import Config
+
+    in_session = save(tmp_path, b'RIFF sesion')
+    recent = save(tmp_path, b'RIFF reciente')
+    orphan = save(tmp_path, b'RIFF huerfano')
+
+    old = datetime.now() - timedelta(days=30)
+    db.audio_blobs.update_many({"_id": {"$ne": recent['sha256']}}, {"$set": {"ultimo_uso": old}})
+
+    sessions = UploadSessionStore(str(tmp_path / '.sessions'))
+    sessions.create('sesion.wav', 11, 11, stored=in_session)
+
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(Config, 'UPLOAD_SESSIONS_FOLDER', str(tmp_path / '.sessions'))
+    assert migrate_audio_storage(recount=True)
+
+    assert db.audio_blobs.find_one({"_id": in_session['sha256']})['refs'] == 1
+    assert db.audio_blobs.find_one({"_id": recent['sha256']})['refs'] == 1
+    assert db.audio_blobs.find_one({"_id": orphan['sha256']}) is None
+    assert (tmp_path / in_session['filename']).exists()
+    assert (tmp_path / recent['filename']).exists()
+    assert not (tmp_path / orphan['filename']).exists()
@@ -0,0 +1,162 @@
+"""Pruebas de la caché de respuestas (utils/cache.py)"""
+
+import threading
+import time
+import fakeredis
+import pytest
+from utils.cache import MemoryCacheBackend, RedisCacheBackend, ResponseCache
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=8)
+    return RedisCacheBackend(None, client=fakeredis.FakeStrictRedis())
+
+def test_hit_after_miss(backend):
+    cache = ResponseCache(backend)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b'valor', True
+
+    assert cache.get_or_compute('k', 60, compute) == b'valor'
+    assert cache.get_or_compute('k', 60, compute) == b'valor'
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+def test_not_cacheable_is_not_stored(backend):
+    cache = ResponseCache(backend)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b'parcial', False
+
+    cache.get_or_compute('k', 60, compute)
+    cache.get_or_compute('k', 60, compute)
+    assert len(calls) == 2
+
+def test_concurrent_misses_compute_once(backend):
+    cache = ResponseCache(backend, lock_timeout=5, lock_wait=5)
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return b'valor', True
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute('k', 60, compute)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [b'valor'] * 8
+    assert cache.stats()['coalesced'] == 7
+
+def test_invalidate_discards_entries(backend):
+    cache = ResponseCache(backend)
+    cache.get_or_compute('k', 60, lambda: (b'viejo', True))
+    cache.invalidate()
+    assert cache.get_or_compute('k', 60, lambda: (b'nuevo', True)) == b'nuevo'
+
+def test_compute_overlapping_invalidate_is_not_served(backend):
+    cache = ResponseCache(backend)
+
+    def stale_compute():
+        # Una escritura invalida la caché mientras se calcula
+        cache.invalidate()
+        return b'viejo', True
+
+    assert cache.get_or_compute('k', 60, stale_compute) == b'viejo'
+    assert cache.get_or_compute('k', 60, lambda: (b'nuevo', True)) == b'nuevo'
+
+def test_release_lock_requires_token(backend):
+    generation = backend.generation()
+    token = backend.acquire_lock('k', 10, generation)
+    assert token is not None
+    assert backend.acquire_lock('k', 10, generation) is None
+
+    backend.release_lock('k', 'otro-token', generation)
+    assert backend.is_locked('k', generation)
+
+    backend.release_lock('k', token, generation)
+    assert not backend.is_locked('k', generation)
+
+def test_memory_lru_eviction():
+    backend = MemoryCacheBackend(max_entries=2)
+    generation = backend.generation()
+    backend.set('a', b'1', 60, generation)
+    backend.set('b', b'2', 60, generation)
+    backend.get('a', generation)
+    backend.set('c', b'3', 60, generation)
+
+    assert backend.get('b', generation) is None
+    assert backend.get('a', generation) == b'1'
+    assert backend.info()['evictions'] == 1
+
+def test_memory_ttl_expiration():
+    backend = MemoryCacheBackend()
+    generation = backend.generation()
+    backend.set('k', b'1', 0.01, generation)
+    time.sleep(0.02)
+    assert backend.get('k', generation) is None
+
+def test_shared_redis_between_workers():
+    server = fakeredis.FakeServer()
+    first = ResponseCache(RedisCacheBackend(None, client=fakeredis.FakeStrictRedis(server=server)))
+    second = ResponseCache(RedisCacheBackend(None, client=fakeredis.FakeStrictRedis(server=server)))
+
+    first.get_or_compute('k', 60, lambda: (b'1', True))
+    assert second.get_or_compute('k', 60, lambda: (b'2', True)) == b'1'
+
+    second.invalidate()
+    assert first.get_or_compute('k', 60, lambda: (b'3', True)) == b'3'
+
+def test_backend_failure_falls_back_to_compute():
+    class BrokenBackend(MemoryCacheBackend):
+        def generation(self):
+            raise ConnectionError('caído')
+
+    cache = ResponseCache(BrokenBackend())
+    assert cache.get_or_compute('k', 60, lambda: (b'valor', True)) == b'valor'
+    assert cache.stats()['errors'] >= 1
+
+def test_cached_decorator_skips_no_store():
+    from flask import Flask, jsonify
+
+    cache = ResponseCache(MemoryCacheBackend())
+    app = Flask(__name__)
+    app.config['CACHE_TTL_TEST'] = 60
+    calls = []
+
+    @app.route('/completo')
+    @cache.cached('CACHE_TTL_TEST')
+    def complete():
+        calls.append('completo')
+        return jsonify({'n': len(calls)})
+
+    @app.route('/parcial')
+    @cache.cached('CACHE_TTL_TEST')
+    def partial():
+        calls.append('parcial')
+        response = jsonify({'n': len(calls)})
+        response.cache_control.no_store = True
+        return response
+
+    client = app.test_client()
+    first = client.get('/completo?b=2&a=1')
+    second = client.get('/completo?a=1&b=2')
+    assert first.get_json() == second.get_json()
+    assert second.mimetype == 'application/json'
+    assert calls.count('completo') == 1
+
+    client.get('/parcial')
+    client.get('/parcial')
+    assert calls.count('parcial') == 2
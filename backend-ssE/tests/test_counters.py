@@ -0,0 +1,114 @@
+"""Pruebas de los contadores precalculados (models/geo_cell_model.py y stats_model.py)"""
+
+from datetime import datetime
+from models.geo_cell_model import GeoCellModel
+from models.stats_model import StatsModel
+from utils import geohash
+
+def make_sound(emotions, sound_id="s1", name="Lluvia"):
+    return {
+        "_id": sound_id,
+        "nombre": name,
+        "ubicacion": {"type": "Point", "coordinates": [-74.1, 4.6]},
+        "geohash": geohash.encode(4.6, -74.1, GeoCellModel.SOUND_PRECISION),
+        "emociones": emotions,
+        "fecha": datetime(2024, 5, 1, 10, 30)
+    }
+
+def test_cells_skip_emotions_without_valid_key(db):
+    sound = make_sound(["", "$", None, "calma", "paz.total"])
+    GeoCellModel().apply_sound(sound)
+
+    cell = db.sonidos_celdas.find_one({"precision": 7})
+    assert cell["count"] == 1
+    assert cell["emociones"] == {"calma": 1, "paz_total": 1}
+    assert cell["emociones_principales"] == {"calma": 1}
+
+    GeoCellModel().apply_sound(sound, sign=-1)
+    assert db.sonidos_celdas.count_documents({}) == 0
+
+def test_cell_rebuild_matches_incremental_counters(db):
+    db.sonidos.insert_one(make_sound(["$", "calma"]))
+    GeoCellModel().rebuild(db.sonidos)
+
+    cell = db.sonidos_celdas.find_one({"precision": 7})
+    assert cell["emociones"] == {"calma": 1}
+    assert cell["emociones_principales"] == {"calma": 1}
+
+def test_stats_skip_emotions_without_valid_key(db):
+    stats = StatsModel()
+    stats.apply_change(None, make_sound(["", "$", "calma"]))
+
+    assert db.sonidos_stats.find_one({"_id": "emocion:calma"})["count"] == 1
+    assert db.sonidos_stats.count_documents({"tipo": "emocion"}) == 1
+    day = db.sonidos_stats.find_one({"_id": "dia:2024-05-01"})
+    assert day["emociones"] == {"calma": 1}
+
+    stats.apply_change(make_sound(["", "$", "calma"]), None)
+    assert db.sonidos_stats.count_documents({}) == 0
+
+def test_stats_samples_stay_newest_first(db):
+    # Orden en que rebuild guarda los ejemplos ($topN por fecha descendente)
+    db.sonidos_stats.insert_one({
+        "_id": "emocion:calma", "tipo": "emocion", "clave": "calma", "count": 5,
+        "ejemplos": ["e", "d", "c", "b", "a"]
+    })
+    stats = StatsModel()
+
+    stats.apply_change(None, {**make_sound(["calma"]), "nombre": "f"})
+    assert db.sonidos_stats.find_one({"_id": "emocion:calma"})["ejemplos"] == ["f", "e", "d", "c", "b"]
+
+    stats.add_sounds([{**make_sound(["calma"]), "nombre": name} for name in ("g", "h")])
+    assert db.sonidos_stats.find_one({"_id": "emocion:calma"})["ejemplos"] == ["h", "g", "f", "e", "d"]
+
+def rebuild_with_concurrent_write(db, monkeypatch, concurrent_write):
+    """Reconstruir mientras otro worker escribe entre la agregación y el cambio de colección"""
+    rebuilder = StatsModel()
+    monkeypatch.setattr(rebuilder, 'REBUILD_CHECK_SECONDS', 0)
+
+    def build_staging(sounds_collection):
+        snapshot = list(sounds_collection.find())
+        concurrent_write()
+        # La colección reconstruida solo conoce los sonidos de la instantánea
+        db.sonidos_stats.delete_many({})
+        stats = {}
+        for sound in snapshot:
+            for stat_id, contribution in rebuilder._contributions(sound).items():
+                stat = stats.setdefault(stat_id, {"_id": stat_id, **contribution["fields"], "count": 0})
+                stat["count"] += 1
+        db.sonidos_stats.insert_many(list(stats.values()))
+        return db.sonidos_stats.count_documents({})
+
+    monkeypatch.setattr(rebuilder, '_build_staging', build_staging)
+    rebuilder.rebuild(db.sonidos)
+    assert db.sonidos_stats_journal.count_documents({}) == 0
+
+def test_rebuild_keeps_sounds_created_while_it_runs(db, monkeypatch):
+    db.sonidos.insert_one(make_sound(["calma"]))
+    writer = StatsModel()
+
+    def create():
+        sound = make_sound(["calma", "paz"], "s2", "Viento")
+        db.sonidos.insert_one(sound)
+        writer.apply_change(None, sound)
+
+    rebuild_with_concurrent_write(db, monkeypatch, create)
+
+    calma = db.sonidos_stats.find_one({"_id": "emocion:calma"})
+    assert calma["count"] == 2
+    assert sorted(calma["ejemplos"]) == ["Lluvia", "Viento"]
+    assert db.sonidos_stats.find_one({"_id": "emocion:paz"})["count"] == 1
+    assert db.sonidos_stats.find_one({"_id": "dia:2024-05-01"})["emociones"] == {"calma": 2, "paz": 1}
+
+def test_rebuild_drops_sounds_deleted_while_it_runs(db, monkeypatch):
+    db.sonidos.insert_many([make_sound(["calma"]), make_sound(["miedo"], "s2", "Trueno")])
+    writer = StatsModel()
+
+    def delete():
+        sound = db.sonidos.find_one_and_delete({"_id": "s2"})
+        writer.apply_change(sound, None)
+
+    rebuild_with_concurrent_write(db, monkeypatch, delete)
+
+    assert db.sonidos_stats.find_one({"_id": "emocion:miedo"}) is None
+    assert db.sonidos_stats.find_one({"_id": "dia:2024-05-01"})["count"] == 1
@@ -0,0 +1,109 @@
+"""Pruebas del dashboard de analytics con secciones lentas o con errores (utils/dashboard.py)"""
+
+import time
+import asyncio
+import pytest
+from pymongo.errors import ExecutionTimeout
+from utils.dashboard import collect_sections, gather_sections
+
+TIMEOUT = 0.2
+
+def slow():
+    time.sleep(TIMEOUT * 3)
+    return ["tarde"]
+
+def broken():
+    raise RuntimeError("agregación rota")
+
+def cut_by_server():
+    raise ExecutionTimeout("operation exceeded time limit")
+
+def assert_partial(payload):
+    assert payload["success"] is True
+    assert payload["partial"] is True
+    assert payload["data"]["emotions"] == [{"emocion": "calma", "count": 2}]
+    assert payload["data"]["timeline"] is None
+    assert payload["data"]["tags"] is None
+    assert payload["sections"]["emotions"]["status"] == "ok"
+    assert payload["sections"]["timeline"]["status"] == "timeout"
+    assert payload["sections"]["tags"] == {
+        "status": "error", "ms": payload["sections"]["tags"]["ms"], "error": "agregación rota"
+    }
+
+def test_collect_sections_returns_the_sections_that_finish():
+    start = time.perf_counter()
+    payload = collect_sections({
+        "emotions": lambda: [{"emocion": "calma", "count": 2}],
+        "timeline": slow,
+        "tags": broken,
+        "locations": cut_by_server
+    }, TIMEOUT)
+
+    assert time.perf_counter() - start < TIMEOUT * 2
+    assert_partial(payload)
+    assert payload["sections"]["locations"]["status"] == "timeout"
+
+def test_collect_sections_fails_when_nothing_finishes():
+    payload = collect_sections({"tags": broken}, TIMEOUT)
+    assert payload["success"] is False
+    assert payload["partial"] is True
+
+def test_gather_sections_cancels_slow_coroutines():
+    cancelled = []
+
+    async def emotions():
+        return [{"emocion": "calma", "count": 2}]
+
+    async def timeline():
+        try:
+            await asyncio.sleep(TIMEOUT * 3)
+        except asyncio.CancelledError:
+            cancelled.append("timeline")
+            raise
+
+    async def tags():
+        broken()
+
+    async def run():
+        payload = await gather_sections(
+            {"emotions": emotions, "timeline": timeline, "tags": tags}, TIMEOUT
+        )
+        await asyncio.sleep(0)
+        return payload
+
+    assert_partial(asyncio.run(run()))
+    assert cancelled == ["timeline"]
+
+@pytest.fixture
+def client(db, monkeypatch):
+    from app import create_app
+    from routes import analytics
+
+    calls = []
+
+    def emotions(live=False):
+        calls.append("emotions")
+        return [{"emocion": "calma", "count": 2}]
+
+    monkeypatch.setattr(analytics.sound_model, "get_emotion_patterns", emotions)
+    monkeypatch.setattr(analytics.sound_model, "get_timeline_stats", lambda live=False: slow())
+    monkeypatch.setattr(analytics.sound_model, "get_tag_stats", lambda live=False: broken())
+    monkeypatch.setattr(analytics.sound_model, "get_location_stats", lambda live=False: [])
+
+    app = create_app('testing')
+    app.config['DASHBOARD_TIMEOUT'] = TIMEOUT
+    return app.test_client(), calls
+
+def test_partial_dashboard_is_not_cached(client):
+    client, calls = client
+
+    for _ in range(2):
+        response = client.get('/api/analytics/dashboard')
+        assert response.status_code == 200
+        assert 'no-store' in response.headers['Cache-Control']
+        payload = response.get_json()
+        assert_partial(payload)
+        assert payload["data"]["locations"] == []
+
+    # La respuesta parcial no se guardó: la segunda petición recalculó
+    assert calls == ["emotions", "emotions"]
@@ -0,0 +1,24 @@
+"""Pruebas de las opciones del cliente de MongoDB (utils/database.py)"""
+
+from config import Config
+from utils import database
+
+def test_missing_compressors_are_skipped(monkeypatch, capsys):
+    monkeypatch.setitem(database.COMPRESSOR_MODULES, "zstd", "zlib")
+    monkeypatch.setitem(database.COMPRESSOR_MODULES, "snappy", "modulo_inexistente")
+
+    assert database.available_compressors("zstd, snappy,lz4,zlib") == ["zstd", "zlib"]
+    output = capsys.readouterr().out
+    assert "snappy" in output and "lz4" in output
+
+def test_client_options_only_pass_available_compressors(monkeypatch):
+    monkeypatch.setitem(database.COMPRESSOR_MODULES, "snappy", "modulo_inexistente")
+
+    class SnappyConfig(Config):
+        MONGO_COMPRESSORS = 'snappy'
+
+    class FallbackConfig(Config):
+        MONGO_COMPRESSORS = 'snappy,zlib'
+
+    assert "compressors" not in database.client_options(SnappyConfig)
+    assert database.client_options(FallbackConfig)["compressors"] == ["zlib"]
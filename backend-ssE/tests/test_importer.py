@@ -0,0 +1,136 @@
+"""Pruebas de la importación masiva (utils/importer.py)"""
+
+import io
+import os
+import zipfile
+import contextlib
+import pytest
+from pymongo.errors import AutoReconnect
+from models.sound_model import SoundModel
+from utils.importer import BulkImporter, parse_manifest
+from utils.audio_storage import audio_key
+
+MANIFEST = """archivo,nombre,latitud,longitud,emociones
+uno.wav,Lluvia,4.6,-74.1,calma;paz
+dos.wav,Tráfico,4.7,-74.0,estrés
+tres.wav,Sin coordenadas,,,calma
+"""
+
+def open_audio(name):
+    return contextlib.nullcontext(io.BytesIO(f"audio de {name}".encode()))
+
+def run_import(sound_model, upload_folder):
+    importer = BulkImporter(sound_model, str(upload_folder), {'wav'}, batch_size=10)
+    return importer.run(parse_manifest(MANIFEST, 'manifiesto.csv'), open_audio)
+
+def test_import_reports_invalid_rows(db, tmp_path):
+    report = run_import(SoundModel(), tmp_path)
+
+    assert report["created"] == 2
+    assert report["failed"] == 1
+    assert report["errors"][0]["fila"] == 3
+    assert db.sonidos.count_documents({}) == 2
+
+def test_derived_sync_failure_keeps_inserted_sounds_and_audio(db, tmp_path, monkeypatch):
+    sound_model = SoundModel()
+
+    def broken_sync(created):
+        raise RuntimeError("fallo en los contadores")
+
+    monkeypatch.setattr(sound_model, '_sync_derived_bulk', broken_sync)
+    report = run_import(sound_model, tmp_path)
+
+    assert report["created"] == 2
+    for sound in db.sonidos.find():
+        assert (tmp_path / audio_key(sound['audio_url'])).exists()
+
+def test_interrupted_insert_checks_which_rows_arrived(db, tmp_path, monkeypatch):
+    sound_model = SoundModel()
+    collection = sound_model.collection.resolve()
+    insert_many = collection.insert_many
+
+    def interrupted_insert(documents, ordered=True):
+        insert_many(documents[:1], ordered=ordered)
+        raise AutoReconnect("conexión perdida")
+
+    monkeypatch.setattr(collection, 'insert_many', interrupted_insert)
+    report = run_import(sound_model, tmp_path)
+
+    assert report["created"] == 1
+    assert report["failed"] == 2
+    assert db.audio_blobs.count_documents({}) == 1
+    sound = db.sonidos.find_one()
+    assert (tmp_path / audio_key(sound['audio_url'])).exists()
+
+def test_unknown_insert_outcome_keeps_audio(db, tmp_path, monkeypatch):
+    sound_model = SoundModel()
+    collection = sound_model.collection.resolve()
+
+    def unreachable(*args, **kwargs):
+        raise AutoReconnect("conexión perdida")
+
+    monkeypatch.setattr(collection, 'insert_many', unreachable)
+    monkeypatch.setattr(collection, 'find', unreachable)
+    report = run_import(sound_model, tmp_path)
+
+    assert report["created"] == 0
+    assert report["failed"] == 3
+    assert db.audio_blobs.count_documents({}) == 2
+    assert all((tmp_path / blob['ruta']).exists() for blob in db.audio_blobs.find())
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    from app import create_app
+    from routes import sounds
+
+    monkeypatch.setattr(sounds, 'schedule_audio_analysis', lambda *args: None)
+    app = create_app('testing')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    app.config['UPLOAD_SESSIONS_FOLDER'] = str(tmp_path / 'sessions')
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    return app.test_client()
+
+def make_archive(audio_size):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for name in ('uno.wav', 'dos.wav'):
+            archive.writestr(name, os.urandom(audio_size))
+    return buffer.getvalue()
+
+def post_bulk(client, **form):
+    form['manifest'] = (io.BytesIO(MANIFEST.encode()), 'manifiesto.csv')
+    return client.post('/api/sounds/bulk', data=form, content_type='multipart/form-data')
+
+def test_bulk_archive_larger_than_request_limit_uses_upload_session(client, db):
+    client.application.config['MAX_CONTENT_LENGTH'] = 4096
+    archive = make_archive(3000)
+
+    session = client.post('/api/uploads', json={
+        'filename': 'grabaciones.zip', 'size': len(archive), 'chunk_size': 2048, 'archive': True
+    }).get_json()['data']
+    for index in range(session['total_chunks']):
+        chunk = archive[index * 2048:(index + 1) * 2048]
+        assert client.put(f"/api/uploads/{session['upload_id']}/chunks/{index}", data=chunk).status_code == 200
+
+    # El ZIP de una importación no se puede completar como un audio
+    assert client.post(f"/api/uploads/{session['upload_id']}/complete", json={}).status_code == 400
+
+    response = post_bulk(client, upload_id=session['upload_id'])
+
+    assert response.status_code == 201
+    assert response.get_json()['data']['created'] == 2
+    assert db.sonidos.count_documents({}) == 2
+    assert client.get(f"/api/uploads/{session['upload_id']}").status_code == 404
+
+def test_bulk_audio_limit_is_per_file(client, db):
+    client.application.config['UPLOAD_MAX_FILE_SIZE'] = 2000
+    response = post_bulk(client, archive=(io.BytesIO(make_archive(3000)), 'grabaciones.zip'))
+
+    assert response.status_code == 400
+    errors = response.get_json()['data']['errors']
+    assert {error['error'] for error in errors if error['fila'] != 3} == {"Audio demasiado grande"}
+
+def test_bulk_requires_an_archive_session(client):
+    session = client.post('/api/uploads', json={'filename': 'lluvia.wav', 'size': 10}).get_json()['data']
+
+    assert post_bulk(client, upload_id=session['upload_id']).status_code == 404
@@ -0,0 +1,64 @@
+"""Pruebas de la paginación por cursor de SoundModel.find_page"""
+
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from models.sound_model import SoundModel
+from utils.helpers import decode_cursor, encode_cursor
+
+@pytest.fixture
+def sounds(db):
+    start = datetime(2024, 1, 1)
+    docs = []
+    for i in range(7):
+        # Varios sonidos comparten fecha para recorrer también el desempate por _id
+        docs.append({"_id": ObjectId(), "nombre": f"Sonido {i}", "fecha": start + timedelta(days=i // 2)})
+    docs.append({"_id": ObjectId(), "nombre": "Sin fecha A"})
+    docs.append({"_id": ObjectId(), "nombre": "Sin fecha B", "fecha": None})
+    db.sonidos.insert_many(docs)
+    return docs
+
+def read_all(sound_model, limit):
+    names, cursor, pages = [], None, 0
+    while True:
+        page, cursor = sound_model.find_page({}, limit, cursor)
+        names.extend(sound["nombre"] for sound in page)
+        pages += 1
+        if not cursor:
+            return names, pages
+
+def test_pages_cover_every_sound_once(sounds):
+    names, pages = read_all(SoundModel(), limit=2)
+
+    # Orden (fecha, _id) descendente con los sonidos sin fecha al final
+    expected = sorted(sounds, key=lambda doc: (doc.get("fecha") is not None, doc.get("fecha") or datetime.min, doc["_id"]), reverse=True)
+    assert pages == 5
+    assert names == [doc["nombre"] for doc in expected]
+
+def test_cursor_round_trip(sounds):
+    page, cursor = SoundModel().find_page({}, 3)
+    position = decode_cursor(cursor)
+
+    assert position == {"f": page[-1]["fecha"], "i": page[-1]["_id"]}
+    assert encode_cursor(position) == cursor
+
+def test_cursor_after_sound_without_date(sounds):
+    missing = [doc for doc in sounds if not doc.get("fecha")]
+    last = max(missing, key=lambda doc: doc["_id"])
+    cursor = encode_cursor(SoundModel.page_position(last))
+
+    page, next_cursor = SoundModel().find_page({}, 10, cursor)
+
+    assert [sound["nombre"] for sound in page] == [min(missing, key=lambda doc: doc["_id"])["nombre"]]
+    assert next_cursor is None
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!",
+    encode_cursor(["f", "i"]),
+    encode_cursor({"f": "ayer", "i": str(ObjectId())}),
+    encode_cursor({"f": "2024-01-01T00:00:00", "i": "abc"}),
+    encode_cursor({"i": str(ObjectId())})
+])
+def test_invalid_cursor_is_rejected(db, cursor):
+    with pytest.raises(ValueError):
+        SoundModel().find_page({}, 10, cursor)
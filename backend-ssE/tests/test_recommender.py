@@ -0,0 +1,109 @@
+"""Pruebas del motor de recomendaciones (utils/recommender.py)"""
+
+import pytest
+from utils.helpers import calculate_distance_km
+from utils.recommender import Recommender
+
+def make_sound(sound_id, emotions=(), tags=(), sounds=(), lat=4.6, lng=-74.1):
+    return {
+        "_id": sound_id,
+        "emociones": list(emotions),
+        "etiquetas": list(tags),
+        "sonidos": list(sounds),
+        "ubicacion": {"type": "Point", "coordinates": [lng, lat]}
+    }
+
+def load(db, *sounds):
+    db.sonidos.insert_many(list(sounds))
+    recommender = Recommender()
+    recommender.load(db.sonidos)
+    return recommender
+
+def scores(recommendations):
+    return {sound_id: score for sound_id, score, _ in recommendations}
+
+def test_scores_are_weighted_cosine_similarity(db):
+    recommender = load(
+        db,
+        make_sound("semilla", ["calma"], ["lluvia"], ["agua"]),
+        make_sound("igual", ["calma"], ["lluvia"], ["agua"]),
+        make_sound("emocion", ["calma"]),
+        make_sound("tipo", sounds=["agua"]),
+        make_sound("ajeno", ["miedo"], ["trafico"])
+    )
+
+    result = recommender.recommend(["semilla"])["semilla"]
+
+    # Pesos de la semilla: calma 1, lluvia 1, agua 0.5 (norma 1.5)
+    assert [sound_id for sound_id, _, _ in result] == ["igual", "emocion", "tipo"]
+    assert scores(result) == {
+        "igual": pytest.approx(1.0, abs=1e-4),
+        "emocion": pytest.approx(1 / 1.5, abs=1e-4),
+        "tipo": pytest.approx(0.5 / 1.5, abs=1e-4)
+    }
+    assert all(distance is None for _, _, distance in result)
+
+def test_limit_and_unknown_seeds(db):
+    recommender = load(db, *[make_sound(f"s{i}", ["calma"]) for i in range(5)])
+
+    result = recommender.recommend(["s0", "desconocido", "s0"], limit=2)
+
+    assert list(result) == ["s0"]
+    assert len(result["s0"]) == 2
+    assert "s0" not in scores(result["s0"])
+
+def test_writes_apply_without_reloading(db):
+    seed = make_sound("semilla", ["calma"], ["lluvia"])
+    old = make_sound("editado", ["calma"], ["lluvia"])
+    removed = make_sound("borrado", ["calma"])
+    recommender = load(db, seed, old, removed)
+
+    new = make_sound("editado", ["miedo"])
+    recommender.apply_change(old, new)
+    recommender.apply_change(removed, None)
+    recommender.apply_change(None, make_sound("nuevo", ["calma"], ["lluvia"]))
+
+    result = scores(recommender.recommend(["semilla", "editado"])["semilla"])
+    assert result == {"nuevo": pytest.approx(1.0, abs=1e-4)}
+    assert recommender.stats()["pending"] == 2
+
+def test_compaction_keeps_scores(db):
+    recommender = load(db, make_sound("semilla", ["calma"], ["lluvia"]))
+    recommender.COMPACT_THRESHOLD = 2
+
+    for i in range(3):
+        recommender.apply_change(None, make_sound(f"nuevo{i}", ["calma"], ["viento"]))
+
+    assert recommender.stats()["pending"] == 0
+    result = scores(recommender.recommend(["semilla"])["semilla"])
+    assert result == {f"nuevo{i}": pytest.approx(0.5, abs=1e-4) for i in range(3)}
+
+def test_near_mode_blends_similarity_and_distance(db):
+    recommender = load(
+        db,
+        make_sound("semilla", ["calma"], lat=4.6),
+        make_sound("cerca", ["calma"], lat=4.65),
+        make_sound("vecino", ["miedo"], lat=4.7),
+        make_sound("lejos", ["calma"], lat=5.6)
+    )
+    recommender.apply_change(None, make_sound("nuevo_lejos", ["calma"], lat=6.0))
+
+    result = recommender.recommend(["semilla"], max_km=50, geo_weight=0.4)["semilla"]
+
+    near = calculate_distance_km(4.6, -74.1, 4.65, -74.1)
+    neighbour = calculate_distance_km(4.6, -74.1, 4.7, -74.1)
+    assert [sound_id for sound_id, _, _ in result] == ["cerca", "vecino"]
+    assert scores(result) == {
+        "cerca": pytest.approx(0.6 + 0.4 * (1 - near / 50), abs=1e-3),
+        "vecino": pytest.approx(0.4 * (1 - neighbour / 50), abs=1e-3)
+    }
+    assert result[0][2] == pytest.approx(near, abs=1e-2)
+
+def test_near_mode_without_seed_location_uses_similarity(db):
+    seed = make_sound("semilla", ["calma"])
+    del seed["ubicacion"]
+    recommender = load(db, seed, make_sound("lejos", ["calma"], lat=40.0))
+
+    result = recommender.recommend(["semilla"], max_km=10)["semilla"]
+
+    assert result == [("lejos", pytest.approx(1.0, abs=1e-4), None)]
@@ -0,0 +1,137 @@
+"""Pruebas de la negociación de versiones comprimidas (utils/renditions.py)"""
+
+import os
+import threading
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from utils.renditions import select_rendition, rendition_cache
+
+FIREFOX_ACCEPT = "audio/webm,audio/ogg,audio/wav,audio/*;q=0.9,application/ogg;q=0.7,video/*;q=0.6,*/*;q=0.5"
+
+def accept(header):
+    return parse_accept_header(header, MIMEAccept)
+
+def test_wildcard_accept_serves_original():
+    assert select_rendition(accept=accept("*/*")) is None
+    assert select_rendition(accept=accept("audio/*;q=0.9,*/*;q=0.5")) is None
+
+def test_accept_listing_ogg_is_not_explicit():
+    assert select_rendition(accept=accept(FIREFOX_ACCEPT)) == ('opus', 'medium', False)
+    assert select_rendition(accept=accept("audio/mpeg")) == ('mp3', 'medium', False)
+
+def test_query_parameters_are_explicit():
+    assert select_rendition('low') == ('opus', 'low', True)
+    assert select_rendition(None, 'mp3', accept(FIREFOX_ACCEPT)) == ('mp3', 'medium', True)
+    assert select_rendition('original', accept=accept(FIREFOX_ACCEPT)) is None
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        select_rendition('altísima')
+    with pytest.raises(ValueError):
+        select_rendition(None, 'flac')
+
+@pytest.fixture
+def audio_app(db, tmp_path, monkeypatch):
+    from app import create_app
+
+    app = create_app('testing')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    (tmp_path / 'ab').mkdir()
+    (tmp_path / 'ab' / 'sonido.wav').write_bytes(b'RIFF' + b'\0' * 100)
+
+    encodes = []
+    scheduled = []
+
+    def fake_encode(key, output_format, quality, storage, path):
+        encodes.append((key, output_format, quality))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'OggS')
+        return True
+
+    monkeypatch.setattr(rendition_cache, 'folder', str(tmp_path / '.renditions'))
+    monkeypatch.setattr(rendition_cache, 'encoder_path', lambda: '/usr/bin/ffmpeg')
+    monkeypatch.setattr(rendition_cache, '_encode', fake_encode)
+    monkeypatch.setattr(rendition_cache, 'schedule', lambda *args: scheduled.append(args))
+    return app.test_client(), encodes, scheduled
+
+def test_browser_accept_serves_original_and_schedules(audio_app):
+    client, encodes, scheduled = audio_app
+    response = client.get('/uploads/ab/sonido.wav', headers={'Accept': FIREFOX_ACCEPT})
+
+    assert response.status_code == 200
+    assert response.data.startswith(b'RIFF')
+    assert 'Accept' in response.headers['Vary']
+    assert encodes == []
+    assert scheduled[0][0] == 'ab/sonido.wav'
+    assert scheduled[0][2:] == ('opus', 'medium')
+
+def test_browser_accept_serves_generated_rendition(audio_app):
+    client, encodes, scheduled = audio_app
+    rendition_cache.get('ab/sonido.wav', 'opus', 'medium', None)
+    response = client.get('/uploads/ab/sonido.wav', headers={'Accept': FIREFOX_ACCEPT})
+
+    assert response.data == b'OggS'
+    assert len(encodes) == 1
+    assert scheduled == []
+
+def test_player_url_never_encodes_inline(audio_app):
+    client, encodes, scheduled = audio_app
+    for url in ('/uploads/ab/sonido.wav', '/uploads/ab/sonido.wav?quality=medium&format=opus'):
+        response = client.get(url, headers={'Accept': FIREFOX_ACCEPT, 'Range': 'bytes=0-'})
+
+        assert response.status_code in (200, 206)
+        assert response.data.startswith(b'RIFF')
+
+    assert encodes == []
+    assert [args[2:] for args in scheduled] == [('opus', 'medium'), ('opus', 'medium')]
+
+def test_explicit_quality_serves_cached_rendition(audio_app):
+    client, encodes, _ = audio_app
+    rendition_cache.get('ab/sonido.wav', 'mp3', 'low', None)
+    response = client.get('/uploads/ab/sonido.wav?quality=low&format=mp3')
+
+    assert response.data == b'OggS'
+    assert len(encodes) == 1
+    assert 'Accept' not in response.headers.get('Vary', '')
+
+def test_explicit_quality_transcodes_inline_when_enabled(audio_app):
+    client, encodes, scheduled = audio_app
+    client.application.config['RENDITIONS_INLINE'] = True
+    response = client.get('/uploads/ab/sonido.wav?quality=low&format=mp3')
+
+    assert response.data == b'OggS'
+    assert encodes == [('ab/sonido.wav', 'mp3', 'low')]
+    assert scheduled == []
+
+def test_invalid_quality_is_json_error(audio_app):
+    client, _, _ = audio_app
+    response = client.get('/uploads/ab/sonido.wav?quality=altísima')
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_missing_audio_is_not_scheduled(audio_app):
+    client, _, scheduled = audio_app
+    response = client.get('/uploads/ab/no-existe.wav', headers={'Accept': FIREFOX_ACCEPT})
+
+    assert response.status_code == 404
+    assert scheduled == []
+
+def test_generation_locks_are_released(tmp_path, monkeypatch):
+    from utils.renditions import RenditionCache
+
+    cache = RenditionCache(str(tmp_path), max_bytes=0)
+    monkeypatch.setattr(cache, '_encode', lambda *args: open(args[-1], 'wb').close() or True)
+
+    threads = [
+        threading.Thread(target=cache.get, args=(f'sonido{i}.wav', 'opus', 'low', None))
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache._locks == {}
@@ -0,0 +1,30 @@
+"""Pruebas de la búsqueda avanzada (GET /api/analytics/search)"""
+
+import pytest
+from models.sound_model import SoundModel
+
+@pytest.fixture
+def client(db):
+    from app import create_app
+
+    sound_model = SoundModel()
+    for name, author in [("Lluvia", "Ana García"), ("Tráfico", "Luis Mora"), ("Río", "Garcés")]:
+        sound_model.create_sound({
+            "nombre": name, "latitud": 4.6, "longitud": -74.1,
+            "emociones": ["calma"], "autor": author
+        })
+    return create_app('testing').test_client()
+
+def search(client, **params):
+    response = client.get('/api/analytics/search', query_string={"mode": "prefix", **params})
+    assert response.status_code == 200
+    return sorted(sound["nombre"] for sound in response.get_json()["data"])
+
+def test_author_matches_anywhere_ignoring_case_and_accents(client):
+    assert search(client, author="garcia") == ["Lluvia"]
+    assert search(client, author="GARC") == ["Lluvia", "Río"]
+    assert search(client, author="mora") == ["Tráfico"]
+
+def test_author_is_not_a_regular_expression(client):
+    assert search(client, author=".*") == []
+    assert search(client, author="(") == []
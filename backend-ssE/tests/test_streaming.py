@@ -0,0 +1,110 @@
+"""Pruebas del servicio de audio con rangos y peticiones condicionales (utils/streaming.py)"""
+
+import os
+import pytest
+from flask import Flask
+from werkzeug.http import http_date
+from utils.streaming import send_audio_file, IMMUTABLE_CACHE_CONTROL, DEFAULT_CACHE_CONTROL
+
+CONTENT = bytes(range(256)) * 4
+HASHED = 'ab/cd/' + 'abcd' * 16 + '.wav'
+
+@pytest.fixture
+def client(tmp_path):
+    for name in (HASHED, 'notas.wav', '.sessions/parcial.wav'):
+        path = tmp_path / name
+        os.makedirs(path.parent, exist_ok=True)
+        path.write_bytes(CONTENT)
+
+    app = Flask(__name__)
+
+    @app.route('/audio/<path:filename>')
+    def audio(filename):
+        return send_audio_file(str(tmp_path), filename)
+
+    return app.test_client()
+
+def test_full_file_and_cache_control(client):
+    response = client.get(f'/audio/{HASHED}')
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+
+    response = client.get('/audio/notas.wav')
+    assert response.headers['Cache-Control'] == DEFAULT_CACHE_CONTROL
+
+def test_hidden_and_missing_files_are_not_served(client):
+    assert client.get('/audio/.sessions/parcial.wav').status_code == 404
+    assert client.get('/audio/no-existe.wav').status_code == 404
+
+@pytest.mark.parametrize("header, start, end", [
+    ('bytes=10-19', 10, 19),
+    ('bytes=1000-', 1000, 1023),
+    ('bytes=-24', 1000, 1023),
+    ('bytes=1020-5000', 1020, 1023)
+])
+def test_single_range(client, header, start, end):
+    response = client.get(f'/audio/{HASHED}', headers={'Range': header})
+    assert response.status_code == 206
+    assert response.data == CONTENT[start:end + 1]
+    assert response.headers['Content-Range'] == f'bytes {start}-{end}/{len(CONTENT)}'
+    assert response.headers['Content-Length'] == str(end - start + 1)
+
+def test_unsatisfiable_range(client):
+    response = client.get(f'/audio/{HASHED}', headers={'Range': 'bytes=2000-2100'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+def test_multiple_ranges_are_multipart(client):
+    response = client.get(f'/audio/{HASHED}', headers={'Range': 'bytes=0-9,10-14,100-109'})
+    assert response.status_code == 206
+    assert response.mimetype == 'multipart/byteranges'
+    boundary = response.mimetype_params['boundary']
+    body = response.data
+    assert response.headers['Content-Length'] == str(len(body))
+
+    # Los rangos contiguos se fusionan: dos partes
+    parts = body.split(f'--{boundary}'.encode())[1:-1]
+    assert len(parts) == 2
+    for part, (start, end) in zip(parts, [(0, 14), (100, 109)]):
+        head, data = part.split(b'\r\n\r\n', 1)
+        assert f'Content-Range: bytes {start}-{end}/{len(CONTENT)}'.encode() in head
+        assert data == CONTENT[start:end + 1] + b'\r\n'
+    assert body.endswith(f'--{boundary}--\r\n'.encode())
+
+def test_malformed_ranges_send_the_whole_file(client):
+    # Werkzeug descarta las cabeceras con rangos desordenados o solapados
+    response = client.get(f'/audio/{HASHED}', headers={'Range': 'bytes=5-14,0-9'})
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+def test_conditional_requests_return_304(client):
+    first = client.get(f'/audio/{HASHED}')
+    etag = first.headers['ETag']
+
+    response = client.get(f'/audio/{HASHED}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    response = client.get(f'/audio/{HASHED}', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert response.status_code == 304
+
+    response = client.get(f'/audio/{HASHED}', headers={'If-None-Match': '"otro"'})
+    assert response.status_code == 200
+
+def test_if_range(client):
+    first = client.get(f'/audio/{HASHED}')
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+
+    for validator in (etag, last_modified):
+        response = client.get(f'/audio/{HASHED}', headers={'Range': 'bytes=0-9', 'If-Range': validator})
+        assert response.status_code == 206
+        assert response.data == CONTENT[:10]
+
+    # Si el archivo cambió se envía entero
+    for validator in ('"otro"', http_date(0)):
+        response = client.get(f'/audio/{HASHED}', headers={'Range': 'bytes=0-9', 'If-Range': validator})
+        assert response.status_code == 200
+        assert response.data == CONTENT
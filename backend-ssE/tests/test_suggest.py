@@ -0,0 +1,107 @@
+"""Pruebas del índice de sugerencias (utils/suggest_index.py y GET /api/search/suggest)"""
+
+import pytest
+from utils.suggest_index import PrefixIndex, suggest_index
+
+def make_sound(sound_id, name, tags=(), author=None, emotions=()):
+    return {
+        "_id": sound_id,
+        "nombre": name,
+        "etiquetas": list(tags),
+        "autor": author,
+        "emociones": list(emotions)
+    }
+
+CATALOG = [
+    make_sound(1, "Lluvia en el río", ["lluvia", "Río"], "Ana", ["calma"]),
+    make_sound(2, "Lluvia de noche", ["lluvia"], "Ana", ["calma"]),
+    make_sound(3, "Tormenta", ["lluvia", "llanto"], "Luis", ["miedo"])
+]
+
+@pytest.fixture
+def index(db):
+    db.sonidos.insert_many(CATALOG)
+    index = PrefixIndex()
+    index.load(db.sonidos)
+    return index
+
+def texts(suggestions):
+    return [(suggestion["texto"], suggestion["tipo"], suggestion["count"]) for suggestion in suggestions]
+
+def test_prefix_ignores_case_and_accents(index):
+    assert texts(index.suggest("rio", kinds={"etiqueta"})) == [("Río", "etiqueta", 1)]
+    assert texts(index.suggest("RÍ", kinds={"etiqueta"})) == [("Río", "etiqueta", 1)]
+    assert index.suggest("   ") == []
+
+def test_most_popular_terms_first(index):
+    assert texts(index.suggest("ll", kinds={"etiqueta"})) == [
+        ("lluvia", "etiqueta", 3), ("llanto", "etiqueta", 1)
+    ]
+    # Los nombres también se encuentran por cada palabra
+    assert {s["texto"] for s in index.suggest("rio", kinds={"nombre"})} == {"Lluvia en el río"}
+
+def test_incremental_update_invalidates_cached_prefixes(index):
+    assert texts(index.suggest("llan")) == [("llanto", "etiqueta", 1)]
+
+    index.apply_change(None, make_sound(4, "Grito", ["llanto"]))
+    assert texts(index.suggest("llan")) == [("llanto", "etiqueta", 2)]
+
+    index.apply_change(CATALOG[2], None)
+    index.apply_change(make_sound(4, "Grito", ["llanto"]), None)
+    assert index.suggest("llan") == []
+
+class WriteDuringScan:
+    """Colección que simula una escritura de este proceso mientras load() recorre el catálogo"""
+
+    def __init__(self, collection, write):
+        self.collection = collection
+        self.write = write
+
+    def find(self, query, projection):
+        if query:
+            return self.collection.find(query, projection)
+        snapshot = list(self.collection.find(query, projection))
+        self.write()
+        return iter(snapshot)
+
+def test_reload_keeps_writes_made_while_scanning(index, db):
+    def create():
+        sound = make_sound(5, "Llovizna", ["llovizna"])
+        db.sonidos.insert_one(sound)
+        index.apply_change(None, sound)
+
+    index.load(WriteDuringScan(db.sonidos, create))
+
+    assert texts(index.suggest("llov", kinds={"etiqueta"})) == [("llovizna", "etiqueta", 1)]
+
+def test_reload_does_not_count_scanned_writes_twice(index, db):
+    sound = make_sound(5, "Llovizna", ["llovizna"])
+    db.sonidos.insert_one(sound)
+
+    index.load(WriteDuringScan(db.sonidos, lambda: index.apply_change(None, sound)))
+
+    assert texts(index.suggest("llov", kinds={"etiqueta"})) == [("llovizna", "etiqueta", 1)]
+
+@pytest.fixture
+def client(db):
+    from app import create_app
+
+    db.sonidos.insert_many(CATALOG)
+    app = create_app('testing')
+    suggest_index.load(db.sonidos)
+    return app.test_client()
+
+def test_suggest_endpoint_types_and_limit(client):
+    response = client.get('/api/search/suggest', query_string={"prefix": "l", "limit": 2})
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert len(data) == 2
+    assert data[0] == {"texto": "lluvia", "tipo": "etiqueta", "count": 3}
+
+    response = client.get('/api/search/suggest', query_string={"prefix": "l", "types": "autor"})
+    assert [s["texto"] for s in response.get_json()["data"]] == ["Luis"]
+
+def test_suggest_endpoint_rejects_unknown_types(client):
+    response = client.get('/api/search/suggest', query_string={"prefix": "l", "types": "color"})
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
@@ -0,0 +1,197 @@
+"""Pruebas de las sesiones de subida (utils/upload_sessions.py y routes/uploads.py)"""
+
+import io
+import os
+import time
+import hashlib
+import pytest
+from utils import audio_storage
+from utils.upload_sessions import UploadSessionStore
+from utils.storage import S3StorageBackend
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='sonidos')
+        storage = S3StorageBackend('sonidos', client=client)
+        monkeypatch.setattr(audio_storage, 'get_storage', lambda upload_folder: storage)
+        yield storage
+
+def put_direct(storage, content):
+    """Lo que hace el cliente con la URL prefirmada"""
+    sha256 = hashlib.sha256(content).hexdigest()
+    key = audio_storage.blob_path(sha256, 'directo.wav')
+    storage.client.put_object(Bucket=storage.bucket, Key=key, Body=content)
+    return sha256, key
+
+def test_discard_direct_upload_deletes_unregistered_object(db, s3_storage):
+    sha256, key = put_direct(s3_storage, b'RIFF directo')
+
+    assert audio_storage.discard_direct_upload(sha256, key, 'uploads')
+    assert not s3_storage.exists(key)
+    assert db.audio_blobs.count_documents({}) == 0
+
+def test_discard_direct_upload_keeps_registered_object(db, s3_storage):
+    sha256, key = put_direct(s3_storage, b'RIFF directo')
+    audio_storage.register_uploaded_audio(sha256, key, 'uploads')
+
+    assert not audio_storage.discard_direct_upload(sha256, key, 'uploads')
+    assert s3_storage.exists(key)
+    assert db.audio_blobs.find_one()['refs'] == 1
+
+def direct_session(store, expires_at):
+    return store.create('directo.wav', 12, 12, direct={
+        'key': 'ab/cd/abcd.wav', 'sha256': 'ab' * 32, 'expires_at': expires_at
+    })
+
+def age(store, session, seconds):
+    """Envejecer los archivos de una sesión"""
+    past = time.time() - seconds
+    directory = os.path.join(store.root, session['upload_id'])
+    for name in ('chunks', 'session.json'):
+        os.utime(os.path.join(directory, name), (past, past))
+
+def test_direct_session_lives_until_url_expires(tmp_path):
+    discarded = []
+    store = UploadSessionStore(str(tmp_path), session_ttl=60, on_discard=discarded.append)
+    session = direct_session(store, expires_at=time.time() + 3600)
+    age(store, session, 600)
+
+    assert store.cleanup_expired() == 0
+    assert store.get(session['upload_id']) is not None
+
+def test_direct_session_touch_keeps_it_alive(tmp_path):
+    store = UploadSessionStore(str(tmp_path), session_ttl=60)
+    session = direct_session(store, expires_at=time.time() - 600)
+    age(store, session, 600)
+    store.touch(session)
+
+    assert store.cleanup_expired() == 0
+
+def test_expired_direct_session_is_discarded(tmp_path):
+    discarded = []
+    store = UploadSessionStore(str(tmp_path), session_ttl=60, on_discard=discarded.append)
+    session = direct_session(store, expires_at=time.time() - 600)
+    age(store, session, 600)
+
+    assert store.cleanup_expired() == 1
+    assert [item['upload_id'] for item in discarded] == [session['upload_id']]
+
+AUDIO = b'RIFF' + bytes(range(256)) * 40
+
+def chunks(content, size):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+def test_chunks_out_of_order_and_resume(tmp_path):
+    store = UploadSessionStore(str(tmp_path))
+    session = store.create('lluvia.wav', len(AUDIO), 1000)
+    parts = chunks(AUDIO, 1000)
+    assert session['total_chunks'] == len(parts)
+
+    for index in (3, 0, 5):
+        store.write_chunk(session, index, io.BytesIO(parts[index]))
+
+    # Un cliente que reanuda pregunta qué falta
+    status = store.status(store.get(session['upload_id']))
+    assert status['received'] == [0, 3, 5]
+    assert status['missing'] == [1, 2, 4, 6, 7, 8, 9, 10]
+    assert not status['complete']
+    with pytest.raises(ValueError):
+        store.assemble(session)
+
+    for index in status['missing']:
+        store.write_chunk(session, index, io.BytesIO(parts[index]))
+
+    path, checksum = store.assemble(session)
+    with open(path, 'rb') as f:
+        assert f.read() == AUDIO
+
+    tree = hashlib.sha256(b''.join(hashlib.sha256(part).digest() for part in parts)).hexdigest()
+    assert checksum == tree
+
+def test_chunk_validation(tmp_path):
+    store = UploadSessionStore(str(tmp_path))
+    session = store.create('lluvia.wav', 2500, 1000)
+
+    with pytest.raises(ValueError):
+        store.write_chunk(session, 3, io.BytesIO(b'x' * 1000))
+    with pytest.raises(ValueError):
+        store.write_chunk(session, 0, io.BytesIO(b'x' * 999))
+    with pytest.raises(ValueError):
+        store.write_chunk(session, 2, io.BytesIO(b'x' * 501))
+    with pytest.raises(ValueError):
+        store.write_chunk(session, 0, io.BytesIO(b'x' * 1000), expected_sha256='00' * 32)
+
+    store.write_chunk(session, 2, io.BytesIO(b'x' * 500), hashlib.sha256(b'x' * 500).hexdigest())
+    assert store.status(session)['received'] == [2]
+
+def test_expired_chunked_session_is_removed(tmp_path):
+    store = UploadSessionStore(str(tmp_path), session_ttl=60)
+    session = store.create('lluvia.wav', 10, 10)
+    age(store, session, 600)
+
+    assert store.cleanup_expired() == 1
+    assert store.get(session['upload_id']) is None
+
+@pytest.fixture
+def client(db, tmp_path):
+    from app import create_app
+
+    app = create_app('testing')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    app.config['UPLOAD_SESSIONS_FOLDER'] = str(tmp_path / 'sessions')
+    app.config['ANALYSIS_FOLDER'] = str(tmp_path / 'analysis')
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    return app.test_client()
+
+METADATA = {'nombre': 'Lluvia', 'latitud': 4.6, 'longitud': -74.1, 'emociones': ['calma']}
+
+def test_chunked_upload_through_api(client, db, monkeypatch):
+    from routes import uploads
+    monkeypatch.setattr(uploads, 'schedule_audio_analysis', lambda *args: None)
+
+    response = client.post('/api/uploads', json={
+        'filename': 'lluvia.wav', 'size': len(AUDIO), 'chunk_size': 4096
+    })
+    assert response.status_code == 201
+    upload_id = response.get_json()['data']['upload_id']
+
+    parts = chunks(AUDIO, 4096)
+    assert client.put(f'/api/uploads/{upload_id}/chunks/0', data=parts[0]).status_code == 200
+
+    # Completar antes de tiempo no crea nada y la sesión sigue
+    assert client.post(f'/api/uploads/{upload_id}/complete', json=METADATA).status_code == 400
+    assert client.get(f'/api/uploads/{upload_id}').get_json()['data']['missing'] == [1, 2]
+
+    for index in (1, 2):
+        client.put(f'/api/uploads/{upload_id}/chunks/{index}', data=parts[index])
+
+    response = client.post(f'/api/uploads/{upload_id}/complete', json=METADATA)
+    assert response.status_code == 201
+    data = response.get_json()['data']
+    assert data['sha256'] == hashlib.sha256(AUDIO).hexdigest()
+    assert db.sonidos.find_one()['audio_url'] == data['audio_url']
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+def test_known_content_needs_no_chunks(client, db, monkeypatch):
+    from routes import uploads
+    monkeypatch.setattr(uploads, 'schedule_audio_analysis', lambda *args: None)
+
+    sha256 = hashlib.sha256(AUDIO).hexdigest()
+    first = client.post('/api/uploads', json={'filename': 'a.wav', 'size': len(AUDIO)}).get_json()['data']
+    client.put(f"/api/uploads/{first['upload_id']}/chunks/0", data=AUDIO)
+    client.post(f"/api/uploads/{first['upload_id']}/complete", json=METADATA)
+
+    second = client.post('/api/uploads', json={
+        'filename': 'b.wav', 'size': len(AUDIO), 'sha256': sha256
+    }).get_json()['data']
+    assert second['stored']['duplicate']
+    assert client.get(f"/api/uploads/{second['upload_id']}").get_json()['data']['complete']
+
+    # Cancelar la sesión libera la referencia que tomó
+    assert client.delete(f"/api/uploads/{second['upload_id']}").status_code == 200
+    assert db.audio_blobs.find_one()['refs'] == 1
@@ -0,0 +1,204 @@
+"""
+Script para entrenar el modelo de sugerencias de SoundScape Explorer
+
+Entrena, con los sonidos ya etiquetados que tienen descriptores de audio
+(extract_features.py), un modelo que sugiere emociones y tipos de sonido.
+Antes de guardar el modelo lo evalúa con una parte de los sonidos
+apartada (--holdout) y luego lo entrena con todos.
+
+Con --rescore recalcula las sugerencias de toda la colección en varios
+procesos.
+
+Uso:
+    python train_classifier.py [--holdout 0.2] [--min-examples 5] [--rescore] [--workers 4]
+"""
+
+import os
+import time
+import argparse
+import multiprocessing
+from functools import partial
+import numpy as np
+from config import Config
+from utils.database import db_instance
+from models.sound_model import SoundModel
+from utils.audio_classifier import AudioClassifier, CLASSIFIED_FIELDS, MIN_EXAMPLES
+from utils.audio_features import FEATURE_DIM
+from utils.audio_processing import load_features
+from utils.audio_storage import audio_key
+
+# Sonidos por tarea al recalcular sugerencias
+RESCORE_CHUNK_SIZE = 2000
+
+def load_corpus(sound_model):
+    """
+    Descriptores y etiquetas de los sonidos etiquetados
+
+    Returns:
+        tuple: (array sonidos × descriptores, {campo: [etiquetas por sonido]})
+    """
+    features = []
+    labels = {field: [] for field in CLASSIFIED_FIELDS}
+    projection = {"audio_url": 1, **{field: 1 for field in CLASSIFIED_FIELDS}}
+
+    for sound in sound_model.collection.find({"audio_url": {"$nin": [None, ""]}}, projection):
+        values = {field: [v for v in (sound.get(field) or []) if isinstance(v, str) and v]
+                  for field in CLASSIFIED_FIELDS}
+        if not any(values.values()):
+            continue
+        key = audio_key(sound['audio_url'])
+        vector = load_features(Config.ANALYSIS_FOLDER, key, Config.UPLOAD_FOLDER) if key else None
+        if vector is None:
+            continue
+        features.append(vector)
+        for field in CLASSIFIED_FIELDS:
+            labels[field].append(values[field])
+
+    return np.array(features, dtype=np.float32).reshape(-1, FEATURE_DIM), labels
+
+def evaluate(model, features, labels):
+    """
+    Precisión de la primera sugerencia y cobertura de las tres primeras
+
+    Returns:
+        dict: {campo: (precisión@1, cobertura@3, etiquetas del modelo)}
+    """
+    predictions = AudioClassifier.predict_model(model, features)
+    results = {}
+    for field, (vocabulary, probabilities) in predictions.items():
+        if not len(vocabulary):
+            results[field] = (0.0, 0.0, 0)
+            continue
+        ranked = np.argsort(-probabilities, axis=1)
+        hits_at_1 = hits_at_3 = total = 0
+        for row, expected in enumerate(labels[field]):
+            expected = set(expected) & set(vocabulary)
+            if not expected:
+                continue
+            top = [vocabulary[column] for column in ranked[row, :3]]
+            hits_at_1 += top[0] in expected
+            hits_at_3 += len(expected & set(top)) / len(expected)
+            total += 1
+        results[field] = (
+            hits_at_1 / total if total else 0.0,
+            hits_at_3 / total if total else 0.0,
+            len(vocabulary)
+        )
+    return results
+
+def score_chunk(chunk, model_path, analysis_folder, upload_folder, min_probability, max_suggestions):
+    """Sugerencias de un bloque de (sound_id, clave del audio) en un proceso aparte"""
+    classifier = AudioClassifier(
+        model_path, min_probability=min_probability, max_suggestions=max_suggestions
+    )
+    sound_ids = []
+    features = []
+    for sound_id, key in chunk:
+        vector = load_features(analysis_folder, key, upload_folder)
+        if vector is not None:
+            sound_ids.append(sound_id)
+            features.append(vector)
+
+    if not features:
+        return []
+    return list(zip(sound_ids, classifier.suggest_many(np.array(features))))
+
+def rescore(sound_model, workers):
+    """Recalcular las sugerencias de todos los sonidos con descriptores"""
+    items = [
+        (str(sound['_id']), audio_key(sound['audio_url']))
+        for sound in sound_model.collection.find({"audio_url": {"$nin": [None, ""]}}, {"audio_url": 1})
+    ]
+    items = [(sound_id, key) for sound_id, key in items if key]
+    chunks = [items[i:i + RESCORE_CHUNK_SIZE] for i in range(0, len(items), RESCORE_CHUNK_SIZE)]
+
+    task = partial(
+        score_chunk,
+        model_path=Config.CLASSIFIER_MODEL_PATH,
+        analysis_folder=Config.ANALYSIS_FOLDER,
+        upload_folder=Config.UPLOAD_FOLDER,
+        min_probability=Config.CLASSIFIER_MIN_PROBABILITY,
+        max_suggestions=Config.CLASSIFIER_MAX_SUGGESTIONS
+    )
+
+    # spawn: los procesos hijos no heredan la conexión a MongoDB
+    updated = 0
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        for scored in pool.imap_unordered(task, chunks):
+            updated += sound_model.set_suggestions(scored)
+    return updated
+
+def train_classifier(holdout=0.2, min_examples=MIN_EXAMPLES, rescore_all=False,
+                     workers=os.cpu_count() or 2):
+    """Entrenar, evaluar y guardar el modelo de sugerencias"""
+    try:
+        print("🧠 Modelo de sugerencias de SoundScape Explorer")
+        print("=" * 55)
+
+        sound_model = SoundModel()
+        start = time.perf_counter()
+
+        features, labels = load_corpus(sound_model)
+        print(f"📋 Sonidos etiquetados con descriptores: {len(features)}")
+        if len(features) < 2 * min_examples:
+            print("❌ No hay suficientes sonidos etiquetados (ejecute extract_features.py)")
+            return False
+
+        # Evaluación con una parte apartada
+        if holdout > 0:
+            order = np.random.default_rng(0).permutation(len(features))
+            split = int(len(features) * (1 - holdout))
+            train, test = order[:split], order[split:]
+            model = AudioClassifier.train(
+                features[train],
+                {field: [values[i] for i in train] for field, values in labels.items()},
+                min_examples=min_examples
+            )
+            results = evaluate(
+                model, features[test],
+                {field: [values[i] for i in test] for field, values in labels.items()}
+            )
+            print(f"\n📊 EVALUACIÓN ({len(test)} sonidos apartados):")
+            for field, (precision, coverage, count) in results.items():
+                print(f"   {field}: {count} etiquetas, precisión@1 {precision:.2f}, cobertura@3 {coverage:.2f}")
+
+        # Modelo final con todos los sonidos
+        model = AudioClassifier.train(features, labels, min_examples=min_examples)
+        AudioClassifier.save(model, Config.CLASSIFIER_MODEL_PATH)
+        print(f"\n✅ Modelo guardado: {Config.CLASSIFIER_MODEL_PATH}")
+
+        if rescore_all:
+            updated = rescore(sound_model, workers)
+            print(f"✅ Sonidos con sugerencias actualizadas: {updated}")
+
+        elapsed = time.perf_counter() - start
+        print(f"\n🎉 Entrenamiento completado en {elapsed:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error entrenando el modelo: {e}")
+        return False
+
+    finally:
+        db_instance.close_connection()
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Entrenar el modelo de sugerencias de audio")
+    parser.add_argument('--holdout', type=float, default=0.2,
+                        help='Fracción de sonidos apartada para evaluar (0 para no evaluar)')
+    parser.add_argument('--min-examples', type=int, default=MIN_EXAMPLES,
+                        help='Ejemplos mínimos de una etiqueta para aprenderla')
+    parser.add_argument('--rescore', action='store_true',
+                        help='Recalcular las sugerencias de toda la colección')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='Procesos para recalcular sugerencias')
+    args = parser.parse_args()
+
+    train_classifier(args.holdout, args.min_examples, args.rescore, args.workers)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n❌ Operación cancelada por el usuario")
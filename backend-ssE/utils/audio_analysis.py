@@ -0,0 +1,249 @@
+"""
+Análisis de archivos de audio con NumPy
+
+Decodifica WAV (PCM de 8, 16, 24 o 32 bits) con el módulo wave por
+bloques, así que la memoria no depende de la duración, y en una sola
+pasada calcula:
+
+- duración exacta, frecuencia de muestreo y canales
+- picos de la forma de onda en varias resoluciones (mipmap de pares
+  mínimo/máximo en int16, cada nivel con la mitad de puntos que el anterior)
+- nivel RMS y pico en dBFS
+- sonoridad integrada en LUFS (ITU-R BS.1770: filtro K y doble puerta)
+"""
+
+import wave
+import numpy as np
+from scipy.signal import lfilter
+
+# Frames por par mín/máx en el nivel más detallado de picos
+SAMPLES_PER_PEAK = 256
+
+# Frames leídos por bloque (múltiplo de SAMPLES_PER_PEAK)
+BLOCK_FRAMES = SAMPLES_PER_PEAK * 1024
+
+# Bloques de sonoridad de 400 ms con saltos de 100 ms (75% de solape)
+LOUDNESS_HOP_SECONDS = 0.1
+LOUDNESS_HOPS_PER_BLOCK = 4
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+class AudioAnalysisError(ValueError):
+    """El archivo no se puede analizar (formato no soportado o dañado)"""
+
+def k_weighting_filters(sample_rate):
+    """
+    Coeficientes del filtro K de BS.1770 para cualquier frecuencia de muestreo
+
+    Returns:
+        list: [(b, a) del shelving de agudos, (b, a) del paso alto]
+    """
+    # Shelving de agudos (+4 dB por encima de ~1.7 kHz)
+    f0, gain, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / sample_rate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        np.array([vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k]) / a0,
+        np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0])
+    )
+
+    # Paso alto (~38 Hz)
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = (
+        np.array([1.0, -2.0, 1.0]),
+        np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0])
+    )
+
+    return [shelf, highpass]
+
+def channel_weights(channels):
+    """Peso de cada canal en la sonoridad (los envolventes 4 y 5 pesan 1.41)"""
+    return np.array([1.41 if channel in (3, 4) and channels > 4 else 1.0
+                     for channel in range(channels)])
+
+def _decode_frames(raw, sample_width, channels):
+    """Bytes PCM a un array float32 (frames × canales) en [-1, 1]"""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    elif sample_width == 3:
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = data[:, 0] | (data[:, 1] << 8) | (data[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        samples = values.astype(np.float32) / (1 << 23)
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / (1 << 31)
+    else:
+        raise AudioAnalysisError(f"Profundidad de {sample_width * 8} bits no soportada")
+
+    return samples.reshape(-1, channels)
+
+def open_wav(path):
+    """
+    Abrir un WAV PCM para leerlo por bloques
+
+    Raises:
+        AudioAnalysisError: Si no es un WAV válido
+    """
+    try:
+        reader = wave.open(path, 'rb')
+    except (wave.Error, EOFError) as e:
+        raise AudioAnalysisError(f"WAV no válido: {e}") from e
+
+    if not reader.getnchannels() or not reader.getframerate():
+        reader.close()
+        raise AudioAnalysisError("WAV sin canales o sin frecuencia de muestreo")
+    return reader
+
+def iter_wav_blocks(reader, block_frames=BLOCK_FRAMES):
+    """
+    Bloques float32 (frames × canales) de un WAV abierto con open_wav
+
+    Un archivo cortado a mitad de un frame (una grabación interrumpida)
+    termina en el último frame completo.
+    """
+    sample_width = reader.getsampwidth()
+    channels = reader.getnchannels()
+    frame_size = sample_width * channels
+    while True:
+        raw = reader.readframes(block_frames)
+        raw = raw[:len(raw) - len(raw) % frame_size]
+        if not raw:
+            return
+        samples = _decode_frames(raw, sample_width, channels)
+        if not len(samples):
+            return
+        yield samples
+
+def _integrated_loudness(hop_energy, hop_frames, channels):
+    """
+    Sonoridad integrada a partir de la energía filtrada de cada salto de 100 ms
+
+    Returns:
+        float | None: LUFS, o None si el audio dura menos de un bloque
+    """
+    if len(hop_energy) < LOUDNESS_HOPS_PER_BLOCK:
+        return None
+
+    cumulative = np.vstack([np.zeros(channels), np.cumsum(hop_energy, axis=0)])
+    blocks = (
+        cumulative[LOUDNESS_HOPS_PER_BLOCK:] - cumulative[:-LOUDNESS_HOPS_PER_BLOCK]
+    ) / (LOUDNESS_HOPS_PER_BLOCK * hop_frames)
+    weighted = blocks @ channel_weights(channels)
+
+    with np.errstate(divide='ignore'):
+        block_loudness = -0.691 + 10 * np.log10(weighted)
+
+    gated = weighted[block_loudness > ABSOLUTE_GATE_LUFS]
+    if not len(gated):
+        return None
+
+    relative_gate = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE_LU
+    gated = weighted[(block_loudness > ABSOLUTE_GATE_LUFS) & (block_loudness > relative_gate)]
+    if not len(gated):
+        return None
+
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def build_peak_levels(level0):
+    """
+    Mipmap de picos: cada nivel une pares consecutivos del anterior
+
+    Args:
+        level0: Array int16 (n × 2) con mínimo y máximo por bloque
+
+    Returns:
+        list: Arrays int16 (n_i × 2), del más detallado al más grueso
+    """
+    levels = [level0]
+    while len(levels[-1]) > 1:
+        previous = levels[-1]
+        if len(previous) % 2:
+            previous = np.vstack([previous, previous[-1:]])
+        pairs = previous.reshape(-1, 2, 2)
+        levels.append(np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1))
+    return levels
+
+def analyze_wav(path):
+    """
+    Analizar un archivo WAV en una sola pasada por bloques
+
+    Returns:
+        dict: {duracion, sample_rate, canales, frames, rms_dbfs, pico_dbfs,
+            lufs, peaks (lista de arrays int16 n × 2 por nivel)}
+
+    Raises:
+        AudioAnalysisError: Si el archivo no es un WAV PCM válido
+    """
+    with open_wav(path) as reader:
+        channels = reader.getnchannels()
+        sample_rate = reader.getframerate()
+
+        filters = k_weighting_filters(sample_rate)
+        states = [np.zeros((max(len(a), len(b)) - 1, channels)) for b, a in filters]
+        hop_frames = max(1, int(round(sample_rate * LOUDNESS_HOP_SECONDS)))
+
+        peaks = []
+        hop_energy = []
+        carry_peak = np.zeros((0, channels), dtype=np.float32)
+        carry_energy = np.zeros((0, channels))
+        sum_squares = 0.0
+        peak = 0.0
+        frames = 0
+
+        for samples in iter_wav_blocks(reader):
+            frames += len(samples)
+
+            sum_squares += float(np.square(samples, dtype=np.float64).sum())
+            peak = max(peak, float(np.abs(samples).max()))
+
+            # Picos: mínimo y máximo de todos los canales por bloque de frames
+            block = np.vstack([carry_peak, samples])
+            usable = len(block) - len(block) % SAMPLES_PER_PEAK
+            if usable:
+                grouped = block[:usable].reshape(-1, SAMPLES_PER_PEAK * channels)
+                peaks.append(np.stack([grouped.min(axis=1), grouped.max(axis=1)], axis=1))
+            carry_peak = block[usable:]
+
+            # Sonoridad: filtro K continuo entre bloques y energía por salto
+            filtered = samples.astype(np.float64)
+            for index, (b, a) in enumerate(filters):
+                filtered, states[index] = lfilter(b, a, filtered, axis=0, zi=states[index])
+            energy = np.vstack([carry_energy, np.square(filtered)])
+            usable = len(energy) - len(energy) % hop_frames
+            if usable:
+                hop_energy.append(energy[:usable].reshape(-1, hop_frames, channels).sum(axis=1))
+            carry_energy = energy[usable:]
+
+        if len(carry_peak):
+            flat = carry_peak.reshape(-1)
+            peaks.append(np.array([[flat.min(), flat.max()]], dtype=np.float32))
+
+    if not frames:
+        raise AudioAnalysisError("WAV sin audio")
+
+    level0 = np.vstack(peaks) if peaks else np.zeros((1, 2), dtype=np.float32)
+    level0 = np.clip(np.round(level0 * 32767), -32768, 32767).astype('<i2')
+    hop_energy = np.vstack(hop_energy) if hop_energy else np.zeros((0, channels))
+
+    rms = np.sqrt(sum_squares / (frames * channels))
+    with np.errstate(divide='ignore'):
+        rms_dbfs = float(20 * np.log10(rms)) if rms > 0 else None
+        peak_dbfs = float(20 * np.log10(peak)) if peak > 0 else None
+    lufs = _integrated_loudness(hop_energy, hop_frames, channels)
+
+    return {
+        "duracion": frames / sample_rate,
+        "sample_rate": sample_rate,
+        "canales": channels,
+        "frames": frames,
+        "rms_dbfs": None if rms_dbfs is None else round(rms_dbfs, 2),
+        "pico_dbfs": None if peak_dbfs is None else round(peak_dbfs, 2),
+        "lufs": None if lufs is None else round(lufs, 2),
+        "peaks": build_peak_levels(level0)
+    }
@@ -0,0 +1,214 @@
+"""
+Sugerencias de emociones y tipos de sonido a partir del audio
+
+Un modelo lineal por campo (emociones, sonidos) sobre los descriptores
+acústicos de utils.audio_features: regresión logística uno-contra-resto,
+entrenada con descenso de gradiente en NumPy sobre el corpus ya
+etiquetado (train_classifier.py). Cada etiqueta tiene su probabilidad
+independiente, porque un sonido puede tener varias emociones.
+
+Las sugerencias se guardan aparte (campo sugerencias) y no modifican
+emociones ni sonidos: las analíticas siguen reflejando lo que escribieron
+los usuarios.
+
+El modelo es un .npz pequeño que se carga con la primera sugerencia, no
+al arrancar la app, y se vuelve a cargar si train_classifier.py lo
+regenera.
+"""
+
+import os
+import threading
+from datetime import datetime
+import numpy as np
+from config import Config
+from utils.audio_features import FEATURE_DIM, FEATURE_VERSION
+
+# Campos del sonido que el modelo aprende a sugerir
+CLASSIFIED_FIELDS = ("emociones", "sonidos")
+
+# Ejemplos mínimos de una etiqueta para aprenderla
+MIN_EXAMPLES = 5
+
+def _sigmoid(values):
+    return 1.0 / (1.0 + np.exp(-np.clip(values, -30, 30)))
+
+def train_one_vs_rest(features, targets, epochs=500, learning_rate=0.5, l2=1e-3):
+    """
+    Regresión logística uno-contra-resto con pesos de clase equilibrados
+
+    Args:
+        features: Array (ejemplos × descriptores) ya estandarizado
+        targets: Array binario (ejemplos × etiquetas)
+
+    Returns:
+        tuple: (pesos descriptores × etiquetas, sesgos por etiqueta)
+    """
+    n_examples, n_features = features.shape
+    targets = targets.astype(np.float32)
+
+    # Positivos y negativos pesan lo mismo en cada etiqueta
+    positive_rate = np.clip(targets.mean(axis=0), 1e-6, 1 - 1e-6)
+    sample_weights = (
+        targets * (0.5 / positive_rate) + (1 - targets) * (0.5 / (1 - positive_rate))
+    ) / n_examples
+
+    weights = np.zeros((n_features, targets.shape[1]), dtype=np.float32)
+    bias = np.zeros(targets.shape[1], dtype=np.float32)
+    for _ in range(epochs):
+        gradient = (_sigmoid(features @ weights + bias) - targets) * sample_weights
+        weights -= learning_rate * (features.T @ gradient + l2 * weights)
+        bias -= learning_rate * gradient.sum(axis=0)
+
+    return weights, bias
+
+class AudioClassifier:
+    """Modelo de sugerencias cargado bajo demanda"""
+
+    def __init__(self, path, min_probability=0.6, max_suggestions=3):
+        self.path = path
+        self.min_probability = min_probability
+        self.max_suggestions = max_suggestions
+        self._lock = threading.Lock()
+        self._model = None
+        self._signature = None
+
+    @staticmethod
+    def train(features, labels, min_examples=MIN_EXAMPLES, **options):
+        """
+        Entrenar un modelo por campo
+
+        Args:
+            features: Array (sonidos × FEATURE_DIM) de descriptores en bruto
+            labels: {campo: [lista de etiquetas de cada sonido]}
+
+        Returns:
+            dict: Arrays del modelo (ver save)
+        """
+        mean = features.mean(axis=0)
+        std = features.std(axis=0)
+        std[std < 1e-6] = 1.0
+        standardized = (features - mean) / std
+
+        model = {
+            "version": np.array(FEATURE_VERSION),
+            "mean": mean.astype(np.float32),
+            "std": std.astype(np.float32)
+        }
+        for field, values in labels.items():
+            counts = {}
+            for sound_labels in values:
+                for label in set(sound_labels):
+                    counts[label] = counts.get(label, 0) + 1
+            vocabulary = sorted(label for label, count in counts.items() if count >= min_examples)
+
+            targets = np.zeros((len(values), len(vocabulary)), dtype=np.float32)
+            column_of = {label: column for column, label in enumerate(vocabulary)}
+            for row, sound_labels in enumerate(values):
+                for label in sound_labels:
+                    if label in column_of:
+                        targets[row, column_of[label]] = 1
+
+            weights, bias = train_one_vs_rest(standardized, targets, **options)
+            model[f"{field}_labels"] = np.array(vocabulary, dtype=str)
+            model[f"{field}_weights"] = weights
+            model[f"{field}_bias"] = bias
+
+        return model
+
+    @staticmethod
+    def save(model, path):
+        """Guardar el modelo de forma atómica"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f"{path}.tmp.npz"
+        np.savez(temp_path, trained_at=np.array(datetime.utcnow().isoformat()), **model)
+        os.replace(temp_path, path)
+
+    def _current_signature(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _ensure_loaded(self):
+        """Cargar el modelo la primera vez (o si se regeneró)"""
+        signature = self._current_signature()
+        with self._lock:
+            if signature is None:
+                self._model = None
+            elif signature != self._signature:
+                with np.load(self.path, allow_pickle=False) as archive:
+                    model = {name: archive[name] for name in archive.files}
+                if int(model["version"]) != FEATURE_VERSION or model["mean"].shape != (FEATURE_DIM,):
+                    print("Modelo de sugerencias de otra versión; ejecute train_classifier.py")
+                    model = None
+                self._model = model
+                self._signature = signature
+            return self._model
+
+    @property
+    def available(self):
+        return self._ensure_loaded() is not None
+
+    def predict(self, features):
+        """
+        Probabilidades de cada etiqueta
+
+        Args:
+            features: Array (sonidos × FEATURE_DIM) de descriptores en bruto
+
+        Returns:
+            dict | None: {campo: (etiquetas, probabilidades sonidos × etiquetas)}
+        """
+        model = self._ensure_loaded()
+        if model is None:
+            return None
+        return self.predict_model(model, features)
+
+    @staticmethod
+    def predict_model(model, features):
+        standardized = (np.atleast_2d(features) - model["mean"]) / model["std"]
+        return {
+            field: (
+                model[f"{field}_labels"],
+                _sigmoid(standardized @ model[f"{field}_weights"] + model[f"{field}_bias"])
+            )
+            for field in CLASSIFIED_FIELDS
+            if f"{field}_labels" in model
+        }
+
+    def suggest_many(self, features):
+        """
+        Sugerencias para varios sonidos
+
+        Returns:
+            list | None: Por sonido, {campo: [{valor, probabilidad}], modelo}
+        """
+        model = self._ensure_loaded()
+        if model is None:
+            return None
+
+        predictions = self.predict_model(model, features)
+        trained_at = str(model["trained_at"]) if "trained_at" in model else None
+        suggestions = [{"modelo": trained_at} for _ in range(len(np.atleast_2d(features)))]
+        for field, (labels, probabilities) in predictions.items():
+            for row, row_probabilities in enumerate(probabilities):
+                best = np.argsort(-row_probabilities)[:self.max_suggestions]
+                suggestions[row][field] = [
+                    {"valor": str(labels[column]), "probabilidad": round(float(row_probabilities[column]), 3)}
+                    for column in best
+                    if row_probabilities[column] >= self.min_probability
+                ]
+        return suggestions
+
+    def suggest(self, features):
+        """Sugerencias para un sonido, o None si no hay modelo"""
+        suggestions = self.suggest_many(features)
+        return suggestions[0] if suggestions else None
+
+# Instancia global del modelo de sugerencias
+audio_classifier = AudioClassifier(
+    Config.CLASSIFIER_MODEL_PATH,
+    min_probability=Config.CLASSIFIER_MIN_PROBABILITY,
+    max_suggestions=Config.CLASSIFIER_MAX_SUGGESTIONS
+)
@@ -0,0 +1,198 @@
+"""
+Descriptores acústicos de una grabación con NumPy
+
+Una STFT por bloques (ventana Hann de 2048 muestras, salto de 512) sobre
+la mezcla mono resume cada grabación en un vector fijo:
+
+- media y desviación de 13 coeficientes cepstrales sobre 32 bandas en
+  escala mel (timbre, parecido a MFCC)
+- centroide, ancho de banda, rolloff y planitud espectral
+- ritmo de ataques (picos del flujo espectral por segundo)
+- nivel RMS medio y su variación
+
+Las bandas se definen en Hz, así que grabaciones con distinta frecuencia
+de muestreo son comparables. El vector es el descriptor «en bruto»; el
+índice de similitud lo estandariza con las estadísticas del catálogo.
+"""
+
+from functools import lru_cache
+import numpy as np
+from scipy.fft import rfft, dct
+from utils.audio_analysis import open_wav, iter_wav_blocks, AudioAnalysisError
+
+# Versión del descriptor: cambiarla invalida los vectores guardados
+FEATURE_VERSION = 1
+
+FFT_SIZE = 2048
+HOP_SIZE = 512
+MEL_BANDS = 32
+CEPSTRAL_COEFFICIENTS = 13
+MIN_FREQUENCY = 40.0
+MAX_FREQUENCY = 11025.0
+
+# Tramas por debajo de este nivel no cuentan en los descriptores espectrales;
+# el nivel de cada trama se acota en FLOOR_DB (silencio digital)
+SILENCE_DB = -60.0
+FLOOR_DB = -90.0
+
+# Flujo espectral mínimo (suma de log10 por banda) y separación de un ataque
+ONSET_MIN_FLUX = 5.0
+ONSET_MIN_GAP = 0.05
+
+# Grupos de descriptores (cada grupo pesa lo mismo en la similitud)
+FEATURE_GROUPS = {
+    "timbre": [f"mfcc_{i}" for i in range(CEPSTRAL_COEFFICIENTS)],
+    "timbre_variacion": [f"mfcc_std_{i}" for i in range(CEPSTRAL_COEFFICIENTS)],
+    "espectro": ["centroide", "centroide_std", "ancho_banda", "rolloff", "planitud"],
+    "dinamica": ["ataques_por_segundo", "rms_db", "rms_db_std"]
+}
+FEATURE_NAMES = [name for names in FEATURE_GROUPS.values() for name in names]
+FEATURE_DIM = len(FEATURE_NAMES)
+
+def _hz_to_mel(frequency):
+    return 2595.0 * np.log10(1.0 + np.asarray(frequency) / 700.0)
+
+def _mel_to_hz(mel):
+    return 700.0 * (10 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+@lru_cache(maxsize=8)
+def mel_filterbank(sample_rate):
+    """
+    Filtros triangulares en escala mel para una frecuencia de muestreo
+
+    Returns:
+        array: (bins de la FFT × MEL_BANDS), float32
+    """
+    frequencies = np.fft.rfftfreq(FFT_SIZE, 1.0 / sample_rate)
+    top = min(MAX_FREQUENCY, sample_rate / 2)
+    edges = _mel_to_hz(np.linspace(_hz_to_mel(MIN_FREQUENCY), _hz_to_mel(top), MEL_BANDS + 2))
+
+    bank = np.zeros((len(frequencies), MEL_BANDS), dtype=np.float32)
+    for band in range(MEL_BANDS):
+        low, center, high = edges[band:band + 3]
+        rising = (frequencies - low) / (center - low)
+        falling = (high - frequencies) / (high - center)
+        bank[:, band] = np.maximum(0, np.minimum(rising, falling))
+    return bank
+
+def _frame_features(frames, sample_rate):
+    """
+    Descriptores por trama
+
+    Returns:
+        array: (tramas × [13 cepstrales, centroide, ancho, rolloff, planitud,
+            rms_db, log-energías de banda...])
+    """
+    window = np.hanning(FFT_SIZE).astype(np.float32)
+    power = np.square(np.abs(rfft(frames * window, axis=1))).astype(np.float32)
+    frequencies = np.fft.rfftfreq(FFT_SIZE, 1.0 / sample_rate).astype(np.float32)
+
+    total = power.sum(axis=1) + 1e-12
+    centroid = (power @ frequencies) / total
+    bandwidth = np.sqrt(np.maximum(
+        (power @ np.square(frequencies)) / total - np.square(centroid), 0
+    ))
+    cumulative = np.cumsum(power, axis=1)
+    rolloff = frequencies[np.argmax(cumulative >= 0.85 * cumulative[:, -1:], axis=1)]
+    log_power = np.log(power + 1e-12)
+    flatness = np.exp(log_power.mean(axis=1)) / (power.mean(axis=1) + 1e-12)
+    rms_db = np.maximum(10 * np.log10(np.square(frames).mean(axis=1) + 1e-12), FLOOR_DB)
+
+    log_bands = np.log10(power @ mel_filterbank(sample_rate) + 1e-10)
+    cepstrum = dct(log_bands, type=2, norm='ortho', axis=1)[:, :CEPSTRAL_COEFFICIENTS]
+
+    return np.column_stack([
+        cepstrum, centroid, bandwidth, rolloff, flatness, rms_db, log_bands
+    ]).astype(np.float32)
+
+def _onset_rate(log_bands, duration, hop_seconds):
+    """
+    Ataques por segundo: picos locales del flujo espectral
+
+    El umbral es robusto (mediana + desviación absoluta mediana) con un
+    mínimo fijo, para que el ruido estacionario no cuente como ataques,
+    y dos ataques deben separarse al menos ONSET_MIN_GAP segundos.
+    """
+    if len(log_bands) < 3 or duration <= 0:
+        return 0.0
+    flux = np.maximum(np.diff(log_bands, axis=0), 0).sum(axis=1)
+    median = np.median(flux)
+    spread = 1.4826 * np.median(np.abs(flux - median))
+    threshold = median + max(4 * spread, ONSET_MIN_FLUX)
+
+    candidates = np.flatnonzero(
+        (flux[1:-1] > threshold) & (flux[1:-1] >= flux[:-2]) & (flux[1:-1] > flux[2:])
+    ) + 1
+    min_gap = max(1, int(round(ONSET_MIN_GAP / hop_seconds)))
+    onsets = 0
+    last = -min_gap
+    for position in candidates:
+        if position - last >= min_gap:
+            onsets += 1
+            last = position
+    return float(onsets / duration)
+
+def extract_features(path):
+    """
+    Vector de descriptores de un archivo WAV
+
+    Returns:
+        array: float32 de FEATURE_DIM valores (ver FEATURE_NAMES)
+
+    Raises:
+        AudioAnalysisError: Si el archivo no es un WAV válido o no tiene audio
+    """
+    rows = []
+    frames_read = 0
+    with open_wav(path) as reader:
+        sample_rate = reader.getframerate()
+        carry = np.zeros(0, dtype=np.float32)
+
+        for samples in iter_wav_blocks(reader):
+            frames_read += len(samples)
+            buffer = np.concatenate([carry, samples.mean(axis=1)])
+            count = (len(buffer) - FFT_SIZE) // HOP_SIZE + 1
+            if count > 0:
+                frames = np.lib.stride_tricks.sliding_window_view(buffer, FFT_SIZE)[::HOP_SIZE][:count]
+                rows.append(_frame_features(frames, sample_rate))
+                carry = buffer[count * HOP_SIZE:]
+            else:
+                carry = buffer
+
+        # Audio más corto que una ventana: una sola trama con relleno
+        if not rows and len(carry):
+            padded = np.pad(carry, (0, FFT_SIZE - len(carry)))
+            rows.append(_frame_features(padded[np.newaxis, :], sample_rate))
+
+    if not frames_read:
+        raise AudioAnalysisError("WAV sin audio")
+
+    table = np.vstack(rows)
+    cepstrum = table[:, :CEPSTRAL_COEFFICIENTS]
+    centroid, bandwidth, rolloff, flatness, rms_db = table[:, CEPSTRAL_COEFFICIENTS:CEPSTRAL_COEFFICIENTS + 5].T
+    log_bands = table[:, CEPSTRAL_COEFFICIENTS + 5:]
+
+    # Los silencios no describen el timbre; si todo es silencio se usa todo
+    voiced = rms_db > SILENCE_DB
+    if not voiced.any():
+        voiced[:] = True
+
+    log_centroid = np.log2(centroid[voiced] + 1.0)
+    vector = np.concatenate([
+        cepstrum[voiced].mean(axis=0),
+        cepstrum[voiced].std(axis=0),
+        [
+            log_centroid.mean(),
+            log_centroid.std(),
+            np.log2(bandwidth[voiced] + 1.0).mean(),
+            np.log2(rolloff[voiced] + 1.0).mean(),
+            flatness[voiced].mean(),
+            _onset_rate(log_bands, frames_read / sample_rate, HOP_SIZE / sample_rate),
+            rms_db.mean(),
+            rms_db.std()
+        ]
+    ]).astype(np.float32)
+
+    if not np.all(np.isfinite(vector)):
+        raise AudioAnalysisError("No se pudieron calcular los descriptores")
+    return vector
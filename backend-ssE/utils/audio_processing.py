@@ -0,0 +1,329 @@
+"""
+Procesamiento en segundo plano del audio de cada sonido
+
+Tras crear un sonido se encola su análisis: duración real, frecuencia de
+muestreo, canales, sonoridad y picos de la forma de onda. Los datos
+escalares se guardan en el documento (audio_info) y los picos en un
+archivo auxiliar en ANALYSIS_FOLDER con la misma ruta que el audio:
+
+    <ANALYSIS_FOLDER>/ab/cd/<sha256>.wav.peaks
+
+El archivo contiene los niveles del mipmap uno tras otro, del más
+detallado al más grueso, como pares mínimo/máximo int16 little-endian;
+audio_info.peaks.niveles guarda cuántos pares tiene cada nivel.
+
+Junto a los picos se guardan los descriptores acústicos en bruto
+(<sha256>.wav.v1.features, float32) que extract_features.py reúne en el
+índice de similitud de audio y que, si hay un modelo entrenado, dan las
+emociones y tipos de sonido sugeridos (campo sugerencias).
+
+Como los audios se guardan por contenido, un audio repetido reutiliza el
+análisis del primer sonido que lo usó.
+
+ANALYSIS_FOLDER es una caché local. Con el almacenamiento S3 los archivos
+auxiliares se suben también al bucket (.analysis/<clave>.peaks), y un
+nodo que no los tiene los descarga la primera vez que los necesita.
+"""
+
+import os
+import uuid
+import shutil
+import numpy as np
+from config import Config
+from models.sound_model import SoundModel
+from utils.audio_analysis import analyze_wav, AudioAnalysisError, SAMPLES_PER_PEAK
+from utils.audio_features import extract_features, FEATURE_DIM, FEATURE_VERSION
+from utils.audio_storage import audio_key
+from utils.storage import get_storage
+from utils.tasks import task_queue
+from utils.renditions import rendition_cache
+from utils.audio_classifier import audio_classifier
+
+# Formatos que se saben decodificar (el resto queda como no_soportado)
+ANALYZABLE_EXTENSIONS = ('.wav',)
+
+# Extensión del archivo auxiliar de picos
+PEAKS_EXTENSION = '.peaks'
+
+# Extensión del archivo de descriptores (cambia con la versión del descriptor)
+FEATURES_EXTENSION = f'.v{FEATURE_VERSION}.features'
+
+# Prefijo de los archivos auxiliares en el almacenamiento compartido
+ANALYSIS_PREFIX = '.analysis'
+
+# Bytes por par mínimo/máximo (dos int16)
+PEAK_PAIR_BYTES = 4
+
+# Resolución pedida a /peaks por defecto y máxima
+DEFAULT_PEAKS_PIXELS = 1000
+MAX_PEAKS_PIXELS = 16384
+
+def peaks_path(analysis_folder, key):
+    """Ruta del archivo de picos de un audio"""
+    return os.path.join(analysis_folder, *key.split('/')) + PEAKS_EXTENSION
+
+def write_peaks(path, levels):
+    """Escribir los niveles de picos (int16 little-endian) de forma atómica"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as output:
+        for level in levels:
+            output.write(np.ascontiguousarray(level, dtype='<i2').tobytes())
+    os.replace(temp_path, path)
+
+def features_path(analysis_folder, key):
+    """Ruta del archivo de descriptores acústicos de un audio"""
+    return os.path.join(analysis_folder, *key.split('/')) + FEATURES_EXTENSION
+
+def write_features(path, vector):
+    """Escribir los descriptores (float32 little-endian) de forma atómica"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as output:
+        output.write(np.asarray(vector, dtype='<f4').tobytes())
+    os.replace(temp_path, path)
+
+def read_features(path):
+    """
+    Leer los descriptores de un audio
+
+    Returns:
+        array | None: float32 de FEATURE_DIM valores, o None si no hay
+    """
+    try:
+        with open(path, 'rb') as source:
+            vector = np.frombuffer(source.read(), dtype='<f4')
+    except OSError:
+        return None
+    return vector if len(vector) == FEATURE_DIM else None
+
+def sidecar_key(key, extension):
+    """Clave de un archivo auxiliar en el almacenamiento"""
+    return f"{ANALYSIS_PREFIX}/{key}{extension}"
+
+def publish_sidecar(path, key, extension, upload_folder):
+    """
+    Subir un archivo auxiliar al almacenamiento compartido
+
+    Con el backend local no hace nada: ANALYSIS_FOLDER ya es el único sitio.
+    """
+    storage = get_storage(upload_folder)
+    if storage.name == 'local':
+        return False
+
+    # put_file elimina el archivo subido: se sube una copia
+    upload_path = f"{path}.{uuid.uuid4().hex}.upload"
+    shutil.copyfile(path, upload_path)
+    try:
+        storage.put_file(upload_path, sidecar_key(key, extension))
+    finally:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+    return True
+
+def fetch_sidecar(path, key, extension, upload_folder):
+    """
+    Asegurar la copia local de un archivo auxiliar, descargándola del
+    almacenamiento compartido si falta
+
+    Returns:
+        bool: True si el archivo está disponible en `path`
+    """
+    if os.path.isfile(path):
+        return True
+
+    storage = get_storage(upload_folder)
+    remote_key = sidecar_key(key, extension)
+    if storage.name == 'local' or not storage.exists(remote_key):
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with storage.local_copy(remote_key) as source:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return True
+
+def save_features(analysis_folder, key, vector, upload_folder):
+    """Guardar los descriptores de un audio en local y en el almacenamiento compartido"""
+    path = features_path(analysis_folder, key)
+    write_features(path, vector)
+    publish_sidecar(path, key, FEATURES_EXTENSION, upload_folder)
+
+def load_features(analysis_folder, key, upload_folder):
+    """Descriptores de un audio (descargándolos si este nodo no los tiene), o None"""
+    path = features_path(analysis_folder, key)
+    try:
+        fetch_sidecar(path, key, FEATURES_EXTENSION, upload_folder)
+    except Exception as e:
+        print(f"Error descargando descriptores de {key}: {e}")
+    return read_features(path)
+
+def read_peaks(analysis_folder, key, peaks_info, pixels, upload_folder=None):
+    """
+    Picos de la forma de onda para dibujarla en `pixels` columnas
+
+    Se mapea el archivo de picos en memoria y se lee solo el nivel más
+    grueso que tiene al menos `pixels` pares; ese nivel se reduce a
+    exactamente `pixels` pares (o se devuelve entero si el audio es más
+    corto que la resolución pedida).
+
+    Args:
+        analysis_folder: Directorio de análisis
+        key: Clave del audio en el almacenamiento
+        peaks_info: audio_info.peaks ({samples_per_peak, niveles})
+        pixels: Número de pares deseado
+        upload_folder: Directorio de uploads, para descargar el archivo del
+            almacenamiento compartido si este nodo no lo tiene
+
+    Returns:
+        array | None: int16 n × 2 (mínimo, máximo), o None si no hay
+            archivo de picos
+    """
+    levels = peaks_info['niveles']
+    path = peaks_path(analysis_folder, key)
+    if upload_folder is not None:
+        fetch_sidecar(path, key, PEAKS_EXTENSION, upload_folder)
+
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    if size != sum(levels) * PEAK_PAIR_BYTES:
+        raise ValueError("El archivo de picos no coincide con el análisis guardado")
+
+    level = 0
+    while level + 1 < len(levels) and levels[level + 1] >= pixels:
+        level += 1
+
+    mapped = np.memmap(
+        path, dtype='<i2', mode='r',
+        offset=sum(levels[:level]) * PEAK_PAIR_BYTES,
+        shape=(levels[level], 2)
+    )
+    if len(mapped) <= pixels:
+        peaks = np.array(mapped)
+    else:
+        starts = np.linspace(0, len(mapped), pixels, endpoint=False).astype(np.int64)
+        peaks = np.stack([
+            np.minimum.reduceat(mapped[:, 0], starts),
+            np.maximum.reduceat(mapped[:, 1], starts)
+        ], axis=1)
+
+    # peaks es una copia: al soltar el memmap se cierra el mapeo
+    del mapped
+    return peaks
+
+def analyze_sound_audio(sound_id, audio_url, upload_folder, analysis_folder, sound_model=None):
+    """
+    Analizar el audio de un sonido y guardar el resultado
+
+    Returns:
+        dict: audio_info guardado en el sonido
+    """
+    sound_model = sound_model or SoundModel()
+    key = audio_key(audio_url)
+    if key is None:
+        return None
+
+    # Mismo contenido que otro sonido ya analizado
+    existing = sound_model.find_audio_info(audio_url)
+    if existing and fetch_sidecar(peaks_path(analysis_folder, key), key, PEAKS_EXTENSION, upload_folder):
+        sound_model.set_audio_info(sound_id, existing)
+        suggest_sound_labels(sound_id, load_features(analysis_folder, key, upload_folder), sound_model)
+        return existing
+
+    extension = os.path.splitext(key)[1].lower()
+    if extension not in ANALYZABLE_EXTENSIONS:
+        audio_info = {"estado": "no_soportado", "formato": extension.lstrip('.')}
+        sound_model.set_audio_info(sound_id, audio_info)
+        return audio_info
+
+    features = None
+    try:
+        with get_storage(upload_folder).local_copy(key) as path:
+            result = analyze_wav(path)
+            features = extract_features(path)
+
+        path = peaks_path(analysis_folder, key)
+        write_peaks(path, result['peaks'])
+        publish_sidecar(path, key, PEAKS_EXTENSION, upload_folder)
+        save_features(analysis_folder, key, features, upload_folder)
+        audio_info = {
+            "estado": "listo",
+            "duracion": round(result['duracion'], 3),
+            "sample_rate": result['sample_rate'],
+            "canales": result['canales'],
+            "rms_dbfs": result['rms_dbfs'],
+            "pico_dbfs": result['pico_dbfs'],
+            "lufs": result['lufs'],
+            "peaks": {
+                "samples_per_peak": SAMPLES_PER_PEAK,
+                "niveles": [len(level) for level in result['peaks']]
+            }
+        }
+    except AudioAnalysisError as e:
+        audio_info = {"estado": "error", "error": str(e)}
+    except Exception as e:
+        # Sin esto el sonido se quedaría sin audio_info y /peaks en 202 para siempre
+        print(f"Error analizando audio {key}: {e}")
+        audio_info = {"estado": "error", "error": str(e)}
+
+    sound_model.set_audio_info(sound_id, audio_info)
+    suggest_sound_labels(sound_id, features, sound_model)
+    return audio_info
+
+def suggest_sound_labels(sound_id, features, sound_model):
+    """Guardar emociones y tipos de sonido sugeridos, si hay un modelo entrenado"""
+    if not Config.CLASSIFIER_ENABLED or features is None:
+        return None
+
+    suggestions = audio_classifier.suggest(features)
+    if suggestions is not None:
+        sound_model.set_suggestions([(sound_id, suggestions)])
+    return suggestions
+
+def schedule_audio_analysis(sound_id, audio_url, upload_folder, analysis_folder):
+    """Encolar el análisis del audio de un sonido recién creado"""
+    future = task_queue.submit(
+        analyze_sound_audio, sound_id, audio_url, upload_folder, analysis_folder
+    )
+
+    # Versión para streaming lista antes de la primera reproducción
+    key = audio_key(audio_url)
+    if Config.RENDITIONS_EAGER and key:
+        rendition_cache.schedule(key, get_storage(upload_folder))
+    return future
+
+def reschedule_audio_analysis(sound_id, audio_url, upload_folder, analysis_folder, sound_model=None):
+    """
+    Volver a analizar un audio cuyos archivos auxiliares ya no existen
+    (otro nodo sin acceso a ellos o una limpieza de ANALYSIS_FOLDER)
+
+    El sonido queda como pendiente para no encolarlo en cada petición.
+    """
+    sound_model = sound_model or SoundModel()
+    sound_model.set_audio_info(sound_id, {"estado": "pendiente"})
+    return schedule_audio_analysis(sound_id, audio_url, upload_folder, analysis_folder)
+
+def remove_audio_analysis(audio_url, analysis_folder, upload_folder=None):
+    """Eliminar los archivos de picos y descriptores de un audio que ya no existe"""
+    key = audio_key(audio_url)
+    if key is None:
+        return False
+
+    removed = False
+    for path in (peaks_path(analysis_folder, key), features_path(analysis_folder, key)):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = True
+
+    storage = get_storage(upload_folder) if upload_folder else None
+    if storage is not None and storage.name != 'local':
+        for extension in (PEAKS_EXTENSION, FEATURES_EXTENSION):
+            removed = storage.delete(sidecar_key(key, extension)) or removed
+    return removed
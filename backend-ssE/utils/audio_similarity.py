@@ -0,0 +1,227 @@
+"""
+Búsqueda de sonidos parecidos por el contenido del audio
+
+Los descriptores de cada grabación (utils.audio_features) se estandarizan
+con la media y la desviación del catálogo, se ponderan para que cada grupo
+de descriptores pese lo mismo y se normalizan (norma L2): el producto de
+la matriz por un vector es la similitud coseno con todo el catálogo.
+
+La matriz la genera extract_features.py y se guarda como float32 en un
+.npy que cada worker mapea en memoria (las páginas se comparten entre
+procesos), con un .json al lado con los IDs de cada fila y la
+estandarización. Con 100.000 grabaciones y 34 descriptores ocupa ~13 MB y
+una búsqueda exhaustiva tarda unos pocos milisegundos.
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+import numpy as np
+from config import Config
+from utils.audio_features import FEATURE_GROUPS, FEATURE_DIM, FEATURE_VERSION
+
+def group_weights():
+    """Peso de cada descriptor: 1/sqrt(tamaño del grupo)"""
+    return np.concatenate([
+        np.full(len(names), 1.0 / np.sqrt(len(names)), dtype=np.float32)
+        for names in FEATURE_GROUPS.values()
+    ])
+
+def metadata_path(matrix_path):
+    return os.path.splitext(matrix_path)[0] + '.json'
+
+class AudioSimilarityIndex:
+    """Matriz de descriptores mapeada en memoria con búsqueda exhaustiva"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._row_ids = []
+        self._row_of = {}
+        self._mean = None
+        self._scale = None
+        self._signature = None
+        self._loaded_at = None
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    @staticmethod
+    def build(entries, path):
+        """
+        Escribir la matriz normalizada y sus metadatos
+
+        Args:
+            entries: Lista de (sound_id, descriptor en bruto)
+            path: Ruta del .npy
+
+        Returns:
+            int: Filas escritas
+        """
+        row_ids = [sound_id for sound_id, _ in entries]
+        raw = np.array([vector for _, vector in entries], dtype=np.float32).reshape(-1, FEATURE_DIM)
+
+        mean = raw.mean(axis=0) if len(raw) else np.zeros(FEATURE_DIM, dtype=np.float32)
+        std = raw.std(axis=0) if len(raw) else np.ones(FEATURE_DIM, dtype=np.float32)
+        std[std < 1e-6] = 1.0
+        scale = group_weights() / std
+
+        matrix = _normalize((raw - mean) * scale)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f"{path}.tmp.npy"
+        np.save(temp_path, matrix)
+        metadata = {
+            "version": FEATURE_VERSION,
+            "dims": FEATURE_DIM,
+            "ids": row_ids,
+            "mean": mean.tolist(),
+            "scale": scale.tolist(),
+            "fecha": datetime.utcnow().isoformat()
+        }
+        temp_metadata = f"{metadata_path(path)}.tmp"
+        with open(temp_metadata, 'w') as output:
+            json.dump(metadata, output)
+
+        # La matriz se sustituye antes que los IDs: load() comprueba que
+        # ambos tengan las mismas filas
+        os.replace(temp_path, path)
+        os.replace(temp_metadata, metadata_path(path))
+        return len(row_ids)
+
+    def _current_signature(self):
+        try:
+            return tuple(
+                (stat.st_mtime_ns, stat.st_size)
+                for stat in (os.stat(self.path), os.stat(metadata_path(self.path)))
+            )
+        except OSError:
+            return None
+
+    def load(self):
+        """
+        Mapear la matriz en memoria
+
+        Returns:
+            int: Número de sonidos indexados
+        """
+        try:
+            signature = self._current_signature()
+            if signature is None:
+                raise FileNotFoundError(f"No existe el índice de audio {self.path}")
+
+            with open(metadata_path(self.path)) as source:
+                metadata = json.load(source)
+            if metadata.get("version") != FEATURE_VERSION or metadata.get("dims") != FEATURE_DIM:
+                raise ValueError("El índice de audio es de otra versión; ejecute extract_features.py")
+
+            matrix = np.load(self.path, mmap_mode='r')
+            if matrix.shape != (len(metadata["ids"]), FEATURE_DIM):
+                raise ValueError("La matriz y los IDs del índice de audio no coinciden")
+
+            with self._lock:
+                self._matrix = matrix
+                self._row_ids = metadata["ids"]
+                self._row_of = {sound_id: row for row, sound_id in enumerate(self._row_ids)}
+                self._mean = np.asarray(metadata["mean"], dtype=np.float32)
+                self._scale = np.asarray(metadata["scale"], dtype=np.float32)
+                self._signature = signature
+                self._loaded_at = time.monotonic()
+
+            return len(self._row_ids)
+
+        except Exception as e:
+            print(f"Error cargando índice de audio: {e}")
+            raise e
+
+    def reload_if_changed(self):
+        """Volver a mapear la matriz si extract_features.py la regeneró"""
+        signature = self._current_signature()
+        if signature is not None and signature != self._signature:
+            try:
+                self.load()
+            except Exception:
+                # A mitad de una regeneración se sigue usando la matriz anterior
+                if not self.loaded:
+                    raise
+
+    def version(self):
+        """Firma de la matriz en uso, tras recargarla si cambió (para claves de caché)"""
+        try:
+            self.reload_if_changed()
+        except Exception:
+            # Sin matriz válida el endpoint responde el error sin cachearlo
+            pass
+        with self._lock:
+            signature = self._signature
+        return ':'.join(f"{mtime}-{size}" for mtime, size in signature) if signature else 'none'
+
+    def embed(self, raw):
+        """Descriptor en bruto a vector normalizado del índice"""
+        with self._lock:
+            if self._mean is None:
+                return None
+            vector = (np.asarray(raw, dtype=np.float32) - self._mean) * self._scale
+        return _normalize(vector[np.newaxis, :])[0]
+
+    def contains(self, sound_id):
+        with self._lock:
+            return sound_id in self._row_of
+
+    def similar(self, sound_id, limit=10, raw=None):
+        """
+        Sonidos con el audio más parecido
+
+        Args:
+            sound_id: ID del sonido de referencia
+            limit: Número de resultados
+            raw: Descriptor en bruto, para sonidos aún no indexados
+
+        Returns:
+            list | None: [(sound_id, similitud)], o None si no hay vector
+        """
+        with self._lock:
+            matrix = self._matrix
+            row_ids = self._row_ids
+            row = self._row_of.get(sound_id)
+
+        if matrix is None or not len(row_ids):
+            return None
+        if row is not None:
+            query = np.asarray(matrix[row])
+        elif raw is not None:
+            query = self.embed(raw)
+        else:
+            return None
+
+        scores = np.asarray(matrix @ query)
+        count = min(limit + 1, len(scores))
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best], kind='stable')]
+
+        return [
+            (row_ids[position], round(float(scores[position]), 4))
+            for position in best
+            if row_ids[position] != sound_id
+        ][:limit]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sounds": len(self._row_ids),
+                "dims": FEATURE_DIM,
+                "bytes": int(self._matrix.nbytes) if self._matrix is not None else 0,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self.loaded else None
+            }
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+# Instancia global del índice de similitud de audio
+audio_index = AudioSimilarityIndex(Config.AUDIO_EMBEDDINGS_PATH)
@@ -0,0 +1,259 @@
+"""
+Almacenamiento de los archivos de audio en el directorio de uploads
+
+Los audios se guardan por contenido: la ruta sale del SHA-256 de sus bytes,
+repartida en subdirectorios por los primeros caracteres del hash
+(ab/cd/abcd….wav), y la colección audio_blobs cuenta cuántos sonidos usan
+cada archivo. Subir dos veces la misma grabación no ocupa más disco, y el
+archivo solo se borra cuando el último sonido que lo usa se elimina.
+
+Dónde viven los bytes (directorio local o S3) lo decide el backend de
+utils.storage; los temporales siempre se escriben en el directorio local.
+"""
+
+import os
+import re
+import time
+import uuid
+import hashlib
+from werkzeug.utils import secure_filename
+from models.audio_blob_model import AudioBlobModel
+from utils.storage import get_storage
+
+# Tamaño de bloque al copiar audio a disco
+CHUNK_SIZE = 1024 * 1024
+
+# Niveles de subdirectorios y caracteres del hash por nivel
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+# Directorio (dentro de uploads) para los archivos a medio escribir
+TEMP_DIRECTORY = '.tmp'
+
+# URL de un audio guardado por contenido: /uploads/ab/cd/<sha256>.<ext>
+BLOB_URL_PATTERN = re.compile(r'^/uploads/(?:[0-9a-f]{2}/){2}([0-9a-f]{64})(?:\.\w+)?$')
+
+def blob_path(sha256, original_filename):
+    """Ruta relativa de un audio según su hash, conservando la extensión original"""
+    extension = os.path.splitext(secure_filename(os.path.basename(original_filename)))[1].lower()
+    shards = [sha256[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)]
+    return '/'.join(shards + [f"{sha256}{extension}"])
+
+def audio_key(audio_url):
+    """Clave en el almacenamiento (ruta relativa) a partir de la URL del audio"""
+    return (audio_url or '')[len('/uploads/'):] if (audio_url or '').startswith('/uploads/') else None
+
+def blob_sha256(audio_url):
+    """Hash de un audio a partir de su URL, o None si no está guardado por contenido"""
+    match = BLOB_URL_PATTERN.match(audio_url or '')
+    return match.group(1) if match else None
+
+def save_audio(stream, original_filename, upload_folder):
+    """
+    Guardar un audio copiándolo por bloques, sin cargarlo entero en memoria
+
+    El SHA-256 se calcula mientras se copia a un archivo temporal; si ese
+    contenido ya estaba guardado, el temporal se descarta y solo se suma
+    una referencia.
+
+    Args:
+        stream: Objeto tipo archivo (binario) con el audio
+        original_filename: Nombre original, se conserva su extensión
+        upload_folder: Directorio de uploads
+
+    Returns:
+        dict: {filename, audio_url, size, sha256, duplicate}
+    """
+    temp_path = _temp_path(upload_folder)
+    digest = hashlib.sha256()
+
+    try:
+        with open(temp_path, 'wb') as output:
+            while True:
+                block = stream.read(CHUNK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                output.write(block)
+
+        return _store_blob(temp_path, digest.hexdigest(), original_filename, upload_folder)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def store_audio_file(path, original_filename, upload_folder):
+    """
+    Guardar un audio ya escrito en disco, moviéndolo en lugar de copiarlo
+
+    El archivo se lee una vez para calcular su SHA-256; si el contenido ya
+    estaba guardado, se elimina.
+
+    Args:
+        path: Ruta del archivo completo
+        original_filename: Nombre original, se conserva su extensión
+        upload_folder: Directorio de uploads
+
+    Returns:
+        dict: {filename, audio_url, size, sha256, duplicate}
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+
+    try:
+        return _store_blob(path, digest.hexdigest(), original_filename, upload_folder)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+def link_audio(sha256, upload_folder):
+    """
+    Sumar una referencia a un audio ya guardado, sin recibir sus bytes
+
+    Returns:
+        dict | None: {filename, audio_url, size, sha256, duplicate} o None
+            si ese contenido no está guardado
+    """
+    if not audio_exists(sha256, upload_folder):
+        return None
+
+    blob = AudioBlobModel().add_reference(sha256)
+    return _stored_info(blob, duplicate=True) if blob else None
+
+def audio_exists(sha256, upload_folder):
+    """Comprobar si un contenido ya está guardado"""
+    blob = AudioBlobModel().get(sha256)
+    return blob is not None and get_storage(upload_folder).exists(blob['ruta'])
+
+def presign_audio_upload(sha256, original_filename, size, upload_folder):
+    """
+    Preparar una subida directa al almacenamiento (sin pasar por Flask)
+
+    Returns:
+        dict: {key, url, method, headers, expires_at}
+
+    Raises:
+        ValueError: Si el backend no admite subidas directas
+    """
+    key = blob_path(sha256, original_filename)
+    upload = get_storage(upload_folder).presigned_upload(key, sha256, size, None)
+    expires_in = upload.pop('expires_in', 0)
+    return {"key": key, **upload, "expires_at": time.time() + expires_in}
+
+def discard_direct_upload(sha256, key, upload_folder):
+    """
+    Borrar el objeto de una subida directa que no llegó a registrarse
+
+    Si el mismo contenido está registrado (otro sonido o sesión lo usa),
+    el objeto es el suyo y se conserva.
+
+    Returns:
+        bool: True si se borró el objeto
+    """
+    blob_model = AudioBlobModel()
+    blob = blob_model.claim_unreferenced(sha256, key)
+    if blob is None:
+        return False
+    return delete_claimed_blob(blob_model, blob, get_storage(upload_folder))
+
+def register_uploaded_audio(sha256, key, upload_folder):
+    """
+    Registrar un audio que el cliente subió directamente al almacenamiento
+
+    Returns:
+        dict: {filename, audio_url, size, sha256, duplicate}
+
+    Raises:
+        ValueError: Si el audio aún no está en el almacenamiento
+    """
+    storage = get_storage(upload_folder)
+    size = storage.size(key)
+    if size is None:
+        raise ValueError("El audio aún no se ha subido al almacenamiento")
+
+    # La firma ya exige el checksum; se comprueba por si el almacenamiento no lo aplica
+    checksum = storage.sha256(key)
+    if checksum is not None and checksum != sha256:
+        storage.delete(key)
+        raise ValueError("El contenido subido no coincide con su sha256")
+
+    blob_model = AudioBlobModel()
+    blob = blob_model.acquire(sha256, key, size)
+
+    # acquire() pudo esperar a que terminara el borrado de ese mismo archivo
+    if not storage.exists(blob['ruta']):
+        release_blob(blob_model, sha256, storage)
+        raise ValueError("El audio aún no se ha subido al almacenamiento")
+
+    return _stored_info(blob, duplicate=blob['refs'] > 1)
+
+def delete_audio(audio_url, upload_folder):
+    """
+    Quitar la referencia de un sonido a su audio y borrar el archivo si
+    ningún otro sonido lo usa
+
+    Returns:
+        bool: True si se borró el archivo
+    """
+    if not audio_url:
+        return False
+
+    sha256 = blob_sha256(audio_url)
+    if sha256 is None:
+        # Audio anterior al almacenamiento por contenido: {uuid}_{nombre}
+        return get_storage(upload_folder).delete(os.path.basename(audio_url))
+
+    return release_blob(AudioBlobModel(), sha256, get_storage(upload_folder))
+
+def release_blob(blob_model, sha256, storage):
+    """
+    Restar una referencia y, si era la última, borrar el archivo
+
+    Returns:
+        bool: True si se borró el archivo
+    """
+    blob = blob_model.release(sha256)
+    if blob is None:
+        return False
+    return delete_claimed_blob(blob_model, blob, storage)
+
+def delete_claimed_blob(blob_model, blob, storage):
+    """Borrar el archivo de un audio marcado para borrar y terminar su baja"""
+    try:
+        return storage.delete(blob['ruta'])
+    finally:
+        blob_model.finish_release(blob['_id'], blob['borrando'])
+
+def _store_blob(source_path, sha256, original_filename, upload_folder):
+    """Registrar la referencia y mover el archivo a su ruta si aún no existe"""
+    size = os.path.getsize(source_path)
+    storage = get_storage(upload_folder)
+    blob_model = AudioBlobModel()
+    blob = blob_model.acquire(sha256, blob_path(sha256, original_filename), size)
+
+    duplicate = blob['refs'] > 1 and storage.exists(blob['ruta'])
+
+    if not duplicate:
+        try:
+            storage.put_file(source_path, blob['ruta'])
+        except Exception:
+            release_blob(blob_model, sha256, storage)
+            raise
+
+    return _stored_info(blob, duplicate)
+
+def _stored_info(blob, duplicate):
+    return {
+        "filename": blob['ruta'],
+        "audio_url": f"/uploads/{blob['ruta']}",
+        "size": blob['size'],
+        "sha256": blob['_id'],
+        "duplicate": duplicate
+    }
+
+def _temp_path(upload_folder):
+    """Archivo temporal en el mismo sistema de archivos que los audios"""
+    temp_folder = os.path.join(upload_folder, TEMP_DIRECTORY)
+    os.makedirs(temp_folder, exist_ok=True)
+    return os.path.join(temp_folder, f"{uuid.uuid4().hex}.part")
@@ -0,0 +1,355 @@
+"""
+Caché de respuestas de la API con backends intercambiables
+
+- memory: LRU con TTL dentro de cada proceso
+- redis: compartida entre workers y nodos (protocolo Redis)
+
+Incluye coalescencia de peticiones: cuando una clave popular expira, un
+solo worker recalcula la respuesta y el resto espera su resultado.
+"""
+
+import time
+import uuid
+import threading
+from functools import wraps
+from collections import OrderedDict
+from urllib.parse import urlencode
+from flask import Response, current_app, request
+from config import Config
+
+class MemoryCacheBackend:
+    """
+    LRU acotada en número de entradas y con TTL por entrada, local al proceso
+
+    Como en Redis, las operaciones reciben la generación leída al empezar la
+    petición; un valor calculado antes de una invalidación no se guarda.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def generation(self):
+        """Generación actual de las claves"""
+        with self._lock:
+            return self._generation
+
+    def get(self, key, generation):
+        """Obtener un valor de la generación indicada si existe y no ha expirado"""
+        with self._lock:
+            if generation != self._generation:
+                return None
+
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, generation):
+        """Guardar un valor, expulsando el menos usado si hace falta"""
+        with self._lock:
+            if generation != self._generation:
+                # Calculado antes de una invalidación: descartarlo
+                return
+
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def acquire_lock(self, key, timeout, generation):
+        """Intentar ser el único que recalcula la clave; devuelve un token o None"""
+        lock_key = (generation, key)
+        with self._lock:
+            lock = self._locks.get(lock_key)
+            if lock is not None and lock[1] > time.monotonic():
+                return None
+            token = uuid.uuid4().hex
+            self._locks[lock_key] = (token, time.monotonic() + timeout)
+            return token
+
+    def is_locked(self, key, generation):
+        """Saber si otro hilo está recalculando la clave"""
+        with self._lock:
+            lock = self._locks.get((generation, key))
+            return lock is not None and lock[1] > time.monotonic()
+
+    def release_lock(self, key, token, generation):
+        """Liberar el bloqueo de recálculo si sigue siendo nuestro"""
+        lock_key = (generation, key)
+        with self._lock:
+            lock = self._locks.get(lock_key)
+            if lock is not None and lock[0] == token:
+                del self._locks[lock_key]
+
+    def invalidate(self):
+        """Vaciar la caché y pasar a una nueva generación"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def info(self):
+        """Estado del backend"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "generation": self._generation,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+class RedisCacheBackend:
+    """
+    Caché compartida sobre cualquier servidor que hable el protocolo Redis
+
+    La invalidación incrementa un contador de generación que forma parte de
+    todas las claves, así que las entradas antiguas dejan de leerse sin
+    tener que recorrerlas y expiran solas por TTL.
+    """
+
+    name = "redis"
+
+    def __init__(self, url, prefix='soundscape', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.client = client
+        self.prefix = prefix
+
+    def generation(self):
+        """Generación actual de las claves"""
+        return int(self.client.get(f"{self.prefix}:gen") or 0)
+
+    def _key(self, key, generation):
+        return f"{self.prefix}:{generation}:{key}"
+
+    def _lock_key(self, key, generation):
+        return f"{self.prefix}:lock:{generation}:{key}"
+
+    def get(self, key, generation):
+        """Obtener un valor de la generación indicada"""
+        return self.client.get(self._key(key, generation))
+
+    def set(self, key, value, ttl, generation):
+        """
+        Guardar un valor con expiración en la generación en que se calculó
+
+        Si hubo una invalidación entretanto, queda en la generación antigua,
+        que ya nadie lee, y expira por TTL.
+        """
+        self.client.set(self._key(key, generation), value, px=int(ttl * 1000))
+
+    def acquire_lock(self, key, timeout, generation):
+        """SET NX con expiración: solo un worker obtiene el token"""
+        token = uuid.uuid4().hex
+        acquired = self.client.set(
+            self._lock_key(key, generation), token, nx=True, px=int(timeout * 1000)
+        )
+        return token if acquired else None
+
+    def is_locked(self, key, generation):
+        """Saber si otro worker está recalculando la clave"""
+        return bool(self.client.exists(self._lock_key(key, generation)))
+
+    def release_lock(self, key, token, generation):
+        """Liberar el bloqueo si sigue siendo nuestro (WATCH/MULTI, sin Lua)"""
+        from redis.exceptions import WatchError
+
+        lock_key = self._lock_key(key, generation)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+            except WatchError:
+                # El bloqueo expiró y otro worker lo tomó
+                pass
+
+    def invalidate(self):
+        """Pasar a una nueva generación de claves"""
+        self.client.incr(f"{self.prefix}:gen")
+
+    def info(self):
+        """Estado del backend"""
+        return {"generation": self.generation()}
+
+class ResponseCache:
+    """Caché de respuestas con coalescencia de peticiones sobre un backend"""
+
+    # Intervalo de sondeo mientras otro worker recalcula
+    POLL_INTERVAL = 0.02
+
+    def __init__(self, backend, lock_timeout=10, lock_wait=5):
+        self.backend = backend
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "lock_timeouts": 0,
+            "invalidations": 0,
+            "errors": 0
+        }
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _safe(self, operation, *args):
+        """Un fallo del backend no debe tumbar la API: se trata como fallo de caché"""
+        try:
+            return operation(*args)
+        except Exception as e:
+            self._count("errors")
+            print(f"Error en la caché ({self.backend.name}): {e}")
+            return None
+
+    def get_or_compute(self, key, ttl, compute):
+        """
+        Obtener un valor de la caché o calcularlo una sola vez entre workers
+
+        Args:
+            key: Clave de caché
+            ttl: Segundos de vida del valor
+            compute: Función que devuelve (valor en bytes, cacheable)
+
+        Returns:
+            bytes: Valor cacheado o recién calculado
+        """
+        # La generación se lee una vez: lo que se calcule ahora no puede
+        # acabar guardado en la generación de una invalidación posterior
+        generation = self._safe(self.backend.generation)
+        if generation is None:
+            value, _ = compute()
+            return value
+
+        value = self._safe(self.backend.get, key, generation)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        self._count("misses")
+        token = self._safe(self.backend.acquire_lock, key, self.lock_timeout, generation)
+
+        if token is None:
+            # Otro worker está recalculando: esperar su resultado
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(self.POLL_INTERVAL)
+                value = self._safe(self.backend.get, key, generation)
+                if value is not None:
+                    self._count("coalesced")
+                    return value
+                if not self._safe(self.backend.is_locked, key, generation):
+                    break
+            else:
+                self._count("lock_timeouts")
+
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                self._safe(self.backend.set, key, value, ttl, generation)
+            return value
+        finally:
+            if token is not None:
+                self._safe(self.backend.release_lock, key, token, generation)
+
+    def invalidate(self):
+        """Invalidar todas las respuestas tras una escritura"""
+        self._count("invalidations")
+        self._safe(self.backend.invalidate)
+
+    def stats(self):
+        """Contadores de uso para ajustar tamaño y TTLs"""
+        with self._lock:
+            counters = dict(self._counters)
+
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "backend": self.backend.name,
+            "hit_ratio": round((counters["hits"] + counters["coalesced"]) / lookups, 4) if lookups else 0.0,
+            **(self._safe(self.backend.info) or {})
+        }
+
+    def cached(self, ttl_setting, version=None):
+        """
+        Decorador que cachea las respuestas 200 de un endpoint GET
+        (salvo las marcadas con Cache-Control: no-store)
+
+        Args:
+            ttl_setting: Clave de configuración con el TTL en segundos
+            version: Función opcional con la versión de los datos que no
+                están en MongoDB (p. ej. un índice en disco); forma parte
+                de la clave, así que al cambiar no se sirven respuestas viejas
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                response = None
+
+                def compute():
+                    nonlocal response
+                    response = current_app.make_response(view(*args, **kwargs))
+                    cacheable = (
+                        response.status_code == 200
+                        and not response.direct_passthrough
+                        and not response.cache_control.no_store
+                    )
+                    body = response.get_data() if cacheable else b''
+                    return response.mimetype.encode() + b'\n' + body, cacheable
+
+                key = self._request_key()
+                if version is not None:
+                    key = f"{key}#{version()}"
+
+                value = self.get_or_compute(key, current_app.config[ttl_setting], compute)
+                if response is not None:
+                    return response
+
+                mimetype, body = value.split(b'\n', 1)
+                return Response(body, status=200, mimetype=mimetype.decode())
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _request_key():
+        """Clave de caché: ruta más parámetros ordenados"""
+        params = sorted(request.args.items(multi=True))
+        return f"{request.path}?{urlencode(params)}"
+
+def create_cache_backend(config):
+    """Crear el backend de caché configurado en CACHE_BACKEND"""
+    if config.CACHE_BACKEND == 'redis':
+        return RedisCacheBackend(config.CACHE_REDIS_URL, config.CACHE_KEY_PREFIX)
+    return MemoryCacheBackend(config.CACHE_MAX_ENTRIES)
+
+# Instancia global de la caché de respuestas de la API
+api_cache = ResponseCache(
+    create_cache_backend(Config),
+    lock_timeout=Config.CACHE_LOCK_TIMEOUT,
+    lock_wait=Config.CACHE_LOCK_WAIT
+)
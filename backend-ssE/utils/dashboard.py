@@ -0,0 +1,132 @@
+"""
+Dashboard de analytics: las estadísticas independientes en una respuesta
+
+Cada sección (emociones, ubicaciones, etiquetas, línea de tiempo) es una
+consulta aparte; aquí se lanzan a la vez, en un pool de hilos (API Flask)
+o como corrutinas (API ASGI), así que el dashboard tarda lo que la más
+lenta y no la suma. Las secciones que fallan o no terminan dentro del
+plazo se devuelven vacías (data: null) con su estado, y el resto llega
+igualmente.
+
+Un hilo cuya consulta vence el plazo sigue ocupado hasta que MongoDB
+responde; el pool es acotado y MONGO_ANALYTICS_MAX_TIME_MS corta la
+consulta en el servidor, así que un Atlas lento no acumula hilos.
+"""
+
+import time
+import asyncio
+from concurrent.futures import wait
+from pymongo.errors import ExecutionTimeout
+from config import Config
+from utils.tasks import TaskQueue
+
+# Secciones del dashboard y método del modelo que calcula cada una
+# (los mismos nombres en SoundModel y AsyncSoundModel)
+DASHBOARD_SECTIONS = {
+    "emotions": "get_emotion_patterns",
+    "locations": "get_location_stats",
+    "tags": "get_tag_stats",
+    "timeline": "get_timeline_stats"
+}
+
+def dashboard_sections(model, live=False):
+    """Funciones de cada sección para un modelo (síncrono o asíncrono)"""
+    return {
+        name: (lambda method=getattr(model, method_name): method(live=live))
+        for name, method_name in DASHBOARD_SECTIONS.items()
+    }
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+def _run_section(function, start):
+    """Ejecutar una sección sin propagar errores: (estado, datos, ms, error)"""
+    try:
+        return "ok", function(), _elapsed_ms(start), None
+    except ExecutionTimeout:
+        return "timeout", None, _elapsed_ms(start), None
+    except Exception as e:
+        return "error", None, _elapsed_ms(start), str(e)
+
+def build_payload(results, total_ms):
+    """
+    Respuesta del dashboard
+
+    Args:
+        results: {sección: (estado, datos, ms, error)}
+        total_ms: Tiempo total del dashboard
+
+    Returns:
+        dict: data por sección, estado y tiempo de cada una, y partial si
+            alguna no llegó
+    """
+    sections = {}
+    for name, (status, _, elapsed, error) in results.items():
+        sections[name] = {"status": status, "ms": elapsed}
+        if error:
+            sections[name]["error"] = error
+
+    complete = sum(status == "ok" for status, *_ in results.values())
+    return {
+        "success": complete > 0,
+        "data": {name: data for name, (_, data, _, _) in results.items()},
+        "sections": sections,
+        "partial": complete < len(results),
+        "total_ms": total_ms
+    }
+
+def collect_sections(sections, timeout, queue=None):
+    """
+    Calcular las secciones en paralelo con un plazo común
+
+    Args:
+        sections: {sección: función sin argumentos}
+        timeout: Segundos de plazo para todas las secciones
+        queue: TaskQueue donde ejecutarlas (por defecto dashboard_queue)
+
+    Returns:
+        dict: Respuesta de build_payload
+    """
+    queue = queue or dashboard_queue
+    start = time.perf_counter()
+    futures = {name: queue.submit(_run_section, function, start) for name, function in sections.items()}
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+    for name, future in futures.items():
+        if future.done() and future.result() is not None:
+            results[name] = future.result()
+        else:
+            results[name] = ("timeout", None, _elapsed_ms(start), None)
+    return build_payload(results, _elapsed_ms(start))
+
+async def gather_sections(sections, timeout):
+    """
+    Versión asíncrona de collect_sections: cada función devuelve una corrutina
+
+    Las secciones que vencen el plazo se cancelan.
+    """
+    start = time.perf_counter()
+
+    async def run(function):
+        try:
+            return "ok", await function(), _elapsed_ms(start), None
+        except ExecutionTimeout:
+            return "timeout", None, _elapsed_ms(start), None
+        except Exception as e:
+            return "error", None, _elapsed_ms(start), str(e)
+
+    tasks = {name: asyncio.ensure_future(run(function)) for name, function in sections.items()}
+    await asyncio.wait(tasks.values(), timeout=timeout)
+
+    results = {}
+    for name, task in tasks.items():
+        if task.done():
+            results[name] = task.result()
+        else:
+            task.cancel()
+            results[name] = ("timeout", None, _elapsed_ms(start), None)
+    return build_payload(results, _elapsed_ms(start))
+
+# Instancia global del pool de hilos del dashboard
+dashboard_queue = TaskQueue(Config.DASHBOARD_WORKERS, name='dashboard')
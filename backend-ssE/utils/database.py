@@ -1,27 +1,310 @@
-from pymongo import MongoClient, GEOSPHERE
+import os
+import time
+import importlib
+import threading
+from pymongo import MongoClient, GEOSPHERE, TEXT, ASCENDING, DESCENDING, monitoring
+from pymongo.read_preferences import (
+    Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+)
 from config import Config
-import logging
+
+# Preferencias de lectura admitidas en MONGO_ANALYTICS_READ_PREFERENCE
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+def build_read_preference(name, max_staleness=-1):
+    """
+    Preferencia de lectura a partir de su nombre
+
+    Raises:
+        ValueError: Si el nombre no es una preferencia de MongoDB
+    """
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Preferencia de lectura no válida: {name}. Use: {', '.join(READ_PREFERENCES)}")
+    if name == "primary":
+        return Primary()
+    return READ_PREFERENCES[name](max_staleness=max_staleness)
+
+# Módulo que necesita cada compresor de MONGO_COMPRESSORS (zlib viene con Python)
+COMPRESSOR_MODULES = {
+    "zstd": "zstandard",
+    "snappy": "snappy",
+    "zlib": "zlib"
+}
+
+def available_compressors(value, warn=True):
+    """
+    Compresores de una lista separada por comas que se pueden usar en este proceso
+
+    Los que no están instalados (o PyMongo no admite) se omiten, en orden,
+    así que el servidor negocia el siguiente de la lista.
+
+    Args:
+        value: Lista de compresores (p. ej. "zstd,snappy,zlib")
+        warn: Avisar de los compresores omitidos
+    """
+    compressors = []
+    for name in (value or '').split(','):
+        name = name.strip()
+        if not name:
+            continue
+
+        module = COMPRESSOR_MODULES.get(name)
+        try:
+            if module is None:
+                raise ImportError("compresor no admitido por PyMongo")
+            importlib.import_module(module)
+        except ImportError as e:
+            if warn:
+                print(f"Compresor de MongoDB {name} no disponible, se omite: {e}")
+            continue
+
+        compressors.append(name)
+    return compressors
+
+def client_options(config=Config, event_listeners=None):
+    """
+    Opciones del cliente de MongoDB (PyMongo y Motor) según la configuración
+
+    Los compresores que no están instalados se ignoran con un aviso y se
+    usa el siguiente de la lista (zlib siempre está disponible).
+    """
+    options = {
+        "appname": config.MONGO_APP_NAME,
+        "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS or None,
+        "maxConnecting": config.MONGO_MAX_CONNECTING,
+        "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": config.MONGO_SOCKET_TIMEOUT_MS or None,
+        "event_listeners": event_listeners or []
+    }
+    compressors = available_compressors(config.MONGO_COMPRESSORS)
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+def pool_summary(monitor, config=Config):
+    """Configuración del pool y métricas de un PoolMonitor en este proceso"""
+    return {
+        "pid": os.getpid(),
+        "max_pool_size": config.MONGO_MAX_POOL_SIZE,
+        "min_pool_size": config.MONGO_MIN_POOL_SIZE,
+        "compressors": available_compressors(config.MONGO_COMPRESSORS, warn=False),
+        "analytics_read_preference": config.MONGO_ANALYTICS_READ_PREFERENCE,
+        "servers": monitor.stats()
+    }
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Métricas del pool de conexiones por servidor
+
+    Registra conexiones abiertas, en uso y esperas para obtener una
+    conexión: si wait_ms_max crece o hay checkout_failures por timeout, el
+    pool se queda corto para los hilos del proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._servers = {}
+
+    def _server(self, address):
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        if key not in self._servers:
+            self._servers[key] = {
+                "open": 0, "in_use": 0, "max_in_use": 0,
+                "created": 0, "closed": 0, "checkouts": 0, "checkout_failures": {},
+                "cleared": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0
+            }
+        return self._servers[key]
+
+    def pool_created(self, event):
+        with self._lock:
+            self._server(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._server(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["open"] += 1
+            server["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["open"] = max(0, server["open"] - 1)
+            server["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            failures = self._server(event.address)["checkout_failures"]
+            failures[str(event.reason)] = failures.get(str(event.reason), 0) + 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        wait_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        with self._lock:
+            server = self._server(event.address)
+            server["checkouts"] += 1
+            server["in_use"] += 1
+            server["max_in_use"] = max(server["max_in_use"], server["in_use"])
+            server["wait_ms_total"] += wait_ms
+            server["wait_ms_max"] = max(server["wait_ms_max"], wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["in_use"] = max(0, server["in_use"] - 1)
+
+    def reset(self):
+        """Empezar de cero (proceso hijo tras un fork)"""
+        with self._lock:
+            self._servers = {}
+
+    def stats(self):
+        with self._lock:
+            servers = {}
+            for address, server in self._servers.items():
+                servers[address] = {
+                    **server,
+                    "checkout_failures": dict(server["checkout_failures"]),
+                    "wait_ms_avg": round(server["wait_ms_total"] / server["checkouts"], 3) if server["checkouts"] else 0.0,
+                    "wait_ms_max": round(server["wait_ms_max"], 3),
+                    "wait_ms_total": round(server["wait_ms_total"], 1)
+                }
+            return servers
+
+class CollectionHandle:
+    """
+    Colección que se resuelve contra el cliente actual en cada uso
+
+    Los modelos guardan su colección al crearse (muchos al importar las
+    rutas, antes de que un servidor pre-fork cree sus workers). Tras un
+    fork el proceso hijo abre su propio cliente y la colección se vuelve a
+    resolver en el siguiente acceso, sin compartir sockets con el padre.
+    """
+
+    def __init__(self, database, name, analytics=False):
+        self._database = database
+        self._name = name
+        self._analytics = analytics
+        self._db = None
+        self._collection = None
+
+    def resolve(self):
+        db = self._database.get_db()
+        if self._collection is None or self._db is not db:
+            if self._analytics:
+                collection = db.get_collection(
+                    self._name, read_preference=self._database.analytics_read_preference
+                )
+            else:
+                collection = db[self._name]
+            self._db, self._collection = db, collection
+        return self._collection
+
+    def __getattr__(self, attribute):
+        if attribute.startswith('__'):
+            raise AttributeError(attribute)
+        return getattr(self.resolve(), attribute)
+
+    def __repr__(self):
+        return f"CollectionHandle({self._name!r}, analytics={self._analytics})"
 
 class Database:
     def __init__(self):
         self.client = None
         self.db = None
+        self.pool_monitor = PoolMonitor()
+        self.analytics_read_preference = build_read_preference(
+            Config.MONGO_ANALYTICS_READ_PREFERENCE, Config.MONGO_ANALYTICS_MAX_STALENESS
+        )
+        self._lock = threading.RLock()
+        self._indexes_created = False
+        self._pid = os.getpid()
         
     def connect(self):
-        try:
-            self.client = MongoClient(Config.MONGODB_URI)
-            self.db = self.client[Config.DATABASE_NAME]
-            
-            # Crear índices geoespaciales
-            self.create_indexes()
-            
-            # Verificar conexión
-            self.client.admin.command('ping')
-            print("Conexión exitosa a MongoDB Atlas")
-            
-        except Exception as e:
-            print(f"Error conectando a MongoDB: {e}")
-            raise e
+        """
+        Abrir el cliente del proceso con el pool configurado
+        
+        Los índices se crean con la primera conexión del proceso padre; un
+        worker que reconecta tras un fork no los vuelve a crear.
+        """
+        with self._lock:
+            try:
+                if self.client is not None:
+                    self.client.close()
+                
+                self.client = MongoClient(
+                    Config.MONGODB_URI, **client_options(event_listeners=[self.pool_monitor])
+                )
+                self.db = self.client[Config.DATABASE_NAME]
+                self._pid = os.getpid()
+                
+                # Crear índices geoespaciales
+                if not self._indexes_created:
+                    self.create_indexes()
+                    self._indexes_created = True
+                
+                # Verificar conexión
+                self.client.admin.command('ping')
+                print("Conexión exitosa a MongoDB Atlas")
+                
+            except Exception as e:
+                print(f"Error conectando a MongoDB: {e}")
+                raise e
+    
+    def get_db(self):
+        """Base de datos del cliente del proceso actual (conecta la primera vez)"""
+        if self.db is None or self._pid != os.getpid():
+            with self._lock:
+                if self.db is None or self._pid != os.getpid():
+                    self.connect()
+        return self.db
+    
+    def _after_fork(self):
+        """
+        En el proceso hijo, olvidar el cliente heredado del padre
+        
+        No se cierra: sus sockets siguen siendo del padre. El hijo conecta
+        con su propio pool en la primera consulta.
+        """
+        self.client = None
+        self.db = None
+        self._lock = threading.RLock()
+        self.pool_monitor.reset()
+    
+    def max_time_ms(self, analytics=False):
+        """Límite por operación (maxTimeMS) de las lecturas de la API, o None"""
+        value = Config.MONGO_ANALYTICS_MAX_TIME_MS if analytics else Config.MONGO_MAX_TIME_MS
+        return value if value > 0 else None
+    
+    def aggregate_options(self, analytics=False):
+        """Opciones de aggregate() con el maxTimeMS configurado"""
+        max_time_ms = self.max_time_ms(analytics)
+        return {"maxTimeMS": max_time_ms} if max_time_ms else {}
     
     def create_indexes(self):
         """Crear índices necesarios para la aplicación"""
@@ -35,21 +318,70 @@ class Database:
             self.db.sonidos.create_index("etiquetas")
             self.db.sonidos.create_index("autor")
             
+            # Índices compuestos para paginación por cursor (fecha, _id)
+            self.db.sonidos.create_index([("fecha", DESCENDING), ("_id", DESCENDING)])
+            self.db.sonidos.create_index([
+                ("emociones", ASCENDING),
+                ("fecha", DESCENDING),
+                ("_id", DESCENDING)
+            ])
+            
+            # Búsqueda de texto completo (sin distinguir mayúsculas ni acentos)
+            self.db.sonidos.create_index(
+                [("nombre", TEXT), ("etiquetas", TEXT), ("descripcion", TEXT)],
+                weights={"nombre": 10, "etiquetas": 5, "descripcion": 1},
+                default_language="spanish",
+                language_override="idioma_busqueda",
+                name="busqueda_texto"
+            )
+            
+            # Campos normalizados para búsqueda por prefijo
+            self.db.sonidos.create_index("nombre_norm")
+            self.db.sonidos.create_index("etiquetas_norm")
+            self.db.sonidos.create_index("autor_norm")
+            
+            # Geohash de cada sonido y contadores precalculados por celda
+            self.db.sonidos.create_index("geohash")
+            self.db.sonidos_celdas.create_index([("precision", ASCENDING), ("count", DESCENDING)])
+            self.db.sonidos_celdas.create_index([("precision", ASCENDING), ("centro", GEOSPHERE)])
+            
+            # Estadísticas materializadas por emoción, etiqueta y día
+            self.db.sonidos_stats.create_index([("tipo", ASCENDING), ("count", DESCENDING)])
+            self.db.sonidos_stats.create_index([("tipo", ASCENDING), ("fecha", DESCENDING)])
+            
             print("Índices creados exitosamente")
             
         except Exception as e:
             print(f"Error creando índices: {e}")
     
-    def get_collection(self, collection_name):
-        """Obtener una colección de la base de datos"""
-        if self.db is None:
-            self.connect()
-        return self.db[collection_name]
+    def get_collection(self, collection_name, analytics=False):
+        """
+        Obtener una colección de la base de datos
+        
+        Args:
+            collection_name: Nombre de la colección
+            analytics: Leer con MONGO_ANALYTICS_READ_PREFERENCE (secundarios)
+        """
+        return CollectionHandle(self, collection_name, analytics)
+    
+    def pool_stats(self):
+        """Configuración y métricas del pool de conexiones de este proceso"""
+        return {
+            **pool_summary(self.pool_monitor),
+            "connected": self.client is not None
+        }
     
     def close_connection(self):
         """Cerrar conexión a la base de datos"""
-        if self.client:
-            self.client.close()
+        with self._lock:
+            if self.client:
+                self.client.close()
+            self.client = None
+            self.db = None
 
 # Instancia global de la base de datos
-db_instance = Database()
\ No newline at end of file
+db_instance = Database()
+
+# Los workers de un servidor pre-fork (gunicorn --preload) abren su propio cliente
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=db_instance._after_fork)
\ No newline at end of file
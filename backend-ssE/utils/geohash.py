@@ -0,0 +1,111 @@
+"""
+Codificación geohash para indexar y agrupar ubicaciones en celdas
+"""
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BASE32_INDEX = {char: i for i, char in enumerate(BASE32)}
+
+
+def encode(lat, lng, precision=9):
+    """
+    Codificar una coordenada como geohash
+
+    Args:
+        lat: Latitud
+        lng: Longitud
+        precision: Número de caracteres del geohash
+
+    Returns:
+        str: Geohash de la coordenada
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bit = 0
+    char_index = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                char_index = char_index * 2 + 1
+                lng_range[0] = mid
+            else:
+                char_index = char_index * 2
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                char_index = char_index * 2 + 1
+                lat_range[0] = mid
+            else:
+                char_index = char_index * 2
+                lat_range[1] = mid
+
+        even = not even
+        bit += 1
+        if bit == 5:
+            geohash.append(BASE32[char_index])
+            bit = 0
+            char_index = 0
+
+    return ''.join(geohash)
+
+
+def decode_bbox(geohash):
+    """
+    Obtener los límites de la celda de un geohash
+
+    Args:
+        geohash: Geohash a decodificar
+
+    Returns:
+        tuple: (min_lng, min_lat, max_lng, max_lat)
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return lng_range[0], lat_range[0], lng_range[1], lat_range[1]
+
+
+def decode_center(geohash):
+    """
+    Obtener el centro de la celda de un geohash
+
+    Returns:
+        tuple: (lng, lat)
+    """
+    min_lng, min_lat, max_lng, max_lat = decode_bbox(geohash)
+    return (min_lng + max_lng) / 2, (min_lat + max_lat) / 2
+
+
+def cell_size(precision):
+    """
+    Tamaño en grados de una celda de la precisión indicada
+
+    Returns:
+        tuple: (ancho en longitud, alto en latitud)
+    """
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 360.0 / (2 ** lng_bits), 180.0 / (2 ** lat_bits)
+
+
+def prefixes(geohash, precisions):
+    """Prefijos del geohash para cada precisión indicada"""
+    return [geohash[:p] for p in precisions if p <= len(geohash)]
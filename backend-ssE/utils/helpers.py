@@ -3,9 +3,15 @@ Funciones auxiliares para SoundScape Explorer Backend
 """
 
 import os
+import re
+import json
+import base64
 import hashlib
 import mimetypes
+import unicodedata
+import numpy as np
 from datetime import datetime
+from flask import current_app, request
 from werkzeug.utils import secure_filename
 
 def validate_audio_file(file, allowed_extensions, max_size_mb=50):
@@ -116,6 +122,95 @@ def validate_coordinates(lat, lng):
     except (ValueError, TypeError):
         return False
 
+def parse_bbox(bbox):
+    """
+    Parsear un bounding box "minLng,minLat,maxLng,maxLat"
+    
+    Args:
+        bbox: Texto con las cuatro coordenadas separadas por comas
+    
+    Returns:
+        tuple: (min_lng, min_lat, max_lng, max_lat)
+    
+    Raises:
+        ValueError: Si el formato o las coordenadas no son válidas
+    """
+    try:
+        min_lng, min_lat, max_lng, max_lat = [float(v) for v in bbox.split(',')]
+    except (ValueError, AttributeError):
+        raise ValueError("bbox debe tener el formato minLng,minLat,maxLng,maxLat")
+    
+    if not (validate_coordinates(min_lat, min_lng) and validate_coordinates(max_lat, max_lng)):
+        raise ValueError("bbox contiene coordenadas fuera de rango")
+    
+    if min_lat >= max_lat:
+        raise ValueError("bbox: minLat debe ser menor que maxLat")
+    
+    return min_lng, min_lat, max_lng, max_lat
+
+def build_bbox_filter(bbox, field="ubicacion", step_deg=10):
+    """
+    Construir un filtro $geoWithin para un bounding box que aprovecha el índice 2dsphere
+    
+    Los bordes se densifican para que las geodésicas sigan los paralelos y se
+    usa el CRS strictwinding para admitir cajas mayores que un hemisferio. Si
+    la caja cruza el antimeridiano (minLng > maxLng) o supera 180° se divide.
+    
+    Args:
+        bbox: Tupla (min_lng, min_lat, max_lng, max_lat)
+        field: Campo GeoJSON a filtrar
+        step_deg: Separación máxima entre vértices de los bordes
+    
+    Returns:
+        dict: Filtro de MongoDB
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    
+    # Los polos colapsan los vértices del anillo, así que se excluyen
+    min_lat = max(min_lat, -89.999)
+    max_lat = min(max_lat, 89.999)
+    
+    if min_lng > max_lng:
+        spans = [(min_lng, 180.0), (-180.0, max_lng)]
+    else:
+        spans = [(min_lng, max_lng)]
+    
+    # Cada polígono abarca como máximo 180° de longitud
+    pieces = []
+    for west, east in spans:
+        while east - west > 180:
+            pieces.append((west, west + 180))
+            west += 180
+        pieces.append((west, east))
+    
+    filters = []
+    for west, east in pieces:
+        steps = max(1, int((east - west) // step_deg) + 1)
+        lngs = [west + (east - west) * i / steps for i in range(steps + 1)]
+        
+        # Anillo en sentido antihorario, como exige strictwinding
+        ring = (
+            [[lng, min_lat] for lng in lngs] +
+            [[lng, max_lat] for lng in reversed(lngs)] +
+            [[west, min_lat]]
+        )
+        filters.append({
+            field: {
+                "$geoWithin": {
+                    "$geometry": {
+                        "type": "Polygon",
+                        "coordinates": [ring],
+                        "crs": {
+                            "type": "name",
+                            "properties": {"name": "urn:x-mongodb:crs:strictwinding:EPSG:4326"}
+                        }
+                    }
+                }
+            }
+        })
+    
+    return filters[0] if len(filters) == 1 else {"$or": filters}
+
 def sanitize_mongo_query(query_dict):
     """
     Limpiar parámetros de consulta para MongoDB
@@ -142,6 +237,89 @@ def sanitize_mongo_query(query_dict):
     
     return sanitized
 
+def mongo_safe_key(value):
+    """
+    Convertir un valor en una clave de campo válida para MongoDB
+    
+    Args:
+        value: Valor a usar como clave (p. ej. una emoción)
+    
+    Returns:
+        str: Clave sin '.' ni '$' inicial
+    """
+    return str(value).replace('.', '_').lstrip('$')
+
+def mongo_safe_keys(values):
+    """
+    Claves válidas para MongoDB de una lista de valores, en orden y sin repetir
+    
+    Se descartan los valores que no son texto y los que quedan vacíos
+    (p. ej. "" o "$"): un campo "emociones." invalida todo el $inc.
+    
+    Args:
+        values: Lista de valores (p. ej. las emociones de un sonido)
+    
+    Returns:
+        list: Claves no vacías
+    """
+    keys = []
+    for value in values or []:
+        if isinstance(value, str):
+            key = mongo_safe_key(value)
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+def normalize_text(value):
+    """
+    Normalizar texto para búsquedas sin distinguir mayúsculas ni acentos
+    
+    Args:
+        value: Texto original (p. ej. "Canción del Río")
+    
+    Returns:
+        str: Texto normalizado (p. ej. "cancion del rio")
+    """
+    if not value:
+        return ''
+    
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    without_marks = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(without_marks.casefold().split())
+
+def build_prefix_filter(field, prefix):
+    """
+    Filtro de prefijo anclado sobre un campo normalizado
+    
+    El texto del usuario se normaliza y se escapa, así que nunca se
+    interpreta como expresión regular y la consulta puede usar el índice.
+    
+    Args:
+        field: Campo normalizado (p. ej. "nombre_norm")
+        prefix: Texto escrito por el usuario
+    
+    Returns:
+        dict: Filtro de MongoDB
+    """
+    return {field: {"$regex": f"^{re.escape(normalize_text(prefix))}"}}
+
+def build_contains_filter(field, text):
+    """
+    Filtro de subcadena sobre un campo normalizado
+    
+    Como build_prefix_filter, pero el texto puede aparecer en cualquier
+    posición (p. ej. "garcia" encuentra a "Ana García"). Recorre todas las
+    claves del índice, así que solo conviene en campos cortos.
+    
+    Args:
+        field: Campo normalizado (p. ej. "autor_norm")
+        text: Texto escrito por el usuario
+    
+    Returns:
+        dict: Filtro de MongoDB
+    """
+    return {field: {"$regex": re.escape(normalize_text(text))}}
+
 def create_response(success=True, data=None, error=None, message=None):
     """
     Crear respuesta estándar de API
@@ -201,6 +379,56 @@ def paginate_results(results, page=1, page_size=20):
         }
     }
 
+def get_page_size(default):
+    """
+    Leer el parámetro limit de la request acotado por MAX_PAGE_SIZE
+    
+    Args:
+        default: Tamaño de página si no se envía limit
+    
+    Returns:
+        int: Tamaño de página válido
+    """
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+def encode_cursor(position):
+    """
+    Codificar la posición de una página como cursor opaco
+
+    Args:
+        position: Diccionario con los valores de la última clave vista
+
+    Returns:
+        str: Cursor en base64 apto para URLs
+    """
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decodificar un cursor generado por encode_cursor
+
+    Args:
+        cursor: Cursor recibido del cliente
+
+    Returns:
+        dict: Posición de la última clave vista
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+    if not isinstance(position, dict):
+        raise ValueError("Cursor inválido")
+
+    return position
+
 def log_api_request(endpoint, method, params=None, user_ip=None):
     """
     Log básico de requests de API (para desarrollo)
@@ -249,4 +477,23 @@ def calculate_distance_km(lat1, lng1, lat2, lng2):
     # Radio de la Tierra en km
     r = 6371
     
-    return c * r
\ No newline at end of file
+    return c * r
+
+def haversine_km_array(lat, lng, lats, lngs):
+    """
+    Distancias desde un punto a muchos puntos (Haversine vectorizada con NumPy)
+    
+    Args:
+        lat, lng: Coordenadas del punto de referencia
+        lats, lngs: Arrays con las coordenadas de los demás puntos
+    
+    Returns:
+        numpy.ndarray: Distancias en kilómetros (NaN si faltan coordenadas)
+    """
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    
+    a = np.sin((lat2 - lat1) / 2) ** 2 + \
+        np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    
+    return 2 * 6371 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
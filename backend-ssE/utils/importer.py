@@ -0,0 +1,221 @@
+"""
+Importación masiva de sonidos a partir de un manifiesto (CSV o JSON)
+
+Lo usan tanto POST /api/sounds/bulk (manifiesto + archivo ZIP) como el
+script bulk_import.py (manifiesto + directorio). Cada fila se valida, su
+audio se copia por bloques al almacenamiento y los documentos se insertan
+por lotes con insert_many no ordenado. Los errores se informan por fila
+sin detener el resto de la importación.
+"""
+
+import io
+import csv
+import json
+import time
+from pymongo.errors import PyMongoError
+from utils.helpers import validate_coordinates
+from utils.audio_storage import save_audio, delete_audio
+
+# Separadores aceptados en las columnas de lista de un CSV
+LIST_SEPARATORS = (';', '|')
+
+# Columnas de lista del manifiesto
+LIST_FIELDS = ('sonidos', 'emociones', 'etiquetas')
+
+def parse_manifest(content, filename):
+    """
+    Leer las filas de un manifiesto CSV o JSON
+
+    Args:
+        content: Contenido del manifiesto (bytes o str)
+        filename: Nombre del manifiesto, para saber su formato
+
+    Returns:
+        list: Filas como diccionarios
+
+    Raises:
+        ValueError: Si el manifiesto no se puede leer
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    try:
+        if filename.lower().endswith('.json'):
+            rows = json.loads(content)
+            if isinstance(rows, dict):
+                rows = rows.get('sonidos', [])
+        elif filename.lower().endswith('.csv'):
+            rows = list(csv.DictReader(io.StringIO(content)))
+        else:
+            raise ValueError("El manifiesto debe ser .csv o .json")
+    except (json.JSONDecodeError, csv.Error) as e:
+        raise ValueError(f"Manifiesto inválido: {e}") from e
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("El manifiesto debe ser una lista de sonidos")
+
+    return rows
+
+def _split_list(value):
+    """Columna de lista: array JSON o texto separado por ';' o '|'"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+
+    text = str(value)
+    for separator in LIST_SEPARATORS:
+        if separator in text:
+            return [item.strip() for item in text.split(separator) if item.strip()]
+    return [text.strip()] if text.strip() else []
+
+def validate_row(row, allowed_extensions):
+    """
+    Validar una fila del manifiesto y convertirla en datos de sonido
+
+    Returns:
+        tuple: (nombre del archivo de audio, datos para SoundModel)
+
+    Raises:
+        ValueError: Si la fila no es válida
+    """
+    audio_file = str(row.get('archivo') or '').strip()
+    if not audio_file:
+        raise ValueError("Falta la columna archivo")
+
+    extension = audio_file.rsplit('.', 1)[-1].lower() if '.' in audio_file else ''
+    if extension not in allowed_extensions:
+        raise ValueError(f"Formato no permitido. Use: {', '.join(allowed_extensions)}")
+
+    nombre = str(row.get('nombre') or '').strip()
+    if not nombre:
+        raise ValueError("Falta el nombre")
+
+    lat, lng = row.get('latitud'), row.get('longitud')
+    if not validate_coordinates(lat, lng):
+        raise ValueError(f"Coordenadas inválidas: {lat}, {lng}")
+
+    try:
+        duracion = int(float(row.get('duracion') or 0))
+    except (TypeError, ValueError):
+        raise ValueError("La duración debe ser numérica")
+
+    sound_data = {
+        'nombre': nombre,
+        'latitud': float(lat),
+        'longitud': float(lng),
+        'descripcion': str(row.get('descripcion') or ''),
+        'autor': str(row.get('autor') or '').strip() or None,
+        'duracion': duracion,
+        'calidad_audio': str(row.get('calidad_audio') or 'media')
+    }
+    for field in LIST_FIELDS:
+        sound_data[field] = _split_list(row.get(field))
+
+    return audio_file, sound_data
+
+class BulkImporter:
+    """Importa filas de un manifiesto por lotes e informa de errores y rendimiento"""
+
+    def __init__(self, sound_model, upload_folder, allowed_extensions, batch_size=500,
+                 on_created=None):
+        """
+        Args:
+            on_created: Función (sound_id, audio_url) llamada por cada sonido
+                creado, p. ej. para encolar el análisis de su audio
+        """
+        self.sound_model = sound_model
+        self.upload_folder = upload_folder
+        self.allowed_extensions = allowed_extensions
+        self.batch_size = batch_size
+        self.on_created = on_created
+
+    def run(self, rows, open_audio):
+        """
+        Importar las filas de un manifiesto
+
+        Args:
+            rows: Filas del manifiesto
+            open_audio: Función que recibe el nombre del archivo y devuelve un
+                context manager con el audio en binario (lanza ValueError
+                si no existe o no es válido)
+
+        Returns:
+            dict: Informe con creados, errores por fila y rendimiento
+        """
+        start = time.perf_counter()
+        report = {
+            "total": len(rows),
+            "created": 0,
+            "failed": 0,
+            "ids": [],
+            "errors": [],
+            "bytes": 0
+        }
+        batch = []
+
+        for position, row in enumerate(rows):
+            audio_file = row.get('archivo') if isinstance(row, dict) else None
+            try:
+                audio_file, sound_data = validate_row(row, self.allowed_extensions)
+                with open_audio(audio_file) as stream:
+                    stored = save_audio(stream, audio_file, self.upload_folder)
+                sound_data['audio_url'] = stored['audio_url']
+                report["bytes"] += stored['size']
+                batch.append((position, audio_file, sound_data))
+            except Exception as e:
+                self._add_error(report, position, audio_file, e)
+
+            if len(batch) >= self.batch_size:
+                self._flush(batch, report)
+                batch = []
+
+        self._flush(batch, report)
+
+        elapsed = time.perf_counter() - start
+        report["elapsed_seconds"] = round(elapsed, 3)
+        report["items_per_second"] = round(report["created"] / elapsed, 1) if elapsed else None
+        report["mb_per_second"] = round(report["bytes"] / 1048576 / elapsed, 2) if elapsed else None
+        return report
+
+    def _flush(self, batch, report):
+        """
+        Insertar un lote; los audios de las filas que no se insertaron se eliminan
+
+        Si MongoDB falla sin que se pueda saber qué filas llegaron, los
+        audios se conservan: un archivo sin sonido solo ocupa disco, un
+        sonido sin archivo no se puede reproducir.
+        """
+        if not batch:
+            return
+
+        keep_audio = False
+        try:
+            created, errors = self.sound_model.create_sounds_bulk(
+                [sound_data for _, _, sound_data in batch]
+            )
+        except PyMongoError as e:
+            created, errors = {}, {index: str(e) for index in range(len(batch))}
+            keep_audio = True
+        except (ValueError, TypeError) as e:
+            created, errors = {}, {index: str(e) for index in range(len(batch))}
+
+        for index, (position, audio_file, sound_data) in enumerate(batch):
+            if index in created:
+                report["created"] += 1
+                report["ids"].append(created[index])
+                if self.on_created:
+                    self.on_created(created[index], sound_data['audio_url'])
+            else:
+                if not keep_audio:
+                    delete_audio(sound_data['audio_url'], self.upload_folder)
+                self._add_error(report, position, audio_file, errors.get(index, "No insertado"))
+
+    @staticmethod
+    def _add_error(report, position, audio_file, error):
+        report["failed"] += 1
+        report["errors"].append({
+            "fila": position + 1,
+            "archivo": audio_file,
+            "error": str(error)
+        })
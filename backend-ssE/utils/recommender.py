@@ -0,0 +1,321 @@
+"""
+Motor de recomendaciones sobre una matriz dispersa sonidos × rasgos
+
+Cada sonido es una fila con sus emociones, etiquetas y tipos de sonido
+como columnas, ponderadas por campo y normalizadas (norma L2), de modo que
+el producto con las filas de los sonidos semilla da la similitud coseno
+con todo el catálogo en una sola multiplicación, vectorizada para un
+lote de semillas a la vez.
+
+Las escrituras no reconstruyen la matriz: la fila anterior se marca como
+inactiva y la nueva versión queda en un bloque pendiente que se puntúa
+aparte. Cuando ese bloque crece se compacta todo en una matriz nueva.
+
+En modo cercano la similitud se mezcla con la proximidad a la semilla,
+calculada con una Haversine vectorizada sobre las coordenadas de todas
+las filas.
+"""
+
+import time
+import threading
+import numpy as np
+from scipy import sparse
+from utils.helpers import haversine_km_array
+
+class Recommender:
+    """Similitud coseno ponderada entre sonidos por emociones, etiquetas y tipos"""
+
+    # Peso de cada campo en la similitud
+    FIELD_WEIGHTS = {
+        "emociones": 1.0,
+        "etiquetas": 1.0,
+        "sonidos": 0.5
+    }
+
+    # Campos que se leen de cada sonido
+    SOURCE_FIELDS = ("emociones", "etiquetas", "sonidos", "ubicacion")
+
+    # Filas pendientes a partir de las cuales se reconstruye la matriz
+    COMPACT_THRESHOLD = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._features = {}
+        self._vocabulary = {}
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._row_ids = []
+        self._row_of = {}
+        self._active = np.zeros(0, dtype=bool)
+        self._coordinates = np.zeros((0, 2))
+        self._pending = set()
+        self._loaded_at = None
+        self._refreshing = False
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def load(self, sounds_collection):
+        """
+        Construir la matriz completa desde la colección de sonidos
+
+        Returns:
+            int: Número de sonidos indexados
+        """
+        try:
+            vocabulary = {}
+            features = {}
+            fields = {field: 1 for field in self.SOURCE_FIELDS}
+            for sound in sounds_collection.find({}, fields):
+                features[str(sound['_id'])] = self._vectorize(sound, vocabulary)
+
+            state = self._build(features, len(vocabulary))
+
+            with self._lock:
+                self._vocabulary = vocabulary
+                self._features = features
+                self._install(state)
+                self._loaded_at = time.monotonic()
+
+            return len(features)
+
+        except Exception as e:
+            print(f"Error cargando recomendaciones: {e}")
+            raise e
+
+    def refresh_if_stale(self, sounds_collection, max_age):
+        """
+        Recargar la matriz en segundo plano si es más antigua que max_age
+
+        Cada worker mantiene su propia matriz; la recarga periódica recoge
+        las escrituras hechas por otros workers.
+        """
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < max_age
+            if fresh or self._refreshing:
+                return
+            self._refreshing = True
+
+        def reload():
+            try:
+                self.load(sounds_collection)
+            except Exception:
+                pass
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=reload, daemon=True).start()
+
+    def apply_change(self, previous, current):
+        """
+        Actualizar la fila de un sonido tras una escritura
+
+        Args:
+            previous: Documento antes de la escritura (None al crear)
+            current: Documento después de la escritura (None al eliminar)
+        """
+        sound = current or previous
+        if not sound or '_id' not in sound:
+            return
+
+        sound_id = str(sound['_id'])
+
+        with self._lock:
+            row = self._row_of.get(sound_id)
+            if row is not None:
+                self._active[row] = False
+
+            if current is None:
+                self._features.pop(sound_id, None)
+                self._pending.discard(sound_id)
+            else:
+                self._features[sound_id] = self._vectorize(current, self._vocabulary)
+                self._pending.add(sound_id)
+
+            if len(self._pending) > self.COMPACT_THRESHOLD:
+                self._install(self._build(self._features, len(self._vocabulary)))
+
+    def ensure_indexed(self, sound):
+        """Añadir un sonido que aún no está en la matriz (escrito por otro worker)"""
+        with self._lock:
+            indexed = str(sound['_id']) in self._features
+        if not indexed:
+            self.apply_change(None, sound)
+
+    def recommend(self, seed_ids, limit=10, max_km=None, geo_weight=0.5):
+        """
+        Sonidos más parecidos a cada semilla
+
+        Args:
+            seed_ids: IDs (str) de los sonidos de referencia
+            limit: Recomendaciones por semilla
+            max_km: Si se indica, solo sonidos a menos de max_km de la semilla,
+                puntuados mezclando similitud y proximidad
+            geo_weight: Peso de la proximidad (0-1) en el modo cercano
+
+        Returns:
+            dict: {seed_id: [(sound_id, puntuación, distancia en km o None)]};
+                las semillas que no están en el índice no aparecen
+        """
+        with self._lock:
+            seeds = [seed_id for seed_id in dict.fromkeys(seed_ids) if seed_id in self._features]
+            if not seeds:
+                return {}
+
+            n_features = len(self._vocabulary)
+            queries = self._rows_matrix([self._features[seed_id] for seed_id in seeds], n_features)
+
+            # Filas de la matriz compactada (dispersa × densa): (sonidos × semillas)
+            base_columns = self._matrix.shape[1]
+            dense_queries = queries[:, :base_columns].T.toarray()
+            base_scores = np.asarray(self._matrix @ dense_queries)
+
+            # Filas escritas desde la última compactación
+            pending_ids = list(self._pending)
+            pending_scores = np.zeros((0, len(seeds)), dtype=np.float32)
+            pending_coordinates = np.zeros((0, 2))
+            if pending_ids:
+                pending_features = [self._features[sound_id] for sound_id in pending_ids]
+                pending_rows = self._rows_matrix(pending_features, n_features)
+                pending_scores = (pending_rows @ queries.T).toarray()
+                pending_coordinates = np.array([location for _, _, location in pending_features])
+
+            scores = np.concatenate([base_scores, pending_scores])
+            active = np.concatenate([self._active, np.ones(len(pending_ids), dtype=bool)])
+            scores[~active] = 0
+            n_base = len(self._row_ids)
+
+            if max_km is not None:
+                coordinates = np.concatenate([self._coordinates, pending_coordinates])
+                # Un grado de latitud mide ~111 km: descarta filas lejanas sin trigonometría
+                lat_band = max_km / 111.0 + 1e-6
+
+            recommendations = {}
+            for column, seed_id in enumerate(seeds):
+                column_scores = scores[:, column]
+                distances = None
+
+                seed_lat, seed_lng = self._features[seed_id][2]
+                if max_km is not None and not np.isnan(seed_lat):
+                    candidates = np.flatnonzero(
+                        active & (np.abs(coordinates[:, 0] - seed_lat) <= lat_band)
+                    )
+                    candidate_distances = haversine_km_array(
+                        seed_lat, seed_lng,
+                        coordinates[candidates, 0], coordinates[candidates, 1]
+                    )
+                    within = candidate_distances <= max_km
+                    candidates = candidates[within]
+
+                    distances = np.full(len(column_scores), np.inf)
+                    distances[candidates] = candidate_distances[within]
+
+                    near_scores = np.zeros_like(column_scores)
+                    near_scores[candidates] = (
+                        (1 - geo_weight) * column_scores[candidates]
+                        + geo_weight * (1 - distances[candidates] / max_km)
+                    )
+                    column_scores = near_scores
+
+                # Solo se traducen a IDs las mejores posiciones
+                results = []
+                for position in self._best_positions(column_scores, limit + 1):
+                    score = float(column_scores[position])
+                    if score <= 0:
+                        break
+                    if position < n_base:
+                        sound_id = self._row_ids[position]
+                    else:
+                        sound_id = pending_ids[position - n_base]
+                    if sound_id != seed_id:
+                        distance = None if distances is None else round(float(distances[position]), 3)
+                        results.append((sound_id, round(score, 4), distance))
+
+                recommendations[seed_id] = results[:limit]
+
+            return recommendations
+
+    def stats(self):
+        """Tamaño de la matriz"""
+        with self._lock:
+            return {
+                "sounds": len(self._features),
+                "features": len(self._vocabulary),
+                "nonzero": int(self._matrix.nnz),
+                "pending": len(self._pending),
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self.loaded else None
+            }
+
+    @staticmethod
+    def _best_positions(scores, count):
+        """Posiciones de las count puntuaciones más altas, de mayor a menor"""
+        count = min(count, len(scores))
+        if count == 0:
+            return []
+
+        best = np.argpartition(-scores, count - 1)[:count]
+        return best[np.argsort(-scores[best], kind='stable')]
+
+    def _vectorize(self, sound, vocabulary):
+        """
+        Columnas, pesos normalizados y coordenadas de un sonido
+
+        Returns:
+            tuple: (array de columnas, array de pesos, (lat, lng) o NaN)
+        """
+        columns = []
+        weights = []
+        for field, weight in self.FIELD_WEIGHTS.items():
+            values = sound.get(field) or []
+            if not isinstance(values, list):
+                values = [values]
+            for value in set(values):
+                if not isinstance(value, str) or not value:
+                    continue
+                column = vocabulary.setdefault((field, value), len(vocabulary))
+                columns.append(column)
+                weights.append(weight)
+
+        weights = np.asarray(weights, dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        if norm:
+            weights /= norm
+
+        location = (np.nan, np.nan)
+        try:
+            lng, lat = sound['ubicacion']['coordinates']
+            location = (float(lat), float(lng))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        return np.asarray(columns, dtype=np.int32), weights, location
+
+    @staticmethod
+    def _rows_matrix(rows, n_features):
+        """Matriz CSR a partir de una lista de (columnas, pesos, coordenadas)"""
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row[0]) for row in rows])
+        indices = np.concatenate([row[0] for row in rows]) if rows else np.zeros(0, np.int32)
+        data = np.concatenate([row[1] for row in rows]) if rows else np.zeros(0, np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), n_features))
+
+    def _build(self, features, n_features):
+        """Compactar todas las filas en una matriz nueva"""
+        row_ids = list(features)
+        rows = [features[sound_id] for sound_id in row_ids]
+        matrix = self._rows_matrix(rows, n_features)
+        coordinates = np.array([row[2] for row in rows]).reshape(len(rows), 2)
+        return matrix, row_ids, coordinates
+
+    def _install(self, state):
+        """Sustituir la matriz compactada (con el lock tomado)"""
+        matrix, row_ids, coordinates = state
+        self._matrix = matrix
+        self._coordinates = coordinates
+        self._row_ids = row_ids
+        self._row_of = {sound_id: row for row, sound_id in enumerate(row_ids)}
+        self._active = np.ones(len(row_ids), dtype=bool)
+        self._pending = set()
+
+# Instancia global del motor de recomendaciones
+recommender = Recommender()
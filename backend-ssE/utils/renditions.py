@@ -0,0 +1,305 @@
+"""
+Versiones comprimidas de los audios para reproducir en streaming
+
+Un WAV de campo de 3 minutos pesa ~30 MB; una versión Opus a 64 kbps
+pesa ~1.5 MB. Las versiones se generan con ffmpeg la primera vez que se
+piden con ?quality= o ?format= (o en segundo plano al crear el sonido, con
+RENDITIONS_EAGER) y se guardan en RENDITIONS_FOLDER junto a la ruta del
+audio original:
+
+    <RENDITIONS_FOLDER>/ab/cd/<sha256>.<calidad>.<ext>
+
+La carpeta funciona como caché LRU: cada acceso actualiza el atime del
+archivo y, al pasar de RENDITIONS_MAX_BYTES, se borran las versiones
+menos usadas. Si ffmpeg no está disponible o falla, se sirve el original.
+
+Un Accept que lista audio/ogg o audio/mpeg (como el de Firefox en un
+<audio>) solo recibe la versión si ya está generada; si no, se sirve el
+original y la versión se encola en segundo plano, sin transcodificar
+dentro de la petición.
+"""
+
+import os
+import contextlib
+import time
+import uuid
+import shutil
+import threading
+import subprocess
+from config import Config
+from utils.tasks import task_queue
+
+# Bitrate (kbps) de cada calidad por formato
+QUALITY_BITRATES = {
+    'opus': {'low': 32, 'medium': 64, 'high': 128},
+    'mp3': {'low': 64, 'medium': 128, 'high': 192}
+}
+DEFAULT_QUALITY = 'medium'
+
+# Contenedor, extensión y códec de cada formato
+RENDITION_FORMATS = {
+    'opus': {
+        'mimetypes': ('audio/ogg', 'audio/opus', 'application/ogg'),
+        'extension': '.ogg',
+        'args': ['-c:a', 'libopus', '-vbr', 'on', '-f', 'ogg']
+    },
+    'mp3': {
+        'mimetypes': ('audio/mpeg', 'audio/mp3'),
+        'extension': '.mp3',
+        'args': ['-c:a', 'libmp3lame', '-f', 'mp3']
+    }
+}
+
+# Al superar el límite se libera hasta quedar en esta fracción
+EVICTION_TARGET = 0.9
+
+def select_rendition(quality=None, output_format=None, accept=None):
+    """
+    Elegir la versión a servir
+
+    Args:
+        quality: Parámetro quality (low, medium, high u original)
+        output_format: Parámetro format (opus o mp3)
+        accept: request.accept_mimetypes
+
+    Returns:
+        tuple | None: (formato, calidad, explícita), o None para servir el
+            original. explícita es False si la versión sale solo de Accept
+
+    Raises:
+        ValueError: Si la calidad o el formato no existen
+    """
+    if quality == 'original':
+        return None
+    if quality is not None and quality not in QUALITY_BITRATES['opus']:
+        raise ValueError(f"quality debe ser una de: original, {', '.join(QUALITY_BITRATES['opus'])}")
+    if output_format is not None and output_format not in RENDITION_FORMATS:
+        raise ValueError(f"format debe ser uno de: {', '.join(RENDITION_FORMATS)}")
+
+    explicit = quality is not None or output_format is not None
+
+    # Formato pedido explícitamente en Accept (los comodines no cuentan:
+    # un cliente que envía */* sigue recibiendo el original)
+    listed = [value for value, q in (accept or []) if q > 0]
+    if output_format is None:
+        output_format = next(
+            (name for value in listed for name, spec in RENDITION_FORMATS.items()
+             if value in spec['mimetypes']),
+            None
+        )
+
+    if quality is None and output_format is None:
+        return None
+
+    return output_format or 'opus', quality or DEFAULT_QUALITY, explicit
+
+class RenditionCache:
+    """Versiones comprimidas en disco con límite de tamaño LRU"""
+
+    def __init__(self, folder, max_bytes, encoder='ffmpeg', timeout=300):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.encoder = encoder
+        self.timeout = timeout
+        self._locks = {}
+        self._pending = set()
+        self._locks_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    def encoder_path(self):
+        """Ruta del ejecutable de ffmpeg o None si no está instalado"""
+        return shutil.which(self.encoder)
+
+    def relative_path(self, key, output_format, quality):
+        """Ruta de una versión dentro de la carpeta de versiones"""
+        base = os.path.splitext(key)[0]
+        return f"{base}.{quality}{RENDITION_FORMATS[output_format]['extension']}"
+
+    def path(self, key, output_format, quality):
+        return os.path.join(self.folder, *self.relative_path(key, output_format, quality).split('/'))
+
+    @contextlib.contextmanager
+    def _locked(self, path):
+        """
+        Bloqueo de generación de una versión
+
+        Cada entrada cuenta los hilos que la usan y se borra con el último,
+        así que solo hay tantas como versiones generándose a la vez.
+        """
+        with self._locks_lock:
+            lock, users = self._locks.get(path, (None, 0))
+            lock = lock or threading.Lock()
+            self._locks[path] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._locks_lock:
+                lock, users = self._locks[path]
+                if users > 1:
+                    self._locks[path] = (lock, users - 1)
+                else:
+                    del self._locks[path]
+
+    def cached(self, key, output_format, quality):
+        """Ruta relativa de la versión si ya está generada, o None (sin generarla)"""
+        if self._touch(self.path(key, output_format, quality)):
+            return self.relative_path(key, output_format, quality)
+        return None
+
+    def get(self, key, output_format, quality, storage):
+        """
+        Ruta relativa de la versión, generándola si aún no existe
+
+        Args:
+            key: Clave del audio original
+            output_format: opus o mp3
+            quality: low, medium o high
+            storage: Backend donde está el original
+
+        Returns:
+            str | None: Ruta relativa a self.folder, o None si no se pudo generar
+        """
+        relative_path = self.cached(key, output_format, quality)
+        if relative_path:
+            return relative_path
+
+        # Una sola generación por versión; el resto de peticiones esperan
+        path = self.path(key, output_format, quality)
+        with self._locked(path):
+            if not os.path.isfile(path) and not self._encode(key, output_format, quality, storage, path):
+                return None
+
+        self._evict(keep=path)
+        return self.relative_path(key, output_format, quality)
+
+    def _touch(self, path):
+        """Marcar un acceso (atime) sin cambiar mtime, que forma parte del ETag"""
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+            return True
+        except OSError:
+            return False
+
+    def _encode(self, key, output_format, quality, storage, path):
+        encoder = self.encoder_path()
+        if encoder is None:
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        bitrate = QUALITY_BITRATES[output_format][quality]
+
+        try:
+            with storage.local_copy(key) as source:
+                subprocess.run(
+                    [encoder, '-nostdin', '-v', 'error', '-y', '-i', source,
+                     '-vn', '-map_metadata', '-1', '-b:a', f'{bitrate}k',
+                     *RENDITION_FORMATS[output_format]['args'], temp_path],
+                    check=True, capture_output=True, timeout=self.timeout
+                )
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            stderr = getattr(e, 'stderr', None) or b''
+            print(f"Error generando versión {output_format}/{quality} de {key}: {e} {stderr.decode(errors='replace')[-500:]}")
+            return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _files(self):
+        for directory, _, filenames in os.walk(self.folder):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat
+
+    def _evict(self, keep=None):
+        """Borrar las versiones menos usadas hasta quedar bajo el límite (salvo keep)"""
+        if not self.max_bytes:
+            return 0
+
+        with self._evict_lock:
+            files = list(self._files())
+            total = sum(stat.st_size for _, stat in files)
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for path, stat in sorted(files, key=lambda item: item[1].st_atime_ns):
+                if total <= self.max_bytes * EVICTION_TARGET:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= stat.st_size
+                removed += 1
+            return removed
+
+    def remove(self, key):
+        """Eliminar todas las versiones de un audio"""
+        removed = 0
+        if key is None:
+            return removed
+        for output_format, qualities in QUALITY_BITRATES.items():
+            for quality in qualities:
+                path = self.path(key, output_format, quality)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def schedule(self, key, storage, output_format='opus', quality=DEFAULT_QUALITY):
+        """Generar una versión en segundo plano (una sola tarea por versión)"""
+        if self.encoder_path() is None:
+            return None
+
+        path = self.path(key, output_format, quality)
+        with self._locks_lock:
+            if path in self._pending:
+                return None
+            self._pending.add(path)
+
+        try:
+            return task_queue.submit(self._generate, key, output_format, quality, storage, path)
+        except Exception:
+            self._discard_pending(path)
+            raise
+
+    def _generate(self, key, output_format, quality, storage, path):
+        try:
+            return self.get(key, output_format, quality, storage)
+        finally:
+            self._discard_pending(path)
+
+    def _discard_pending(self, path):
+        with self._locks_lock:
+            self._pending.discard(path)
+
+    def stats(self):
+        files = list(self._files())
+        return {
+            "files": len(files),
+            "bytes": sum(stat.st_size for _, stat in files),
+            "max_bytes": self.max_bytes,
+            "pending": len(self._pending),
+            "encoder": self.encoder_path() is not None
+        }
+
+# Instancia global de la caché de versiones
+rendition_cache = RenditionCache(
+    Config.RENDITIONS_FOLDER,
+    Config.RENDITIONS_MAX_BYTES,
+    encoder=Config.FFMPEG_BINARY,
+    timeout=Config.RENDITION_TIMEOUT
+)
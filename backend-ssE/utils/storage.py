@@ -0,0 +1,254 @@
+"""
+Backends de almacenamiento de los archivos de audio
+
+- local: directorio de uploads, con las rutas repartidas por prefijo del hash
+- s3: cualquier almacenamiento compatible con S3 (AWS, MinIO, ...). Los
+  clientes suben directamente con URLs prefirmadas y las descargas se
+  redirigen al almacenamiento, así que los workers de Flask no transmiten
+  los bytes del audio.
+
+Las claves son rutas relativas (ab/cd/<sha256>.wav) que generan
+utils.audio_storage; el backend solo decide dónde viven esos bytes.
+"""
+
+import os
+import base64
+import hashlib
+import shutil
+import tempfile
+import mimetypes
+from contextlib import contextmanager
+from flask import redirect
+from config import Config
+from utils.streaming import send_audio_file
+
+class LocalStorageBackend:
+    """Archivos en el directorio de uploads, servidos con Range y ETag"""
+
+    name = "local"
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def put_file(self, source_path, key):
+        """Mover un archivo local a su clave (un renombrado en el mismo disco)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(source_path, path)
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def size(self, key):
+        """Tamaño en bytes o None si no existe"""
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            return None
+
+    def sha256(self, key):
+        """SHA-256 (hex) del contenido o None si no existe"""
+        digest = hashlib.sha256()
+        try:
+            with open(self.path(key), 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def delete(self, key):
+        """Eliminar un archivo; devuelve True si existía"""
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    @contextmanager
+    def local_copy(self, key):
+        """Ruta local del archivo para procesarlo (aquí es el propio archivo)"""
+        yield self.path(key)
+
+    def serve(self, key):
+        """Respuesta HTTP con el audio"""
+        return send_audio_file(self.root, key)
+
+    def presigned_upload(self, key, sha256, size, expires):
+        raise ValueError("El almacenamiento local no admite subidas directas")
+
+class S3StorageBackend:
+    """
+    Almacenamiento compatible con S3
+
+    Con S3_ENDPOINT_URL apunta a cualquier servicio compatible (MinIO,
+    LocalStack, moto_server), que es como se prueba en local.
+    """
+
+    name = "s3"
+
+    # Los audios por hash nunca cambian
+    CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None,
+                 access_key_id=None, secret_access_key=None, url_expires=3600,
+                 public_url=None, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client(
+                's3',
+                endpoint_url=endpoint_url or None,
+                region_name=region or None,
+                aws_access_key_id=access_key_id or None,
+                aws_secret_access_key=secret_access_key or None
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.url_expires = url_expires
+        self.public_url = (public_url or '').rstrip('/')
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put_file(self, source_path, key):
+        """Subir un archivo local y eliminarlo"""
+        self.client.upload_file(
+            source_path, self.bucket, self._object_key(key),
+            ExtraArgs={
+                'ContentType': mimetypes.guess_type(key)[0] or 'application/octet-stream',
+                'CacheControl': self.CACHE_CONTROL
+            }
+        )
+        os.remove(source_path)
+
+    def exists(self, key):
+        return self.size(key) is not None
+
+    def size(self, key):
+        """Tamaño en bytes o None si no existe"""
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return head['ContentLength']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def sha256(self, key):
+        """
+        SHA-256 (hex) que el almacenamiento calculó al recibir el objeto
+
+        Returns:
+            str | None: None si no existe o si se subió sin checksum
+        """
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(
+                Bucket=self.bucket, Key=self._object_key(key), ChecksumMode='ENABLED'
+            )
+        except ClientError:
+            return None
+        checksum = head.get('ChecksumSHA256')
+        return base64.b64decode(checksum).hex() if checksum else None
+
+    def delete(self, key):
+        """Eliminar un objeto; devuelve True si existía"""
+        if not self.exists(key):
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return True
+
+    @contextmanager
+    def local_copy(self, key):
+        """Descargar el objeto a un archivo temporal para procesarlo"""
+        suffix = os.path.splitext(key)[1]
+        descriptor, path = tempfile.mkstemp(suffix=suffix)
+        os.close(descriptor)
+        try:
+            self.client.download_file(self.bucket, self._object_key(key), path)
+            yield path
+        finally:
+            os.remove(path)
+
+    def serve(self, key):
+        """Redirigir al objeto (CDN pública o URL prefirmada de lectura)"""
+        if self.public_url:
+            url = f"{self.public_url}/{self._object_key(key)}"
+        else:
+            url = self.client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket, 'Key': self._object_key(key)},
+                ExpiresIn=self.url_expires
+            )
+
+        response = redirect(url, code=302)
+        # La redirección caduca con la firma; el objeto en sí es inmutable
+        response.headers['Cache-Control'] = f'private, max-age={max(self.url_expires // 2, 0)}'
+        return response
+
+    def presigned_upload(self, key, sha256, size, expires=None):
+        """
+        URL prefirmada para subir el audio directamente con PUT
+
+        El SHA-256 y el tamaño forman parte de la firma: el almacenamiento
+        rechaza un cuerpo distinto del anunciado, así que la clave por hash
+        no se puede llenar con otro contenido.
+
+        Returns:
+            dict: {url, method, headers, expires_in}
+        """
+        expires = expires or self.url_expires
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        url = self.client.generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self._object_key(key),
+                'ContentType': content_type,
+                'ContentLength': size,
+                'ChecksumSHA256': checksum,
+                'CacheControl': self.CACHE_CONTROL
+            },
+            ExpiresIn=expires
+        )
+        return {
+            "url": url,
+            "method": "PUT",
+            "expires_in": expires,
+            "headers": {
+                "Content-Type": content_type,
+                "x-amz-checksum-sha256": checksum,
+                "Cache-Control": self.CACHE_CONTROL
+            }
+        }
+
+_s3_backend = None
+
+def get_storage(upload_folder):
+    """
+    Backend configurado en STORAGE_BACKEND
+
+    Args:
+        upload_folder: Directorio de uploads (raíz del backend local)
+    """
+    global _s3_backend
+    if Config.STORAGE_BACKEND == 's3':
+        if _s3_backend is None:
+            _s3_backend = S3StorageBackend(
+                Config.S3_BUCKET,
+                prefix=Config.S3_PREFIX,
+                endpoint_url=Config.S3_ENDPOINT_URL,
+                region=Config.S3_REGION,
+                access_key_id=Config.S3_ACCESS_KEY_ID,
+                secret_access_key=Config.S3_SECRET_ACCESS_KEY,
+                url_expires=Config.S3_URL_EXPIRES,
+                public_url=Config.S3_PUBLIC_URL
+            )
+        return _s3_backend
+    return LocalStorageBackend(upload_folder)
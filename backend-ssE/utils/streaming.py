@@ -0,0 +1,226 @@
+"""
+Servicio de archivos de audio con soporte de rangos HTTP (206),
+ETags fuertes y peticiones condicionales (304)
+"""
+
+import os
+import re
+import uuid
+import hashlib
+import mimetypes
+from datetime import datetime, timezone
+from flask import Response, abort, current_app, request
+from werkzeug.http import http_date
+from werkzeug.security import safe_join
+
+# Tamaño de bloque para leer el archivo mientras se transmite
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Máximo de rangos aceptados en una petición multi-rango
+MAX_RANGES = 16
+
+# Los archivos subidos (y sus versiones comprimidas) se nombran por su hash
+# (o, los antiguos, con un prefijo UUID) y nunca se sobrescriben
+IMMUTABLE_FILENAME_PATTERN = re.compile(
+    r'^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_'
+    r'|(?:[0-9a-f]{2}/){2}[0-9a-f]{64}(?:\.\w+)*$)'
+)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, no-cache'
+
+
+def send_audio_file(directory, filename):
+    """
+    Servir un archivo de audio soportando Range, ETag y peticiones condicionales
+
+    Args:
+        directory: Directorio donde están los archivos
+        filename: Nombre del archivo solicitado
+
+    Returns:
+        Response: 200, 206, 304 o 416 según la petición
+    """
+    # Igual que send_from_directory, las rutas relativas parten de la app
+    directory = os.path.join(current_app.root_path, directory)
+    file_path = safe_join(directory, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+
+    # Los directorios ocultos (.tmp, .sessions) guardan subidas a medio terminar
+    if any(part.startswith('.') for part in filename.split('/')):
+        abort(404)
+
+    stat = os.stat(file_path)
+    file_size = stat.st_size
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    etag = _build_etag(filename, stat)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    headers = {
+        'ETag': f'"{etag}"',
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': _cache_control_for(filename),
+        'Accept-Ranges': 'bytes'
+    }
+
+    if _is_not_modified(etag, last_modified):
+        return Response(status=304, headers=headers)
+
+    ranges = _requested_ranges(etag, last_modified)
+
+    if ranges is None:
+        headers['Content-Length'] = str(file_size)
+        return Response(
+            _read_file_ranges(file_path, [(0, file_size - 1)]),
+            status=200,
+            headers=headers,
+            mimetype=mimetype,
+            direct_passthrough=True
+        )
+
+    ranges = _resolve_ranges(ranges, file_size)
+
+    if not ranges:
+        headers['Content-Range'] = f'bytes */{file_size}'
+        return Response(status=416, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+        headers['Content-Length'] = str(end - start + 1)
+        return Response(
+            _read_file_ranges(file_path, ranges),
+            status=206,
+            headers=headers,
+            mimetype=mimetype,
+            direct_passthrough=True
+        )
+
+    # Respuesta multipart/byteranges para varios rangos
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: {mimetype}\r\n'
+            f'Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n'
+        ).encode('latin-1')
+        for start, end in ranges
+    ]
+    closing = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+
+    content_length = len(closing) + sum(
+        len(part) + (end - start + 1)
+        for part, (start, end) in zip(part_headers, ranges)
+    )
+    headers['Content-Length'] = str(content_length)
+
+    return Response(
+        _read_multipart_ranges(file_path, ranges, part_headers, closing),
+        status=206,
+        headers=headers,
+        content_type=f'multipart/byteranges; boundary={boundary}',
+        direct_passthrough=True
+    )
+
+
+def _build_etag(filename, stat):
+    """ETag fuerte derivado del nombre, tamaño y fecha de modificación"""
+    fingerprint = f"{filename}-{stat.st_size}-{stat.st_mtime_ns}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def _cache_control_for(filename):
+    """Los archivos por hash o con prefijo UUID son inmutables y se cachean un año"""
+    if IMMUTABLE_FILENAME_PATTERN.match(filename):
+        return IMMUTABLE_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+
+def _is_not_modified(etag, last_modified):
+    """Evaluar If-None-Match y, si no viene, If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+
+    return False
+
+
+def _requested_ranges(etag, last_modified):
+    """
+    Obtener los rangos pedidos, respetando If-Range
+
+    Returns:
+        list | None: Rangos crudos de la cabecera o None para enviar el archivo completo
+    """
+    if request.range is None or request.range.units != 'bytes':
+        return None
+
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None and if_range.date != last_modified:
+        return None
+
+    if len(request.range.ranges) > MAX_RANGES:
+        return None
+
+    return request.range.ranges
+
+
+def _resolve_ranges(ranges, file_size):
+    """
+    Convertir rangos de la cabecera a posiciones absolutas (inclusivas)
+    y fusionar los que se solapan
+    """
+    resolved = []
+    for begin, stop in ranges:
+        if begin < 0:
+            # Rango sufijo: los últimos N bytes
+            start = max(file_size + begin, 0)
+            end = file_size - 1
+        else:
+            start = begin
+            end = file_size - 1 if stop is None else min(stop, file_size) - 1
+
+        if start < file_size and start <= end:
+            resolved.append((start, end))
+
+    resolved.sort()
+    merged = []
+    for start, end in resolved:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def _read_file_ranges(file_path, ranges):
+    """Leer los rangos indicados del archivo en bloques acotados"""
+    with open(file_path, 'rb') as f:
+        for start, end in ranges:
+            yield from _read_range(f, start, end)
+
+
+def _read_multipart_ranges(file_path, ranges, part_headers, closing):
+    """Generar el cuerpo multipart/byteranges"""
+    with open(file_path, 'rb') as f:
+        for part, (start, end) in zip(part_headers, ranges):
+            yield part
+            yield from _read_range(f, start, end)
+        yield closing
+
+
+def _read_range(f, start, end):
+    """Leer un rango inclusivo de un archivo abierto"""
+    f.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
@@ -0,0 +1,322 @@
+"""
+Índice de prefijos en memoria para autocompletar búsquedas
+
+Guarda las claves normalizadas (minúsculas y sin acentos) de etiquetas,
+autores, nombres y emociones en arrays ordenados, uno por nivel de
+popularidad (1 sonido, 2-3, 4-7, 8-15...). Una sugerencia recorre los
+niveles de más a menos popular y en cada uno acota con búsqueda binaria
+el rango de claves con el prefijo; en cuanto se llena la respuesta se
+detiene, así que los prefijos de una letra no recorren todo el catálogo.
+Las respuestas se memorizan por prefijo y una escritura solo descarta las
+de los prefijos de los términos que cambia. Ninguna sugerencia toca MongoDB.
+
+Una recarga lee el catálogo sin bloquear las escrituras, que siguen
+modificando el índice anterior; los términos que cambian entretanto se
+recuentan desde MongoDB antes de sustituirlo para no perder esos cambios.
+"""
+
+import time
+import bisect
+import threading
+from collections import Counter
+from utils.helpers import normalize_text
+
+class PrefixIndex:
+    """Arrays ordenados de (clave, tipo, término) por nivel de popularidad"""
+
+    # Campo del sonido de cada tipo de término
+    KINDS = {
+        "etiqueta": "etiquetas",
+        "autor": "autor",
+        "nombre": "nombre",
+        "emocion": "emociones"
+    }
+
+    # Longitud mínima de las palabras de un nombre que se indexan por separado
+    MIN_WORD_LENGTH = 3
+
+    # Prefijos con respuestas memorizadas
+    MAX_CACHED_PREFIXES = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terms = {}
+        self._levels = []
+        self._cache = {}
+        self._loaded_at = None
+        self._refreshing = False
+        # Términos escritos durante una recarga: {(tipo, clave): {textos originales}}
+        self._touched = None
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def load(self, sounds_collection):
+        """
+        Construir el índice completo desde la colección de sonidos
+
+        El índice nuevo se construye aparte y se sustituye de una vez, así
+        que las sugerencias siguen respondiendo durante la carga.
+
+        Returns:
+            int: Número de términos indexados
+        """
+        try:
+            with self._lock:
+                self._touched = {}
+
+            terms = {}
+            fields = {field: 1 for field in self.KINDS.values()}
+            for sound in sounds_collection.find({}, fields):
+                for term, delta in self._contributions(sound).items():
+                    self._apply_term(terms, None, term, delta)
+
+            levels = []
+            for (kind, key), entry in terms.items():
+                level = self._level(entry["count"])
+                while len(levels) <= level:
+                    levels.append([])
+                levels[level].extend((token, kind, key) for token in self._tokens(kind, key))
+            for keys in levels:
+                keys.sort()
+
+            # Los términos escritos durante la lectura se recuentan primero sin
+            # el lock y, los que cambien mientras tanto, ya con el lock tomado
+            with self._lock:
+                touched, self._touched = self._touched, {}
+            self._recount(sounds_collection, terms, levels, touched)
+
+            with self._lock:
+                self._recount(sounds_collection, terms, levels, self._touched)
+                self._terms = terms
+                self._levels = levels
+                self._cache = {}
+                self._loaded_at = time.monotonic()
+                self._touched = None
+
+            return len(terms)
+
+        except Exception as e:
+            with self._lock:
+                self._touched = None
+            print(f"Error cargando índice de sugerencias: {e}")
+            raise e
+
+    def refresh_if_stale(self, sounds_collection, max_age):
+        """
+        Recargar el índice en segundo plano si es más antiguo que max_age
+
+        Cada worker mantiene su propio índice; la recarga periódica recoge
+        las escrituras hechas por otros workers.
+        """
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < max_age
+            if fresh or self._refreshing:
+                return
+            self._refreshing = True
+
+        def reload():
+            try:
+                self.load(sounds_collection)
+            except Exception:
+                pass
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=reload, daemon=True).start()
+
+    def apply_change(self, previous, current):
+        """
+        Aplicar al índice la diferencia entre dos versiones de un sonido
+
+        Args:
+            previous: Documento antes de la escritura (None al crear)
+            current: Documento después de la escritura (None al eliminar)
+        """
+        delta = self._contributions(current)
+        delta.subtract(self._contributions(previous))
+
+        with self._lock:
+            for term, change in delta.items():
+                if change:
+                    self._apply_term(self._terms, self._levels, term, change)
+                    self._invalidate(term)
+                    if self._touched is not None:
+                        kind, label = term
+                        self._touched.setdefault((kind, normalize_text(label)), set()).add(label)
+
+    def suggest(self, prefix, limit=10, kinds=None):
+        """
+        Términos que empiezan por el prefijo, ordenados por popularidad
+
+        Args:
+            prefix: Texto escrito por el usuario
+            limit: Número máximo de sugerencias
+            kinds: Tipos de término permitidos (None para todos)
+
+        Returns:
+            list: [{"texto", "tipo", "count"}]
+        """
+        needle = normalize_text(prefix)
+        if not needle:
+            return []
+
+        cache_key = (limit, tuple(sorted(kinds)) if kinds else None)
+
+        with self._lock:
+            cached = self._cache.get(needle, {}).get(cache_key)
+            if cached is not None:
+                return cached
+
+            selected = []
+            seen = set()
+
+            for level in range(len(self._levels) - 1, -1, -1):
+                keys = self._levels[level]
+                start = bisect.bisect_left(keys, (needle,))
+                end = bisect.bisect_left(keys, (needle + '\U0010ffff',))
+                needed = limit - len(selected)
+
+                matches = []
+                for position in range(start, end):
+                    if level == 0 and len(matches) >= needed:
+                        # Nivel de un solo sonido: todos empatan, basta con los primeros
+                        break
+                    _, kind, key = keys[position]
+                    if (kind, key) in seen or (kinds is not None and kind not in kinds):
+                        continue
+                    seen.add((kind, key))
+                    matches.append((-self._terms[(kind, key)]["count"], key, kind))
+
+                matches.sort()
+                selected.extend(matches[:needed])
+                if len(selected) >= limit:
+                    break
+
+            suggestions = [
+                {
+                    "texto": self._terms[(kind, key)]["labels"].most_common(1)[0][0],
+                    "tipo": kind,
+                    "count": -negative_count
+                }
+                for negative_count, key, kind in selected
+            ]
+
+            if len(self._cache) >= self.MAX_CACHED_PREFIXES:
+                self._cache = {}
+            self._cache.setdefault(needle, {})[cache_key] = suggestions
+            return suggestions
+
+    def stats(self):
+        """Tamaño del índice"""
+        with self._lock:
+            return {
+                "terms": len(self._terms),
+                "keys": sum(len(keys) for keys in self._levels),
+                "levels": [len(keys) for keys in self._levels],
+                "cached_prefixes": len(self._cache),
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self.loaded else None
+            }
+
+    def _apply_term(self, terms, levels, term, delta):
+        """Sumar delta sonidos a un término, moviendo sus claves si cambia de nivel"""
+        kind, label = term
+        key = normalize_text(label)
+        entry = terms.get((kind, key))
+
+        if entry is None:
+            if delta <= 0:
+                return
+            entry = terms[(kind, key)] = {"count": 0, "labels": Counter()}
+
+        old_level = self._level(entry["count"]) if entry["count"] > 0 else None
+
+        entry["count"] += delta
+        entry["labels"][label] += delta
+        if entry["labels"][label] <= 0:
+            del entry["labels"][label]
+
+        new_level = None
+        if entry["count"] <= 0 or not entry["labels"]:
+            del terms[(kind, key)]
+        else:
+            new_level = self._level(entry["count"])
+
+        if levels is None or old_level == new_level:
+            return
+
+        for token in self._tokens(kind, key):
+            if old_level is not None:
+                keys = levels[old_level]
+                position = bisect.bisect_left(keys, (token, kind, key))
+                if position < len(keys) and keys[position] == (token, kind, key):
+                    del keys[position]
+            if new_level is not None:
+                while len(levels) <= new_level:
+                    levels.append([])
+                bisect.insort(levels[new_level], (token, kind, key))
+
+    def _recount(self, sounds_collection, terms, levels, touched):
+        """
+        Sustituir en un índice el recuento de unos términos por el de MongoDB
+
+        Args:
+            terms, levels: Índice a corregir
+            touched: {(tipo, clave): {textos originales}} de los términos
+        """
+        for (kind, key), labels in touched.items():
+            entry = terms.get((kind, key))
+            if entry:
+                labels = labels | set(entry["labels"])
+                for label, count in list(entry["labels"].items()):
+                    self._apply_term(terms, levels, (kind, label), -count)
+
+            counts = Counter()
+            field = self.KINDS[kind]
+            for sound in sounds_collection.find({field: {"$in": sorted(labels)}}, {field: 1}):
+                for (term_kind, label), count in self._contributions(sound).items():
+                    if term_kind == kind and normalize_text(label) == key:
+                        counts[label] += count
+
+            for label, count in counts.items():
+                self._apply_term(terms, levels, (kind, label), count)
+
+    def _invalidate(self, term):
+        """Descartar las respuestas memorizadas de los prefijos de un término"""
+        kind, label = term
+        for token in self._tokens(kind, normalize_text(label)):
+            for length in range(1, len(token) + 1):
+                self._cache.pop(token[:length], None)
+
+    @staticmethod
+    def _level(count):
+        """Nivel de popularidad: 0 para 1 sonido, 1 para 2-3, 2 para 4-7..."""
+        return max(count, 1).bit_length() - 1
+
+    def _tokens(self, kind, key):
+        """Claves por las que se encuentra un término (los nombres también por palabra)"""
+        tokens = {key}
+        if kind == "nombre":
+            tokens.update(
+                word for word in key.split(' ') if len(word) >= self.MIN_WORD_LENGTH
+            )
+        return tokens
+
+    def _contributions(self, sound):
+        """Términos que aporta un sonido: {(tipo, texto original): 1}"""
+        contributions = Counter()
+        if not sound:
+            return contributions
+
+        for kind, field in self.KINDS.items():
+            value = sound.get(field)
+            values = value if isinstance(value, list) else [value]
+            for item in set(values):
+                if isinstance(item, str) and normalize_text(item):
+                    contributions[(kind, item.strip())] += 1
+
+        return contributions
+
+# Instancia global del índice de sugerencias
+suggest_index = PrefixIndex()
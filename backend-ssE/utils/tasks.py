@@ -0,0 +1,78 @@
+"""
+Cola de tareas en segundo plano dentro de cada proceso
+
+Un pool de hilos acotado para trabajo que no debe retrasar la respuesta
+(como analizar el audio de un sonido recién creado). El pool se crea con
+la primera tarea, así que un servidor que precarga la app y luego hace
+fork no hereda hilos muertos.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import Config
+
+class TaskQueue:
+    """Pool de hilos con contadores de tareas"""
+
+    def __init__(self, max_workers=2, name='tareas'):
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Encolar una tarea; los errores se registran y no se propagan
+
+        Returns:
+            Future: Resultado de la tarea
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+            self._counters["submitted"] += 1
+            future = self._executor.submit(self._run, function, *args, **kwargs)
+            self._pending.add(future)
+
+        future.add_done_callback(self._done)
+        return future
+
+    def _run(self, function, *args, **kwargs):
+        try:
+            result = function(*args, **kwargs)
+            self._count("completed")
+            return result
+        except Exception as e:
+            self._count("failed")
+            print(f"Error en tarea en segundo plano ({getattr(function, '__name__', function)}): {e}")
+            return None
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def wait(self, timeout=None):
+        """Esperar a que terminen las tareas encoladas (scripts y pruebas)"""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+    def stats(self):
+        """Contadores y tareas pendientes"""
+        with self._lock:
+            return {
+                **self._counters,
+                "pending": len(self._pending),
+                "workers": self.max_workers
+            }
+
+# Instancia global de la cola de procesamiento de audio
+task_queue = TaskQueue(Config.AUDIO_WORKERS, name='audio')
@@ -0,0 +1,299 @@
+"""
+Sesiones de subida reanudables por fragmentos
+
+Cada sesión es un directorio con sus metadatos (session.json), el archivo
+de datos preasignado al tamaño final y un marcador por fragmento recibido
+con su SHA-256. Los fragmentos se escriben directamente en su posición del
+archivo de datos leyendo la petición por bloques, así que la memoria por
+subida está acotada y ensamblar el archivo final es solo renombrarlo.
+
+Una vez guardado el audio, la sesión conserva su referencia ("stored")
+hasta que se crea el sonido, para poder reintentar ese último paso. Si el
+cliente anuncia un contenido que ya está guardado, la sesión nace con su
+referencia y no hace falta enviar ningún fragmento. En las subidas
+directas ("direct") el cliente envía el archivo entero al almacenamiento
+con una URL prefirmada y la sesión solo guarda a qué clave va; como el
+servidor no ve esa transferencia, la sesión sigue viva mientras la URL
+no caduca y mientras el cliente consulta su estado. Las sesiones de
+archivo ("archive") suben el ZIP de una importación masiva, que se lee
+directamente desde el archivo de datos.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+from collections import Counter
+
+# Tamaño de bloque al leer el cuerpo de un fragmento
+BLOCK_SIZE = 64 * 1024
+
+class UploadSessionStore:
+    """Sesiones de subida guardadas en disco, compartidas entre workers"""
+
+    def __init__(self, root, session_ttl=24 * 3600, on_discard=None):
+        """
+        Args:
+            root: Directorio de las sesiones
+            session_ttl: Segundos sin actividad tras los que una sesión caduca
+            on_discard: Función que recibe una sesión descartada con su audio
+                ya guardado o con una subida directa, para liberar la
+                referencia o borrar el objeto subido
+        """
+        self.root = root
+        self.session_ttl = session_ttl
+        self.on_discard = on_discard
+
+    def create(self, filename, size, chunk_size, stored=None, direct=None, archive=False):
+        """
+        Crear una sesión y preasignar su archivo de datos
+
+        Args:
+            stored: Audio ya guardado con ese contenido (no se envían fragmentos)
+            direct: Subida prefirmada al almacenamiento (no se envían fragmentos)
+            archive: La sesión sube el ZIP de una importación masiva
+
+        Returns:
+            dict: Metadatos de la sesión
+        """
+        self.cleanup_expired()
+
+        session = {
+            "upload_id": uuid.uuid4().hex,
+            "filename": filename,
+            "size": size,
+            "chunk_size": chunk_size,
+            "total_chunks": max(1, -(-size // chunk_size)),
+            "created_at": time.time(),
+            "stored": stored,
+            "direct": direct,
+            "archive": archive
+        }
+
+        directory = self._directory(session["upload_id"])
+        os.makedirs(os.path.join(directory, "chunks"))
+        if stored is None and direct is None:
+            with open(self._data_path(session["upload_id"]), 'wb') as data:
+                data.truncate(size)
+        self.save(session)
+
+        return session
+
+    def save(self, session):
+        """Guardar los metadatos de una sesión"""
+        self._write_json(os.path.join(self._directory(session["upload_id"]), "session.json"), session)
+
+    def get(self, upload_id):
+        """Metadatos de una sesión o None si no existe"""
+        if not self._valid_id(upload_id):
+            return None
+        try:
+            with open(os.path.join(self._directory(upload_id), "session.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_chunk(self, session, index, stream, expected_sha256=None):
+        """
+        Escribir un fragmento en su posición leyendo el cuerpo por bloques
+
+        Args:
+            session: Metadatos de la sesión
+            index: Número de fragmento (desde 0)
+            stream: Cuerpo de la petición
+            expected_sha256: SHA-256 enviado por el cliente (opcional)
+
+        Returns:
+            str: SHA-256 del fragmento
+
+        Raises:
+            ValueError: Si el número, el tamaño o el checksum no son válidos
+        """
+        if session.get("stored"):
+            raise ValueError("El audio de esta sesión ya está guardado")
+        if session.get("direct"):
+            raise ValueError("Esta sesión se sube directamente al almacenamiento")
+        if not 0 <= index < session["total_chunks"]:
+            raise ValueError(f"Fragmento fuera de rango (0-{session['total_chunks'] - 1})")
+
+        offset = index * session["chunk_size"]
+        expected_length = min(session["chunk_size"], session["size"] - offset)
+        digest = hashlib.sha256()
+        received = 0
+
+        with open(self._data_path(session["upload_id"]), 'r+b') as data:
+            data.seek(offset)
+            while True:
+                block = stream.read(BLOCK_SIZE)
+                if not block:
+                    break
+                received += len(block)
+                if received > expected_length:
+                    raise ValueError(f"El fragmento {index} supera {expected_length} bytes")
+                digest.update(block)
+                data.write(block)
+
+        if received != expected_length:
+            raise ValueError(f"El fragmento {index} debe tener {expected_length} bytes")
+
+        checksum = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != checksum:
+            raise ValueError(f"Checksum incorrecto en el fragmento {index}")
+
+        marker = os.path.join(self._directory(session["upload_id"]), "chunks", str(index))
+        with open(f"{marker}.tmp", 'w') as f:
+            f.write(checksum)
+        os.replace(f"{marker}.tmp", marker)
+
+        return checksum
+
+    def status(self, session):
+        """
+        Fragmentos recibidos y pendientes de una sesión
+
+        Returns:
+            dict: Estado con received, missing y bytes_received
+        """
+        checksums = self._checksums(session)
+        received = sorted(checksums)
+        missing = [index for index in range(session["total_chunks"]) if index not in checksums]
+        if session.get("stored") or session.get("direct"):
+            missing = []
+
+        bytes_received = sum(
+            min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+            for index in received
+        )
+
+        return {
+            **session,
+            "received": received,
+            "missing": missing,
+            "bytes_received": session["size"] if session.get("stored") else bytes_received,
+            "complete": not missing
+        }
+
+    def assemble(self, session):
+        """
+        Comprobar que el archivo está completo y calcular su checksum
+
+        Los fragmentos ya están en su posición, así que no se vuelve a leer
+        el audio: el checksum del archivo es el SHA-256 de los SHA-256 de
+        sus fragmentos en orden, que el cliente puede calcular igual.
+
+        Returns:
+            tuple: (ruta del archivo de datos, checksum)
+
+        Raises:
+            ValueError: Si faltan fragmentos
+        """
+        checksums = self._checksums(session)
+        missing = [index for index in range(session["total_chunks"]) if index not in checksums]
+        if missing:
+            raise ValueError(f"Faltan fragmentos: {missing[:20]}")
+
+        tree = hashlib.sha256()
+        for index in range(session["total_chunks"]):
+            tree.update(bytes.fromhex(checksums[index]))
+
+        return self._data_path(session["upload_id"]), tree.hexdigest()
+
+    def delete(self, upload_id, discard=True):
+        """
+        Eliminar una sesión y sus datos
+
+        Args:
+            discard: Liberar el audio ya guardado (False si pasó a un sonido)
+        """
+        if not self._valid_id(upload_id):
+            return
+
+        session = self.get(upload_id)
+        shutil.rmtree(self._directory(upload_id), ignore_errors=True)
+        if discard and session and (session.get("stored") or session.get("direct")) and self.on_discard:
+            self.on_discard(session)
+
+    def cleanup_expired(self):
+        """Eliminar las sesiones abandonadas más antiguas que session_ttl"""
+        if not os.path.isdir(self.root):
+            return 0
+
+        removed = 0
+        limit = time.time() - self.session_ttl
+        for upload_id in os.listdir(self.root):
+            try:
+                if self._last_activity(upload_id) < limit:
+                    self.delete(upload_id)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def touch(self, session):
+        """Marcar actividad en una sesión (las directas no reciben fragmentos)"""
+        os.utime(os.path.join(self._directory(session["upload_id"]), "session.json"))
+
+    def _last_activity(self, upload_id):
+        """
+        Última actividad de una sesión
+
+        Cada fragmento recibido actualiza la fecha del directorio chunks.
+        Una subida directa cuenta como activa hasta que caduca su URL, y
+        cada consulta de su estado (touch) la mantiene viva.
+        """
+        directory = self._directory(upload_id)
+        activity = os.path.getmtime(os.path.join(directory, "chunks"))
+
+        session = self.get(upload_id)
+        if session and session.get("direct"):
+            activity = max(
+                activity,
+                os.path.getmtime(os.path.join(directory, "session.json")),
+                session["direct"].get("expires_at", 0)
+            )
+        return activity
+
+    def held_blobs(self):
+        """
+        Audios retenidos por las sesiones con el audio ya guardado
+
+        Returns:
+            Counter: {sha256: sesiones que lo retienen}
+        """
+        held = Counter()
+        if not os.path.isdir(self.root):
+            return held
+
+        for upload_id in os.listdir(self.root):
+            session = self.get(upload_id)
+            if session and session.get("stored"):
+                held[session["stored"]["sha256"]] += 1
+        return held
+
+    def _checksums(self, session):
+        """{índice: sha256} de los fragmentos recibidos"""
+        chunks_dir = os.path.join(self._directory(session["upload_id"]), "chunks")
+        checksums = {}
+        for name in os.listdir(chunks_dir):
+            if name.isdigit():
+                with open(os.path.join(chunks_dir, name)) as f:
+                    checksums[int(name)] = f.read().strip()
+        return checksums
+
+    @staticmethod
+    def _valid_id(upload_id):
+        return len(upload_id) == 32 and all(c in "0123456789abcdef" for c in upload_id)
+
+    @staticmethod
+    def _write_json(path, value):
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(value, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _directory(self, upload_id):
+        return os.path.join(self.root, upload_id)
+
+    def _data_path(self, upload_id):
+        return os.path.join(self._directory(upload_id), "data.part")
@@ -136,6 +136,7 @@ const HomePage = ({ sounds, onSoundSelect }) => {
                 {sound.audio_url && (
                   <AudioPlayer
                     audioUrl={`${APP_CONFIG.UPLOADS_URL}${sound.audio_url}`}
+                    soundId={sound._id}
                     title={sound.nombre}
                     compact={true}
                   />
@@ -483,6 +484,7 @@ const SoundModal = ({ sound, onClose }) => {
             <div className="audio-section">
               <AudioPlayer
                 audioUrl={`${APP_CONFIG.UPLOADS_URL}${sound.audio_url}`}
+                soundId={sound._id}
                 title={sound.nombre}
               />
             </div>
@@ -1,15 +1,76 @@
 import React, { useState, useRef, useEffect } from "react";
+import { soundsAPI } from "../../services/api";
 import "./AudioPlayer.css";
 
-const SimpleAudioPlayer = ({ audioUrl, title = "Audio", compact = false }) => {
+const SimpleAudioPlayer = ({
+  audioUrl,
+  soundId = null,
+  title = "Audio",
+  compact = false,
+}) => {
   const [isPlaying, setIsPlaying] = useState(false);
   const [duration, setDuration] = useState(0);
   const [currentTime, setCurrentTime] = useState(0);
   const [volume, setVolume] = useState(0.7);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [peaks, setPeaks] = useState(null);
 
   const audioRef = useRef(null);
+  const waveformRef = useRef(null);
+
+  // Picos precalculados por el servidor (sin decodificar el audio)
+  useEffect(() => {
+    const canvas = waveformRef.current;
+    if (!soundId || !canvas) return;
+
+    // El canvas está oculto hasta tener picos: se mide el contenedor
+    let cancelled = false;
+    const width = canvas.parentElement?.clientWidth || 300;
+    const px = Math.max(1, Math.round(width * (window.devicePixelRatio || 1)));
+
+    soundsAPI
+      .getSoundPeaks(soundId, px)
+      .then((response) => {
+        // 202: el análisis aún no ha terminado
+        if (!cancelled && response.status === 200) {
+          setPeaks(new Int16Array(response.data));
+        }
+      })
+      .catch(() => {
+        if (!cancelled) setPeaks(null);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [soundId]);
+
+  useEffect(() => {
+    const canvas = waveformRef.current;
+    if (!canvas || !peaks) return;
+
+    const length = peaks.length / 2;
+    canvas.width = length;
+    canvas.height = 64;
+
+    const context = canvas.getContext("2d");
+    const middle = canvas.height / 2;
+    const played = duration ? (currentTime / duration) * length : 0;
+
+    context.clearRect(0, 0, canvas.width, canvas.height);
+    for (let x = 0; x < length; x++) {
+      const min = peaks[2 * x] / 32768;
+      const max = peaks[2 * x + 1] / 32768;
+      context.fillStyle = x < played ? "#4f46e5" : "#c7d2fe";
+      context.fillRect(
+        x,
+        middle - max * middle,
+        1,
+        Math.max(1, (max - min) * middle)
+      );
+    }
+  }, [peaks, currentTime, duration]);
 
   useEffect(() => {
     const audio = audioRef.current;
@@ -129,6 +190,8 @@ const SimpleAudioPlayer = ({ audioUrl, title = "Audio", compact = false }) => {
       {/* Audio element oculto */}
       <audio
         ref={audioRef}
+        // Sin quality/format: el servidor elige la versión por Accept y, si
+        // aún no existe, sirve el original mientras la genera en segundo plano
         src={audioUrl}
         preload="metadata"
         style={{ display: "none" }}
@@ -164,30 +227,48 @@ const SimpleAudioPlayer = ({ audioUrl, title = "Audio", compact = false }) => {
         )}
       </div>
 
+      {/* Forma de onda (si el servidor ya analizó el audio) */}
+      {soundId && (
+        <canvas
+          ref={waveformRef}
+          className="waveform"
+          onClick={handleSeek}
+          style={{
+            display: peaks ? "block" : "none",
+            width: "100%",
+            height: compact ? "32px" : "64px",
+            cursor: "pointer",
+            marginTop: "8px",
+          }}
+        />
+      )}
+
       {/* Barra de progreso simple */}
-      <div
-        className="progress-bar"
-        onClick={handleSeek}
-        style={{
-          width: "100%",
-          height: "8px",
-          backgroundColor: "#e5e7eb",
-          borderRadius: "4px",
-          cursor: "pointer",
-          marginTop: "8px",
-          position: "relative",
-        }}
-      >
+      {!peaks && (
         <div
+          className="progress-bar"
+          onClick={handleSeek}
           style={{
-            width: duration ? `${(currentTime / duration) * 100}%` : "0%",
-            height: "100%",
-            backgroundColor: "#4f46e5",
+            width: "100%",
+            height: "8px",
+            backgroundColor: "#e5e7eb",
             borderRadius: "4px",
-            transition: "width 0.1s",
+            cursor: "pointer",
+            marginTop: "8px",
+            position: "relative",
           }}
-        />
-      </div>
+        >
+          <div
+            style={{
+              width: duration ? `${(currentTime / duration) * 100}%` : "0%",
+              height: "100%",
+              backgroundColor: "#4f46e5",
+              borderRadius: "4px",
+              transition: "width 0.1s",
+            }}
+          />
+        </div>
+      )}
 
       {isLoading && (
         <div
@@ -620,6 +620,7 @@ const SoundMap = ({
                   <div className="audio-player-container">
                     <SimpleAudioPlayer
                       audioUrl={`${APP_CONFIG.UPLOADS_URL}${sound.audio_url}`}
+                      soundId={sound._id}
                       title={sound.nombre}
                       compact={true}
                     />
@@ -83,6 +83,14 @@ export const soundsAPI = {
   addTagToSound: (id, tag) => {
     return api.post(`/sounds/${id}/tags`, { tag });
   },
+
+  // Obtener picos de la forma de onda (pares mín/máx int16 intercalados)
+  getSoundPeaks: (id, px = 1000) => {
+    return api.get(`/sounds/${id}/peaks`, {
+      params: { px, format: "binary" },
+      responseType: "arraybuffer",
+    });
+  },
 };
 
 // Servicios para analytics
@@ -107,14 +115,103 @@ export const analyticsAPI = {
     return api.get("/analytics/timeline");
   },
 
+  // Emociones, ubicaciones, etiquetas y línea de tiempo en una sola petición
+  // (las secciones que no llegan a tiempo vienen con data null)
+  getDashboard: (params = {}) => {
+    return api.get("/analytics/dashboard", { params });
+  },
+
   // Búsqueda avanzada
   searchSounds: (params) => {
     return api.get("/analytics/search", { params });
   },
 
+  // Sugerencias de autocompletado (etiquetas, autores, nombres, emociones)
+  getSuggestions: (prefix, params = {}) => {
+    return api.get("/search/suggest", { params: { prefix, ...params } });
+  },
+
   // Obtener recomendaciones
-  getRecommendations: (soundId) => {
-    return api.get(`/analytics/recommendations/${soundId}`);
+  getRecommendations: (soundId, params = {}) => {
+    return api.get(`/analytics/recommendations/${soundId}`, { params });
+  },
+
+  // Recomendaciones para varios sonidos en una sola petición
+  getBatchRecommendations: (soundIds, params = {}) => {
+    return api.post("/recommendations", { sound_ids: soundIds, ...params });
+  },
+};
+
+// Servicios para subidas reanudables por fragmentos
+export const uploadsAPI = {
+  // Abrir una sesión de subida (con sha256, un audio ya guardado no se reenvía;
+  // con direct, el archivo va directo al almacenamiento con una URL prefirmada)
+  createUpload: (file, sha256, direct = false) => {
+    return api.post("/uploads", {
+      filename: file.name,
+      size: file.size,
+      sha256,
+      direct,
+    });
+  },
+
+  // Estado de una sesión (fragmentos pendientes)
+  getUpload: (uploadId) => {
+    return api.get(`/uploads/${uploadId}`);
+  },
+
+  // Enviar un fragmento
+  uploadChunk: (uploadId, index, blob) => {
+    return api.put(`/uploads/${uploadId}/chunks/${index}`, blob, {
+      headers: { "Content-Type": "application/octet-stream" },
+    });
+  },
+
+  // Crear el sonido con sus metadatos
+  completeUpload: (uploadId, metadata) => {
+    return api.post(`/uploads/${uploadId}/complete`, metadata);
+  },
+
+  // Cancelar la subida
+  abortUpload: (uploadId) => {
+    return api.delete(`/uploads/${uploadId}`);
+  },
+
+  // Subir un archivo completo; con uploadId reanuda una sesión existente
+  uploadSound: async (
+    file,
+    metadata,
+    { uploadId, sha256, direct = false, onProgress } = {}
+  ) => {
+    let session;
+    if (uploadId) {
+      session = (await uploadsAPI.getUpload(uploadId)).data.data;
+    } else {
+      session = (await uploadsAPI.createUpload(file, sha256, direct)).data.data;
+      session.missing =
+        session.stored || session.direct
+          ? []
+          : [...Array(session.total_chunks).keys()];
+    }
+
+    if (session.direct && !session.stored) {
+      await axios.put(session.direct.url, file, {
+        headers: session.direct.headers,
+        onUploadProgress: (event) =>
+          onProgress && onProgress(event.loaded / file.size, session.upload_id),
+      });
+    }
+
+    let sent = session.total_chunks - session.missing.length;
+    for (const index of session.missing) {
+      const start = index * session.chunk_size;
+      const blob = file.slice(start, start + session.chunk_size);
+      await uploadsAPI.uploadChunk(session.upload_id, index, blob);
+      sent += 1;
+      if (onProgress) onProgress(sent / session.total_chunks, session.upload_id);
+    }
+
+    return uploadsAPI.completeUpload(session.upload_id, metadata);
   },
 };
 